@@ -0,0 +1,15 @@
+"""Where the tool keeps its per-user data.
+
+Everything lives under %LOCALAPPDATA%\\CCI_New_PC_Setup (~/.cache/CCI_New_PC_Setup
+when LOCALAPPDATA is not set): the wallpaper cache, run journals and archives,
+the compiled settings catalog and the step history.
+"""
+import os
+
+APP_DIR_NAME = "CCI_New_PC_Setup"
+
+
+def app_data_dir(*parts) -> str:
+    """Path of `parts` under the per-user data folder; nothing is created."""
+    base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, APP_DIR_NAME, *parts)
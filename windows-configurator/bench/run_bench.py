@@ -0,0 +1,416 @@
+"""Headless benchmarks for the configurator's logic and subprocess paths.
+
+Nothing here needs Tk, Windows or a display. Measured:
+
+    naming.*        name generation throughput (form rules and bulk batches)
+    plan.*          building and rendering the configure-windows.ps1 plan
+    request.*       encoding a configure request for the worker (ps_worker.py)
+    checklist.*     full and incremental checklist refresh for N rows
+    catalog.*       settings catalog compile and cached load, as shipped and
+                    padded to hundreds of settings
+    fleet.*         loading synthetic machine snapshots (cold, and incremental
+                    from the index) and the compliance statistics
+    preview.*       thumbnail decode per image size and format (needs Pillow)
+    subprocess.*    dispatch overhead against the stub powershell in stub/,
+                    through subprocess.run, ps_runner.BackgroundRunner and a
+                    request to the long-lived worker (ps_worker_stub.py)
+
+Each run is saved to results/<timestamp>-<host>.json and compared with the
+previous result file (or --compare FILE), showing the change in median.
+
+    python bench/run_bench.py                 # everything
+    python bench/run_bench.py --quick         # fewer repeats, no 8K images
+    python bench/run_bench.py -k checklist -k naming
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+
+import configurator_plan as _plan  # noqa: E402
+import fleet  # noqa: E402
+import naming  # noqa: E402
+import preview_cache  # noqa: E402
+import run_archive  # noqa: E402
+import selection as _sel  # noqa: E402
+import settings_catalog as _catalog  # noqa: E402
+from ps_runner import BackgroundRunner  # noqa: E402
+from ps_worker import WorkerClient, encode_request  # noqa: E402
+
+RESULTS_DIR = HERE / "results"
+STUB_DIR = HERE / "stub"
+WORKER_STUB = HERE.parent / "ps_worker_stub.py"
+
+ALL_PARAMS = {
+    "TimeZoneId": "Eastern Standard Time",
+    "BackgroundPath": r"C:\Wallpapers\support-info.png",
+    "PowerButtonDoNothing": True,
+    "LidCloseDoNothing": True,
+    "SkipSteps": ["power.disk_ac", "taskbar.open_ui"],
+    **{switch: True for _key, switch in _sel.SECTION_SWITCHES},
+    "DoPowerButtonActions": True,
+}
+
+
+def check_params(params=ALL_PARAMS):
+    """Fail fast when SkipSteps names a step the plan does not have; such a skip would measure nothing."""
+    ids = {step.id for step in _plan.build_plan(params, scheme=_plan.SCHEME_PLACEHOLDER, exists=lambda p: True)}
+    unknown = [sid for sid in params.get("SkipSteps", ()) if sid not in ids]
+    if unknown:
+        raise SystemExit(f"ALL_PARAMS SkipSteps names unknown step ids: {', '.join(unknown)}")
+
+
+def measure(fn, repeat=20, warmup=1):
+    """Call `fn` repeatedly; timing statistics in milliseconds."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000.0)
+    samples.sort()
+    return {
+        "n": len(samples),
+        "min_ms": samples[0],
+        "median_ms": statistics.median(samples),
+        "mean_ms": statistics.fmean(samples),
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+    }
+
+
+# --- logic -------------------------------------------------------------------
+
+def bench_naming(ctx):
+    rows = [(f"Customer{i % 97}", ("Console", "Laptop", "Rack PC", "Desktop")[i % 4], f"SN{i:08d}") for i in range(10000)]
+
+    def form():
+        for customer, type_name, serial in rows:
+            naming.generate_name(customer, type_name, serial)
+
+    # every 10th serial repeats, so the batch also exercises the suffix path
+    clashing = [(c, t, s[:-1] + "0") if i % 10 == 0 else (c, t, s) for i, (c, t, s) in enumerate(rows)]
+    yield "naming.generate_name[10k]", measure(form, ctx.repeat(10)), {"items": len(rows)}
+    yield "naming.generate_batch[10k]", measure(lambda: naming.generate_batch(clashing), ctx.repeat(10)), {"items": len(rows)}
+
+
+def bench_plan(ctx):
+    def build():
+        return _plan.build_plan(ALL_PARAMS, scheme=_plan.SCHEME_PLACEHOLDER, exists=lambda p: True)
+
+    plan = build()
+    yield "plan.build", measure(build, ctx.repeat(200)), {"steps": len(plan)}
+    yield "plan.render", measure(lambda: _plan.render_plan(plan), ctx.repeat(200)), {"steps": len(plan)}
+    sel = _sel.default_selection()
+    yield "plan.selection_params", measure(lambda: _sel.selection_params(sel, ALL_PARAMS["BackgroundPath"]), ctx.repeat(200)), {}
+
+
+def bench_request(ctx):
+    args = {"script": "configure-windows.ps1", "params": dict(ALL_PARAMS, StepEvents=True)}
+    yield "request.encode", measure(lambda: encode_request(1, "configure", args), ctx.repeat(500)), {}
+
+
+def _checklist_rows(n):
+    """`n` rows cycling through the real checklist rules, with unique descriptions."""
+    base = _sel.CHECKLIST
+    return [base[i % len(base)]._replace(desc=f"{base[i % len(base)].desc} #{i}") for i in range(n)]
+
+
+def bench_checklist(ctx):
+    for n in (len(_sel.CHECKLIST), 250, 2500, 25000):
+        rows = _checklist_rows(n)
+        on = _sel.default_selection()
+        off = dict(on, power=False, taskbar=False, personalization=False)
+        checklist = _sel.Checklist(rows)
+        flip = [on, off]
+
+        def full():
+            flip.reverse()
+            return checklist.refresh(flip[0])
+
+        def incremental():
+            flip.reverse()
+            return checklist.refresh(flip[0], ("taskbar",))
+
+        yield f"checklist.full[{n}]", measure(full, ctx.repeat(20)), {"rows": n}
+        yield f"checklist.incremental[{n}]", measure(incremental, ctx.repeat(20)), {
+            "rows": n, "affected": len(checklist.affected(("taskbar",)))}
+
+
+def _padded_catalog(n):
+    """The shipped catalog plus `n` extra taskbar settings, each with a checklist row and a registry step."""
+    with open(_catalog.default_catalog_path(), encoding="utf-8") as fh:
+        data = json.load(fh)
+    for i in range(n):
+        data["settings"].append({"key": f"extra_{i}", "group": "taskbar", "label": f"Extra setting {i}", "default": False})
+        data["checklist"].append({"desc": f"Extra setting {i}", "when": ["taskbar", f"extra_{i}"]})
+        data["operations"]["taskbar"].append({
+            "id": f"extra_{i}", "description": f"Set Extra{i} = 1", "kind": "registry",
+            "op": {"key": "{HKCU_EXPLORER_ADVANCED}", "name": f"Extra{i}", "value": 1}})
+    return data
+
+
+def bench_catalog(ctx):
+    with tempfile.TemporaryDirectory(prefix="cci-bench-") as tmp:
+        for n in (0, 500):
+            path = os.path.join(tmp, f"catalog-{n}.json")
+            with open(path, "w", encoding="utf-8") as fh:
+                json.dump(_padded_catalog(n), fh)
+            cache = os.path.join(tmp, f"cache-{n}")
+            _catalog.load_catalog(path, cache_dir=cache)
+            meta = {"settings": len(_catalog.load_catalog(path, cache_dir=cache).settings)}
+            yield f"catalog.compile[+{n}]", measure(lambda: _catalog.load_catalog(path, use_cache=False), ctx.repeat(10)), meta
+            yield f"catalog.cached[+{n}]", measure(lambda: _catalog.load_catalog(path, cache_dir=cache), ctx.repeat(50)), meta
+
+
+def _write_fleet(folder, n, seed=7):
+    """`n` snapshots of machines that mostly comply; about one machine in ten has two snapshots."""
+    import gzip
+    import random
+    rng = random.Random(seed)
+    checks = [c for c in fleet.fleet_checks() if c.probe_key]
+    for i in range(n):
+        customer = rng.choice(("ACME", "CONTOSO", "FABRIKAM", ""))
+        machine = f"{customer}-{rng.choice('CLRD')}-{i % max(1, n - n // 10):06d}" if customer else f"DESKTOP-{i:07d}"
+        state = {c.probe_key: c.desired if rng.random() < 0.95 else "drifted" for c in checks}
+        snapshot = {"v": 1, "machine": machine, "taken": f"2026-{1 + i % 9:02d}-01T10:00:00Z", "app": "bench", "state": state}
+        with gzip.open(os.path.join(folder, f"{machine}-{i}{fleet.SNAPSHOT_SUFFIX}"), "wb") as fh:
+            fh.write(json.dumps(snapshot, separators=(",", ":")).encode("utf-8"))
+
+
+def bench_fleet(ctx):
+    n = 2000 if ctx.quick else 20000
+    with tempfile.TemporaryDirectory(prefix="cci-bench-") as tmp:
+        _write_fleet(tmp, n)
+        meta = {"snapshots": n, "numpy": fleet.NUMPY_AVAILABLE}
+        yield f"fleet.load_cold[{n}]", measure(lambda: fleet.load_fleet(tmp, use_index=False), ctx.repeat(2), warmup=0), meta
+        fleet.load_fleet(tmp)
+        yield f"fleet.load_indexed[{n}]", measure(lambda: fleet.load_fleet(tmp), ctx.repeat(10)), meta
+        columns, _stats = fleet.load_fleet(tmp)
+        yield f"fleet.analyze[{n}]", measure(lambda: fleet.analyze(columns), ctx.repeat(10)), meta
+
+
+def _write_archive(folder, n, seed=11):
+    """`n` archived apply runs made of the plan's DRYRUN lines plus timings; one run has a rare warning."""
+    import gzip
+    import random
+    rng = random.Random(seed)
+    lines = _plan.dryrun_lines(_plan.build_plan(ALL_PARAMS))
+    started = time.time() - n * 600.0
+    for i in range(n):
+        run_id = f"bench-{i:06d}"
+        body = [f"{line}  ({rng.random() * 900:.1f} ms)" for line in lines]
+        if i == n // 2:
+            body.append("WARNING: Access is denied writing HKLM\\SOFTWARE\\Policies\\BenchQuirk")
+        with gzip.open(os.path.join(folder, run_id + ".log.gz"), "wt", encoding="utf-8") as fh:
+            fh.write("\n".join(body) + "\n")
+        meta = {"id": run_id, "kind": "apply", "title": "Apply selected settings", "machine": "BENCH", "version": "bench",
+                "selections": ALL_PARAMS, "started": "", "finished": "", "status": "ok", "exit_code": 0,
+                "stored_bytes": os.path.getsize(os.path.join(folder, run_id + ".log.gz")), "started_ts": started + i * 600.0}
+        with open(os.path.join(folder, run_id + ".json"), "w", encoding="utf-8") as fh:
+            json.dump(meta, fh)
+
+
+def bench_archive(ctx):
+    n = 200 if ctx.quick else 2000
+    with tempfile.TemporaryDirectory(prefix="cci-bench-") as tmp:
+        _write_archive(tmp, n)
+        meta = {"runs": n}
+        yield f"archive.rebuild[{n}]", measure(lambda: run_archive.RunArchive(tmp)._rebuild(), ctx.repeat(2), warmup=0), meta
+        yield f"archive.open[{n}]", measure(lambda: run_archive.RunArchive(tmp).runs(), ctx.repeat(10)), meta
+        archive = run_archive.RunArchive(tmp)
+        yield f"archive.search_rare[{n}]", measure(lambda: archive.search("access is denied"), ctx.repeat(20)), meta
+        yield f"archive.search_common[{n}]", measure(lambda: archive.search("Set power", limit=50), ctx.repeat(10)), meta
+        text = "\n".join(_plan.dryrun_lines(_plan.build_plan(ALL_PARAMS))) + "\n"
+        yield f"archive.record[{n}]", measure(lambda: archive.record("apply", "bench", text), ctx.repeat(10)), meta
+
+
+def bench_preview(ctx):
+    if not preview_cache.PIL_AVAILABLE:
+        ctx.note("preview: Pillow is not installed, skipped")
+        return
+    from PIL import Image
+    sizes = [(1920, 1080), (3840, 2160)] + ([] if ctx.quick else [(7680, 4320)])
+    formats = [("PNG", ".png"), ("JPEG", ".jpg"), ("BMP", ".bmp")]
+    with tempfile.TemporaryDirectory(prefix="cci-bench-") as tmp:
+        for w, h in sizes:
+            # a gradient compresses like a photo more than a flat fill does
+            img = Image.linear_gradient("L").resize((w, h)).convert("RGB")
+            for fmt, ext in formats:
+                path = os.path.join(tmp, f"{w}x{h}{ext}")
+                img.save(path, fmt)
+                yield f"preview.decode[{fmt} {w}x{h}]", measure(lambda: preview_cache.decode_thumbnail(path), ctx.repeat(5)), {
+                    "bytes": os.path.getsize(path)}
+
+
+# --- subprocess dispatch -----------------------------------------------------
+
+def stub_powershell():
+    """Full path of the stub powershell for this platform."""
+    return str(STUB_DIR / ("powershell.cmd" if os.name == "nt" else "powershell"))
+
+
+def _wait_runner(cmd):
+    runner = BackgroundRunner(cmd).start()
+    while True:
+        kind, payload = runner.events.get()
+        if kind == "exit":
+            return payload
+
+
+def _wait_job(job):
+    while True:
+        kind, payload = job.events.get()
+        if kind == "exit":
+            return payload
+
+
+def bench_subprocess(ctx):
+    os.environ["CCI_BENCH_PYTHON"] = sys.executable
+    ps = stub_powershell()
+    base = [ps, "-NoProfile", "-NonInteractive", "-ExecutionPolicy", "Bypass", "-Command"]
+    python_only = [sys.executable, str(STUB_DIR / "powershell_stub.py"), "-Command"]
+    yield "subprocess.python_baseline", measure(
+        lambda: subprocess.run(python_only + ["exit 0"], stdout=subprocess.DEVNULL), ctx.repeat(10)), {}
+    yield "subprocess.run", measure(lambda: subprocess.run(base + ["exit 0"], stdout=subprocess.DEVNULL), ctx.repeat(10)), {}
+    yield "subprocess.background_runner", measure(lambda: _wait_runner(base + ["exit 0"]), ctx.repeat(10)), {}
+    yield "subprocess.background_runner[5000 lines]", measure(lambda: _wait_runner(base + ["1..5000"]), ctx.repeat(10)), {
+        "lines": 5000}
+    if ctx.real_powershell:
+        real = shutil.which("powershell") or shutil.which("pwsh")
+        if real:
+            cmd = [real, "-NoProfile", "-NonInteractive", "-Command", "exit 0"]
+            yield "subprocess.real_powershell", measure(lambda: subprocess.run(cmd, stdout=subprocess.DEVNULL), ctx.repeat(5)), {}
+        else:
+            ctx.note("subprocess: no powershell or pwsh on PATH, real_powershell skipped")
+
+    client = WorkerClient([sys.executable, str(WORKER_STUB)]).start()
+    try:
+        _wait_job(client.submit("ping"))  # pay the start-up once, outside the timings
+        yield "subprocess.worker_ping", measure(lambda: _wait_job(client.submit("ping")), ctx.repeat(50)), {}
+        configure = {"script": "configure-windows.ps1", "params": dict(ALL_PARAMS, DryRun=True)}
+        yield "subprocess.worker_configure", measure(lambda: _wait_job(client.submit("configure", configure)), ctx.repeat(50)), {}
+    finally:
+        client.close()
+
+
+BENCHMARKS = [
+    ("naming", bench_naming),
+    ("plan", bench_plan),
+    ("request", bench_request),
+    ("checklist", bench_checklist),
+    ("catalog", bench_catalog),
+    ("fleet", bench_fleet),
+    ("archive", bench_archive),
+    ("preview", bench_preview),
+    ("subprocess", bench_subprocess),
+]
+
+
+# --- running and comparing ---------------------------------------------------
+
+class Context:
+    def __init__(self, quick=False, real_powershell=False):
+        self.quick = quick
+        self.real_powershell = real_powershell
+        self.notes = []
+
+    def repeat(self, n):
+        return max(3, n // 4) if self.quick else n
+
+    def note(self, text):
+        self.notes.append(text)
+        print(f"  ({text})")
+
+
+def run(selected, ctx):
+    results = {}
+    for group, fn in BENCHMARKS:
+        if selected and not any(k in group for k in selected):
+            continue
+        for name, stats, extra in fn(ctx):
+            stats.update(extra)
+            results[name] = stats
+            print(f"  {name:<44} median {stats['median_ms']:9.3f} ms   p95 {stats['p95_ms']:9.3f} ms")
+    return results
+
+
+def environment():
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "pillow": preview_cache.PIL_AVAILABLE,
+    }
+
+
+def save(record, directory=RESULTS_DIR):
+    directory.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    host = "".join(c for c in platform.node() if c.isalnum() or c in "-_") or "host"
+    path = directory / f"{stamp}-{host}.json"
+    n = 2
+    while path.exists():
+        path = directory / f"{stamp}-{host}-{n}.json"
+        n += 1
+    path.write_text(json.dumps(record, indent=2), encoding="utf-8")
+    return path
+
+
+def latest_result(directory=RESULTS_DIR, exclude=None):
+    files = sorted(p for p in directory.glob("*.json") if p != exclude) if directory.is_dir() else []
+    return files[-1] if files else None
+
+
+def compare(current, previous):
+    """Lines comparing median times of the benchmarks both runs have."""
+    lines = [f"{'benchmark':<44} {'before':>10} {'after':>10} {'change':>8}"]
+    for name, stats in current.items():
+        old = previous.get(name)
+        if not old:
+            continue
+        before, after = old["median_ms"], stats["median_ms"]
+        change = (after - before) / before * 100.0 if before else 0.0
+        lines.append(f"{name:<44} {before:10.3f} {after:10.3f} {change:+7.1f}%")
+    return lines
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Run the headless configurator benchmarks.")
+    ap.add_argument("-k", dest="only", action="append", default=[], help="only run groups containing this text (repeatable)")
+    ap.add_argument("--quick", action="store_true", help="fewer repeats and no 8K images")
+    ap.add_argument("--real-powershell", action="store_true", help="also time the real powershell/pwsh when on PATH")
+    ap.add_argument("--compare", metavar="FILE", help="result file to compare with (default: the previous run)")
+    ap.add_argument("--no-save", action="store_true", help="do not write a result file")
+    args = ap.parse_args(argv)
+
+    check_params()
+    ctx = Context(quick=args.quick, real_powershell=args.real_powershell)
+    print("Running benchmarks...")
+    results = run(args.only, ctx)
+    record = dict(environment(), quick=args.quick, notes=ctx.notes, results=results)
+    saved = None if args.no_save else save(record)
+    baseline = Path(args.compare) if args.compare else latest_result(exclude=saved)
+    if baseline and baseline.exists():
+        previous = json.loads(baseline.read_text(encoding="utf-8"))
+        print(f"\nCompared with {baseline.name} ({previous.get('host')}, {previous.get('timestamp')}):")
+        print("\n".join(compare(results, previous.get("results", {}))))
+    if saved:
+        print(f"\nSaved {saved}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
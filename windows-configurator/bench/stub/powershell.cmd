@@ -0,0 +1,3 @@
+@echo off
+rem Stub powershell for bench\run_bench.py; see powershell_stub.py
+"%CCI_BENCH_PYTHON%" "%~dp0powershell_stub.py" %*
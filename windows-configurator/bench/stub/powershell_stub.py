@@ -0,0 +1,36 @@
+"""Stand-in for powershell.exe used by the subprocess benchmarks.
+
+Accepts the same leading switches the GUI passes (-NoProfile,
+-NonInteractive, -ExecutionPolicy Bypass) and understands just enough of
+-Command to be useful for timing:
+
+    -Command "exit 3"     exit with code 3
+    -Command "1..5000"    print the numbers 1 to 5000, one per line
+    -Command "..."        anything else: print nothing, exit 0
+"""
+import re
+import sys
+
+
+def main(argv):
+    command = ""
+    args = iter(argv)
+    for arg in args:
+        if arg.lower() == "-executionpolicy":
+            next(args, None)
+        elif arg.lower() == "-command":
+            command = " ".join(args)
+    command = command.strip()
+    m = re.fullmatch(r"(\d+)\.\.(\d+)", command)
+    if m:
+        lo, hi = int(m.group(1)), int(m.group(2))
+        sys.stdout.write("".join(f"{i}\n" for i in range(lo, hi + 1)))
+        return 0
+    m = re.fullmatch(r"exit\s+(-?\d+)", command, re.IGNORECASE)
+    if m:
+        return int(m.group(1))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
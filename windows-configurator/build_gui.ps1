@@ -25,12 +25,16 @@ $safe = $BaseName -replace ' ', '_'
 $outname = "$safe`_v$new.exe"
 Write-Host "Building $outname"
 
+# Refuse to bundle a settings catalog that does not validate
+py -3 settings_catalog.py settings_catalog.json
+if ($LASTEXITCODE -ne 0) { throw "settings_catalog.json is invalid" }
+
 # Run PyInstaller (must be on PATH - uses user's Python)
 # Script runs with working directory set to the script folder, so reference local paths.
 if ($Console) {
-    py -3 -m PyInstaller --onefile --uac-admin --add-data "assets;assets" --add-data "configure-windows.ps1;." "$Script"
+    py -3 -m PyInstaller --onefile --uac-admin --add-data "assets;assets" --add-data "configure-windows.ps1;." --add-data "ps_worker.ps1;." --add-data "settings_catalog.json;." "$Script"
 } else {
-    py -3 -m PyInstaller --onefile --windowed --uac-admin --add-data "assets;assets" --add-data "configure-windows.ps1;." "$Script"
+    py -3 -m PyInstaller --onefile --windowed --uac-admin --add-data "assets;assets" --add-data "configure-windows.ps1;." --add-data "ps_worker.ps1;." --add-data "settings_catalog.json;." "$Script"
 }
 
 # Move produced exe
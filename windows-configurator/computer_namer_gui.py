@@ -1,31 +1,59 @@
-import re
-import subprocess
+import time
+_STARTED = time.perf_counter()
+import sys
+import profiling
+# --profile: record startup and PowerShell timings and write a Chrome trace next to the exe on exit.
+# Enabled before the other imports so their cost is part of the trace.
+if __name__ == "__main__" and "--profile" in sys.argv[1:]:
+    profiling.enable()
+# --answer-file: unattended mode (unattended.py); hand over before tkinter is imported
+if __name__ == "__main__" and "--answer-file" in sys.argv[1:]:
+    import unattended
+    sys.exit(unattended.main(sys.argv[1:], started=_STARTED))
+# --export-snapshot DIR: write this machine's state for fleet analysis (fleet.py), no GUI
+if __name__ == "__main__" and "--export-snapshot" in sys.argv[1:]:
+    import fleet
+    _at = sys.argv.index("--export-snapshot")
+    sys.exit(fleet.main(["export", "--out", sys.argv[_at + 1] if _at + 1 < len(sys.argv) else "."]))
+import importlib.util
+import queue
+import sqlite3
+from collections import deque
 import threading
 import ctypes
-import sys
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import winreg
 import os
-import shutil
 from pathlib import Path
 import app_version as _av
-import sys
-
-# Optional Pillow for better image resizing; fallback to Tk PhotoImage
-try:
-    from PIL import Image, ImageTk
-    PIL_AVAILABLE = True
-except Exception:
-    PIL_AVAILABLE = False
-
-
-TYPE_MAP = {
-    "Console": "C",
-    "Laptop": "L",
-    "Rack PC": "R",
-    "Desktop": "D",
-}
+from ps_worker import WorkerClient, WorkerPool, worker_command
+from preview_cache import PreviewLoader
+import configurator_plan as _plan
+import state_probe as _probe
+import registry_ops as _reg
+import native_ops as _native
+from section_graph import SectionRun, worker_executor
+from step_events import StepTimings
+import step_history as _hist
+from wallpaper_cache import WallpaperCache, WallpaperImport
+from file_availability import FileAvailability, AVAILABLE, MISSING, TIMEOUT
+import windows_update_job as _wu
+import naming as _naming
+import selection as _sel
+import settings_catalog as _catalog
+import run_journal as _journal
+import run_archive as _archive
+from naming import TYPE_MAP, sanitize_custom
+from log_store import LogStore
+from log_view import LogView
+from virtual_list import SharedTooltip, VirtualList
+profiling.complete("startup.imports", _STARTED, cat="startup")
+
+# Optional Pillow for better image resizing; fallback to Tk PhotoImage.
+# Only looked up here; PIL itself is imported when the first image is made.
+PIL_AVAILABLE = importlib.util.find_spec("PIL") is not None
+# run output lines handed to on_done callbacks (the tail of the run)
+RUN_LINES_KEPT = 500
 
 
 def is_admin():
@@ -35,6 +63,26 @@ def is_admin():
         return False
 
 
+def physical_screen_size(widget):
+    """(width, height) of the primary screen in physical pixels.
+
+    The process is not DPI-aware, so at 150% scaling Tk reports 1707x960 on a
+    2560x1440 screen; GetDeviceCaps(DESKTOPHORZRES/DESKTOPVERTRES) is not scaled.
+    """
+    try:
+        user32, gdi32 = ctypes.windll.user32, ctypes.windll.gdi32
+        hdc = user32.GetDC(None)
+        try:
+            size = (gdi32.GetDeviceCaps(hdc, 118), gdi32.GetDeviceCaps(hdc, 117))  # DESKTOPHORZRES, DESKTOPVERTRES
+        finally:
+            user32.ReleaseDC(None, hdc)
+        if size[0] > 0 and size[1] > 0:
+            return size
+    except Exception:
+        pass
+    return widget.winfo_screenwidth(), widget.winfo_screenheight()
+
+
 def _resource_path(rel_path: str) -> str:
     """Return an absolute path to a resource, working when running in a PyInstaller one-file bundle.
 
@@ -46,14 +94,6 @@ def _resource_path(rel_path: str) -> str:
     return os.path.join(os.path.dirname(__file__), rel_path)
 
 
-def sanitize_custom(name: str) -> str:
-    # Convert spaces to -, allow only letters, numbers, - and _
-    name = name.replace(" ", "-")
-    # Remove disallowed characters
-    name = re.sub(r"[^A-Za-z0-9-_]", "", name)
-    return name[:15]
-
-
 class ScrollableFrame(ttk.Frame):
     """A simple vertically-scrollable frame for ttk widgets."""
     def __init__(self, container, *args, **kwargs):
@@ -71,8 +111,18 @@ class ScrollableFrame(ttk.Frame):
         self.grid_rowconfigure(0, weight=1)
         self.grid_columnconfigure(0, weight=1)
 
+        # every child resize fires <Configure> on the inner frame; update the
+        # scroll region once per idle pass, from the frame's own size
+        self._region_pending = False
+
+        def _update_region():
+            self._region_pending = False
+            canvas.configure(scrollregion=(0, 0, self.inner.winfo_reqwidth(), self.inner.winfo_reqheight()))
+
         def _on_frame_config(event):
-            canvas.configure(scrollregion=canvas.bbox("all"))
+            if not self._region_pending:
+                self._region_pending = True
+                self.after_idle(_update_region)
 
         def _on_canvas_config(event):
             # keep inner width in sync with canvas width
@@ -81,63 +131,35 @@ class ScrollableFrame(ttk.Frame):
         self.inner.bind("<Configure>", _on_frame_config)
         canvas.bind('<Configure>', _on_canvas_config)
 
-        # Windows mousewheel
+        # Windows mousewheel; bound only while the pointer is over this frame so
+        # several scrollable frames don't steal each other's wheel
         def _on_mousewheel(event):
             canvas.yview_scroll(int(-1 * (event.delta / 120)), "units")
 
-        canvas.bind_all('<MouseWheel>', _on_mousewheel)
-
-
-class ToolTip:
-    """Very small tooltip helper for tkinter widgets."""
-    def __init__(self, widget, text, delay=500):
-        self.widget = widget
-        self.text = text
-        self.delay = delay
-        self.tipwindow = None
-        self.id = None
-        widget.bind("<Enter>", self.schedule)
-        widget.bind("<Leave>", self.hide)
-
-    def schedule(self, _=None):
-        self.cancel()
-        self.id = self.widget.after(self.delay, self.show)
+        def _on_leave(event):
+            # moving onto a child also sends <Leave>; only unbind once the pointer is outside
+            inside = self.winfo_containing(event.x_root, event.y_root)
+            if inside is None or not str(inside).startswith(str(self)):
+                canvas.unbind_all('<MouseWheel>')
 
-    def cancel(self):
-        if self.id:
-            try:
-                self.widget.after_cancel(self.id)
-            except Exception:
-                pass
-            self.id = None
-
-    def show(self):
-        if self.tipwindow or not self.text:
-            return
-        x = self.widget.winfo_rootx() + 20
-        y = self.widget.winfo_rooty() + self.widget.winfo_height() + 10
-        self.tipwindow = tw = tk.Toplevel(self.widget)
-        tw.wm_overrideredirect(True)
-        tw.wm_geometry(f"+{x}+{y}")
-        label = ttk.Label(tw, text=self.text, justify='left', background='#FFFFE0', relief='solid', borderwidth=1)
-        label.pack(ipadx=6, ipady=3)
-
-    def hide(self, _=None):
-        self.cancel()
-        if self.tipwindow:
-            try:
-                self.tipwindow.destroy()
-            except Exception:
-                pass
-            self.tipwindow = None
+        self.bind('<Enter>', lambda e: canvas.bind_all('<MouseWheel>', _on_mousewheel))
+        self.bind('<Leave>', _on_leave)
 
 
 class ComputerNamerApp(tk.Tk):
-    def __init__(self):
+    # how many configurator sections an apply run may execute at once
+    SECTION_WORKERS = 3
+
+    def __init__(self, resume_id=None):
+        # startup phases are recorded as profiling spans (see --profile)
+        t = profiling.PROFILER.now()
         super().__init__()
+        profiling.complete("startup.tk_init", t, cat="startup")
         # App name and version
         self.APP_NAME = "CCI_New_PC_Setup"
+        t = profiling.PROFILER.now()
         self.VERSION = _av.read_version()
+        profiling.complete("startup.version", t, cat="startup")
         self.title(f"{self.APP_NAME} v{self.VERSION}")
         self.resizable(True, True)
         self.geometry("820x620")
@@ -145,29 +167,94 @@ class ComputerNamerApp(tk.Tk):
         padding = {"padx": 8, "pady": 6}
 
         # Variables
+        t = profiling.PROFILER.now()
         self.customer_var = tk.StringVar()
         self.type_var = tk.StringVar(value="Console")
         self.serial_var = tk.StringVar()
         self.custom_var = tk.StringVar()
         self.generated_var = tk.StringVar()
-        self.tz_var = tk.StringVar()
         self.bg_path_var = tk.StringVar(value=r"H:\Shared drives\Marketing and Advertising\Branding_ Bios_Logos\Desktop Wallpaper\1920x1080CCI Desktop Wallpaper, 169 - Support Info.png")
-        self.apply_power_var = tk.BooleanVar(value=True)
-        self.apply_taskbar_var = tk.BooleanVar(value=True)
-        self.apply_datetime_var = tk.BooleanVar(value=True)
-        self.apply_notifications_var = tk.BooleanVar(value=True)
-        self.apply_windowsupdate_var = tk.BooleanVar(value=False)
-        self.apply_personalization_var = tk.BooleanVar(value=True)
-        # New: fine-grained power button / lid actions
-        self.power_button_do_nothing_var = tk.BooleanVar(value=False)
-        self.sleep_button_do_nothing_var = tk.BooleanVar(value=False)
-        self.lid_close_do_nothing_var = tk.BooleanVar(value=False)
+        # register a RunOnce entry while a run is in progress (see run_journal.py)
+        self.auto_resume_var = tk.BooleanVar(value=True)
+        # selection.py key -> variable, one per setting in settings_catalog.json;
+        # _selection() snapshots them for the Tk-free rules
+        self._selection_vars = {
+            s.key: (tk.StringVar if s.type == "text" else tk.BooleanVar)(value=s.default)
+            for s in _catalog.catalog().settings
+        }
+        self._var_keys = {str(v): k for k, v in self._selection_vars.items()}
 
         # assets directory (used for icons and default background)
         self.assets_dir = Path(os.path.dirname(__file__)) / "assets"
         self.assets_dir.mkdir(parents=True, exist_ok=True)
+        # one tooltip window shared by every widget that has a tooltip
+        self._tooltip = SharedTooltip(self)
+
+        profiling.complete("startup.variables", t, cat="startup")
+
+        t = profiling.PROFILER.now()
+        # last rendered plan; while _live_plan is set the preview pane re-renders the plan on every
+        # selection change. Explicit previews and every run's output also go to the run archive.
+        self._last_preview_text = None
+        self._archive = _archive.RunArchive()
+        # recorder of the run whose output is streaming into the preview pane, if any
+        self._archive_run = None
+        self._archive_status = ("ok", None)
+        self._live_plan = False
+        self._active_scheme = None
+        # share paths are only ever checked off the UI thread, with a timeout and a TTL cache
+        self._files = FileAvailability()
+        self.bg_status_var = tk.StringVar(value="")
+        # the configurator run currently streaming into preview_log, if any
+        self._runner = None
+        self._run_journal = None
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+        # one elevated PowerShell worker for the whole session; warmed up once the window is idle
+        self._worker = WorkerClient(worker_command(_resource_path('ps_worker.ps1')))
+        # independent sections of an apply run side by side on up to SECTION_WORKERS workers
+        self._worker_pool = WorkerPool(self._worker.cmd, self.SECTION_WORKERS, first=self._worker)
+        # reads the machine's current values so apply only runs steps that differ.
+        # CCI_PROBE_FIXTURE points at a JSON machine-state fixture for testing off Windows.
+        fixture = os.environ.get("CCI_PROBE_FIXTURE")
+        if fixture:
+            self._probe_backend = _probe.FakeProbeBackend.from_json(fixture)
+        elif os.name == "nt":
+            self._probe_backend = _probe.PowerShellProbeBackend()
+        else:
+            self._probe_backend = _probe.FakeProbeBackend()
+        self._probing = False
+        # HKCU writes are done in-process through winreg; the script only handles the rest
+        self._registry = _reg.WinregBackend() if os.name == "nt" else None
+        # rename and wallpaper through the Win32 API; None means PowerShell does them
+        self._native = _native.default_backend()
+        # step durations of past runs, for the remaining-time estimate (step_history.py)
+        self._history = _hist.StepHistory()
+        self._forecast = None
+        self.after(200, self._warm_worker)
+        # finish whatever a crash left half-written, off the UI thread
+        threading.Thread(target=self._archive.recover, daemon=True).start()
+
+        # background Windows Update job (see _start_windows_update)
+        self._wu_job = None
+        # checkpoint journal of the apply run in progress; --resume <run id> picks one up after a reboot
+        self._journal = None
+        self._resume_id = resume_id
+        # wallpaper previews are decoded off the UI thread (see _load_preview_image)
+        self._preview_loader = PreviewLoader()
+        self._preview_after_id = None
+        self._preview_polling = False
+        self.default_bg_path = self.assets_dir / "default_background.png"
+        # wallpapers are imported once into a local cache, pre-rendered for this display;
+        # _prepared maps a source path to its cached file
+        self._wallpapers = WallpaperCache()
+        self._wallpaper_import = None
+        self._prepared = {}
+        self.wp_status_var = tk.StringVar(value="")
+        self.wp_progress_var = tk.DoubleVar(value=0.0)
+        profiling.complete("startup.services", t, cat="startup")
 
         # Notebook (tabs)
+        t = profiling.PROFILER.now()
         notebook = ttk.Notebook(self)
         notebook.grid(column=0, row=0, sticky="nsew", **padding)
         # make the root expand so notebook and tabs can grow
@@ -208,13 +295,27 @@ class ComputerNamerApp(tk.Tk):
         ttk.Label(frm, textvariable=self.generated_var, foreground="blue").grid(column=1, row=5, sticky="w")
         self.accept_btn = ttk.Button(frm, text="Accept new computer name", command=self._on_accept, state="disabled")
         self.accept_btn.grid(column=0, row=6, columnspan=2, pady=(12, 0))
+        ttk.Button(frm, text="Bulk names from CSV...", command=self._bulk_names).grid(column=0, row=7, columnspan=2, pady=(8, 0))
         for var in (self.customer_var, self.type_var, self.serial_var):
             var.trace_add("write", self._update_generated)
         self._update_generated()
-
-        # System settings tab (left = scrollable inputs, right = preview)
-        sys_frame = ttk.Frame(notebook)
-        notebook.add(sys_frame, text="System Settings")
+        profiling.complete("startup.naming_tab", t, cat="startup")
+
+        # The other tabs are built on first selection, or in idle time once the first frame
+        # is up, so a tech can start typing a name without waiting on them
+        self._notebook = notebook
+        self._pending_tabs = {}
+        for text, builder in (("System Settings", self._build_settings_tab), ("Background Preview", self._build_preview_tab)):
+            frame = ttk.Frame(notebook)
+            notebook.add(frame, text=text)
+            self._pending_tabs[str(frame)] = (frame, builder)
+        self._settings_tab = str(notebook.tabs()[1])
+        notebook.bind("<<NotebookTabChanged>>", self._on_tab_changed)
+        self.startup_timings = {"init_ms": (time.perf_counter() - _STARTED) * 1000.0}
+        self.bind("<Map>", self._on_map, add="+")
+
+    def _build_settings_tab(self, sys_frame):
+        """System settings tab (left = scrollable inputs, right = preview)."""
         sys_frame.grid_rowconfigure(0, weight=1)
         sys_frame.grid_columnconfigure(0, weight=1)
         sys_frame.grid_columnconfigure(1, weight=0)
@@ -237,52 +338,39 @@ class ComputerNamerApp(tk.Tk):
         self.settings_tree.grid(column=0, row=1, sticky="nsew")
         inputs.rowconfigure(1, weight=1)
 
-        # Build a mapping from tree items to BooleanVars so toggles update state
+        # Build a mapping from tree items to BooleanVars so toggles update state,
+        # plus the reverse index (var name -> tree items) used by the dirty refresh
         self._tree_item_map = {}
-
-        # Helper to insert items and remember the var mapping
-        def _ins(parent, text, var):
-            iid = self.settings_tree.insert(parent, 'end', text=text)
+        self._tree_index = {}
+
+        # groups and their settings come from settings_catalog.json, in catalog order
+        catalog = _catalog.catalog()
+        groups = {g.id: self.settings_tree.insert('', 'end', text=g.title) for g in catalog.groups}
+        for setting in catalog.settings:
+            if setting.type != "bool":
+                continue
+            var = self._selection_vars[setting.key]
+            iid = self.settings_tree.insert(groups[setting.group], 'end', text=setting.label)
             self._tree_item_map[iid] = var
+            self._tree_index.setdefault(str(var), []).append(iid)
             # initialize display text with checkbox marker
             self._update_tree_item_text(iid)
-            return iid
-
-        # Top-level groups
-        power_grp = self.settings_tree.insert('', 'end', text='Power')
-        taskbar_grp = self.settings_tree.insert('', 'end', text='Taskbar')
-        datetime_grp = self.settings_tree.insert('', 'end', text='Date & Time')
-        notifications_grp = self.settings_tree.insert('', 'end', text='Notifications')
-        windowsupdate_grp = self.settings_tree.insert('', 'end', text='Windows Update')
-        personalization_grp = self.settings_tree.insert('', 'end', text='Personalization')
-
-        # Power group children
-        _ins(power_grp, 'Power (never sleep/display/disk)', self.apply_power_var)
-        _ins(power_grp, 'Power button -> Do nothing', self.power_button_do_nothing_var)
-        _ins(power_grp, 'Sleep button -> Do nothing', self.sleep_button_do_nothing_var)
-        _ins(power_grp, 'Lid close -> Do nothing (laptops)', self.lid_close_do_nothing_var)
-
-        # Taskbar
-        _ins(taskbar_grp, 'Taskbar settings', self.apply_taskbar_var)
-
-        # Date & Time
-        _ins(datetime_grp, 'Date & Time (sync and timezone if provided)', self.apply_datetime_var)
-
-        # Notifications
-        _ins(notifications_grp, 'Notifications / Do Not Disturb', self.apply_notifications_var)
-
-        # Windows Update
-        _ins(windowsupdate_grp, 'Windows Update (run then stop service)', self.apply_windowsupdate_var)
-
-        # Personalization
-        _ins(personalization_grp, 'Personalization (dark + accent + background)', self.apply_personalization_var)
 
         # Allow toggling items with single-click; clicking a top-level/group toggles all children
         self.settings_tree.bind('<Button-1>', self._on_tree_click)
 
-        # Time Zone entry remains below the tree
-        ttk.Label(inputs, text="Time Zone ID (optional):").grid(column=0, row=2, sticky="w", pady=(8,0))
-        ttk.Entry(inputs, textvariable=self.tz_var, width=40).grid(column=0, row=3, sticky="w")
+        # text settings (the time zone) go below the tree; rows 2-10 are theirs
+        row = 2
+        for setting in catalog.settings:
+            if setting.type == "text":
+                ttk.Label(inputs, text=setting.label).grid(column=0, row=row, sticky="w", pady=(8,0))
+                entry = ttk.Entry(inputs, textvariable=self._selection_vars[setting.key], width=40)
+                entry.grid(column=0, row=row + 1, sticky="w")
+                if setting.tooltip:
+                    self._tooltip.attach(entry, setting.tooltip)
+                row += 2
+
+        ttk.Checkbutton(inputs, text="Resume automatically after a restart", variable=self.auto_resume_var).grid(column=0, row=11, sticky="w", pady=(8,0))
 
         # action buttons
         ttk.Button(inputs, text="Preview actions", command=self._preview_system_actions).grid(column=0, row=12, pady=(12,0), sticky="w")
@@ -293,8 +381,8 @@ class ComputerNamerApp(tk.Tk):
 
         checklist_frame = ttk.LabelFrame(right, text="Planned changes")
         checklist_frame.grid(column=0, row=1, sticky="nsew", pady=(8,0))
-        checklist_frame.columnconfigure(0, weight=0)
-        checklist_frame.columnconfigure(1, weight=1)
+        checklist_frame.columnconfigure(0, weight=1)
+        checklist_frame.rowconfigure(0, weight=1)
 
         # Allow the right column to expand for the live preview area
         right.grid_rowconfigure(2, weight=1)
@@ -313,54 +401,51 @@ class ComputerNamerApp(tk.Tk):
         ttk.Button(pf_toolbar, text="Open last preview", command=lambda: self._open_last_preview()).pack(side='left')
         ttk.Button(pf_toolbar, text="Clear", command=lambda: self._clear_preview()).pack(side='left', padx=(6,4))
         ttk.Button(pf_toolbar, text="Save...", command=lambda: self._save_preview()).pack(side='left')
-
-        # text widget for live output
-        self.preview_text = tk.Text(preview_out_frame, wrap='none')
-        self.preview_text.grid(column=0, row=0, sticky='nsew')
-        self.preview_text.config(state='disabled')
-
-        vsb2 = ttk.Scrollbar(preview_out_frame, orient='vertical', command=self.preview_text.yview)
-        vsb2.grid(column=1, row=0, sticky='ns')
-        self.preview_text.configure(yscrollcommand=vsb2.set)
-        hsb2 = ttk.Scrollbar(preview_out_frame, orient='horizontal', command=self.preview_text.xview)
-        hsb2.grid(column=0, row=2, sticky='ew')
-        self.preview_text.configure(xscrollcommand=hsb2.set)
-
-        # track last preview file
-        self._last_preview_path = None
-
-        # Define the granular planned actions and how they map to the top-level checkboxes
-        self._detailed_plan = [
-            ("Power button -> Do nothing", lambda: self.apply_power_var.get() and self.power_button_do_nothing_var.get()),
-            ("Sleep button -> Do nothing", lambda: self.apply_power_var.get() and self.sleep_button_do_nothing_var.get()),
-            ("Lid close -> Do nothing", lambda: self.apply_power_var.get() and self.lid_close_do_nothing_var.get()),
-            ("Disk timeout (AC)", lambda: self.apply_power_var.get()),
-            ("Disk timeout (DC)", lambda: self.apply_power_var.get()),
-            ("Monitor timeout (AC)", lambda: self.apply_power_var.get()),
-            ("Monitor timeout (DC)", lambda: self.apply_power_var.get()),
-            ("Standby timeout (AC)", lambda: self.apply_power_var.get()),
-            ("Standby timeout (DC)", lambda: self.apply_power_var.get()),
-            ("Taskbar alignment (center)", lambda: self.apply_taskbar_var.get()),
-            ("Taskbar size (default)", lambda: self.apply_taskbar_var.get()),
-            ("Open Taskbar settings UI", lambda: self.apply_taskbar_var.get()),
-            ("Set Time Zone (if provided)", lambda: self.apply_datetime_var.get() and bool(self.tz_var.get().strip())),
-            ("Sync time now (w32tm /resync)", lambda: self.apply_datetime_var.get()),
-            ("Disable toasts (PushNotifications::ToastEnabled=0)", lambda: self.apply_notifications_var.get()),
-            ("Set Focus Assist policy (QuietHours)", lambda: self.apply_notifications_var.get()),
-            ("Open Notifications settings UI", lambda: self.apply_notifications_var.get()),
-            ("Install/Use PSWindowsUpdate module", lambda: self.apply_windowsupdate_var.get()),
-            ("Run Windows Update via PSWindowsUpdate", lambda: self.apply_windowsupdate_var.get()),
-            ("Stop and disable wuauserv", lambda: self.apply_windowsupdate_var.get()),
-            ("Set dark theme (Apps/System)", lambda: self.apply_personalization_var.get()),
-            ("Set accent color", lambda: self.apply_personalization_var.get()),
-            ("Set desktop background (provided or sample)", lambda: self.apply_personalization_var.get()),
-        ]
+        ttk.Button(pf_toolbar, text="Run archive...", command=self._show_run_archive).pack(side='left', padx=(6,0))
+        self.timings_btn = ttk.Button(pf_toolbar, text="Step timings", command=self._show_step_timings, state="disabled")
+        self.timings_btn.pack(side='left', padx=(6,0))
+        self.cancel_btn = ttk.Button(pf_toolbar, text="Cancel run", command=self._cancel_run, state="disabled")
+        self.cancel_btn.pack(side='right')
+        self.run_status_var = tk.StringVar(value="Idle")
+        ttk.Label(pf_toolbar, textvariable=self.run_status_var, foreground="gray").pack(side='right', padx=(0,6))
+
+        # progress of an apply run, estimated from past step durations; shown only while one runs
+        self.run_progress_frame = ttk.Frame(preview_out_frame)
+        self.run_progress_frame.grid(column=0, row=2, sticky="ew", pady=(0,4))
+        self.run_progress_frame.columnconfigure(0, weight=1)
+        self.run_progress = ttk.Progressbar(self.run_progress_frame, mode="determinate", maximum=100)
+        self.run_progress.grid(column=0, row=0, sticky="ew")
+        self.run_eta_var = tk.StringVar(value="")
+        ttk.Label(self.run_progress_frame, textvariable=self.run_eta_var, foreground="gray").grid(column=1, row=0, padx=(6,0))
+        self.run_progress_frame.grid_remove()
+
+        # live output: spilled to a temp file and drawn a screenful at a time (log_view.py)
+        self.preview_log = LogView(preview_out_frame)
+        self.preview_log.grid(column=0, row=0, sticky='nsew')
+
+        # Windows Update runs as its own job next to the other settings; shown only while in use
+        self.wu_frame = ttk.LabelFrame(right, text="Windows Update")
+        self.wu_frame.grid(column=0, row=3, sticky="ew", pady=(8,0))
+        self.wu_frame.columnconfigure(0, weight=1)
+        self.wu_status_var = tk.StringVar(value="Idle")
+        ttk.Label(self.wu_frame, textvariable=self.wu_status_var).grid(column=0, row=0, sticky="w", padx=6, pady=(4,0))
+        self.wu_progress = ttk.Progressbar(self.wu_frame, mode="determinate", maximum=100)
+        self.wu_progress.grid(column=0, row=1, sticky="ew", padx=6, pady=(2,6))
+        self.wu_cancel_btn = ttk.Button(self.wu_frame, text="Cancel updates", command=self._cancel_windows_update, state="disabled")
+        self.wu_cancel_btn.grid(column=1, row=0, rowspan=2, padx=6)
+        self.wu_frame.grid_remove()
+        self._wu_job = None
+
+        # the planned actions checklist; rows and their rules live in selection.py
+        self._checklist = _sel.Checklist()
 
         # create small image icons (try to load PNGs from assets; otherwise create simple colored squares)
+        t = profiling.PROFILER.now()
         try:
             ok_path = self.assets_dir / "icon_ok.png"
             off_path = self.assets_dir / "icon_off.png"
             if PIL_AVAILABLE and ok_path.exists() and off_path.exists():
+                from PIL import Image, ImageTk
                 self.icon_ok = ImageTk.PhotoImage(Image.open(ok_path).resize((16,16), Image.LANCZOS))
                 self.icon_off = ImageTk.PhotoImage(Image.open(off_path).resize((16,16), Image.LANCZOS))
             elif ok_path.exists() and off_path.exists():
@@ -376,82 +461,28 @@ class ComputerNamerApp(tk.Tk):
             # last-resort fallback to simple text markers
             self.icon_ok = None
             self.icon_off = None
-
-        # create labels for each detailed item (icon + description)
-        self.detailed_labels = {}
-        r = 0
-        for desc, checker in self._detailed_plan:
-            if self.icon_off:
-                icon = ttk.Label(checklist_frame, image=self.icon_off)
-                icon.image = self.icon_off
-            else:
-                icon = ttk.Label(checklist_frame, text=" ", width=2)
-            icon.grid(column=0, row=r, sticky="w", padx=(6,4))
-            lbl = ttk.Label(checklist_frame, text=desc)
-            lbl.grid(column=1, row=r, sticky="w", pady=2)
-            self.detailed_labels[desc] = (icon, lbl, checker)
-            r += 1
-
-        # Attach short explanatory tooltips to each checklist item (icon + label)
-        tooltip_map = {
-            "Disk timeout (AC)": "Set disk idle timeout on AC power (powercfg).",
-            "Disk timeout (DC)": "Set disk idle timeout on battery (powercfg).",
-            "Monitor timeout (AC)": "Set display timeout on AC power (powercfg).",
-            "Monitor timeout (DC)": "Set display timeout on battery (powercfg).",
-            "Standby timeout (AC)": "Set system standby timeout on AC power (powercfg).",
-            "Standby timeout (DC)": "Set system standby timeout on battery (powercfg).",
-            "Taskbar alignment (center)": "Adjust taskbar alignment to center (registry/Explorer settings).",
-            "Taskbar size (default)": "Reset taskbar size to default (registry/Explorer settings).",
-            "Open Taskbar settings UI": "Opens the Taskbar settings UI for manual confirmation.",
-            "Set Time Zone (if provided)": "Set the system time zone (tzutil).",
-            "Sync time now (w32tm /resync)": "Force a time sync now using w32tm.",
-            "Disable toasts (PushNotifications::ToastEnabled=0)": "Disable toast notifications via registry.",
-            "Set Focus Assist policy (QuietHours)": "Enable Quiet Hours / Focus Assist via registry or settings.",
-            "Open Notifications settings UI": "Opens the Notifications settings UI for manual confirmation.",
-            "Install/Use PSWindowsUpdate module": "Acquire PSWindowsUpdate module to run Windows Update from PowerShell.",
-            "Run Windows Update via PSWindowsUpdate": "Run Windows Update checks/installs via PSWindowsUpdate.",
-            "Stop and disable wuauserv": "Stops and disables the Windows Update service (wuauserv).",
-            "Set dark theme (Apps/System)": "Switch system and apps to Dark theme via registry/settings.",
-            "Set accent color": "Set a Windows accent color to match corporate theme.",
-            "Set desktop background (provided or sample)": "Set the desktop wallpaper to the provided image or sample.",
-        }
-        for desc, (icon, lbl, _) in self.detailed_labels.items():
-            txt = tooltip_map.get(desc, "")
-            if txt:
-                try:
-                    ToolTip(icon, txt)
-                    ToolTip(lbl, txt)
-                except Exception:
-                    pass
-
-        # attach var traces to update the checklist when selections change
-        for v in (self.apply_power_var, self.apply_taskbar_var, self.apply_datetime_var, self.apply_notifications_var, self.apply_windowsupdate_var, self.apply_personalization_var, self.tz_var, self.bg_path_var, self.power_button_do_nothing_var, self.sleep_button_do_nothing_var, self.lid_close_do_nothing_var):
-            try:
-                def _trace_cb(*_args, var=v):
-                    # update main checklist labels
-                    try:
-                        self._update_checklist()
-                    except Exception:
-                        pass
-                    # if we have a settings tree, update mapped items
-                    try:
-                        if hasattr(self, '_tree_item_map'):
-                            for iid, mapped_var in self._tree_item_map.items():
-                                if mapped_var is var:
-                                    self._update_tree_item_text(iid)
-                    except Exception:
-                        pass
-
-                v.trace_add("write", _trace_cb)
-            except Exception:
-                pass
+        profiling.complete("settings.icons", t, cat="startup")
+
+        # rows are drawn from a small pool of widgets reused while scrolling (virtual_list.py),
+        # so the checklist costs the same however many settings the catalog holds
+        self.checklist_view = VirtualList(checklist_frame, self._make_checklist_row, self._render_checklist_row,
+                                          key=lambda row: row.desc, rows=12, tooltip=self._tooltip,
+                                          tooltip_text=lambda row: row.tooltip if row else "")
+        self.checklist_view.grid(column=0, row=0, sticky="nsew", padx=(6,0), pady=(2,4))
+        self.checklist_view.set_items(_sel.CHECKLIST)
+
+        # attach var traces; writes only mark the variable dirty and one idle pass refreshes
+        # the affected checklist rows and tree items (a group click sets many vars at once)
+        self._dirty_vars = set()
+        self._refresh_pending = False
+        for v in self._selection_vars.values():
+            v.trace_add("write", self._on_var_write)
 
         # ensure checklist reflects initial checkbox states
         self._update_checklist()
 
-        # Move background preview to its own tab for a larger preview area
-        preview_tab = ttk.Frame(notebook)
-        notebook.add(preview_tab, text="Background Preview")
+    def _build_preview_tab(self, preview_tab):
+        """Background preview in its own tab for a larger preview area."""
         preview_tab.grid_rowconfigure(0, weight=1)
         preview_tab.grid_columnconfigure(0, weight=1)
 
@@ -474,21 +505,49 @@ class ComputerNamerApp(tk.Tk):
         ctrl_frame.columnconfigure(1, weight=0)
         ttk.Button(ctrl_frame, text="Apply background", command=self._apply_background).grid(column=2, row=1, sticky="w", padx=(6,0))
         ttk.Label(ctrl_frame, text="If empty, a sample corporate wallpaper will be used.").grid(column=0, row=2, columnspan=3, sticky="w", pady=(6,0))
+        ttk.Progressbar(ctrl_frame, variable=self.wp_progress_var, maximum=100, mode="determinate").grid(column=0, row=3, sticky="ew", pady=(6,0))
+        ttk.Label(ctrl_frame, textvariable=self.wp_status_var, foreground="gray").grid(column=1, row=3, columnspan=2, sticky="w", padx=(6,0), pady=(6,0))
+        ttk.Label(ctrl_frame, textvariable=self.bg_status_var, foreground="gray").grid(column=0, row=4, columnspan=3, sticky="w", pady=(2,0))
 
-        # When bg path changes, reload preview and update checklist
-        try:
-            self.bg_path_var.trace_add("write", lambda *_, __=None: (self._load_preview_image(self.bg_path_var.get()), self._update_checklist()))
-        except Exception:
-            try:
-                self.bg_path_var.trace("w", lambda *args: (self._load_preview_image(self.bg_path_var.get()), self._update_checklist()))
-            except Exception:
-                pass
+        # When bg path changes, update the checklist and (debounced) reload the preview
+        self.bg_path_var.trace_add("write", self._on_bg_path_change)
+        self._load_preview_image(self._background_source())
 
-        # Ensure default background exists in assets and load initial preview
-        self.default_bg_path = self.assets_dir / "default_background.png"
-        self._ensure_embedded_background()
-        initial = str(self.default_bg_path) if self.default_bg_path.exists() else self.bg_path_var.get()
-        self._load_preview_image(initial)
+    def _on_map(self, event):
+        # <Map> on the root also fires for every child; only the window itself counts
+        if event.widget is not self or "first_frame_ms" in self.startup_timings:
+            return
+        self.after_idle(self._on_first_frame)
+
+    def _on_first_frame(self):
+        self.startup_timings["first_frame_ms"] = (time.perf_counter() - _STARTED) * 1000.0
+        profiling.instant("startup.first_frame", cat="startup")
+        # check the (possibly offline) share in the background; the wallpaper is imported once it answers
+        self._files.status(self.bg_path_var.get().strip())
+        self.after(250, self._poll_file_status)
+        self.after(50, self._build_next_tab)
+
+    def _build_next_tab(self):
+        """Build one pending tab per idle slot so input stays responsive while they are made."""
+        if self._pending_tabs:
+            self._ensure_tab(next(iter(self._pending_tabs)))
+        if self._pending_tabs:
+            self.after(50, self._build_next_tab)
+            return
+        t = self.startup_timings
+        t["tabs_ready_ms"] = (time.perf_counter() - _STARTED) * 1000.0
+        self._append_preview(f"Startup: first frame {t['first_frame_ms']:.0f} ms, all tabs ready {t['tabs_ready_ms']:.0f} ms\n")
+        self.after_idle(self._check_unfinished_run)
+
+    def _on_tab_changed(self, _event=None):
+        self._ensure_tab(self._notebook.select())
+
+    def _ensure_tab(self, name):
+        entry = self._pending_tabs.pop(str(name), None)
+        if entry is not None:
+            frame, builder = entry
+            with profiling.span(f"tab.{builder.__name__.strip('_')}", cat="startup"):
+                builder(frame)
 
     def _validate_serial(self, new_value: str) -> bool:
         if new_value == "":
@@ -510,16 +569,9 @@ class ComputerNamerApp(tk.Tk):
         self._update_generated()
 
     def _update_generated(self, *_):
-        custom = self.custom_var.get().strip()
-        if custom:
-            new_name = sanitize_custom(custom)
-        else:
-            cust = re.sub(r"\s+", "-", self.customer_var.get().strip())
-            type_char = TYPE_MAP.get(self.type_var.get(), "D")
-            serial = self.serial_var.get().strip()
-            parts = [p for p in [cust, type_char, serial] if p]
-            new_name = "-".join(parts)
-            new_name = re.sub(r"\s+", "-", new_name)
+        # same rules as bulk mode, including the 15-character NetBIOS limit
+        new_name = _naming.generate_name(self.customer_var.get(), self.type_var.get(),
+                                         self.serial_var.get(), self.custom_var.get())
         self.generated_var.set(new_name)
         if new_name:
             self.accept_btn.config(state="normal")
@@ -546,10 +598,8 @@ class ComputerNamerApp(tk.Tk):
         if var is None:
             # might be a group; ignore
             return
-        # toggle the var
+        # toggle the var; the trace refreshes the item text
         var.set(not var.get())
-        # update text
-        self._update_tree_item_text(iid)
 
 
     def _on_tree_click(self, event):
@@ -558,15 +608,10 @@ class ComputerNamerApp(tk.Tk):
         if not iid:
             return
 
-        # If this item is mapped to a BooleanVar, toggle it
+        # If this item is mapped to a BooleanVar, toggle it (the trace schedules the refresh)
         if iid in self._tree_item_map:
             var = self._tree_item_map[iid]
             var.set(not var.get())
-            self._update_tree_item_text(iid)
-            try:
-                self._update_checklist()
-            except Exception:
-                pass
             return
 
         # Otherwise treat it as a group: gather descendant mapped items and toggle them all
@@ -586,11 +631,6 @@ class ComputerNamerApp(tk.Tk):
         any_unchecked = any(not self._tree_item_map[d].get() for d in descendants)
         for d in descendants:
             self._tree_item_map[d].set(any_unchecked)
-            self._update_tree_item_text(d)
-        try:
-            self._update_checklist()
-        except Exception:
-            pass
 
 
     def _on_accept(self):
@@ -606,254 +646,1080 @@ class ComputerNamerApp(tk.Tk):
         if not is_admin():
             messagebox.showerror("Administrator required", "This operation must be run as Administrator. Please run the script elevated and try again.")
             return
-        try:
-            subprocess.run([
-                "powershell", "-NoProfile", "-NonInteractive", "-Command",
-                f"Rename-Computer -NewName '{name}' -Force"
-            ], check=True)
+
+        def _done(code, text):
+            if code != 0:
+                messagebox.showerror("Error", f"Failed to rename computer:\n{text}")
+                return
             if messagebox.askyesno("Restart now?", "Rename queued successfully. Do you want to restart now for the change to take effect?"):
-                subprocess.run(["powershell", "-NoProfile", "-NonInteractive", "-Command", "Restart-Computer -Force"], check=True)
-        except subprocess.CalledProcessError as e:
-            messagebox.showerror("Error", f"Failed to rename computer:\n{e}")
+                self._start_run("restart", {}, "Restart computer")
+
+        if self._native is not None:
+            own = self._archive_run is None
+            self._begin_archive("rename", f"Rename computer to {name}")
+            try:
+                _native.try_rename(name, self._native)
+            except _native.NativeError as e:
+                if not e.fallback:
+                    self._append_preview(f"Rename failed: {e}\n")
+                    if own:
+                        self._end_archive("failed")
+                    _done(1, str(e))
+                    return
+                self._append_preview(f"Native rename unavailable ({e.message}); using Rename-Computer\n")
+            else:
+                self._append_preview(f"Computer renamed to {name} (takes effect after restart)\n")
+                if own:
+                    self._end_archive("ok", 0)
+                _done(0, "")
+                return
+        self._start_run("rename", {"name": name}, f"Rename computer to {name}", on_done=_done)
+
+    def _bulk_names(self):
+        """Generate names for a CSV of customer,type,serial rows, checked against an inventory export."""
+        src = filedialog.askopenfilename(title="CSV of customer,type,serial rows", filetypes=[("CSV", "*.csv"), ("All files", "*")])
+        if not src:
+            return
+        inventory = None
+        if messagebox.askyesno("Bulk names", "Check the names against an exported inventory file?"):
+            inventory = filedialog.askopenfilename(title="Inventory export", filetypes=[("CSV / text", "*.csv;*.txt"), ("All files", "*")]) or None
+        results = queue.Queue()
+
+        def _work():
+            try:
+                results.put(_naming.bulk_generate(src, inventory))
+            except Exception as e:
+                results.put(e)
+
+        threading.Thread(target=_work, daemon=True).start()
+        self.after(100, self._poll_bulk_names, results)
+
+    def _poll_bulk_names(self, results):
+        try:
+            outcome = results.get_nowait()
+        except queue.Empty:
+            self.after(100, self._poll_bulk_names, results)
+            return
+        if isinstance(outcome, Exception):
+            messagebox.showerror("Bulk names failed", str(outcome))
+            return
+        rows, manifest, report, seconds = outcome
+        messagebox.showinfo("Bulk names", f"{len(rows)} rows in {seconds:.1f}s: {_naming.summarize(rows)}\n\n"
+                                          f"Manifest: {manifest}\nCollision report: {report}")
 
     def _browse_bg(self):
         path = filedialog.askopenfilename(title="Select background image", filetypes=[("Images", "*.jpg;*.jpeg;*.png;*.bmp;*.gif"), ("All files", "*")])
         if path:
             self.bg_path_var.set(path)
-            self._load_preview_image(path)
 
-    def _ensure_embedded_background(self):
-        try:
-            if self.default_bg_path.exists():
+    def _prepare_wallpaper(self, src):
+        """Import `src` into the wallpaper cache in the background; replaces any import in progress."""
+        if self._wallpaper_import is not None and self._wallpaper_import.running:
+            if self._wallpaper_import.src == src:
                 return
-            src = Path(self.bg_path_var.get())
-            if src.exists() and src.is_file():
-                try:
-                    shutil.copy2(str(src), str(self.default_bg_path))
-                except Exception:
-                    pass
-        except Exception:
-            pass
+            self._wallpaper_import.cancel()
+        self._wallpaper_import = None
+        if not src or src in self._prepared:
+            return
+        size = physical_screen_size(self)
+        self._wallpaper_import = WallpaperImport(self._wallpapers, src, size).start()
+        self.wp_progress_var.set(0)
+        self.wp_status_var.set("Importing wallpaper...")
+        self.after(100, self._poll_wallpaper_import, self._wallpaper_import)
+
+    def _poll_wallpaper_import(self, job):
+        if job is not self._wallpaper_import:
+            # superseded by an import of another path
+            return
+        for event in job.drain():
+            if event[0] == "progress":
+                _, done, total = event
+                self.wp_progress_var.set(100.0 * done / total if total else 100)
+                self.wp_status_var.set(f"Importing wallpaper... {done // 1024} / {total // 1024} KB")
+            elif event[0] == "done":
+                _, path, error = event
+                if path:
+                    self._prepared[job.src] = path
+                    self.wp_progress_var.set(100)
+                    self.wp_status_var.set("Wallpaper cached locally")
+                    if job.src == self.bg_path_var.get().strip():
+                        self._load_preview_image(path)
+                        if self._live_plan:
+                            self._render_live_plan()
+                elif error != "cancelled":
+                    self.wp_progress_var.set(0)
+                    self.wp_status_var.set(f"Wallpaper not imported: {error}")
+                return
+        self.after(100, self._poll_wallpaper_import, job)
+
+    def _background_source(self):
+        """The wallpaper file to preview/apply right now, without touching the share on the UI thread.
+
+        The local cached copy once imported; the selected file while it is known to be
+        reachable; otherwise assets/default_background.png.
+        """
+        src = self.bg_path_var.get().strip()
+        if src in self._prepared:
+            return self._prepared[src]
+        if src and self._files.exists(src):
+            return src
+        return str(self.default_bg_path) if self.default_bg_path.exists() else ""
+
+    def _update_bg_status(self):
+        src = self.bg_path_var.get().strip()
+        status = self._files.status(src) if src and src not in self._prepared else None
+        if not src:
+            text = "Using the default background."
+        elif src in self._prepared:
+            text = "Using the local cached copy."
+        elif status is None or status.state not in (AVAILABLE, MISSING, TIMEOUT):
+            text = "Checking file... (default background shown meanwhile)"
+        elif status.state == AVAILABLE:
+            text = "File available."
+        elif status.state == MISSING:
+            text = "File not found - using the default background."
+        else:
+            text = "Share not responding - using the default background."
+        self.bg_status_var.set(text)
+
+    def _poll_file_status(self):
+        """Pick up availability changes pushed by the checker thread."""
+        src = self.bg_path_var.get().strip()
+        changed = set()
+        while True:
+            try:
+                changed.add(self._files.changes.get_nowait().path)
+            except queue.Empty:
+                break
+        if src in changed:
+            self._on_bg_available(src)
+        elif changed and self._live_plan:
+            self._render_live_plan()
+        self.after(250, self._poll_file_status)
+
+    def _on_bg_available(self, src):
+        self._update_bg_status()
+        if src not in self._prepared:
+            self._load_preview_image(self._background_source())
+            if self._files.exists(src):
+                self._prepare_wallpaper(src)
+        if self._live_plan:
+            self._render_live_plan()
+
+    def _pin_wallpaper(self, path):
+        # keep the applied wallpaper out of cache eviction
+        if path and os.path.dirname(os.path.abspath(path)) == os.path.abspath(self._wallpapers.root):
+            self._wallpapers.pin(path)
+
+    def _on_bg_path_change(self, *_):
+        # wait for typing to pause before touching the (possibly network) path
+        if self._preview_after_id is not None:
+            self.after_cancel(self._preview_after_id)
+        self._preview_after_id = self.after(300, self._debounced_preview)
+
+    def _debounced_preview(self):
+        self._preview_after_id = None
+        # shows the cached copy or the default right away; _poll_file_status follows up
+        # once the checker thread knows whether the new path is reachable
+        self._on_bg_available(self.bg_path_var.get().strip())
 
     def _load_preview_image(self, path_or_obj):
+        path = str(path_or_obj).strip()
+        if PIL_AVAILABLE:
+            # decoded on the loader thread; _poll_preview picks up the result
+            self._preview_requested = profiling.PROFILER.now()
+            self._preview_loader.request(path)
+            if not self._preview_polling:
+                self._preview_polling = True
+                self.after(30, self._poll_preview)
+            return
         try:
-            path = str(path_or_obj)
-            if not path or not os.path.exists(path):
-                self.preview_label.config(image="")
-                self.preview_label.image = None
+            # callers pass local or already-verified paths (see _background_source)
+            if not path:
+                self._set_preview(None)
                 return
-            if PIL_AVAILABLE:
-                img = Image.open(path)
-                max_w, max_h = 360, 360
-                img.thumbnail((max_w, max_h), Image.LANCZOS)
-                tk_img = ImageTk.PhotoImage(img)
-                self.preview_label.config(image=tk_img)
-                self.preview_label.image = tk_img
-            else:
-                try:
-                    tk_img = tk.PhotoImage(file=path)
-                    self.preview_label.config(image=tk_img)
-                    self.preview_label.image = tk_img
-                except Exception:
-                    self.preview_label.config(text=os.path.basename(path))
-                    self.preview_label.image = None
-        except Exception:
             try:
-                self.preview_label.config(image="")
-                self.preview_label.image = None
+                with profiling.span("preview.load", cat="image", path=os.path.basename(path)):
+                    self._set_preview(tk.PhotoImage(file=path))
             except Exception:
-                pass
+                self._set_preview(None, text=os.path.basename(path))
+        except Exception:
+            self._set_preview(None)
+
+    def _poll_preview(self):
+        latest = None
+        while not self._preview_loader.results.empty():
+            latest = self._preview_loader.results.get_nowait()
+        if latest is not None and self._preview_loader.is_current(latest[0]):
+            self._preview_polling = False
+            path, img, _err = latest
+            from PIL import ImageTk
+            self._set_preview(ImageTk.PhotoImage(img) if img is not None else None)
+            profiling.complete("preview.load", self._preview_requested, cat="image", path=os.path.basename(path))
+            return
+        self.after(30, self._poll_preview)
+
+    def _set_preview(self, tk_img, text=""):
+        try:
+            self.preview_label.config(image=tk_img or "", text=text)
+            self.preview_label.image = tk_img
+        except Exception:
+            pass
+
+    def _on_var_write(self, name, *_):
+        """Trace callback: remember which variable changed and refresh once when idle."""
+        self._dirty_vars.add(name)
+        if not self._refresh_pending:
+            self._refresh_pending = True
+            self.after_idle(self._flush_dirty)
+
+    def _flush_dirty(self):
+        self._refresh_pending = False
+        dirty, self._dirty_vars = self._dirty_vars, set()
+        keys = {self._var_keys[name] for name in dirty if name in self._var_keys}
+        items = set()
+        for name in dirty:
+            items.update(self._tree_index.get(name, ()))
+        with profiling.span("checklist.refresh", cat="ui", keys=len(keys), items=len(items)):
+            # only the rows whose state actually changed are re-rendered
+            for desc, _applies in self._checklist.refresh(self._selection(), keys):
+                self.checklist_view.refresh_item(desc)
+            for iid in items:
+                self._update_tree_item_text(iid)
+        if self._live_plan:
+            self._render_live_plan()
+
+    def _selection(self):
+        """Snapshot of the current selections as a plain dict (see selection.py)."""
+        return {key: var.get() for key, var in self._selection_vars.items()}
 
     def _update_checklist(self):
         """Refresh the planned changes checklist labels to reflect current selections."""
-        # Update detailed labels (icon + description) using their checker functions
-        for desc, trio in self.detailed_labels.items():
-            icon, lbl, checker = trio
-            try:
-                applies = bool(checker())
-            except Exception:
-                applies = False
-            # If we have image icons, switch images; otherwise fallback to text markers
-            if applies:
-                if getattr(self, 'icon_ok', None) is not None and getattr(icon, 'image', None) is not None:
-                    icon.config(image=self.icon_ok)
-                    icon.image = self.icon_ok
-                else:
-                    icon.config(text="✓", foreground="green")
-                lbl.config(foreground="black")
-            else:
-                if getattr(self, 'icon_off', None) is not None and getattr(icon, 'image', None) is not None:
-                    icon.config(image=self.icon_off)
-                    icon.image = self.icon_off
-                else:
-                    icon.config(text="—", foreground="gray")
-                lbl.config(foreground="gray")
+        with profiling.span("checklist.update_all", cat="ui", rows=len(self._checklist.rows)):
+            for desc, _applies in self._checklist.refresh(self._selection()):
+                self.checklist_view.refresh_item(desc)
+
+    def _make_checklist_row(self, parent):
+        """One pooled checklist row: an icon (or text marker) and a description."""
+        frame = ttk.Frame(parent)
+        frame.columnconfigure(1, weight=1)
+        if self.icon_off:
+            icon = ttk.Label(frame, image=self.icon_off)
+        else:
+            icon = ttk.Label(frame, text=" ", width=2)
+        icon.grid(column=0, row=0, sticky="w", padx=(0,4))
+        lbl = ttk.Label(frame, text="")
+        lbl.grid(column=1, row=0, sticky="w")
+        return frame, (icon, lbl)
+
+    def _render_checklist_row(self, widgets, row):
+        """Show a checklist row as applying or not (row is None for an unused pool slot)."""
+        icon, lbl = widgets
+        if row is None:
+            icon.config(image="", text="")
+            lbl.config(text="")
+            return
+        applies = self._checklist.state.get(row.desc, False)
+        lbl.config(text=row.desc, foreground="black" if applies else "gray")
+        # If we have image icons, switch images; otherwise fallback to text markers
+        if self.icon_ok is not None:
+            icon.config(image=self.icon_ok if applies else self.icon_off)
+        elif applies:
+            icon.config(text="✓", foreground="green")
+        else:
+            icon.config(text="—", foreground="gray")
 
-    def _preview_system_actions(self):
+    def _configurator_params(self, dry_run=False):
+        """Build the configure-windows.ps1 parameters for the current selections.
+
+        Returns None (after telling the user) when nothing is selected. The script runs
+        everything when no Do* switch is given, so an empty selection must not reach it.
+        """
+        params = self._selection_params(dry_run)
+        if not any(k.startswith("Do") for k in params):
+            messagebox.showinfo("Nothing selected", "Select at least one setting in the tree first.")
+            return None
+        return params
+
+    def _selection_params(self, dry_run=False):
+        """Return the script parameters for the current selections, with no validation."""
+        return _sel.selection_params(self._selection(), self._background_source(), dry_run)
+
+    def _warm_worker(self):
+        try:
+            self._worker.start()
+        except OSError:
+            # reported when the first request is submitted
+            pass
+        # the power button steps need the active scheme GUID; look it up once, off the UI thread
+        threading.Thread(target=self._resolve_scheme, daemon=True).start()
+
+    def _resolve_scheme(self):
+        self._active_scheme = _plan.resolve_active_scheme()
+
+    def _run_configurator(self, params, title, on_done=None, journal=None, forecast=None):
+        script = _resource_path('configure-windows.ps1')
+        if not os.path.exists(script):
+            messagebox.showerror("Script not found", f"Could not find {script}")
+            self._end_archive("failed")
+            return
+        self._start_run("configure", {"script": script, "params": dict(params, StepEvents=True)}, title, on_done, journal,
+                        forecast)
+
+    def _path_available(self, path):
+        # local files (bundled default, cached wallpapers) are checked directly; anything else
+        # never blocks, and an unknown or unreachable path plans like a missing one
+        if path == str(self.default_bg_path) or path in self._prepared.values():
+            return os.path.exists(path)
+        return bool(self._files.exists(path))
+
+    def _render_live_plan(self):
+        """Recompute the plan for the current selections and show it in the preview pane."""
+        params = self._selection_params()
+        if not any(k.startswith("Do") for k in params):
+            text = "Nothing selected."
+        else:
+            plan = _plan.build_plan(params, scheme=self._active_scheme, exists=self._path_available)
+            text = _plan.render_plan(plan)
+        self._last_preview_text = text
+        self._clear_preview()
+        self._append_preview(text + "\n")
+        self.preview_log.scroll_to(0)
+
+    def _run_sections(self, params, title, on_done=None, journal=None, forecast=None):
+        """Run each selected section as its own configure request, independent ones concurrently."""
         script = _resource_path('configure-windows.ps1')
         if not os.path.exists(script):
             messagebox.showerror("Script not found", f"Could not find {script}")
+            self._end_archive("failed")
+            return
+        sections = _plan.selected_sections(params)
+        if len(sections) == 1:
+            self._run_configurator(params, title, on_done, journal, forecast)
+            return
+        execute = worker_executor(self._worker_pool, script, dict(params, StepEvents=True))
+        self._start_job(SectionRun(sections, execute, self.SECTION_WORKERS).start(), title, on_done, journal, forecast)
+
+    def _start_run(self, op, args, title, on_done=None, journal=None, forecast=None):
+        """Send `op` to the worker and stream its output into the preview pane.
+
+        `on_done(returncode, text)` is called on the Tk thread once the request finishes.
+        """
+        if self._runner is not None and self._runner.running:
+            messagebox.showwarning("Run in progress", "Another configurator run is still in progress. Cancel it or wait for it to finish.")
+            return
+        self._start_job(self._worker.submit(op, args), title, on_done, journal, forecast)
+
+    def _start_job(self, job, title, on_done=None, journal=None, forecast=None):
+        """Stream a started job (worker request or section run) into the preview pane.
+
+        Step events are checkpointed into `journal` when one is given, and drive the
+        progress bar when a step_history.Forecast is.
+        """
+        self._ensure_tab(self._settings_tab)
+        self._live_plan = False
+        self._begin_archive(title.split()[0].lower(), title)
+        self._append_preview(f"=== {title} ===\n")
+        # only the tail is kept for on_done (error dialogs); the full log is in preview_log
+        self._run_lines = deque(maxlen=RUN_LINES_KEPT)
+        # -StepEvents records of this run (see step_events.py)
+        self._step_timings = StepTimings()
+        self._run_journal = journal
+        self._run_on_done = on_done
+        self._runner = job
+        self._forecast = forecast
+        if forecast is not None:
+            self.run_progress.config(value=0)
+            self.run_eta_var.set(forecast.text())
+            self.run_progress_frame.grid()
+        self.run_status_var.set(f"Running: {title}")
+        self.cancel_btn.config(state="normal")
+        self.after(50, self._drain_run)
+
+    def _drain_run(self):
+        runner = self._runner
+        if runner is None:
+            return
+        chunk = []
+        finished = False
+        for kind, payload in runner.drain():
+            if kind == "exit":
+                finished = True
+                break
+            if kind == "out":
+                event = self._step_timings.feed(payload)
+                if event is not None:
+                    self._checkpoint(event)
+                    if self._forecast is not None and self._forecast.feed(event):
+                        chunk.append(_hist.slow_message(event, self._forecast.stats[event.id]) + "\n")
+                    # timings go to the table; only failures are worth a line in the log
+                    if event.status == "failed":
+                        chunk.append(f"FAILED {event.id}: {event.error or f'exit code {event.exit_code}'}\n")
+                    continue
+            line = payload if kind == "out" else f"[stderr] {payload}"
+            self._run_lines.append(line)
+            chunk.append(line + "\n")
+        if chunk:
+            self._append_preview("".join(chunk))
+        if self._forecast is not None:
+            self.run_progress.config(value=100.0 * self._forecast.fraction())
+            self.run_eta_var.set(self._forecast.text())
+        if not finished:
+            self.after(50, self._drain_run)
+            return
+        if self._forecast is not None:
+            self._forecast = None
+            self.run_progress_frame.grid_remove()
+        code = runner.returncode
+        if runner.cancelled:
+            status = "Cancelled"
+        else:
+            status = f"Finished (exit code {code})"
+        if self._step_timings:
+            self._append_preview("=== Run summary ===\n" + self._step_timings.render_summary() + "\n")
+            self._last_step_timings = self._step_timings
+            self.timings_btn.config(state="normal")
+            self._record_history([(e.id, e.duration_ms) for e in self._step_timings.executed() if e.status == "ok"],
+                                 self._run_journal.run_id if self._run_journal else None)
+        self._append_preview(f"=== {status} ===\n\n")
+        self.run_status_var.set(status)
+        self.cancel_btn.config(state="disabled")
+        self._archive_status = ("cancelled" if runner.cancelled else "ok" if code == 0 else "failed", code)
+        if self._wu_job is None or not self._wu_job.running:
+            self._end_archive(*self._archive_status)
+        on_done = self._run_on_done
+        self._run_on_done = None
+        if self._run_journal is not None:
+            self._run_journal = None
+            self._finish_journal()
+        if on_done is not None and not runner.cancelled:
+            on_done(code, "\n".join(self._run_lines))
+
+    def _show_step_timings(self):
+        """Per-step timing table of the last run; click a heading to sort by it."""
+        timings = getattr(self, "_last_step_timings", None)
+        if not timings:
+            return
+        win = tk.Toplevel(self)
+        win.title("Step timings")
+        win.geometry("760x420")
+        columns = ("step", "section", "status", "ms", "error")
+        tree = ttk.Treeview(win, columns=columns, show="headings")
+        for col, width, anchor in (("step", 220, "w"), ("section", 110, "w"), ("status", 70, "w"), ("ms", 80, "e"), ("error", 260, "w")):
+            tree.heading(col, text=col.capitalize() if col != "ms" else "Duration (ms)",
+                         command=lambda c=col: _sort(c))
+            tree.column(col, width=width, anchor=anchor)
+        rows = [(e.id, e.section, e.status, e.duration_ms, e.error or "") for e in timings.steps]
+        rows += [(f"[{e.id}]", e.section, e.status, e.duration_ms, e.error or "") for e in timings.sections]
+        order = {"reverse": False, "col": None}
+
+        def _fill(data):
+            tree.delete(*tree.get_children())
+            for r in data:
+                tree.insert("", "end", values=(r[0], r[1], r[2], f"{r[3]:.1f}", r[4]))
+
+        def _sort(col):
+            idx = columns.index(col)
+            order["reverse"] = not order["reverse"] if order["col"] == col else col == "ms"
+            order["col"] = col
+            _fill(sorted(rows, key=lambda r: r[idx], reverse=order["reverse"]))
+
+        vsb = ttk.Scrollbar(win, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=vsb.set)
+        tree.grid(column=0, row=0, sticky="nsew")
+        vsb.grid(column=1, row=0, sticky="ns")
+        ttk.Label(win, text=timings.render_summary().splitlines()[0]).grid(column=0, row=1, sticky="w", padx=6, pady=6)
+        win.grid_rowconfigure(0, weight=1)
+        win.grid_columnconfigure(0, weight=1)
+        _fill(rows)
+
+    def _plan_kwargs(self):
+        return {"scheme": self._active_scheme, "exists": self._path_available}
+
+    def _checkpoint(self, event):
+        """Record a step event in the journal of the current run, if it has one."""
+        if self._run_journal is None:
             return
         try:
-            pscmd = ["powershell", "-NoProfile", "-ExecutionPolicy", "Bypass", "-File", script, "-DryRun"]
-            if self.tz_var.get().strip():
-                pscmd.extend(["-TimeZoneId", self.tz_var.get().strip()])
-            if self.bg_path_var.get().strip():
-                pscmd.extend(["-BackgroundPath", self.bg_path_var.get().strip()])
-            elif self.default_bg_path.exists():
-                pscmd.extend(["-BackgroundPath", str(self.default_bg_path)])
-            # Pass fine-grained power action switches
-            if self.power_button_do_nothing_var.get():
-                pscmd.append("-PowerButtonDoNothing")
-            if self.sleep_button_do_nothing_var.get():
-                pscmd.append("-SleepButtonDoNothing")
-            if self.lid_close_do_nothing_var.get():
-                pscmd.append("-LidCloseDoNothing")
-            # Pass Do* function selection switches only when user toggles them
-            if self.do_powersettings_var.get():
-                pscmd.append("-DoPowerSettings")
-            if self.do_taskbar_var.get():
-                pscmd.append("-DoTaskbar")
-            if self.do_datetime_var.get():
-                pscmd.append("-DoDateTime")
-            if self.do_notifications_var.get():
-                pscmd.append("-DoNotifications")
-            if self.do_windowsupdate_var.get():
-                pscmd.append("-DoWindowsUpdate")
-            if self.do_personalization_var.get():
-                pscmd.append("-DoPersonalization")
-            if self.do_powerbuttonactions_var.get():
-                pscmd.append("-DoPowerButtonActions")
-            # refresh checklist to reflect user's current choices before running
-            self._update_checklist()
-            # Run powershell and capture output to a temporary file, then show it in a pop-up
-            import tempfile
-            tf = tempfile.NamedTemporaryFile(delete=False, suffix='.txt')
-            tf.close()
-            with open(tf.name, 'w', encoding='utf-8', errors='replace') as fh:
-                subprocess.run(pscmd, check=False, stdout=fh, stderr=subprocess.STDOUT)
-            # Load and display the output in the GUI
+            self._run_journal.record(event)
+        except OSError as e:
+            self._append_preview(f"=== Run journal write failed, checkpointing stopped: {e} ===\n")
+            self._run_journal = self._journal = None
+
+    def _record_history(self, durations, run_id=None):
+        """Add (step id, ms) pairs of a finished run to the step history, off the Tk thread."""
+        if not durations:
+            return
+
+        def _write():
             try:
-                with open(tf.name, 'r', encoding='utf-8', errors='replace') as fh:
-                    out = fh.read()
-            except Exception:
-                out = "(Could not read output file)"
-            self._show_ps_output(out, title="Preview output (DryRun)")
-            messagebox.showinfo("Preview actions", "PowerShell configurator finished DryRun — output shown in the preview window.")
-        except subprocess.CalledProcessError as e:
-            messagebox.showerror("Preview failed", f"Preview run failed: {e}")
+                self._history.record(durations, run_id)
+            except (sqlite3.Error, OSError):
+                pass  # the estimate just has one run less to go on
 
-    def _show_ps_output(self, text, title="Output"):
-        """Show PowerShell output text in a modal read-only window with scrollbar."""
-        win = tk.Toplevel(self)
-        win.title(title)
-        win.geometry("720x480")
-        win.transient(self)
-        win.grab_set()
+        threading.Thread(target=_write, daemon=True).start()
 
-        frm = ttk.Frame(win)
-        frm.pack(fill='both', expand=True)
+    def _checkpoint_native(self, step_ids):
+        if self._journal is None or not step_ids:
+            return
+        try:
+            self._journal.mark_completed(step_ids)
+        except OSError as e:
+            self._append_preview(f"=== Run journal write failed, checkpointing stopped: {e} ===\n")
+            self._journal = None
+
+    def _finish_journal(self):
+        """Close the journal once the section run and the Windows Update job are both over."""
+        journal = self._journal
+        if journal is None or self._run_journal is not None or (self._wu_job is not None and self._wu_job.running):
+            return
+        self._journal = None
+        self._clear_auto_resume()
+        try:
+            status = journal.finish(**self._plan_kwargs())
+            _journal.prune()
+        except OSError:
+            return
+        if status == _journal.DONE:
+            self._append_preview(f"=== Run {journal.run_id} complete ===\n")
+        else:
+            self._append_preview(f"=== Not finished: {journal.summary(**self._plan_kwargs())}. "
+                                 "Restart the app to resume it. ===\n")
 
-        txt = tk.Text(frm, wrap='none')
-        txt.insert('1.0', text)
-        txt.config(state='disabled')
-        txt.pack(side='left', fill='both', expand=True)
+    def _set_auto_resume(self, run_id):
+        if self._registry is None:
+            return
+        result = _journal.register_resume(run_id, self._registry)
+        if not result.ok:
+            self._append_preview(f"=== Could not register automatic resume: {result.error} ===\n")
+
+    def _clear_auto_resume(self):
+        if self._registry is not None:
+            _journal.unregister_resume(self._registry)
+
+    def _check_unfinished_run(self):
+        """Offer to resume an interrupted run; with --resume <run id> (RunOnce at logon) just resume it."""
+        run_id, self._resume_id = self._resume_id, None
+        journal = _journal.find_run(run_id) if run_id else _journal.latest_unfinished()
+        if journal is None or journal.status not in (_journal.RUNNING, _journal.INCOMPLETE):
+            return
+        kwargs = self._plan_kwargs()
+        params = journal.resume_params(**kwargs)
+        if params is None:
+            journal.finish(**kwargs)
+            return
+        if not run_id and not messagebox.askyesno(
+                "Resume unfinished run",
+                f"An earlier run did not finish.\n\n{journal.summary(**kwargs)}\n\n"
+                "Resume it now? Completed steps are skipped."):
+            journal.dismiss()
+            return
+        if not is_admin():
+            messagebox.showerror("Administrator required", "Resuming the run requires Administrator privileges. Run this app elevated and try again.")
+            return
+        if self._probing or (self._runner is not None and self._runner.running):
+            return
+        journal.start_resume()
+        self._start_apply(params, journal)
+        self._append_preview(f"=== Resuming run {journal.run_id}: {len(journal.completed())} step(s) already done ===\n")
+
+    def _cancel_run(self):
+        if self._runner is not None and self._runner.running:
+            self.run_status_var.set("Cancelling...")
+            self._runner.cancel()
+
+    def _on_close(self):
+        busy = (self._runner is not None and self._runner.running) or (self._wu_job is not None and self._wu_job.running)
+        if busy:
+            if not messagebox.askyesno("Run in progress", "A configurator run is still in progress. Cancel it and exit?"):
+                return
+            if self._runner is not None:
+                self._runner.cancel()
+            if self._wu_job is not None:
+                self._wu_job.cancel()
+            # the journal stays unfinished, so the next start offers to resume; just no RunOnce
+            self._clear_auto_resume()
+        if self._wallpaper_import is not None:
+            self._wallpaper_import.cancel()
+        self._worker_pool.close()
+        if self._archive_run is not None:
+            self._end_archive("cancelled" if busy else "ok", wait=True)
+        if hasattr(self, "preview_log"):
+            self.preview_log.store.close()
+        self.destroy()
+
+    def _append_preview(self, text):
+        self.preview_log.append(text)
+        if self._archive_run is not None:
+            self._archive_run.append(text)
+
+    def _begin_archive(self, kind, title, selections=None):
+        """Start recording the preview pane's output into the run archive, unless a run already is."""
+        if self._archive_run is not None:
+            return
+        self._archive_status = ("ok", None)
+        try:
+            self._archive_run = self._archive.begin(kind, title, selections)
+        except OSError as e:
+            self.preview_log.append(f"=== Run archive unavailable, this run's output is not kept: {e} ===\n")
+
+    def _end_archive(self, status, exit_code=None, wait=False):
+        """Compress and index the recorded run, off the Tk thread unless `wait`."""
+        rec, self._archive_run = self._archive_run, None
+        if rec is None:
+            return
 
-        vsb = ttk.Scrollbar(frm, orient='vertical', command=txt.yview)
-        vsb.pack(side='right', fill='y')
-        txt.configure(yscrollcommand=vsb.set)
+        def _finish():
+            try:
+                rec.finish(status, exit_code)
+            except OSError:
+                pass  # the plain .log stays behind and recover() finishes it next time
 
-        # Horizontal scrollbar
-        hsb = ttk.Scrollbar(win, orient='horizontal', command=txt.xview)
-        hsb.pack(side='bottom', fill='x')
-        txt.configure(xscrollcommand=hsb.set)
+        if wait:
+            _finish()
+        else:
+            threading.Thread(target=_finish, daemon=True).start()
+
+    def _clear_preview(self):
+        self.preview_log.clear()
+
+    def _save_preview(self):
+        self._save_log(self.preview_log.store)
+
+    def _save_log(self, store):
+        p = filedialog.asksaveasfilename(defaultextension='.txt', filetypes=[('Text', '*.txt'), ('All', '*.*')])
+        if p:
+            try:
+                store.save_to(p)
+            except Exception as e:
+                messagebox.showerror('Save failed', str(e))
+
+    def _open_last_preview(self):
+        """This session's last plan, else the newest archived preview of an earlier session."""
+        if self._last_preview_text:
+            self._show_ps_output(self._last_preview_text, title="Planned actions")
+            return
+        try:
+            run = self._archive.latest("preview")
+        except OSError:
+            run = None
+        if run is None:
+            messagebox.showinfo("Open last preview", "No preview has been run yet.")
+            return
+        self._show_archived_run(run)
+
+    def _show_archived_run(self, run):
+        try:
+            text = self._archive.read(run.id)
+        except OSError as e:
+            messagebox.showerror("Run archive", f"Cannot read {run.id}: {e}")
+            return
+        self._show_ps_output(_archive.format_header(run) + "\n\n" + text, title=f"{run.title} ({run.started})")
+
+    def _show_run_archive(self):
+        """Archived runs of every session, newest first; the search box finds runs by a line they contain."""
+        win = tk.Toplevel(self)
+        win.title("Run archive")
+        win.geometry("900x440")
+        win.columnconfigure(0, weight=1)
+        win.rowconfigure(1, weight=1)
+
+        top = ttk.Frame(win)
+        top.grid(column=0, row=0, columnspan=2, sticky="ew", padx=6, pady=6)
+        query_var = tk.StringVar()
+        entry = ttk.Entry(top, textvariable=query_var, width=40)
+        entry.pack(side="left")
+        ttk.Button(top, text="Search", command=lambda: _load(query_var.get().strip())).pack(side="left", padx=(6,0))
+        ttk.Button(top, text="Show all", command=lambda: (query_var.set(""), _load(""))).pack(side="left", padx=(6,0))
+        status_var = tk.StringVar(value="Loading...")
+        ttk.Label(top, textvariable=status_var, foreground="gray").pack(side="left", padx=(8,0))
+        entry.bind("<Return>", lambda e: _load(query_var.get().strip()))
+
+        cols = ("started", "kind", "title", "status", "machine", "match")
+        tree = ttk.Treeview(win, columns=cols, show="headings", selectmode="browse")
+        for col, width in zip(cols, (140, 80, 200, 80, 110, 280)):
+            tree.heading(col, text=col.capitalize())
+            tree.column(col, width=width, stretch=(col == "match"))
+        tree.grid(column=0, row=1, sticky="nsew", padx=(6,0))
+        vsb = ttk.Scrollbar(win, orient="vertical", command=tree.yview)
+        vsb.grid(column=1, row=1, sticky="ns", padx=(0,6))
+        tree.configure(yscrollcommand=vsb.set)
+        runs = {}
+
+        def _selected():
+            sel = tree.selection()
+            return runs.get(sel[0]) if sel else None
+
+        def _open(_event=None):
+            run = _selected()
+            if run is not None:
+                self._show_archived_run(run)
 
-        btn_frame = ttk.Frame(win)
-        btn_frame.pack(fill='x')
         def _save():
-            p = filedialog.asksaveasfilename(defaultextension='.txt', filetypes=[('Text', '*.txt'), ('All', '*.*')])
+            run = _selected()
+            if run is None:
+                return
+            p = filedialog.asksaveasfilename(parent=win, initialfile=run.id + ".txt", defaultextension=".txt",
+                                             filetypes=[("Text", "*.txt"), ("All", "*.*")])
             if p:
                 try:
-                    with open(p, 'w', encoding='utf-8', errors='replace') as fh:
-                        fh.write(text)
-                except Exception as e:
-                    messagebox.showerror('Save failed', str(e))
+                    self._archive.export(run.id, p)
+                except OSError as e:
+                    messagebox.showerror("Save failed", str(e), parent=win)
+
+        tree.bind("<Double-1>", _open)
+        buttons = ttk.Frame(win)
+        buttons.grid(column=0, row=2, columnspan=2, sticky="ew")
+        ttk.Button(buttons, text="Close", command=win.destroy).pack(side="right", padx=6, pady=6)
+        ttk.Button(buttons, text="Save...", command=_save).pack(side="right", pady=6)
+        ttk.Button(buttons, text="Open", command=_open).pack(side="right", padx=6, pady=6)
+
+        results = queue.Queue()
 
-        ttk.Button(btn_frame, text='Save...', command=_save).pack(side='right', padx=6, pady=6)
+        def _load(needle):
+            status_var.set("Searching..." if needle else "Loading...")
+
+            def _work():
+                started = time.perf_counter()
+                try:
+                    if needle:
+                        rows = {}
+                        for hit in self._archive.search(needle, limit=1000):
+                            rows.setdefault(hit.run.id, (hit.run, f"{hit.line_no}: {hit.line.strip()}"))
+                        rows = list(rows.values())
+                    else:
+                        rows = [(run, "") for run in self._archive.runs()]
+                    results.put((needle, rows, time.perf_counter() - started))
+                except OSError as e:
+                    results.put(e)
+
+            threading.Thread(target=_work, daemon=True).start()
+            win.after(50, _poll)
+
+        def _poll():
+            if not win.winfo_exists():
+                return
+            try:
+                outcome = results.get_nowait()
+            except queue.Empty:
+                win.after(50, _poll)
+                return
+            if isinstance(outcome, Exception):
+                status_var.set(f"Archive unavailable: {outcome}")
+                return
+            needle, rows, seconds = outcome
+            tree.delete(*tree.get_children())
+            runs.clear()
+            for run, match in rows:
+                runs[run.id] = run
+                tree.insert("", "end", iid=run.id, values=(run.started.replace("T", " "), run.kind, run.title,
+                                                           run.status, run.machine, match))
+            what = f"{len(rows)} run(s) containing '{needle}'" if needle else f"{len(rows)} run(s)"
+            status_var.set(f"{what} ({seconds * 1000.0:.0f} ms)")
+
+        _load("")
+        entry.focus_set()
+
+    def _preview_system_actions(self):
+        """Show the planned operations, computed in-process, and keep them live as selections change."""
+        if self._runner is not None and self._runner.running:
+            messagebox.showwarning("Run in progress", "Wait for the current run to finish before previewing.")
+            return
+        self._live_plan = True
+        self.run_status_var.set("Live plan (no changes made)")
+        self._render_live_plan()
+        # only the explicit preview is archived, not every live re-render
+        text, params = self._last_preview_text, self._selection_params()
+
+        def _archive_preview():
+            try:
+                self._archive.record("preview", "Planned actions", text + "\n", params)
+            except OSError:
+                pass
+
+        threading.Thread(target=_archive_preview, daemon=True).start()
+
+    def _show_ps_output(self, text, title="Output"):
+        """Show PowerShell output in a read-only, searchable window; the main window stays usable."""
+        win = tk.Toplevel(self)
+        win.title(title)
+        win.geometry("720x480")
+
+        store = LogStore.from_text(text)
+        view = LogView(win, store)
+        view.pack(fill='both', expand=True)
+        view.scroll_to(0)
+
+        btn_frame = ttk.Frame(win)
+        btn_frame.pack(fill='x')
+        ttk.Button(btn_frame, text='Save...', command=lambda: self._save_log(store)).pack(side='right', padx=6, pady=6)
         ttk.Button(btn_frame, text='Close', command=win.destroy).pack(side='right', pady=6)
+        # the spill file goes away with the window
+        win.bind("<Destroy>", lambda e: store.close() if e.widget is win else None)
 
     def _apply_system_settings(self):
-        script = _resource_path('configure-windows.ps1')
-        if not os.path.exists(script):
-            messagebox.showerror("Script not found", f"Could not find {script}")
-            return
         if not is_admin():
             messagebox.showerror("Administrator required", "Applying system settings requires Administrator privileges. Run this script elevated and try again.")
             return
+        if self._probing or (self._runner is not None and self._runner.running):
+            messagebox.showwarning("Run in progress", "Another configurator run is still in progress. Cancel it or wait for it to finish.")
+            return
+        params = self._configurator_params()
+        if params is None:
+            return
+        if params.get("DoWindowsUpdate") and self._wu_job is not None and self._wu_job.running:
+            messagebox.showwarning("Windows Update running", "Windows Update is still running. Cancel it or wait for it to finish.")
+            return
         if not messagebox.askyesno("Apply settings", "Apply system settings now? This will run the PowerShell configurator script which may change registry and stop services."):
             return
         try:
-            cmd = ["powershell", "-NoProfile", "-ExecutionPolicy", "Bypass", "-File", script]
-            if self.tz_var.get().strip():
-                cmd.extend(["-TimeZoneId", self.tz_var.get().strip()])
-            if self.bg_path_var.get().strip():
-                cmd.extend(["-BackgroundPath", self.bg_path_var.get().strip()])
-            elif self.default_bg_path.exists():
-                cmd.extend(["-BackgroundPath", str(self.default_bg_path)])
-            # Pass fine-grained power action switches
-            if self.power_button_do_nothing_var.get():
-                cmd.append("-PowerButtonDoNothing")
-            if self.sleep_button_do_nothing_var.get():
-                cmd.append("-SleepButtonDoNothing")
-            if self.lid_close_do_nothing_var.get():
-                cmd.append("-LidCloseDoNothing")
-            # Pass Do* function selection switches only when user toggles them
-            if self.do_powersettings_var.get():
-                cmd.append("-DoPowerSettings")
-            if self.do_taskbar_var.get():
-                cmd.append("-DoTaskbar")
-            if self.do_datetime_var.get():
-                cmd.append("-DoDateTime")
-            if self.do_notifications_var.get():
-                cmd.append("-DoNotifications")
-            if self.do_windowsupdate_var.get():
-                cmd.append("-DoWindowsUpdate")
-            if self.do_personalization_var.get():
-                cmd.append("-DoPersonalization")
-            if self.do_powerbuttonactions_var.get():
-                cmd.append("-DoPowerButtonActions")
-            # refresh checklist to reflect user's current choices before running
-            self._update_checklist()
-            subprocess.run(cmd, check=True)
-            messagebox.showinfo("Apply settings", "PowerShell configurator executed. Review the PowerShell output for details.")
-        except subprocess.CalledProcessError as e:
-            messagebox.showerror("Apply failed", f"PowerShell configurator failed: {e}")
+            journal = _journal.RunJournal.create(params)
+            # a fresh run replaces whatever was left unfinished
+            _journal.dismiss_unfinished(keep=journal.run_id)
+        except OSError as e:
+            # the run itself does not depend on the journal
+            journal = None
+            self._append_preview(f"=== Run journal unavailable, this run cannot be resumed: {e} ===\n")
+        self._start_apply(params, journal)
+
+    def _start_apply(self, params, journal=None):
+        """Probe, write the registry natively and run the sections, checkpointing into `journal`."""
+        self._journal = journal
+        self._begin_archive("apply", "Apply selected settings", params)
+        if journal is not None and self.auto_resume_var.get():
+            self._set_auto_resume(journal.run_id)
+        # refresh checklist to reflect user's current choices before running
+        self._update_checklist()
+
+        # read the current machine state first (one batch, off the UI thread) and skip steps already applied
+        plan = _plan.build_plan(params, scheme=self._active_scheme, exists=self._path_available)
+        self._probing = True
+        self._live_plan = False
+        self.run_status_var.set("Reading current state...")
+        results = queue.Queue()
+
+        def _read_state():
+            try:
+                diffs = _probe.probe_plan(plan, self._probe_backend)
+            except Exception as e:
+                diffs, error = None, str(e)
+            else:
+                error = None
+            skip = set(params.get("SkipSteps") or ()) | set(_probe.skip_ids(diffs) if diffs else ())
+            written, native, write_error = [], [], None
+            try:
+                if self._registry is not None:
+                    written = self._registry.apply(_reg.writes_for_plan(plan, skip))
+                if self._native is not None:
+                    native = _native.apply_native_steps(plan, self._native, skip)
+            except Exception as e:
+                # whatever was not written natively stays in the plan for the script
+                write_error = str(e)
+            try:
+                stats = self._history.stats_for([s.id for s in plan] + [_hist.WINDOWS_UPDATE_STEP])
+            except (sqlite3.Error, OSError):
+                stats = {}
+            try:
+                script_ids = _plan.script_step_ids(_resource_path('configure-windows.ps1'))
+            except OSError:
+                # without the script the run fails on its own; nothing to single out here
+                script_ids = None
+            results.put((plan, diffs, error, written, native, write_error, stats, script_ids))
+
+        threading.Thread(target=_read_state, daemon=True).start()
+        self.after(50, self._poll_probe, results, params)
+
+    def _poll_probe(self, results, params):
+        try:
+            plan, diffs, error, written, native, write_error, stats, script_ids = results.get_nowait()
+        except queue.Empty:
+            self.after(50, self._poll_probe, results, params)
+            return
+        self._probing = False
+        skip = []
+        if diffs is not None:
+            self._append_preview("=== Current state ===\n" + _probe.format_diff(diffs) + "\n")
+            skip = _probe.skip_ids(diffs)
+        else:
+            self._append_preview(f"=== State probe failed, applying everything: {error} ===\n")
+        if written:
+            lines = []
+            for r in written:
+                target = r.write.key if r.write.name is None else f"{r.write.key}\\{r.write.name}"
+                lines.append(f"  {'ok    ' if r.ok else 'FAILED'}  {target}" + (f"  ({r.error})" if r.error else ""))
+                if r.ok:
+                    # done natively; failed writes are retried by the script when it has the step
+                    skip.append(r.write.step_id)
+            self._append_preview("=== Registry (native) ===\n" + "\n".join(lines) + "\n")
+        if write_error:
+            self._append_preview(f"=== Native writes failed, the script retries the steps it has: {write_error} ===\n")
+        for r in native:
+            self._append_preview(f"=== Wallpaper (native) ===\n  {'ok    ' if r.ok else 'FAILED'}  {r.target}"
+                                 + (f"  ({r.error})" if r.error else "") + "\n")
+            if r.ok:
+                skip.append(r.step_id)
+        unapplied = []
+        if self._registry is not None and script_ids is not None:
+            done = set(skip) | set(params.get("SkipSteps") or ())
+            unapplied = _plan.catalog_only_unapplied(plan, done, script_ids)
+        if unapplied:
+            # catalog-only steps have no code in configure-windows.ps1, so a failed native write is final
+            self._append_preview("=== Not applied, configure-windows.ps1 has no fallback for: "
+                                 + ", ".join(unapplied) + " ===\n")
+        self._checkpoint_native([r.write.step_id for r in written if r.ok and r.write.step_id]
+                                + [r.step_id for r in native if r.ok])
+        journal = self._journal
+        if skip:
+            # steps a resumed run already finished are in SkipSteps too
+            params = dict(params, SkipSteps=list(dict.fromkeys(list(params.get("SkipSteps") or ()) + skip)))
+        if params.get("DoPersonalization"):
+            self._pin_wallpaper(params.get("BackgroundPath"))
+        if params.pop("DoWindowsUpdate", False):
+            # updates can take an hour; run them separately so the other settings finish meanwhile
+            self._start_windows_update(stats.get(_hist.WINDOWS_UPDATE_STEP))
+            if not any(k.startswith("Do") for k in params):
+                self._finish_journal()
+                return
+        done = set(params.get("SkipSteps") or ())
+        forecast = _hist.Forecast([s.id for s in plan if s.id not in done and s.section != "windowsupdate"],
+                                  stats, self.SECTION_WORKERS)
+
+        def _done(code, text):
+            if code == 0 and unapplied:
+                messagebox.showwarning("Apply settings", "PowerShell configurator finished, but "
+                                       f"{len(unapplied)} setting(s) could not be written. Review the preview output for details.")
+            elif code == 0:
+                messagebox.showinfo("Apply settings", "PowerShell configurator finished. Review the preview output for details.")
+            else:
+                messagebox.showerror("Apply failed", f"PowerShell configurator exited with code {code}. Review the preview output for details.")
+
+        self._run_sections(params, "Apply selected settings", on_done=_done, journal=journal, forecast=forecast)
+
+    def _start_windows_update(self, stats=None):
+        if os.name == "nt" and not os.environ.get("CCI_WORKER_STUB"):
+            provider = _wu.PowerShellUpdateProvider()
+        else:
+            provider = _wu.FakeUpdateProvider([_wu.UpdateInfo("KB0000001", "Sample update (stub)")], delay=0.3)
+        self._wu_job = _wu.WindowsUpdateJob(provider).start()
+        self._wu_started = time.monotonic()
+        self.wu_progress.config(value=0)
+        self.wu_status_var.set("Starting...")
+        self.wu_cancel_btn.config(state="normal")
+        self.wu_frame.grid()
+        self._append_preview("=== Windows Update started (runs alongside the other settings) ===\n")
+        if stats is not None:
+            self._append_preview(f"Windows Update usually takes {_hist.format_duration(stats.p50_ms / 1000.0)} on this "
+                                 f"hardware (90% under {_hist.format_duration(stats.p90_ms / 1000.0)})\n")
+        self.after(200, self._poll_windows_update, self._wu_job)
+
+    def _poll_windows_update(self, job):
+        labels = {
+            _wu.PREPARING: "Preparing PSWindowsUpdate module...",
+            _wu.SCANNING: "Scanning for updates...",
+            _wu.STOPPING_SERVICE: "Stopping and disabling wuauserv...",
+        }
+        for event in job.drain():
+            kind = event[0]
+            if kind == "state" and event[1] in labels:
+                self.wu_status_var.set(labels[event[1]])
+            elif kind == "update":
+                _, index, total, kb, phase, percent = event
+                verb = "Downloading" if phase == "download" else "Installing"
+                self.wu_status_var.set(f"{verb} {kb} ({index}/{total}) {percent}%")
+                # each update is half download, half install
+                done = (index - 1) + (percent / 200.0) + (0.5 if phase == "install" else 0)
+                self.wu_progress.config(value=100.0 * done / total)
+            elif kind == "log":
+                self._append_preview(f"[windowsupdate] {event[1]}\n")
+            elif kind == "done":
+                _, state, reboot, error = event
+                status = {
+                    _wu.DONE: f"Finished: {len(job.installed)} update(s) installed",
+                    _wu.CANCELLED: f"Cancelled after {len(job.installed)} update(s)",
+                    _wu.FAILED: f"Failed: {error}",
+                }[state]
+                if reboot:
+                    status += " - restart required"
+                if state == _wu.DONE:
+                    self.wu_progress.config(value=100)
+                    if job is self._wu_job:
+                        self._record_history([(_hist.WINDOWS_UPDATE_STEP, (time.monotonic() - self._wu_started) * 1000.0)])
+                self.wu_status_var.set(status)
+                self.wu_cancel_btn.config(state="disabled")
+                self._append_preview(f"=== Windows Update: {status} ===\n")
+                if job is self._wu_job and (self._runner is None or not self._runner.running):
+                    # the section run, if any, is over too; a failed update fails the whole run
+                    run_status, code = self._archive_status
+                    self._end_archive(run_status if state == _wu.DONE else state, code)
+                if self._journal is not None and job is self._wu_job:
+                    try:
+                        self._journal.mark_section("windowsupdate", "ok" if state == _wu.DONE else state, error)
+                    except OSError:
+                        pass
+                    self._finish_journal()
+                return
+        self.after(200, self._poll_windows_update, job)
+
+    def _cancel_windows_update(self):
+        if self._wu_job is not None and self._wu_job.running:
+            self.wu_status_var.set("Cancelling...")
+            self._wu_job.cancel()
 
     def _apply_background(self):
-        """Apply the selected background immediately by running the PowerShell configurator with -BackgroundPath.
+        """Apply the selected background immediately, through the Win32 API or else the configurator's wallpaper step.
 
         This operation requires Administrator privileges because setting the system wallpaper may change system settings.
         """
-        script = _resource_path('configure-windows.ps1')
-        if not os.path.exists(script):
-            messagebox.showerror("Script not found", f"Could not find {script}")
-            return
         if not is_admin():
             messagebox.showerror("Administrator required", "Applying the background requires Administrator privileges. Run this program elevated and try again.")
             return
-        bg = self.bg_path_var.get().strip() or (str(self.default_bg_path) if self.default_bg_path.exists() else "")
-        if not bg or not os.path.exists(bg):
+        src = self.bg_path_var.get().strip()
+        bg = self._background_source()
+        if not bg:
             messagebox.showerror("Background not found", "Selected background file does not exist.")
             return
-        if not messagebox.askyesno("Apply background", f"Apply the selected background now?\n{bg}"):
+        note = ""
+        if src and bg == str(self.default_bg_path) and src not in self._prepared:
+            note = "\n\nThe selected file is not reachable right now, so the default background will be used."
+        if not messagebox.askyesno("Apply background", f"Apply the selected background now?\n{bg}{note}"):
             return
-        try:
-            cmd = ["powershell", "-NoProfile", "-ExecutionPolicy", "Bypass", "-File", script, "-BackgroundPath", bg]
-            subprocess.run(cmd, check=True)
-            messagebox.showinfo("Background applied", "Background applied successfully.")
-        except subprocess.CalledProcessError as e:
-            messagebox.showerror("Apply failed", f"Failed to apply background: {e}")
+        def _done(code, text):
+            if code == 0:
+                messagebox.showinfo("Background applied", "Background applied successfully.")
+            else:
+                messagebox.showerror("Apply failed", f"Failed to apply background (exit code {code}).")
+
+        params = {"BackgroundPath": bg}
+        self._pin_wallpaper(bg)
+        own = self._archive_run is None
+        self._begin_archive("background", "Apply background", params)
+        if self._native is not None:
+            try:
+                self._native.set_wallpaper(bg)
+            except _native.NativeError as e:
+                if not e.fallback:
+                    self._append_preview(f"Setting the wallpaper failed: {e}\n")
+                    if own:
+                        self._end_archive("failed")
+                    messagebox.showerror("Apply failed", f"Failed to apply background:\n{e.message}")
+                    return
+                self._append_preview(f"Native wallpaper unavailable ({e.message}); using the configurator\n")
+            else:
+                self._append_preview(f"Wallpaper set to {bg}\n")
+                if own:
+                    self._end_archive("ok", 0)
+                _done(0, "")
+                return
+        # only the wallpaper step of the personalization section
+        params["DoPersonalization"] = True
+        plan = _plan.build_plan(params, scheme=self._active_scheme, exists=self._path_available)
+        params["SkipSteps"] = [step.id for step in plan if step.kind != "wallpaper"]
+        self._run_configurator(params, "Apply background", on_done=_done)
 
 if __name__ == "__main__":
-    app = ComputerNamerApp()
+    args = sys.argv[1:]
+    resume_id = args[args.index("--resume") + 1] if "--resume" in args[:-1] else None
+    app = ComputerNamerApp(resume_id=resume_id)
     app.mainloop()
+    if profiling.enabled():
+        profiling.write_trace(profiling.default_trace_path())
@@ -5,7 +5,7 @@ a = Analysis(
     ['computer_namer_gui.py'],
     pathex=[],
     binaries=[],
-    datas=[('assets', 'assets'), ('configure-windows.ps1', '.')],
+    datas=[('assets', 'assets'), ('configure-windows.ps1', '.'), ('ps_worker.ps1', '.'), ('settings_catalog.json', '.')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
@@ -0,0 +1,173 @@
+"""Compute the configure-windows.ps1 plan in Python.
+
+build_plan() takes the same parameter dict the GUI sends to the script
+(see ComputerNamerApp._configurator_params) and returns the steps the script
+would run, in order, each with the exact operation and resolved arguments.
+The GUI renders it live instead of launching PowerShell with -DryRun. The
+sections and their steps come from the settings catalog (settings_catalog.json).
+
+Each step's `description` is the text configure-windows.ps1 passes to
+Invoke-IfNotDry, so dryrun_lines(plan) matches the script's "DRYRUN: ..."
+output line for line; compare_with_dryrun() reports any drift between the
+two. Keep the catalog's step descriptions and the script in step when either
+changes.
+"""
+import os
+import re
+import subprocess
+from typing import NamedTuple
+
+import settings_catalog as _catalog
+
+_CATALOG = _catalog.catalog()
+
+# (Do* switch, section key, title) in the order the script's main block runs them
+SECTIONS = [(section.switch, section.id, section.title) for section in _CATALOG.sections]
+
+SCHEME_PLACEHOLDER = "<active-scheme>"
+_GUID_RE = re.compile(r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}")
+
+
+class PlanStep(NamedTuple):
+    id: str
+    section: str
+    description: str
+    kind: str
+    op: dict
+
+    def render(self) -> str:
+        """Return the operation as a single readable line."""
+        op = self.op
+        if self.kind == "command":
+            return subprocess.list2cmdline(op["argv"])
+        if self.kind == "registry-key":
+            return f"ensure key {op['key']}"
+        if self.kind == "registry":
+            value = op["value"]
+            shown = f"0x{value:06X}" if op.get("hex") else str(value)
+            return f"{op['key']}\\{op['name']} = {shown} ({op['type']})"
+        if self.kind == "service":
+            return f"{op['action']} service {op['name']}"
+        if self.kind == "module":
+            return f"{op['action']} module {op['name']}"
+        if self.kind == "wallpaper":
+            return f"SystemParametersInfo(SPI_SETDESKWALLPAPER, {op['path']})"
+        if self.kind == "open-ui":
+            return f"open {op['target']}"
+        return self.description
+
+
+def parse_active_scheme(output: str):
+    """Pull the scheme GUID out of `powercfg -getactivescheme` output."""
+    m = _GUID_RE.search(output or "")
+    return m.group(0).lower() if m else None
+
+
+def resolve_active_scheme(timeout=5):
+    """Ask powercfg for the active scheme GUID; None off Windows or on failure."""
+    if os.name != "nt":
+        return None
+    try:
+        out = subprocess.run(["powercfg", "-getactivescheme"], capture_output=True, text=True,
+                             timeout=timeout, creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0)).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return parse_active_scheme(out)
+
+
+def sample_background() -> str:
+    return os.path.join(os.environ.get("USERPROFILE", os.path.expanduser("~")), "Pictures", "CC Background with support info.jpg")
+
+
+def selected_sections(params: dict):
+    """Return the section keys the script will run for `params` (all of them when no Do* switch is set)."""
+    chosen = [key for switch, key, _ in SECTIONS if params.get(switch)]
+    return chosen or [key for _, key, _ in SECTIONS]
+
+
+class _PlanValues(dict):
+    """Parameters plus the plan-time values step templates and conditions can name."""
+    def __init__(self, params, scheme, exists, pswindowsupdate_installed):
+        super().__init__(params)
+        self["scheme"] = scheme
+        self["pswindowsupdate_installed"] = pswindowsupdate_installed
+        self._exists = exists
+
+    def __missing__(self, key):
+        if key == "wallpaper":
+            # only resolved (and the share touched) when a selected step asks for it
+            background = self.get("BackgroundPath")
+            if background and self._exists(background):
+                self[key] = background
+            elif self._exists(sample_background()):
+                self[key] = sample_background()
+            else:
+                self[key] = None
+            return self[key]
+        return ""
+
+
+def build_plan(params: dict, scheme=None, exists=os.path.exists, pswindowsupdate_installed=False):
+    """Return the ordered PlanStep list configure-windows.ps1 would run for `params`."""
+    values = _PlanValues(params, scheme or SCHEME_PLACEHOLDER, exists, pswindowsupdate_installed)
+    steps = []
+    for section in selected_sections(params):
+        for t in _CATALOG.steps.get(section, ()):
+            if t.if_ is not None and not _catalog.truthy(values[t.if_]):
+                continue
+            if t.unless is not None and _catalog.truthy(values[t.unless]):
+                continue
+            if t.templated:
+                description = t.description.format_map(values)
+                op = _catalog.map_strings(t.op, lambda text: text.format_map(values))
+            else:
+                description, op = t.description, dict(t.op)
+            steps.append(PlanStep(f"{section}.{t.id}", section, description, t.kind, op))
+    return steps
+
+
+# step kinds the native writers (registry_ops, native_ops) apply before the script runs
+NATIVE_KINDS = ("registry-key", "registry", "wallpaper")
+_SCRIPT_ID_RE = re.compile(r"-Id\s+'([^']+)'")
+
+
+def script_step_ids(script) -> frozenset:
+    """Step ids configure-windows.ps1 has code for (the -Id of each Invoke-IfNotDry)."""
+    with open(script, encoding="utf-8-sig") as fh:
+        return frozenset(_SCRIPT_ID_RE.findall(fh.read()))
+
+
+def catalog_only_unapplied(plan, done, script_ids):
+    """Native steps not in `done` that the script has no code for, so nothing will retry them."""
+    return [s.id for s in plan if s.kind in NATIVE_KINDS and s.id not in done and s.id not in script_ids]
+
+
+def render_plan(plan) -> str:
+    """Format the plan for the preview pane, one operation per line grouped by section."""
+    titles = {key: title for _, key, title in SECTIONS}
+    lines = []
+    section = None
+    for step in plan:
+        if step.section != section:
+            section = step.section
+            if lines:
+                lines.append("")
+            lines.append(f"[{titles.get(section, section)}]")
+        lines.append(f"  {step.render()}")
+    return "\n".join(lines)
+
+
+def dryrun_lines(plan):
+    return [f"DRYRUN: {step.description}" for step in plan]
+
+
+def parse_dryrun_output(text: str):
+    """Return the DRYRUN: lines from captured `configure-windows.ps1 -DryRun` output."""
+    return [line.strip() for line in text.splitlines() if line.strip().startswith("DRYRUN: ")]
+
+
+def compare_with_dryrun(plan, text: str):
+    """Return a unified diff between the plan and captured -DryRun output (empty when they agree)."""
+    import difflib
+    return list(difflib.unified_diff(parse_dryrun_output(text), dryrun_lines(plan),
+                                     "configure-windows.ps1 -DryRun", "configurator_plan", lineterm=""))
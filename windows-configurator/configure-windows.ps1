@@ -19,9 +19,16 @@ param(
     [switch]$DoNotifications,
     [switch]$DoWindowsUpdate,
     [switch]$DoPersonalization,
-    [switch]$DoPowerButtonActions
+    [switch]$DoPowerButtonActions,
+    # Step ids (see Invoke-IfNotDry -Id) already in the desired state; the GUI fills this from its state probe
+    [string[]]$SkipSteps = @(),
+    # Also print one '@@event {json}' line per step and section (timings for the GUI)
+    [switch]$StepEvents
 )
 
+# -File passes "a,b,c" as one string; accept both that and a real array
+$SkipSteps = @($SkipSteps | ForEach-Object { $_ -split ',' } | Where-Object { $_ })
+
 function Ensure-Admin {
     $isAdmin = ([Security.Principal.WindowsPrincipal] [Security.Principal.WindowsIdentity]::GetCurrent()).IsInRole([Security.Principal.WindowsBuiltInRole]::Administrator)
     if (-not $isAdmin) {
@@ -37,31 +44,108 @@ function Ensure-Admin {
     }
 }
 
+# With -StepEvents, report a step or section as one machine-readable line:
+#   @@event {"type":"step","id":"power.disk_ac","section":"power","start":...,"end":...,"duration_ms":...,"status":"ok","exit_code":0,"error":null}
+# status is ok, failed, skipped or dryrun; start/end are UTC ISO 8601 timestamps.
+function Write-StepEvent {
+    param(
+        [string]$Type,
+        [string]$Id,
+        [string]$Description,
+        [datetime]$Start,
+        [string]$Status,
+        $ExitCode = $null,
+        [string]$ErrorText = $null
+    )
+    if (-not $StepEvents) { return }
+    $end = [datetime]::UtcNow
+    $record = [ordered]@{
+        type = $Type
+        id = $Id
+        section = ($Id -split '\.')[0]
+        description = $Description
+        start = $Start.ToString('o')
+        end = $end.ToString('o')
+        duration_ms = [math]::Round(($end - $Start).TotalMilliseconds, 1)
+        status = $Status
+        exit_code = $ExitCode
+        error = $ErrorText
+    }
+    Write-Host ('@@event ' + ($record | ConvertTo-Json -Compress))
+}
+
 # Helper to either perform an action or, when -DryRun, just print the intended action.
+# Steps listed in -SkipSteps are already in the desired state and are not run again.
 function Invoke-IfNotDry {
     param(
         [string]$Description,
-        [scriptblock]$Action
+        [scriptblock]$Action,
+        [string]$Id
     )
-    if ($DryRun) {
+    $start = [datetime]::UtcNow
+    if ($Id -and $SkipSteps -contains $Id) {
+        Write-Host "SKIP: $Description (already set)"
+        Write-StepEvent -Type step -Id $Id -Description $Description -Start $start -Status skipped
+    } elseif ($DryRun) {
         Write-Host "DRYRUN: $Description"
+        Write-StepEvent -Type step -Id $Id -Description $Description -Start $start -Status dryrun
     } else {
+        $global:LASTEXITCODE = 0
+        # $Error is capped at $MaximumErrorCount and lives on in the persistent worker,
+        # so a count taken before the action stops moving once it is full
+        $Error.Clear()
+        try {
+            & $Action
+        } catch {
+            $script:FailedSteps++
+            Write-StepEvent -Type step -Id $Id -Description $Description -Start $start -Status failed -ExitCode $LASTEXITCODE -ErrorText $_.Exception.Message
+            throw
+        }
+        # native tools report through the exit code; cmdlets through non-terminating errors
+        $errorText = $null
+        if ($Error.Count -gt 0) { $errorText = "$($Error[0])" }
+        $status = if ($LASTEXITCODE -ne 0 -or $errorText) { 'failed' } else { 'ok' }
+        if ($status -eq 'failed') { $script:FailedSteps++ }
+        Write-StepEvent -Type step -Id $Id -Description $Description -Start $start -Status $status -ExitCode $LASTEXITCODE -ErrorText $errorText
+    }
+}
+
+# Run one Apply-* section and report its total time (and failure) as a section event.
+# A section whose steps failed without throwing is reported as failed too.
+$script:FailedSteps = 0
+function Invoke-Section {
+    param(
+        [string]$Id,
+        [scriptblock]$Action
+    )
+    $start = [datetime]::UtcNow
+    $failedBefore = $script:FailedSteps
+    try {
         & $Action
+    } catch {
+        Write-StepEvent -Type section -Id $Id -Description $Id -Start $start -Status failed -ErrorText $_.Exception.Message
+        throw
+    }
+    $failed = $script:FailedSteps - $failedBefore
+    if ($failed -gt 0) {
+        Write-StepEvent -Type section -Id $Id -Description $Id -Start $start -Status failed -ErrorText "$failed step(s) failed"
+    } else {
+        Write-StepEvent -Type section -Id $Id -Description $Id -Start $start -Status ok
     }
 }
 
 function Apply-PowerSettings {
     Write-Host "Applying power settings (set timeouts to NEVER)..."
     # Set disk, display and sleep timeouts to 0 (never) for AC and DC
-    Invoke-IfNotDry "Set disk timeout AC to 0" { powercfg -change -disk-timeout-ac 0 }
-    Invoke-IfNotDry "Set disk timeout DC to 0" { powercfg -change -disk-timeout-dc 0 }
-    Invoke-IfNotDry "Set monitor timeout AC to 0" { powercfg -change -monitor-timeout-ac 0 }
-    Invoke-IfNotDry "Set monitor timeout DC to 0" { powercfg -change -monitor-timeout-dc 0 }
-    Invoke-IfNotDry "Set standby timeout AC to 0" { powercfg -change -standby-timeout-ac 0 }
-    Invoke-IfNotDry "Set standby timeout DC to 0" { powercfg -change -standby-timeout-dc 0 }
+    Invoke-IfNotDry "Set disk timeout AC to 0" { powercfg -change -disk-timeout-ac 0 } -Id 'power.disk_ac'
+    Invoke-IfNotDry "Set disk timeout DC to 0" { powercfg -change -disk-timeout-dc 0 } -Id 'power.disk_dc'
+    Invoke-IfNotDry "Set monitor timeout AC to 0" { powercfg -change -monitor-timeout-ac 0 } -Id 'power.monitor_ac'
+    Invoke-IfNotDry "Set monitor timeout DC to 0" { powercfg -change -monitor-timeout-dc 0 } -Id 'power.monitor_dc'
+    Invoke-IfNotDry "Set standby timeout AC to 0" { powercfg -change -standby-timeout-ac 0 } -Id 'power.standby_ac'
+    Invoke-IfNotDry "Set standby timeout DC to 0" { powercfg -change -standby-timeout-dc 0 } -Id 'power.standby_dc'
 
     Write-Host "Note: Power button / Sleep button actions are not changed automatically by this script because those settings can be platform/version-specific and involve GUID mappings; you'll be taken to the Power Options control panel to set them manually." 
-    Invoke-IfNotDry "Open Power Options control panel" { Start-Process -FilePath "powercfg.cpl" }
+    Invoke-IfNotDry "Open Power Options control panel" { Start-Process -FilePath "powercfg.cpl" } -Id 'power.open_ui'
 }
 
 function Apply-PowerButtonActions {
@@ -69,7 +153,12 @@ function Apply-PowerButtonActions {
     # These settings are stored per power scheme using powercfg -setacvalueindex / -setdcvalueindex
     # We attempt to set the behaviors if the values are available; otherwise open Power Options.
     try {
-        $scheme = (powercfg -getactivescheme) -replace '.*:\s*',''
+        # "Power Scheme GUID: 381b4222-... (Balanced)" -> keep only the GUID
+        if ("$(powercfg -getactivescheme)" -match '[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}') {
+            $scheme = $Matches[0].ToLower()
+        } else {
+            throw "Could not determine the active power scheme"
+        }
         Write-Host "Active power scheme: $scheme"
         # GUID subgroups and setting GUIDs for power buttons/lid
         $subgroup = '4f971e89-eebd-4455-a8de-9e59040e7347' # System button subgroup GUID (best-effort)
@@ -79,24 +168,24 @@ function Apply-PowerButtonActions {
 
         if ($PowerButtonDoNothing) {
             Write-Host "Attempting to set Power button action to 'Do nothing' (value 0) for AC and DC"
-            Invoke-IfNotDry "powercfg -setacvalueindex $scheme $subgroup $btnPower 0" { powercfg -setacvalueindex $scheme $subgroup $btnPower 0 }
-            Invoke-IfNotDry "powercfg -setdcvalueindex $scheme $subgroup $btnPower 0" { powercfg -setdcvalueindex $scheme $subgroup $btnPower 0 }
+            Invoke-IfNotDry "powercfg -setacvalueindex $scheme $subgroup $btnPower 0" { powercfg -setacvalueindex $scheme $subgroup $btnPower 0 } -Id 'powerbuttons.power_ac'
+            Invoke-IfNotDry "powercfg -setdcvalueindex $scheme $subgroup $btnPower 0" { powercfg -setdcvalueindex $scheme $subgroup $btnPower 0 } -Id 'powerbuttons.power_dc'
         }
         if ($SleepButtonDoNothing) {
             Write-Host "Attempting to set Sleep button action to 'Do nothing' (value 0) for AC and DC"
-            Invoke-IfNotDry "powercfg -setacvalueindex $scheme $subgroup $btnSleep 0" { powercfg -setacvalueindex $scheme $subgroup $btnSleep 0 }
-            Invoke-IfNotDry "powercfg -setdcvalueindex $scheme $subgroup $btnSleep 0" { powercfg -setdcvalueindex $scheme $subgroup $btnSleep 0 }
+            Invoke-IfNotDry "powercfg -setacvalueindex $scheme $subgroup $btnSleep 0" { powercfg -setacvalueindex $scheme $subgroup $btnSleep 0 } -Id 'powerbuttons.sleep_ac'
+            Invoke-IfNotDry "powercfg -setdcvalueindex $scheme $subgroup $btnSleep 0" { powercfg -setdcvalueindex $scheme $subgroup $btnSleep 0 } -Id 'powerbuttons.sleep_dc'
         }
         if ($LidCloseDoNothing) {
             Write-Host "Attempting to set Lid close action to 'Do nothing' (value 0) for AC and DC"
-            Invoke-IfNotDry "powercfg -setacvalueindex $scheme $subgroup $lid 0" { powercfg -setacvalueindex $scheme $subgroup $lid 0 }
-            Invoke-IfNotDry "powercfg -setdcvalueindex $scheme $subgroup $lid 0" { powercfg -setdcvalueindex $scheme $subgroup $lid 0 }
+            Invoke-IfNotDry "powercfg -setacvalueindex $scheme $subgroup $lid 0" { powercfg -setacvalueindex $scheme $subgroup $lid 0 } -Id 'powerbuttons.lid_ac'
+            Invoke-IfNotDry "powercfg -setdcvalueindex $scheme $subgroup $lid 0" { powercfg -setdcvalueindex $scheme $subgroup $lid 0 } -Id 'powerbuttons.lid_dc'
         }
 
         # Activate the scheme to ensure changes take effect
-        Invoke-IfNotDry "powercfg -setactive $scheme" { powercfg -setactive $scheme }
+        Invoke-IfNotDry "powercfg -setactive $scheme" { powercfg -setactive $scheme } -Id 'powerbuttons.setactive'
         Write-Host "Applied button/lid actions where supported; opening Power Options for manual review if anything failed."
-        Invoke-IfNotDry "Open Power Options control panel" { Start-Process -FilePath "powercfg.cpl" }
+        Invoke-IfNotDry "Open Power Options control panel" { Start-Process -FilePath "powercfg.cpl" } -Id 'powerbuttons.open_ui'
     } catch {
         Write-Warning "Could not programmatically update button/lid actions on this platform: $_"
         Start-Process -FilePath "powercfg.cpl"
@@ -108,8 +197,8 @@ function Apply-TaskbarSettings {
 
     # Center alignment: TaskbarAl = 1 (0 = left, 1 = center) - safe on recent Windows 11 builds
     try {
-        Invoke-IfNotDry "Create/ensure Explorer\Advanced registry key" { New-Item -Path HKCU:\Software\Microsoft\Windows\CurrentVersion\Explorer\Advanced -Force | Out-Null }
-        Invoke-IfNotDry "Set TaskbarAl to 1" { Set-ItemProperty -Path HKCU:\Software\Microsoft\Windows\CurrentVersion\Explorer\Advanced -Name TaskbarAl -Value 1 -Type DWord }
+        Invoke-IfNotDry "Create/ensure Explorer\Advanced registry key" { New-Item -Path HKCU:\Software\Microsoft\Windows\CurrentVersion\Explorer\Advanced -Force | Out-Null } -Id 'taskbar.advanced_key'
+        Invoke-IfNotDry "Set TaskbarAl to 1" { Set-ItemProperty -Path HKCU:\Software\Microsoft\Windows\CurrentVersion\Explorer\Advanced -Name TaskbarAl -Value 1 -Type DWord } -Id 'taskbar.alignment'
         Write-Host "Set taskbar alignment to center (TaskbarAl = 1)"
     } catch {
         Write-Warning "Failed to set TaskbarAl: $_"
@@ -117,7 +206,7 @@ function Apply-TaskbarSettings {
 
     # Taskbar size: TaskbarSi (0 small, 1 default, 2 large). 'When taskbar is full' behaviour can't be forced reliably; we set default.
     try {
-        Invoke-IfNotDry "Set TaskbarSi to 1" { Set-ItemProperty -Path HKCU:\Software\Microsoft\Windows\CurrentVersion\Explorer\Advanced -Name TaskbarSi -Value 1 -Type DWord }
+        Invoke-IfNotDry "Set TaskbarSi to 1" { Set-ItemProperty -Path HKCU:\Software\Microsoft\Windows\CurrentVersion\Explorer\Advanced -Name TaskbarSi -Value 1 -Type DWord } -Id 'taskbar.size'
         Write-Host "Set Taskbar size to default (TaskbarSi = 1)"
     } catch {
         Write-Warning "Failed to set TaskbarSi: $_"
@@ -125,23 +214,24 @@ function Apply-TaskbarSettings {
 
     # Many Windows 11 taskbar features (Search mode, Widgets toggle, Task view pinning, combine labels) are controlled by explorer shell components
     # and by REST/COM calls; they are not reliably scriptable across builds. We'll open Taskbar settings for final manual verification.
-    Invoke-IfNotDry "Open Taskbar settings UI" { Start-Process "ms-settings:taskbar" }
+    Invoke-IfNotDry "Open Taskbar settings UI" { Start-Process "ms-settings:taskbar" } -Id 'taskbar.open_ui'
     Write-Host "Opened Taskbar settings UI; please verify the following manually if not already set: Search icon only; Task view ON; Widgets OFF; Safely Remove icon ON; taskbar behaviors as requested."
 }
 
 function Apply-DateTime {
-    if ($PSBoundParameters.ContainsKey('TimeZoneId') -and $TimeZoneId) {
+    # Script-level parameter; $PSBoundParameters inside this function only sees the function's own (none)
+    if ($TimeZoneId) {
         Write-Host "Setting time zone to: $TimeZoneId"
-    Invoke-IfNotDry "tzutil /s $TimeZoneId" { tzutil /s "$TimeZoneId" }
+        Invoke-IfNotDry "tzutil /s $TimeZoneId" { tzutil /s "$TimeZoneId" } -Id 'datetime.timezone'
     } else {
         Write-Host "No TimeZoneId provided. To set explicitly, run: .\configure-windows.ps1 -TimeZoneId 'Pacific Standard Time'"
         Write-Host "Opening Date & time settings for manual timezone selection..."
-        Start-Process "ms-settings:dateandtime"
+        Invoke-IfNotDry "Open Date & time settings UI" { Start-Process "ms-settings:dateandtime" } -Id 'datetime.open_ui'
     }
 
     Write-Host "Syncing time now..."
     try {
-        Invoke-IfNotDry "w32tm /resync" { w32tm /resync | Out-Null }
+        Invoke-IfNotDry "w32tm /resync" { w32tm /resync | Out-Null } -Id 'datetime.resync'
         Write-Host "Time sync requested (w32tm /resync)"
     } catch {
         Write-Warning "Time sync failed or requires network/service: $_"
@@ -155,8 +245,8 @@ function Apply-NotificationsAndFocusAssist {
     # This key exists on many systems but may not be present on all builds; the change here affects toast popups.
     try {
         $path = 'HKCU:\Software\Microsoft\Windows\CurrentVersion\PushNotifications'
-        Invoke-IfNotDry "Create/ensure PushNotifications key" { New-Item -Path $path -Force | Out-Null }
-        Invoke-IfNotDry "Set ToastEnabled = 0" { New-ItemProperty -Path $path -Name 'ToastEnabled' -Value 0 -PropertyType DWord -Force | Out-Null }
+        Invoke-IfNotDry "Create/ensure PushNotifications key" { New-Item -Path $path -Force | Out-Null } -Id 'notifications.push_key'
+        Invoke-IfNotDry "Set ToastEnabled = 0" { New-ItemProperty -Path $path -Name 'ToastEnabled' -Value 0 -PropertyType DWord -Force | Out-Null } -Id 'notifications.toasts'
         Write-Host "Set PushNotifications\ToastEnabled = 0 (attempted)"
     } catch {
         Write-Warning "Could not set PushNotifications keys: $_"
@@ -165,15 +255,15 @@ function Apply-NotificationsAndFocusAssist {
     # Focus Assist: use registry for 'QuietHours' (Focus Assist) default - this is informational and may not fully emulate UI toggles across builds
     try {
         $faPath = 'HKCU:\Software\Policies\Microsoft\Windows\Explorer'
-        Invoke-IfNotDry "Create/ensure Focus Assist policy key" { New-Item -Path $faPath -Force | Out-Null }
-        Invoke-IfNotDry "Set QuietHours = 1" { New-ItemProperty -Path $faPath -Name 'QuietHours' -Value 1 -PropertyType DWord -Force | Out-Null }
+        Invoke-IfNotDry "Create/ensure Focus Assist policy key" { New-Item -Path $faPath -Force | Out-Null } -Id 'notifications.policy_key'
+        Invoke-IfNotDry "Set QuietHours = 1" { New-ItemProperty -Path $faPath -Name 'QuietHours' -Value 1 -PropertyType DWord -Force | Out-Null } -Id 'notifications.quiet_hours'
         Write-Host "Attempted to set Focus Assist (QuietHours) policy to ON"
     } catch {
         Write-Warning "Could not set Focus Assist policy via registry: $_"
     }
 
     Write-Host "Opened Notifications & actions settings for manual confirmation..."
-    Invoke-IfNotDry "Open Notifications settings UI" { Start-Process "ms-settings:notifications" }
+    Invoke-IfNotDry "Open Notifications settings UI" { Start-Process "ms-settings:notifications" } -Id 'notifications.open_ui'
 }
 
 function Apply-WindowsUpdate {
@@ -182,23 +272,23 @@ function Apply-WindowsUpdate {
         # Try to install and import PSWindowsUpdate if available
         if (-not (Get-Module -ListAvailable -Name PSWindowsUpdate)) {
             Write-Host "Installing PSWindowsUpdate module (may prompt for PSGallery trust)..."
-            Invoke-IfNotDry "Install PSWindowsUpdate module" { Install-Module -Name PSWindowsUpdate -Force -Confirm:$false -Scope AllUsers -AllowClobber }
+            Invoke-IfNotDry "Install PSWindowsUpdate module" { Install-Module -Name PSWindowsUpdate -Force -Confirm:$false -Scope AllUsers -AllowClobber } -Id 'windowsupdate.install_module'
         }
-        Invoke-IfNotDry "Import PSWindowsUpdate module" { Import-Module PSWindowsUpdate -ErrorAction Stop }
+        Invoke-IfNotDry "Import PSWindowsUpdate module" { Import-Module PSWindowsUpdate -ErrorAction Stop } -Id 'windowsupdate.import_module'
 
         Write-Host "Checking for updates and installing (this may take a while)..."
-        Invoke-IfNotDry "Run Get-WindowsUpdate -AcceptAll -Install -AutoReboot" { Get-WindowsUpdate -AcceptAll -Install -AutoReboot | Out-Null }
+        Invoke-IfNotDry "Run Get-WindowsUpdate -AcceptAll -Install -AutoReboot" { Get-WindowsUpdate -AcceptAll -Install -AutoReboot | Out-Null } -Id 'windowsupdate.run'
         Write-Host "Windows Update run requested via PSWindowsUpdate"
     } catch {
         Write-Warning "PSWindowsUpdate approach failed or not available: $_"
         Write-Host "As a fallback, opening Windows Update settings UI..."
-        Invoke-IfNotDry "Open Windows Update settings UI" { Start-Process "ms-settings:windowsupdate" }
+        Invoke-IfNotDry "Open Windows Update settings UI" { Start-Process "ms-settings:windowsupdate" } -Id 'windowsupdate.open_ui'
     }
 
     Write-Host "Stopping Windows Update service (wuauserv) to prevent immediate updates..."
     try {
-        Invoke-IfNotDry "Stop-Service wuauserv" { Stop-Service -Name wuauserv -Force -ErrorAction Stop }
-        Invoke-IfNotDry "Set-Service wuauserv Disabled" { Set-Service -Name wuauserv -StartupType Disabled }
+        Invoke-IfNotDry "Stop-Service wuauserv" { Stop-Service -Name wuauserv -Force -ErrorAction Stop } -Id 'windowsupdate.stop_service'
+        Invoke-IfNotDry "Set-Service wuauserv Disabled" { Set-Service -Name wuauserv -StartupType Disabled } -Id 'windowsupdate.disable_service'
         Write-Host "Windows Update service stopped and disabled (wuauserv)."
     } catch {
         Write-Warning "Failed to stop or disable wuauserv: $_"
@@ -210,9 +300,9 @@ function Apply-Personalization {
 
     # Set dark theme (Apps and System)
     try {
-        Invoke-IfNotDry "Ensure Themes\Personalize key" { New-Item -Path HKCU:\Software\Microsoft\Windows\CurrentVersion\Themes\Personalize -Force | Out-Null }
-        Invoke-IfNotDry "Set AppsUseLightTheme = 0" { Set-ItemProperty -Path HKCU:\Software\Microsoft\Windows\CurrentVersion\Themes\Personalize -Name 'AppsUseLightTheme' -Value 0 -Type DWord }
-        Invoke-IfNotDry "Set SystemUsesLightTheme = 0" { Set-ItemProperty -Path HKCU:\Software\Microsoft\Windows\CurrentVersion\Themes\Personalize -Name 'SystemUsesLightTheme' -Value 0 -Type DWord }
+        Invoke-IfNotDry "Ensure Themes\Personalize key" { New-Item -Path HKCU:\Software\Microsoft\Windows\CurrentVersion\Themes\Personalize -Force | Out-Null } -Id 'personalization.personalize_key'
+        Invoke-IfNotDry "Set AppsUseLightTheme = 0" { Set-ItemProperty -Path HKCU:\Software\Microsoft\Windows\CurrentVersion\Themes\Personalize -Name 'AppsUseLightTheme' -Value 0 -Type DWord } -Id 'personalization.apps_dark'
+        Invoke-IfNotDry "Set SystemUsesLightTheme = 0" { Set-ItemProperty -Path HKCU:\Software\Microsoft\Windows\CurrentVersion\Themes\Personalize -Name 'SystemUsesLightTheme' -Value 0 -Type DWord } -Id 'personalization.system_dark'
         Write-Host "Set system and apps to dark theme (0)"
     } catch {
         Write-Warning "Failed to set theme keys: $_"
@@ -222,12 +312,12 @@ function Apply-Personalization {
     # #F18232 => RGB (241,130,50) => Hex 0x32 0x82 0xF1 (BGR) => 0x3282F1
     try {
         $accentBgr = 0x3282F1
-        Invoke-IfNotDry "Ensure Explorer\Accent key" { New-Item -Path HKCU:\Software\Microsoft\Windows\CurrentVersion\Explorer\Accent -Force | Out-Null }
-        Invoke-IfNotDry "Set AccentColor" { Set-ItemProperty -Path HKCU:\Software\Microsoft\Windows\CurrentVersion\Explorer\Accent -Name 'AccentColor' -Value $accentBgr -Type DWord -Force }
-        Invoke-IfNotDry "Set StartColor" { Set-ItemProperty -Path HKCU:\Software\Microsoft\Windows\CurrentVersion\Explorer\Accent -Name 'StartColor' -Value $accentBgr -Type DWord -Force }
+        Invoke-IfNotDry "Ensure Explorer\Accent key" { New-Item -Path HKCU:\Software\Microsoft\Windows\CurrentVersion\Explorer\Accent -Force | Out-Null } -Id 'personalization.accent_key'
+        Invoke-IfNotDry "Set AccentColor" { Set-ItemProperty -Path HKCU:\Software\Microsoft\Windows\CurrentVersion\Explorer\Accent -Name 'AccentColor' -Value $accentBgr -Type DWord -Force } -Id 'personalization.accent_color'
+        Invoke-IfNotDry "Set StartColor" { Set-ItemProperty -Path HKCU:\Software\Microsoft\Windows\CurrentVersion\Explorer\Accent -Name 'StartColor' -Value $accentBgr -Type DWord -Force } -Id 'personalization.start_color'
         # Also set the personalization colors
-        Invoke-IfNotDry "Ensure Themes key" { New-Item -Path HKCU:\Software\Microsoft\Windows\CurrentVersion\Themes -Force | Out-Null }
-        Invoke-IfNotDry "Set ColorPrevalence = 1" { Set-ItemProperty -Path HKCU:\Software\Microsoft\Windows\CurrentVersion\Themes -Name 'ColorPrevalence' -Value 1 -Type DWord -Force }
+        Invoke-IfNotDry "Ensure Themes key" { New-Item -Path HKCU:\Software\Microsoft\Windows\CurrentVersion\Themes -Force | Out-Null } -Id 'personalization.themes_key'
+        Invoke-IfNotDry "Set ColorPrevalence = 1" { Set-ItemProperty -Path HKCU:\Software\Microsoft\Windows\CurrentVersion\Themes -Name 'ColorPrevalence' -Value 1 -Type DWord -Force } -Id 'personalization.color_prevalence'
         Write-Host "Attempted to set Accent color to #F18232 (best-effort)."
     } catch {
         Write-Warning "Failed to set accent color: $_"
@@ -244,18 +334,24 @@ function Apply-Personalization {
 
     if ($usedBackground) {
         Write-Host "Setting background: $usedBackground"
-        Add-Type @"
+        Invoke-IfNotDry "Set desktop wallpaper to $usedBackground" {
+            # compiled only when the step really runs (the app usually sets the wallpaper natively and
+            # skips it), and once per worker process
+            if (-not ('Wallpaper' -as [type])) {
+                Add-Type @"
 using System.Runtime.InteropServices;
 public class Wallpaper {
     [DllImport("user32.dll",SetLastError=true)]
     public static extern bool SystemParametersInfo(int uAction, int uParam, string lpvParam, int fuWinIni);
 }
 "@
-        Invoke-IfNotDry "Set desktop wallpaper to $usedBackground" { [Wallpaper]::SystemParametersInfo(20, 0, $usedBackground, 3) | Out-Null }
+            }
+            [Wallpaper]::SystemParametersInfo(20, 0, $usedBackground, 3) | Out-Null
+        } -Id 'personalization.wallpaper'
         Write-Host "Background set to: $usedBackground"
     } else {
         Write-Host "No background image found or provided. Opening Background settings UI for manual selection."
-        Invoke-IfNotDry "Open Background settings UI" { Start-Process "ms-settings:personalization-background" }
+        Invoke-IfNotDry "Open Background settings UI" { Start-Process "ms-settings:personalization-background" } -Id 'personalization.open_ui'
     }
 }
 
@@ -285,21 +381,21 @@ $doFlags = @($DoPowerSettings, $DoTaskbar, $DoDateTime, $DoNotifications, $DoWin
 if ($doFlags.Count -eq 0) {
     # Run everything
     Write-Host "No selective flags provided; running all configurator actions."
-    Apply-PowerSettings
-    Apply-TaskbarSettings
-    Apply-DateTime
-    Apply-NotificationsAndFocusAssist
-    Apply-WindowsUpdate
-    Apply-Personalization
-    Apply-PowerButtonActions
+    Invoke-Section power { Apply-PowerSettings }
+    Invoke-Section taskbar { Apply-TaskbarSettings }
+    Invoke-Section datetime { Apply-DateTime }
+    Invoke-Section notifications { Apply-NotificationsAndFocusAssist }
+    Invoke-Section windowsupdate { Apply-WindowsUpdate }
+    Invoke-Section personalization { Apply-Personalization }
+    Invoke-Section powerbuttons { Apply-PowerButtonActions }
 } else {
-    if ($DoPowerSettings) { Apply-PowerSettings }
-    if ($DoTaskbar) { Apply-TaskbarSettings }
-    if ($DoDateTime) { Apply-DateTime }
-    if ($DoNotifications) { Apply-NotificationsAndFocusAssist }
-    if ($DoWindowsUpdate) { Apply-WindowsUpdate }
-    if ($DoPersonalization) { Apply-Personalization }
-    if ($DoPowerButtonActions) { Apply-PowerButtonActions }
+    if ($DoPowerSettings) { Invoke-Section power { Apply-PowerSettings } }
+    if ($DoTaskbar) { Invoke-Section taskbar { Apply-TaskbarSettings } }
+    if ($DoDateTime) { Invoke-Section datetime { Apply-DateTime } }
+    if ($DoNotifications) { Invoke-Section notifications { Apply-NotificationsAndFocusAssist } }
+    if ($DoWindowsUpdate) { Invoke-Section windowsupdate { Apply-WindowsUpdate } }
+    if ($DoPersonalization) { Invoke-Section personalization { Apply-Personalization } }
+    if ($DoPowerButtonActions) { Invoke-Section powerbuttons { Apply-PowerButtonActions } }
 }
 
 Summary
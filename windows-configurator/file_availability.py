@@ -0,0 +1,134 @@
+"""Non-blocking, time-bounded checks of whether a file is reachable.
+
+`os.path.exists` on the Google Drive H: mount can hang for many seconds while
+the share is offline or still syncing, so the GUI never calls it on the UI
+thread. FileAvailability runs each check on its own daemon thread, gives up
+waiting after `timeout` (the abandoned thread finishes whenever the OS lets
+it), and caches the answer: positive results for `ttl` seconds, negative
+ones and timeouts for `negative_ttl`.
+
+exists(path) never blocks. It returns the last known answer (True / False),
+or None while a path has never been checked, and starts a fresh check when
+the cached one is stale. Every change of a path's state is put on `changes`
+for the GUI to drain from an after() callback.
+
+States: "available", "missing", "timeout" (treated as unavailable), "checking".
+"""
+import os
+import queue
+import threading
+import time
+from typing import NamedTuple
+
+import profiling
+
+AVAILABLE = "available"
+MISSING = "missing"
+TIMEOUT = "timeout"
+CHECKING = "checking"
+
+
+class Availability(NamedTuple):
+    path: str
+    state: str
+    checked: float
+
+    @property
+    def exists(self):
+        """True / False once known; None while the first check is still running."""
+        if self.state == AVAILABLE:
+            return True
+        if self.state in (MISSING, TIMEOUT):
+            return False
+        return None
+
+
+class FileAvailability:
+    def __init__(self, timeout=2.0, ttl=30.0, negative_ttl=10.0, probe=os.path.exists, clock=time.monotonic):
+        self.timeout = timeout
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.changes = queue.Queue()
+        self._probe = probe
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._status = {}
+        self._inflight = {}
+
+    def status(self, path):
+        """Cached Availability for `path` (None if never checked); refreshes it in the background when stale."""
+        if not path:
+            return None
+        with self._lock:
+            current = self._status.get(path)
+            stale = current is None or current.state != CHECKING and self._clock() - current.checked > (
+                self.ttl if current.state == AVAILABLE else self.negative_ttl)
+        if stale:
+            self.check(path)
+        return current
+
+    def exists(self, path):
+        current = self.status(path)
+        return None if current is None else current.exists
+
+    def check(self, path):
+        """Start a check of `path` unless one is already running."""
+        with self._lock:
+            if path in self._inflight:
+                return
+            token = object()
+            self._inflight[path] = token
+            if path not in self._status:
+                self._set(path, CHECKING)
+        threading.Thread(target=self._run, args=(path, token), daemon=True).start()
+        timer = threading.Timer(self.timeout, self._expire, args=(path, token))
+        timer.daemon = True
+        timer.start()
+
+    def _run(self, path, token):
+        try:
+            with profiling.span("file.exists", cat="io", path=path):
+                ok = bool(self._probe(path))
+        except Exception:
+            ok = False
+        with self._lock:
+            if self._inflight.get(path) is token:
+                del self._inflight[path]
+            # a late answer after a timeout still counts: the share came back
+            self._set(path, AVAILABLE if ok else MISSING)
+
+    def _expire(self, path, token):
+        with self._lock:
+            if self._inflight.get(path) is not token:
+                return
+            # keep the hung check registered so no second thread piles up on the same path
+            self._set(path, TIMEOUT)
+
+    def _set(self, path, state):
+        # caller holds the lock
+        previous = self._status.get(path)
+        self._status[path] = Availability(path, state, self._clock())
+        if previous is None or previous.state != state:
+            self.changes.put(self._status[path])
+
+    def wait(self, path, timeout=None):
+        """Blocking variant for non-GUI callers: True / False, or None if still unknown after `timeout`."""
+        deadline = self._clock() + (self.timeout if timeout is None else timeout)
+        self.status(path)
+        while True:
+            with self._lock:
+                current = self._status.get(path)
+                busy = path in self._inflight
+            if current is not None and current.state != CHECKING and (not busy or current.state == TIMEOUT):
+                return current.exists
+            if self._clock() >= deadline:
+                return None
+            time.sleep(0.02)
+
+    def invalidate(self, path=None):
+        """Forget cached results (all of them when `path` is None) so the next query re-checks."""
+        with self._lock:
+            if path is None:
+                self._status = {p: s for p, s in self._status.items() if s.state == CHECKING}
+            elif path in self._status and self._status[path].state != CHECKING:
+                del self._status[path]
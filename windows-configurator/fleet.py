@@ -0,0 +1,470 @@
+"""Fleet compliance: snapshot each machine's state, analyze the snapshots offline.
+
+    CCI_New_PC_Setup.exe --export-snapshot \\\\server\\share\\snapshots     (on each machine)
+    python fleet.py export --out \\\\server\\share\\snapshots
+    python fleet.py analyze \\\\server\\share\\snapshots [--json report.json]
+
+export reads every probeable setting of the full plan (every section and
+power button action in the catalog; see state_probe.py) in one batch and
+writes <MACHINE>-<UTC time>.snap.gz: gzip'd compact JSON with the machine
+name, the time, the app version and the raw probe values. The file is written
+under a temporary name and renamed, so an analyzer never sees half of one.
+
+Checks are judged at analysis time, from the plan's desired values: one per
+registry value, powercfg setting and service state (registry keys, the time
+zone and the wallpaper vary by machine and are not judged), plus
+name.convention (naming.parse_name). Each is pass, fail or unknown (not read).
+
+analyze keeps .fleet-index.bin in the snapshot folder: every snapshot already
+parsed, with its size and mtime and its row of results, stored as columns
+(file, machine, customer, time, and an int8 results matrix). A run stats the
+folder, drops the rows of deleted or changed files, parses only the new ones
+and rewrites the index; the index is rebuilt when the checks change (an edit
+to settings_catalog.json). With numpy the columns become numpy arrays and the
+statistics are vectorized; without it they are computed from the same
+columns in plain Python.
+
+The report covers the latest snapshot of each machine: the pass rate per
+check, fully compliant machines (every check read and passed), incomplete
+machines (nothing failed but some checks could not be read), a per-customer breakdown
+(customer from the name) and drift, meaning machines whose latest snapshot
+fails a check that an earlier snapshot of the same machine passed.
+"""
+import argparse
+import array
+import datetime
+import gzip
+import hashlib
+import importlib.util
+import json
+import marshal
+import os
+import socket
+import sys
+import time
+from typing import NamedTuple
+
+import app_version as _av
+import configurator_plan as _plan
+import naming as _naming
+import settings_catalog as _catalog
+import state_probe as _probe
+
+NUMPY_AVAILABLE = importlib.util.find_spec("numpy") is not None
+
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_SUFFIX = ".snap.gz"
+INDEX_NAME = ".fleet-index.bin"
+# bump when the index layout changes, so older indexes are rebuilt
+INDEX_FORMAT = 1
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+PASS, FAIL, UNKNOWN = 1, 0, -1
+# probe kinds with one expected value on every machine
+_JUDGED = ("registry", "powercfg", "service-status", "service-start")
+
+
+class Check(NamedTuple):
+    id: str
+    label: str
+    probe_key: object    # None for name.convention
+    desired: object
+
+
+def full_params():
+    """Script parameters selecting every section and power button action in the catalog."""
+    cat = _catalog.catalog()
+    params = {s.switch: True for s in cat.sections}
+    params.update({s.switch: True for s in cat.settings if s.switch})
+    return params
+
+
+def full_plan():
+    return _plan.build_plan(full_params(), exists=lambda path: False)
+
+
+def fleet_checks(plan=None):
+    """The checks every snapshot is judged on, in plan order."""
+    checks, seen = [], set()
+    for step in plan or full_plan():
+        probe = _probe.probe_for(step)
+        if probe is None or probe.kind not in _JUDGED or probe.key in seen:
+            continue
+        seen.add(probe.key)
+        checks.append(Check(step.id, step.description, probe.key, probe.desired))
+    checks.append(Check("name.convention", "Name follows Customer-TypeChar-Serial", None, True))
+    return checks
+
+
+def checks_digest(checks) -> str:
+    return hashlib.sha256(repr([(c.id, c.probe_key, c.desired) for c in checks]).encode()).hexdigest()[:16]
+
+
+def judge(checks, snapshot):
+    """One snapshot's results, a PASS / FAIL / UNKNOWN per check."""
+    state = snapshot.get("state") or {}
+    row = []
+    for check in checks:
+        if check.probe_key is None:
+            row.append(PASS if _naming.parse_name(snapshot.get("machine")) else FAIL)
+            continue
+        value = state.get(check.probe_key)
+        row.append(UNKNOWN if value is None else PASS if value == check.desired else FAIL)
+    return row
+
+
+# --- export --------------------------------------------------------------------
+
+def machine_name() -> str:
+    return os.environ.get("COMPUTERNAME") or socket.gethostname().split(".")[0]
+
+
+def take_snapshot(backend, machine=None, plan=None):
+    """Read the full plan's probes through `backend` (see state_probe.py) into a snapshot dict."""
+    probes = {}
+    for step in plan or full_plan():
+        probe = _probe.probe_for(step)
+        if probe is not None:
+            probes[probe.key] = probe
+    return {
+        "v": SNAPSHOT_FORMAT,
+        "machine": machine or machine_name(),
+        "taken": datetime.datetime.now(datetime.timezone.utc).strftime(TIME_FORMAT),
+        "app": _av.read_version(),
+        "state": backend.read(list(probes.values())),
+    }
+
+
+def write_snapshot(snapshot, out_dir) -> str:
+    os.makedirs(out_dir, exist_ok=True)
+    stamp = snapshot["taken"].replace("-", "").replace(":", "")
+    path = os.path.join(out_dir, f"{snapshot['machine']}-{stamp}{SNAPSHOT_SUFFIX}")
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with gzip.open(tmp, "wb") as fh:
+        fh.write(json.dumps(snapshot, separators=(",", ":")).encode("utf-8"))
+    os.replace(tmp, path)
+    return path
+
+
+def read_snapshot(path):
+    with gzip.open(path, "rb") as fh:
+        return json.loads(fh.read())
+
+
+# --- index ---------------------------------------------------------------------
+
+class FleetColumns:
+    """Parsed snapshots as columns; row i is one snapshot file."""
+    def __init__(self, checks):
+        self.checks = checks
+        self.files = []
+        self.stamps = []             # (size, mtime_ns) the row was parsed from
+        self.machines = []
+        self.customers = []
+        self.taken = array.array("d")
+        self.results = array.array("b")    # len(files) x len(checks), row-major
+
+    def __len__(self):
+        return len(self.files)
+
+    def append(self, name, stamp, snapshot):
+        machine = str(snapshot.get("machine") or "").upper()
+        parsed = _naming.parse_name(machine)
+        taken = datetime.datetime.strptime(snapshot["taken"], TIME_FORMAT).replace(tzinfo=datetime.timezone.utc)
+        row = judge(self.checks, snapshot)
+        self.files.append(name)
+        self.stamps.append(stamp)
+        self.machines.append(machine)
+        self.customers.append(parsed[0] if parsed and parsed[0] else "(none)")
+        self.taken.append(taken.timestamp())
+        self.results.extend(row)
+
+    def keep(self, rows):
+        """Keep only the given row numbers, in order."""
+        k = len(self.checks)
+        results = array.array("b")
+        for i in rows:
+            results.extend(self.results[i * k:(i + 1) * k])
+        self.files = [self.files[i] for i in rows]
+        self.stamps = [self.stamps[i] for i in rows]
+        self.machines = [self.machines[i] for i in rows]
+        self.customers = [self.customers[i] for i in rows]
+        self.taken = array.array("d", (self.taken[i] for i in rows))
+        self.results = results
+
+    def to_index(self):
+        return {
+            "format": INDEX_FORMAT,
+            "checks": checks_digest(self.checks),
+            "files": self.files,
+            "stamps": self.stamps,
+            "machines": self.machines,
+            "customers": self.customers,
+            "taken": self.taken.tobytes(),
+            "results": self.results.tobytes(),
+        }
+
+    @classmethod
+    def from_index(cls, data, checks):
+        """Columns from a loaded index, or empty ones when it was built for other checks."""
+        columns = cls(checks)
+        if not isinstance(data, dict) or data.get("format") != INDEX_FORMAT or data.get("checks") != checks_digest(checks):
+            return columns
+        columns.files = list(data["files"])
+        columns.stamps = [tuple(s) for s in data["stamps"]]
+        columns.machines = list(data["machines"])
+        columns.customers = list(data["customers"])
+        columns.taken.frombytes(data["taken"])
+        columns.results.frombytes(data["results"])
+        return columns
+
+
+class LoadStats(NamedTuple):
+    kept: int
+    parsed: int
+    dropped: int
+    errors: list
+    seconds: float
+
+
+def load_fleet(folder, checks=None, use_index=True):
+    """Columns for every snapshot in `folder`, parsing only what the index does not have.
+
+    Returns (columns, LoadStats). Unreadable snapshots are listed in errors and
+    left out of the index, so they are tried again next time.
+    """
+    started = time.perf_counter()
+    checks = checks or fleet_checks()
+    index_path = os.path.join(folder, INDEX_NAME)
+    columns = FleetColumns(checks)
+    if use_index:
+        try:
+            with open(index_path, "rb") as fh:
+                columns = FleetColumns.from_index(marshal.loads(fh.read()), checks)
+        except (OSError, EOFError, ValueError, TypeError, KeyError):
+            pass
+    present = {}
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.name.endswith(SNAPSHOT_SUFFIX) and entry.is_file():
+                st = entry.stat()
+                present[entry.name] = (st.st_size, st.st_mtime_ns)
+    before = len(columns)
+    rows = [i for i, name in enumerate(columns.files) if present.get(name) == columns.stamps[i]]
+    if len(rows) != before:
+        columns.keep(rows)
+    indexed = set(columns.files)
+    errors = []
+    parsed = 0
+    for name in sorted(n for n in present if n not in indexed):
+        try:
+            columns.append(name, present[name], read_snapshot(os.path.join(folder, name)))
+        except (OSError, EOFError, ValueError, KeyError, TypeError) as e:
+            errors.append(f"{name}: {e}")
+            continue
+        parsed += 1
+    if use_index and (parsed or len(rows) != before):
+        tmp = f"{index_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "wb") as fh:
+                fh.write(marshal.dumps(columns.to_index()))
+            os.replace(tmp, index_path)
+        except OSError as e:
+            errors.append(f"{INDEX_NAME}: not saved: {e}")
+    return columns, LoadStats(len(rows), parsed, before - len(rows), errors, time.perf_counter() - started)
+
+
+# --- analysis ------------------------------------------------------------------
+
+class _Stats(NamedTuple):
+    latest: list        # row of each machine's latest snapshot
+    counts: list        # per check: [pass, fail, unknown] over those rows
+    compliant: int      # latest rows with every check passed
+    incomplete: int     # latest rows with no failure but some check unknown
+    customers: dict     # customer -> [machines, compliant, incomplete, pass, fail]
+    drift: list         # (row, [check numbers]) for latest rows that regressed
+
+
+def analyze(columns, use_numpy=None):
+    """Compliance of the latest snapshot per machine, as a JSON-ready dict (see the module docstring)."""
+    use_numpy = NUMPY_AVAILABLE if use_numpy is None else use_numpy
+    if not len(columns):
+        stats = _Stats([], [[0, 0, 0] for _ in columns.checks], 0, 0, {}, [])
+    elif use_numpy:
+        stats = _stats_numpy(columns)
+    else:
+        stats = _stats_python(columns)
+    checks = []
+    for j, check in enumerate(columns.checks):
+        passed, failed, unknown = stats.counts[j]
+        checks.append({
+            "id": check.id,
+            "label": check.label,
+            "pass": passed,
+            "fail": failed,
+            "unknown": unknown,
+            "pass_rate": _rate(passed, failed),
+            "regressed": 0,
+        })
+    drift = []
+    for i, regressed in stats.drift:
+        for j in regressed:
+            checks[j]["regressed"] += 1
+        drift.append({"machine": columns.machines[i], "file": columns.files[i],
+                      "checks": [columns.checks[j].id for j in regressed]})
+    customers = [{"customer": name, "machines": machines, "compliant": compliant, "incomplete": incomplete,
+                  "pass_rate": _rate(passed, failed)}
+                 for name, (machines, compliant, incomplete, passed, failed) in stats.customers.items()]
+    return {
+        "snapshots": len(columns),
+        "machines": len(stats.latest),
+        "compliant": stats.compliant,
+        "incomplete": stats.incomplete,
+        "engine": "numpy" if use_numpy else "python",
+        "checks": checks,
+        "customers": sorted(customers, key=lambda c: (-c["machines"], c["customer"])),
+        "drift": sorted(drift, key=lambda d: d["machine"]),
+    }
+
+
+def _rate(passed, failed):
+    return round(passed / (passed + failed), 4) if passed + failed else None
+
+
+def _stats_numpy(columns):
+    import numpy as np
+    n, k = len(columns), len(columns.checks)
+    results = np.frombuffer(columns.results, dtype=np.int8).reshape(n, k)
+    codes = {}
+    machine = np.fromiter((codes.setdefault(m, len(codes)) for m in columns.machines), dtype=np.int64, count=n)
+    taken = np.frombuffer(columns.taken, dtype=np.float64)
+    # group each machine's snapshots together, oldest first
+    order = np.lexsort((taken, machine))
+    grouped = machine[order]
+    boundary = grouped[1:] != grouped[:-1]
+    starts = np.flatnonzero(np.concatenate(([True], boundary)))
+    latest = order[np.concatenate((boundary, [True]))]
+    rows = results[latest]
+    passed, failed, unknown = rows == PASS, rows == FAIL, rows == UNKNOWN
+    counts = np.stack([passed.sum(0), failed.sum(0), unknown.sum(0)], axis=1)
+    clean = ~failed.any(1)
+    ok = clean & ~unknown.any(1)
+    incomplete = clean & ~ok
+    ever_passed = np.maximum.reduceat((results[order] == PASS).view(np.int8), starts, axis=0).astype(bool)
+    regressed = failed & ever_passed
+
+    names = {}
+    customer = np.fromiter((names.setdefault(columns.customers[i], len(names)) for i in latest.tolist()),
+                           dtype=np.int64, count=len(latest))
+    c = len(names)
+    per_customer = np.stack([
+        np.bincount(customer, minlength=c),
+        np.bincount(customer, weights=ok, minlength=c),
+        np.bincount(customer, weights=incomplete, minlength=c),
+        np.bincount(customer, weights=passed.sum(1), minlength=c),
+        np.bincount(customer, weights=failed.sum(1), minlength=c),
+    ], axis=1).astype(np.int64).tolist()
+    drift = [(int(latest[m]), np.flatnonzero(regressed[m]).tolist()) for m in np.flatnonzero(regressed.any(1))]
+    return _Stats(latest.tolist(), counts.tolist(), int(ok.sum()), int(incomplete.sum()),
+                  {name: per_customer[code] for name, code in names.items()}, drift)
+
+
+def _stats_python(columns):
+    k = len(columns.checks)
+    latest, ever_passed = {}, {}
+    for i, machine in enumerate(columns.machines):
+        if machine not in latest or columns.taken[i] >= columns.taken[latest[machine]]:
+            latest[machine] = i
+        row = columns.results[i * k:(i + 1) * k]
+        seen = ever_passed.setdefault(machine, [False] * k)
+        for j in range(k):
+            if row[j] == PASS:
+                seen[j] = True
+    counts = [[0, 0, 0] for _ in range(k)]
+    customers, drift, compliant, incomplete = {}, [], 0, 0
+    for machine, i in latest.items():
+        row = columns.results[i * k:(i + 1) * k]
+        for j in range(k):
+            counts[j][0 if row[j] == PASS else 1 if row[j] == FAIL else 2] += 1
+        clean = FAIL not in row
+        ok = clean and UNKNOWN not in row
+        compliant += ok
+        incomplete += clean and not ok
+        c = customers.setdefault(columns.customers[i], [0, 0, 0, 0, 0])
+        c[0] += 1
+        c[1] += ok
+        c[2] += clean and not ok
+        c[3] += row.count(PASS)
+        c[4] += row.count(FAIL)
+        regressed = [j for j in range(k) if row[j] == FAIL and ever_passed[machine][j]]
+        if regressed:
+            drift.append((i, regressed))
+    return _Stats(list(latest.values()), counts, compliant, incomplete, customers, drift)
+
+
+def format_report(report, stats=None, drift_lines=20) -> str:
+    lines = []
+    if stats is not None:
+        lines.append(f"{report['snapshots']} snapshots ({stats.parsed} parsed, {stats.kept} from the index, "
+                     f"{stats.dropped} dropped) in {stats.seconds:.2f}s")
+    machines = report["machines"]
+    share = f" ({report['compliant'] / machines:.1%})" if machines else ""
+    lines.append(f"{machines} machines, {report['compliant']} fully compliant{share}, "
+                 f"{report['incomplete']} incomplete (no failures, some checks unknown)")
+    lines.append("")
+    lines.append(f"{'check':<34}{'pass':>8}{'fail':>8}{'unknown':>9}{'rate':>8}{'drift':>7}")
+    for c in report["checks"]:
+        rate = "-" if c["pass_rate"] is None else f"{c['pass_rate']:.1%}"
+        lines.append(f"{c['id']:<34}{c['pass']:>8}{c['fail']:>8}{c['unknown']:>9}{rate:>8}{c['regressed']:>7}")
+    lines.append("")
+    lines.append(f"{'customer':<20}{'machines':>10}{'compliant':>11}{'incomplete':>12}{'rate':>8}")
+    for c in report["customers"]:
+        rate = "-" if c["pass_rate"] is None else f"{c['pass_rate']:.1%}"
+        lines.append(f"{c['customer']:<20}{c['machines']:>10}{c['compliant']:>11}{c['incomplete']:>12}{rate:>8}")
+    if report["drift"]:
+        lines.append("")
+        lines.append(f"Drift: {len(report['drift'])} machines fail checks an earlier snapshot passed")
+        for d in report["drift"][:drift_lines]:
+            lines.append(f"  {d['machine']}: {', '.join(d['checks'])}")
+        if len(report["drift"]) > drift_lines:
+            lines.append(f"  ... {len(report['drift']) - drift_lines} more (see --json)")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Export machine-state snapshots and analyze fleet compliance.")
+    sub = ap.add_subparsers(dest="command", required=True)
+    ex = sub.add_parser("export", help="write this machine's state to a snapshot file")
+    ex.add_argument("--out", default=".", help="folder for the snapshot (e.g. a share)")
+    ex.add_argument("--machine", help="machine name to record (default: this computer)")
+    ex.add_argument("--fake-state", help="read the state from a JSON fixture instead of PowerShell")
+    an = sub.add_parser("analyze", help="report compliance over a folder of snapshots")
+    an.add_argument("folder")
+    an.add_argument("--json", help="also write the full report as JSON")
+    an.add_argument("--no-index", action="store_true", help=f"parse every snapshot and leave {INDEX_NAME} alone")
+    an.add_argument("--no-numpy", action="store_true", help="use the plain Python statistics")
+    args = ap.parse_args(argv)
+
+    if args.command == "export":
+        backend = _probe.FakeProbeBackend.from_json(args.fake_state) if args.fake_state else _probe.PowerShellProbeBackend()
+        try:
+            path = write_snapshot(take_snapshot(backend, args.machine), args.out)
+        except (OSError, RuntimeError, ValueError) as e:
+            print(f"Snapshot failed: {e}", file=sys.stderr)
+            return 1
+        print(path)
+        return 0
+
+    columns, stats = load_fleet(args.folder, use_index=not args.no_index)
+    report = analyze(columns, use_numpy=False if args.no_numpy else None)
+    for error in stats.errors:
+        print(f"skipped {error}", file=sys.stderr)
+    print(format_report(report, stats))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=1)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""Append-only run log that lives in a spill file instead of memory.
+
+Text is appended to a temporary file; the only thing kept in memory is an
+array of line start offsets (8 bytes per line), so a log of tens of MB costs
+well under a MB of RAM and any window of lines can be read back with one
+seek. When the file grows past `max_bytes` the oldest half is dropped
+(`dropped_lines` counts them), so disk use is bounded too.
+
+search() walks the file in blocks of lines using the same offset index.
+Nothing here touches Tk; log_view.LogView renders a store.
+"""
+import os
+import shutil
+import tempfile
+import threading
+from array import array
+from bisect import bisect_right
+
+DEFAULT_MAX_BYTES = 128 * 1024 * 1024
+_SEARCH_BLOCK = 4096
+_COPY_CHUNK = 1024 * 1024
+
+
+class LogStore:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, directory=None):
+        self.max_bytes = max_bytes
+        self.dropped_lines = 0
+        self._lock = threading.RLock()
+        fd, self.path = tempfile.mkstemp(prefix="cci-log-", suffix=".txt", dir=directory)
+        self._fh = os.fdopen(fd, "w+b")
+        self._offsets = array("q", [0])
+        self._size = 0
+
+    def __len__(self):
+        return self.line_count
+
+    @property
+    def line_count(self) -> int:
+        with self._lock:
+            # the last offset starts a line that has no text yet unless something was written after it
+            return len(self._offsets) - (0 if self._size > self._offsets[-1] else 1)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def append(self, text: str):
+        if not text:
+            return
+        data = text.encode("utf-8", "replace")
+        with self._lock:
+            self._fh.seek(self._size)
+            self._fh.write(data)
+            base = self._size
+            pos = data.find(b"\n")
+            while pos >= 0:
+                self._offsets.append(base + pos + 1)
+                pos = data.find(b"\n", pos + 1)
+            self._size += len(data)
+            if self._size > self.max_bytes:
+                self._drop_oldest_half()
+
+    def _drop_oldest_half(self):
+        cut_line = len(self._offsets) // 2
+        cut = self._offsets[cut_line]
+        kept = self._size - cut
+        # move the kept half to the front a chunk at a time, so memory stays bounded
+        done = 0
+        while done < kept:
+            self._fh.seek(cut + done)
+            chunk = self._fh.read(min(_COPY_CHUNK, kept - done))
+            if not chunk:
+                break
+            self._fh.seek(done)
+            self._fh.write(chunk)
+            done += len(chunk)
+        self._fh.truncate(kept)
+        self._offsets = array("q", (o - cut for o in self._offsets[cut_line:]))
+        self._size -= cut
+        self.dropped_lines += cut_line
+
+    def get_lines(self, start: int, count: int):
+        """Lines [start, start + count) without their newlines."""
+        with self._lock:
+            n = self.line_count
+            start = max(0, min(start, n))
+            end = min(n, start + max(0, count))
+            if start >= end:
+                return []
+            lo = self._offsets[start]
+            hi = self._offsets[end] if end < len(self._offsets) else self._size
+            self._fh.flush()
+            self._fh.seek(lo)
+            data = self._fh.read(hi - lo)
+        lines = data.decode("utf-8", "replace").split("\n")
+        if lines and lines[-1] == "" and data.endswith(b"\n"):
+            lines.pop()
+        return [l.rstrip("\r") for l in lines]
+
+    def line_at_offset(self, offset: int) -> int:
+        with self._lock:
+            return max(0, bisect_right(self._offsets, offset) - 1)
+
+    def search(self, needle: str, start: int = 0, backwards: bool = False, wrap: bool = True, case: bool = False):
+        """Index of the first line at or after `start` (before it, when `backwards`) containing `needle`."""
+        if not needle:
+            return None
+        n = self.line_count
+        if n == 0:
+            return None
+        needle = needle if case else needle.lower()
+        start = max(0, min(start, n - 1))
+
+        def scan(lo, hi):
+            # forward over [lo, hi) or backward over (hi, lo] in blocks
+            if not backwards:
+                for block in range(lo, hi, _SEARCH_BLOCK):
+                    for i, line in enumerate(self.get_lines(block, min(_SEARCH_BLOCK, hi - block))):
+                        if needle in (line if case else line.lower()):
+                            return block + i
+            else:
+                pos = lo
+                while pos > hi:
+                    first = max(hi + 1, pos - _SEARCH_BLOCK + 1)
+                    lines = self.get_lines(first, pos - first + 1)
+                    for i in range(len(lines) - 1, -1, -1):
+                        if needle in (lines[i] if case else lines[i].lower()):
+                            return first + i
+                    pos = first - 1
+            return None
+
+        if not backwards:
+            found = scan(start, n)
+            if found is None and wrap:
+                found = scan(0, start)
+        else:
+            found = scan(start, -1)
+            if found is None and wrap:
+                found = scan(n - 1, start)
+        return found
+
+    def text(self) -> str:
+        with self._lock:
+            self._fh.flush()
+            self._fh.seek(0)
+            return self._fh.read(self._size).decode("utf-8", "replace")
+
+    def save_to(self, path):
+        with self._lock:
+            self._fh.flush()
+            self._fh.seek(0)
+            with open(path, "wb") as out:
+                shutil.copyfileobj(self._fh, out)
+
+    def clear(self):
+        with self._lock:
+            self._fh.seek(0)
+            self._fh.truncate()
+            self._offsets = array("q", [0])
+            self._size = 0
+            self.dropped_lines = 0
+
+    def close(self):
+        with self._lock:
+            try:
+                self._fh.close()
+            finally:
+                try:
+                    os.remove(self.path)
+                except OSError:
+                    pass
+
+    @classmethod
+    def from_text(cls, text, **kwargs):
+        store = cls(**kwargs)
+        store.append(text)
+        return store
@@ -0,0 +1,180 @@
+"""Virtualized Tk viewer for a log_store.LogStore.
+
+Only the lines that fit in the widget are ever inserted into the Text, so
+showing or appending to a log of any size costs the same. The scrollbar is
+driven by line numbers, appends are coalesced into one redraw per idle
+pass, and the view follows the tail while it is scrolled to the bottom.
+
+The optional search bar searches the store incrementally as you type
+(Enter / Shift+Enter for next / previous).
+"""
+import tkinter as tk
+from tkinter import ttk
+
+from log_store import LogStore
+
+
+class LogView(ttk.Frame):
+    def __init__(self, master, store=None, search=True, **kwargs):
+        super().__init__(master, **kwargs)
+        self.store = store if store is not None else LogStore()
+        self.top = 0
+        self.follow = True
+        self._match = None
+        self._dropped = self.store.dropped_lines
+        self._redraw_pending = False
+        self._search_after = None
+
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(0, weight=1)
+        self.text = tk.Text(self, wrap="none", state="disabled", height=10)
+        self.text.grid(column=0, row=0, sticky="nsew")
+        self.text.tag_configure("match", background="#ffe08a")
+        self.vsb = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.vsb.grid(column=1, row=0, sticky="ns")
+        hsb = ttk.Scrollbar(self, orient="horizontal", command=self.text.xview)
+        hsb.grid(column=0, row=1, sticky="ew")
+        self.text.configure(xscrollcommand=hsb.set)
+
+        self.text.bind("<Configure>", lambda e: self.refresh())
+        self.text.bind("<MouseWheel>", self._on_wheel)
+        self.text.bind("<Button-4>", lambda e: self.scroll(-3))
+        self.text.bind("<Button-5>", lambda e: self.scroll(3))
+        self.text.bind("<Prior>", lambda e: self.scroll(-self.rows()))
+        self.text.bind("<Next>", lambda e: self.scroll(self.rows()))
+        self.text.bind("<Control-Home>", lambda e: self.scroll_to(0))
+        self.text.bind("<Control-End>", lambda e: self.scroll_to(self.store.line_count))
+
+        if search:
+            bar = ttk.Frame(self)
+            bar.grid(column=0, row=2, columnspan=2, sticky="ew", pady=(4, 0))
+            bar.columnconfigure(1, weight=1)
+            ttk.Label(bar, text="Find:").grid(column=0, row=0, padx=(0, 4))
+            self.search_var = tk.StringVar()
+            entry = ttk.Entry(bar, textvariable=self.search_var)
+            entry.grid(column=1, row=0, sticky="ew")
+            entry.bind("<Return>", lambda e: self.find())
+            entry.bind("<Shift-Return>", lambda e: self.find(backwards=True))
+            self.search_var.trace_add("write", self._on_search_edit)
+            ttk.Button(bar, text="Prev", command=lambda: self.find(backwards=True)).grid(column=2, row=0, padx=(4, 0))
+            ttk.Button(bar, text="Next", command=self.find).grid(column=3, row=0, padx=(4, 0))
+            self.search_status = tk.StringVar()
+            ttk.Label(bar, textvariable=self.search_status, foreground="gray").grid(column=4, row=0, padx=(6, 0))
+
+    def rows(self) -> int:
+        """How many lines fit in the widget right now."""
+        height = self.text.winfo_height()
+        if height <= 1:
+            return int(self.text.cget("height"))
+        linespace = max(1, self.text.tk.call("font", "metrics", self.text.cget("font"), "-linespace"))
+        return max(1, height // int(linespace))
+
+    def append(self, text):
+        self.store.append(text)
+        self._schedule_refresh()
+
+    def clear(self):
+        self.store.clear()
+        self.top = 0
+        self.follow = True
+        self._match = None
+        self._dropped = 0
+        self.refresh()
+
+    def _sync_dropped(self):
+        """Shift the view and the current match when the store dropped its oldest lines."""
+        shift = self.store.dropped_lines - self._dropped
+        if not shift:
+            return
+        self._dropped = self.store.dropped_lines
+        if shift < 0:
+            # the store was cleared behind our back
+            self._match, self.top = None, 0
+            return
+        self.top = max(0, self.top - shift)
+        if self._match is not None:
+            self._match = self._match - shift if self._match >= shift else None
+
+    def _schedule_refresh(self):
+        if not self._redraw_pending:
+            self._redraw_pending = True
+            self.after_idle(self.refresh)
+
+    def refresh(self):
+        self._redraw_pending = False
+        self._sync_dropped()
+        total = self.store.line_count
+        rows = self.rows()
+        if self.follow:
+            self.top = max(0, total - rows)
+        self.top = max(0, min(self.top, max(0, total - rows)))
+        lines = self.store.get_lines(self.top, rows)
+        self.text.config(state="normal")
+        self.text.delete("1.0", "end")
+        self.text.insert("1.0", "\n".join(lines))
+        if self._match is not None and self.top <= self._match < self.top + len(lines):
+            line_no = self._match - self.top + 1
+            self.text.tag_add("match", f"{line_no}.0", f"{line_no}.end")
+        self.text.config(state="disabled")
+        if total:
+            self.vsb.set(self.top / total, min(1.0, (self.top + rows) / total))
+        else:
+            self.vsb.set(0.0, 1.0)
+
+    def scroll(self, lines):
+        self.scroll_to(self.top + lines)
+
+    def scroll_to(self, line):
+        total = self.store.line_count
+        rows = self.rows()
+        self.top = max(0, min(int(line), max(0, total - rows)))
+        self.follow = self.top + rows >= total
+        self.refresh()
+
+    def see(self, line):
+        """Scroll so `line` is visible, roughly in the upper third."""
+        self.scroll_to(max(0, line - self.rows() // 3))
+
+    def _on_scrollbar(self, action, *args):
+        if action == "moveto":
+            self.scroll_to(float(args[0]) * self.store.line_count)
+        elif action == "scroll":
+            amount, what = int(args[0]), args[1]
+            self.scroll(amount * (self.rows() if what == "pages" else 1))
+
+    def _on_wheel(self, event):
+        self.scroll(-3 if event.delta > 0 else 3)
+        return "break"
+
+    def _on_search_edit(self, *_):
+        # incremental: search from the current position once typing pauses
+        if self._search_after is not None:
+            self.after_cancel(self._search_after)
+        self._search_after = self.after(150, lambda: self.find(from_current=True))
+
+    def find(self, backwards=False, from_current=False):
+        self._search_after = None
+        self._sync_dropped()
+        needle = self.search_var.get()
+        if not needle:
+            self._match = None
+            self.search_status.set("")
+            self.refresh()
+            return None
+        if self._match is None:
+            start = self.top
+        elif from_current:
+            start = self._match
+        else:
+            start = self._match - 1 if backwards else self._match + 1
+            if start < 0 or start >= self.store.line_count:
+                start = self.store.line_count - 1 if backwards else 0
+        found = self.store.search(needle, start, backwards=backwards)
+        self._match = found
+        if found is None:
+            self.search_status.set("Not found")
+            self.refresh()
+        else:
+            self.search_status.set(f"Line {found + 1 + self.store.dropped_lines}")
+            self.see(found)
+        return found
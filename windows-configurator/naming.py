@@ -0,0 +1,253 @@
+"""Computer name rules, shared by the form and the bulk CSV mode.
+
+A generated name is Customer-TypeChar-Serial (or the sanitized custom name)
+and must fit the 15-character NetBIOS limit. When it does not, the customer
+part is shortened first, then the serial keeps its last digits, so the same
+input always yields the same name.
+
+Bulk mode reads a CSV of customer,type,serial rows, checks every name
+against an index of an exported inventory (plus the names generated earlier
+in the same batch) and resolves collisions with deterministic -2, -3, ...
+suffixes, shortening the name to make room. It writes a manifest of all
+rows and a report of the collisions and problems.
+
+    python naming.py machines.csv --inventory inventory.csv --out-dir results
+"""
+import argparse
+import csv
+import os
+import re
+import sys
+import time
+from typing import NamedTuple
+
+NETBIOS_MAX = 15
+
+TYPE_MAP = {
+    "Console": "C",
+    "Laptop": "L",
+    "Rack PC": "R",
+    "Desktop": "D",
+}
+
+_DISALLOWED = re.compile(r"[^A-Za-z0-9-_]")
+_SPACES = re.compile(r"\s+")
+_TYPE_LOOKUP = {k.lower(): v for k, v in TYPE_MAP.items()}
+_TYPE_LOOKUP.update({v.lower(): v for v in TYPE_MAP.values()})
+
+
+def sanitize_custom(name: str) -> str:
+    # Convert spaces to -, allow only letters, numbers, - and _
+    name = name.replace(" ", "-")
+    # Remove disallowed characters
+    name = _DISALLOWED.sub("", name)
+    return name[:NETBIOS_MAX]
+
+
+def type_char(type_name: str) -> str:
+    """'Laptop' or 'L' -> 'L'; anything unknown counts as a desktop, like the form does."""
+    return _TYPE_LOOKUP.get((type_name or "").strip().lower(), "D")
+
+
+def _clean(part: str) -> str:
+    return _DISALLOWED.sub("", _SPACES.sub("-", part.strip())).strip("-")
+
+
+def fit_name(customer: str, tchar: str, serial: str, suffix: str = "", limit: int = NETBIOS_MAX) -> str:
+    """Join the parts and shorten them to `limit` characters, customer first, then the serial's head."""
+    tail = [p for p in (tchar, serial) if p]
+    fixed = len("-".join(tail)) + (1 if tail and customer else 0) + len(suffix)
+    if customer and fixed < limit:
+        customer = customer[:limit - fixed].rstrip("-")
+    elif customer:
+        customer = ""
+    if not customer:
+        fixed = len("-".join(tail)) + len(suffix)
+        if fixed > limit and serial:
+            # keep the serial's last digits: they are what tells machines apart
+            keep = max(1, len(serial) - (fixed - limit))
+            serial = serial[-keep:]
+            tail = [p for p in (tchar, serial) if p]
+    name = "-".join([p for p in [customer] + tail if p]) + suffix
+    return name[:limit]
+
+
+def generate_name(customer: str, type_name: str, serial: str, custom: str = "") -> str:
+    """The name the form shows: the custom name if given, else Customer-TypeChar-Serial, within 15 characters."""
+    if custom.strip():
+        return sanitize_custom(custom.strip())
+    return fit_name(_clean(customer), type_char(type_name), _clean(serial))
+
+
+# Customer-TypeChar-Serial as generate_name() builds it: the customer may have been dropped
+# to fit, and a bulk collision suffix (-2, -3, ...) may follow the serial
+_CONVENTION = re.compile(r"^(?:(?P<customer>[A-Za-z0-9_-]+?)-)?(?P<type>[CLRD])-(?P<serial>[A-Za-z0-9_][A-Za-z0-9_-]*)$",
+                         re.IGNORECASE)
+
+
+def parse_name(name: str):
+    """(customer, type char, serial) of a name that follows the convention, else None.
+
+    Windows reports computer names in upper case, so the parts come back as found.
+    """
+    name = (name or "").strip()
+    if not name or len(name) > NETBIOS_MAX or name.isdigit():
+        return None
+    m = _CONVENTION.match(name)
+    if not m:
+        return None
+    return m.group("customer") or "", m.group("type").upper(), m.group("serial")
+
+
+class NameResult(NamedTuple):
+    row: int
+    customer: str
+    type: str
+    serial: str
+    name: str
+    status: str      # ok, shortened, suffixed, invalid
+    note: str = ""
+
+
+class InventoryIndex:
+    """Case-insensitive hash set of names already in use (NetBIOS names ignore case)."""
+    def __init__(self, names=()):
+        self._names = {n.strip().upper() for n in names if n and n.strip()}
+
+    def __contains__(self, name):
+        return name.upper() in self._names
+
+    def __len__(self):
+        return len(self._names)
+
+    def add(self, name):
+        self._names.add(name.upper())
+
+    @classmethod
+    def from_file(cls, path, column=None):
+        """Load an inventory export: a CSV with a name column (`column`, or the first one that
+        looks like Name/ComputerName/Hostname), or a plain list with one name per line."""
+        with open(path, newline="", encoding="utf-8-sig", errors="replace") as fh:
+            sample = fh.read(4096)
+            fh.seek(0)
+            first = sample.splitlines()[0] if sample else ""
+            if "," not in first and ";" not in first and "\t" not in first and column is None:
+                return cls(line.strip() for line in fh)
+            try:
+                dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+            except csv.Error:
+                dialect = csv.excel
+            reader = csv.reader(fh, dialect)
+            header = next(reader, [])
+            lowered = [h.strip().lower() for h in header]
+            if column is not None:
+                idx = lowered.index(column.lower())
+            else:
+                for candidate in ("computername", "computer name", "name", "hostname", "devicename", "device name"):
+                    if candidate in lowered:
+                        idx = lowered.index(candidate)
+                        break
+                else:
+                    raise ValueError(f"No computer name column in {path}; pass the column name explicitly")
+            return cls(r[idx] for r in reader if len(r) > idx)
+
+
+def generate_batch(rows, inventory=None, limit=NETBIOS_MAX):
+    """Names for (customer, type, serial) rows, unique against `inventory` and each other.
+
+    Deterministic: the same rows in the same order always give the same names.
+    Every generated name is added to `inventory`.
+    """
+    taken = inventory if inventory is not None else InventoryIndex()
+    next_suffix = {}
+    results = []
+    for i, row in enumerate(rows, start=1):
+        customer, type_name, serial = (list(row) + ["", "", ""])[:3]
+        cust, tchar, ser = _clean(customer), type_char(type_name), _clean(serial)
+        if not ser and not cust:
+            results.append(NameResult(i, customer, type_name, serial, "", "invalid", "no customer or serial"))
+            continue
+        full = "-".join(p for p in (cust, tchar, ser) if p)
+        name = fit_name(cust, tchar, ser, limit=limit)
+        status, note = ("shortened", f"from {full}") if name != full else ("ok", "")
+        if name.isdigit():
+            results.append(NameResult(i, customer, type_name, serial, name, "invalid", "names cannot be all digits"))
+            continue
+        if name in taken:
+            clash = name
+            n = next_suffix.get(clash.upper(), 2)
+            while True:
+                candidate = fit_name(cust, tchar, ser, suffix=f"-{n}", limit=limit)
+                n += 1
+                if candidate not in taken:
+                    break
+            next_suffix[clash.upper()] = n
+            name, status, note = candidate, "suffixed", f"{clash} already in use"
+        taken.add(name)
+        results.append(NameResult(i, customer, type_name, serial, name, status, note))
+    return results
+
+
+def read_rows(path):
+    """(customer, type, serial) rows from a CSV; a header row is skipped when it names the columns."""
+    with open(path, newline="", encoding="utf-8-sig", errors="replace") as fh:
+        reader = csv.reader(fh)
+        first = next(reader, None)
+        if first is None:
+            return
+        if [c.strip().lower() for c in first[:3]] != ["customer", "type", "serial"]:
+            yield first
+        yield from reader
+
+
+def write_manifest(results, path):
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        w = csv.writer(fh)
+        w.writerow(["row", "customer", "type", "serial", "name", "status", "note"])
+        w.writerows(results)
+
+
+def write_report(results, path):
+    """Only the rows that needed attention: collisions, shortened names and invalid rows."""
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        w = csv.writer(fh)
+        w.writerow(["row", "customer", "type", "serial", "name", "status", "note"])
+        w.writerows(r for r in results if r.status != "ok")
+
+
+def bulk_generate(csv_path, inventory_path=None, out_dir=None):
+    """Run bulk mode end to end; returns (results, manifest_path, report_path, seconds)."""
+    started = time.perf_counter()
+    inventory = InventoryIndex.from_file(inventory_path) if inventory_path else InventoryIndex()
+    results = generate_batch(read_rows(csv_path), inventory)
+    out_dir = out_dir or os.path.dirname(os.path.abspath(csv_path))
+    base = os.path.splitext(os.path.basename(csv_path))[0]
+    manifest = os.path.join(out_dir, f"{base}-names.csv")
+    report = os.path.join(out_dir, f"{base}-collisions.csv")
+    write_manifest(results, manifest)
+    write_report(results, report)
+    return results, manifest, report, time.perf_counter() - started
+
+
+def summarize(results):
+    counts = {}
+    for r in results:
+        counts[r.status] = counts.get(r.status, 0) + 1
+    return ", ".join(f"{counts.get(s, 0)} {s}" for s in ("ok", "shortened", "suffixed", "invalid"))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Generate computer names for a CSV of customer,type,serial rows.")
+    ap.add_argument("csv", help="input CSV (customer,type,serial)")
+    ap.add_argument("--inventory", help="exported inventory of names already in use (CSV or one name per line)")
+    ap.add_argument("--out-dir", help="where to write <input>-names.csv and <input>-collisions.csv")
+    args = ap.parse_args(argv)
+    results, manifest, report, seconds = bulk_generate(args.csv, args.inventory, args.out_dir)
+    print(f"{len(results)} rows in {seconds:.2f}s: {summarize(results)}")
+    print(f"Manifest: {manifest}")
+    print(f"Collision report: {report}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
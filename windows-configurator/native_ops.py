@@ -0,0 +1,197 @@
+"""Computer rename and desktop wallpaper done in-process through the Win32 API.
+
+Renaming used to start PowerShell just to run Rename-Computer, and the script
+compiled a C# class with Add-Type on every run to reach SystemParametersInfo.
+Both are single API calls, made here through ctypes:
+    rename      SetComputerNameExW(ComputerNamePhysicalDnsHostname, name)
+    wallpaper   SystemParametersInfoW(SPI_SETDESKWALLPAPER, 0, path, SPIF_UPDATEINIFILE | SPIF_SENDCHANGE)
+
+A failed call raises NativeError with the Win32 error code, a readable
+message and whether the PowerShell path is worth trying instead. Errors that
+PowerShell would hit as well (a bad name, a missing file) are final; anything
+else falls back. A domain-joined machine always falls back for the rename,
+since Rename-Computer also renames the computer account in the domain.
+
+Backends:
+    Win32Backend       the real calls (Windows only)
+    FakeNativeBackend  records the calls and fails on request, for tests and
+                       non-Windows runs
+"""
+import os
+import re
+from typing import NamedTuple
+
+from naming import NETBIOS_MAX
+
+COMPUTER_NAME_PHYSICAL_DNS_HOSTNAME = 5
+SPI_SETDESKWALLPAPER = 0x0014
+SPIF_UPDATEINIFILE = 0x01
+SPIF_SENDCHANGE = 0x02
+NETSETUP_DOMAIN_NAME = 3
+
+ERROR_FILE_NOT_FOUND = 2
+ERROR_ACCESS_DENIED = 5
+ERROR_INVALID_PARAMETER = 87
+ERROR_INVALID_COMPUTERNAME = 1210
+
+_NAME_CHARS = re.compile(r"^[A-Za-z0-9_-]+$")
+
+_MESSAGES = {
+    ERROR_FILE_NOT_FOUND: "The file was not found",
+    ERROR_ACCESS_DENIED: "Access is denied; run the tool elevated",
+    ERROR_INVALID_PARAMETER: "Windows rejected the value as invalid",
+    ERROR_INVALID_COMPUTERNAME: "The computer name is not valid",
+}
+# PowerShell would fail the same way on these, so there is no point retrying there
+_FINAL = {ERROR_FILE_NOT_FOUND, ERROR_INVALID_PARAMETER, ERROR_INVALID_COMPUTERNAME}
+
+
+class NativeError(Exception):
+    def __init__(self, code, operation, message=None, fallback=None):
+        self.code = code
+        self.operation = operation
+        self.message = message or describe(code)
+        self.fallback = code not in _FINAL if fallback is None else fallback
+        super().__init__(f"{operation} failed: {self.message} (error {code})")
+
+
+class NativeResult(NamedTuple):
+    step_id: str
+    target: str
+    ok: bool
+    error: object = None
+
+
+def describe(code: int) -> str:
+    if code in _MESSAGES:
+        return _MESSAGES[code]
+    try:
+        import ctypes
+        return ctypes.FormatError(code).strip()
+    except (ImportError, AttributeError):
+        return f"Win32 error {code}"
+
+
+def check_name(name: str):
+    """Raise NativeError (no fallback) for a name SetComputerNameExW would refuse anyway."""
+    if not name or len(name) > NETBIOS_MAX or name.isdigit() or not _NAME_CHARS.match(name):
+        raise NativeError(ERROR_INVALID_COMPUTERNAME, f"Rename to {name!r}",
+                          f"A computer name needs 1-{NETBIOS_MAX} letters, digits, - or _ and cannot be all digits")
+
+
+class NativeBackend:
+    def set_computer_name(self, name: str):
+        raise NotImplementedError
+
+    def set_wallpaper(self, path: str):
+        raise NotImplementedError
+
+    def is_domain_joined(self) -> bool:
+        raise NotImplementedError
+
+
+class Win32Backend(NativeBackend):
+    def __init__(self):
+        import ctypes
+        from ctypes import wintypes
+        self._ctypes = ctypes
+        self._kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        self._user32 = ctypes.WinDLL("user32", use_last_error=True)
+        self._netapi32 = ctypes.WinDLL("netapi32", use_last_error=True)
+        self._kernel32.SetComputerNameExW.argtypes = (ctypes.c_int, wintypes.LPCWSTR)
+        self._kernel32.SetComputerNameExW.restype = wintypes.BOOL
+        self._user32.SystemParametersInfoW.argtypes = (wintypes.UINT, wintypes.UINT, wintypes.LPVOID, wintypes.UINT)
+        self._user32.SystemParametersInfoW.restype = wintypes.BOOL
+        self._netapi32.NetGetJoinInformation.argtypes = (wintypes.LPCWSTR, ctypes.POINTER(wintypes.LPWSTR),
+                                                         ctypes.POINTER(ctypes.c_int))
+        self._netapi32.NetGetJoinInformation.restype = wintypes.DWORD
+        self._netapi32.NetApiBufferFree.argtypes = (wintypes.LPVOID,)
+        self._netapi32.NetApiBufferFree.restype = wintypes.DWORD
+
+    def set_computer_name(self, name):
+        if not self._kernel32.SetComputerNameExW(COMPUTER_NAME_PHYSICAL_DNS_HOSTNAME, name):
+            raise NativeError(self._ctypes.get_last_error(), f"Rename to {name}")
+
+    def set_wallpaper(self, path):
+        buf = self._ctypes.create_unicode_buffer(path)
+        if not self._user32.SystemParametersInfoW(SPI_SETDESKWALLPAPER, 0, buf, SPIF_UPDATEINIFILE | SPIF_SENDCHANGE):
+            raise NativeError(self._ctypes.get_last_error(), f"Set wallpaper to {path}")
+
+    def is_domain_joined(self):
+        from ctypes import wintypes
+        buf, status = wintypes.LPWSTR(), self._ctypes.c_int()
+        code = self._netapi32.NetGetJoinInformation(None, self._ctypes.byref(buf), self._ctypes.byref(status))
+        if code != 0:
+            raise NativeError(code, "Read domain membership")
+        self._netapi32.NetApiBufferFree(buf)
+        return status.value == NETSETUP_DOMAIN_NAME
+
+
+class FakeNativeBackend(NativeBackend):
+    """Records every call in `calls`; `fail` maps an operation name to the Win32 code it fails with."""
+    def __init__(self, fail=None, domain_joined=False):
+        self.calls = []
+        self.fail = dict(fail or {})
+        self.domain_joined = domain_joined
+        self.computer_name = None
+        self.wallpaper = None
+
+    def _call(self, op, arg, what):
+        self.calls.append((op, arg))
+        if op in self.fail:
+            raise NativeError(self.fail[op], what)
+
+    def set_computer_name(self, name):
+        self._call("set_computer_name", name, f"Rename to {name}")
+        self.computer_name = name
+
+    def set_wallpaper(self, path):
+        self._call("set_wallpaper", path, f"Set wallpaper to {path}")
+        self.wallpaper = path
+
+    def is_domain_joined(self):
+        self._call("is_domain_joined", None, "Read domain membership")
+        return self.domain_joined
+
+
+def default_backend():
+    """Win32Backend on Windows; None (use PowerShell) elsewhere or when CCI_WORKER_STUB is set."""
+    if os.name != "nt" or os.environ.get("CCI_WORKER_STUB"):
+        return None
+    try:
+        return Win32Backend()
+    except (OSError, AttributeError):
+        return None
+
+
+def try_rename(name, backend):
+    """Rename natively; returns None on success and raises NativeError otherwise.
+
+    err.fallback tells the caller whether to hand the rename to Rename-Computer.
+    """
+    check_name(name)
+    try:
+        joined = backend.is_domain_joined()
+    except NativeError as e:
+        # unknown: let Rename-Computer deal with the domain side
+        raise NativeError(e.code, f"Rename to {name}", f"Domain membership unknown: {e.message}", fallback=True)
+    if joined:
+        raise NativeError(0, f"Rename to {name}", "The computer is joined to a domain", fallback=True)
+    backend.set_computer_name(name)
+
+
+def apply_native_steps(plan, backend, skip=(), exists=os.path.isfile):
+    """Run the plan's wallpaper steps through `backend`; one NativeResult per step, failures included."""
+    results = []
+    for step in plan:
+        if step.kind != "wallpaper" or step.id in skip:
+            continue
+        path = step.op["path"]
+        try:
+            if not exists(path):
+                raise NativeError(ERROR_FILE_NOT_FOUND, f"Set wallpaper to {path}")
+            backend.set_wallpaper(path)
+            results.append(NativeResult(step.id, path, True))
+        except NativeError as e:
+            results.append(NativeResult(step.id, path, False, e.message))
+    return results
@@ -0,0 +1,127 @@
+"""Background preview decoding with a small thumbnail cache.
+
+Wallpapers are often 4K/8K PNGs on a network share, so the preview is
+decoded on a worker thread at reduced size (JPEG draft mode, Image.reduce
+for everything else) and the resulting thumbnails are kept in a bounded LRU
+keyed by (path, mtime, size). Only the newest request is decoded; older ones
+are dropped when the user keeps typing.
+
+The GUI converts finished thumbnails to ImageTk.PhotoImage on the Tk thread;
+nothing here touches Tk.
+"""
+import importlib.util
+import os
+import queue
+import threading
+from collections import OrderedDict
+
+import profiling
+
+# PIL is imported by decode_thumbnail on the loader thread, not at GUI startup
+PIL_AVAILABLE = importlib.util.find_spec("PIL") is not None
+
+PREVIEW_SIZE = (360, 360)
+
+
+def cache_key(path: str):
+    """Return the cache key for `path`, or None when it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+
+def decode_thumbnail(path: str, size=PREVIEW_SIZE):
+    """Decode `path` into a PIL image no larger than `size`, skipping as much work as possible."""
+    from PIL import Image
+    with Image.open(path) as img:
+        if img.format == "JPEG":
+            # let libjpeg scale by 1/2, 1/4 or 1/8 while decoding
+            img.draft("RGB", size)
+        else:
+            factor = min(img.width // size[0], img.height // size[1])
+            if factor >= 2:
+                img = img.reduce(factor)
+        img.thumbnail(size, Image.LANCZOS)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+        img.load()
+        return img.copy()
+
+
+class ThumbnailCache:
+    """Thread-safe LRU of decoded thumbnails."""
+    def __init__(self, max_entries=16):
+        self.max_entries = max_entries
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            img = self._items.get(key)
+            if img is not None:
+                self._items.move_to_end(key)
+            return img
+
+    def put(self, key, img):
+        with self._lock:
+            self._items[key] = img
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def __len__(self):
+        return len(self._items)
+
+
+class PreviewLoader:
+    """Decode preview requests on a single worker thread; stale requests are skipped.
+
+    Results are tuples `(path, image_or_None, error_or_None)` on `results`.
+    """
+    def __init__(self, cache=None, decode=decode_thumbnail, size=PREVIEW_SIZE):
+        self.cache = cache if cache is not None else ThumbnailCache()
+        self.results = queue.Queue()
+        self._decode = decode
+        self._size = size
+        self._pending = None
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def request(self, path: str):
+        """Ask for a preview of `path`; replaces any request not yet started."""
+        with self._cond:
+            self._pending = path
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while self._pending is None:
+                    self._cond.wait()
+                path, self._pending = self._pending, None
+            self.results.put(self._load(path))
+
+    def _load(self, path):
+        key = cache_key(path) if path else None
+        if key is None:
+            return (path, None, None)
+        img = self.cache.get(key)
+        if img is not None:
+            return (path, img, None)
+        try:
+            with profiling.span("preview.decode", cat="image", path=os.path.basename(path)):
+                img = self._decode(path, self._size)
+        except Exception as e:
+            return (path, None, str(e))
+        self.cache.put(key, img)
+        return (path, img, None)
+
+    def is_current(self, path) -> bool:
+        """False when a newer request has been queued since `path` was decoded."""
+        with self._cond:
+            return self._pending is None or self._pending == path
@@ -0,0 +1,103 @@
+"""Named timing spans for startup and hot paths, written as a Chrome trace.
+
+Off by default: span() costs one attribute check until enable() is called
+(the GUI does that for `--profile`). Spans from any thread are recorded;
+open the written JSON in chrome://tracing or https://ui.perfetto.dev.
+
+    with profiling.span("init.tk"):
+        ...
+    profiling.complete("ps.configure", started, cat="powershell")   # async work timed elsewhere
+    profiling.write_trace(profiling.default_trace_path())
+"""
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# trace timestamps are relative to module import, which is close enough to process start
+_ORIGIN = time.perf_counter()
+
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.events = []
+        self._lock = threading.Lock()
+
+    def now(self) -> float:
+        return time.perf_counter()
+
+    def complete(self, name, started, finished=None, cat="app", **args):
+        """Record a span that started at perf_counter() value `started`."""
+        if not self.enabled:
+            return
+        finished = time.perf_counter() if finished is None else finished
+        event = {
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": round((started - _ORIGIN) * 1e6, 1),
+            "dur": round((finished - started) * 1e6, 1),
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        }
+        if args:
+            event["args"] = args
+        with self._lock:
+            self.events.append(event)
+
+    def instant(self, name, cat="app", **args):
+        if not self.enabled:
+            return
+        event = {"name": name, "cat": cat, "ph": "i", "s": "p",
+                 "ts": round((time.perf_counter() - _ORIGIN) * 1e6, 1),
+                 "pid": os.getpid(), "tid": threading.get_ident()}
+        if args:
+            event["args"] = args
+        with self._lock:
+            self.events.append(event)
+
+    @contextmanager
+    def span(self, name, cat="app", **args):
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.complete(name, started, cat=cat, **args)
+
+    def write_trace(self, path):
+        with self._lock:
+            events = list(self.events)
+        threads = {e["tid"] for e in events}
+        meta = [{"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid,
+                 "args": {"name": "main" if tid == threading.main_thread().ident else f"worker-{tid}"}}
+                for tid in threads]
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump({"traceEvents": meta + events, "displayTimeUnit": "ms"}, fh)
+        return path
+
+
+PROFILER = Profiler()
+span = PROFILER.span
+complete = PROFILER.complete
+instant = PROFILER.instant
+write_trace = PROFILER.write_trace
+
+
+def enable():
+    PROFILER.enabled = True
+
+
+def enabled() -> bool:
+    return PROFILER.enabled
+
+
+def default_trace_path(prefix="profile") -> str:
+    """A timestamped file next to the exe (or next to this script when run from source)."""
+    base = os.path.dirname(sys.executable) if getattr(sys, "frozen", False) else os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base, f"{prefix}-{time.strftime('%Y%m%d-%H%M%S')}.json")
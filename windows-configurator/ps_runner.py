@@ -0,0 +1,125 @@
+"""Run a child process off the Tk main thread and stream its output.
+
+The GUI creates a BackgroundRunner, calls start() and then drains `events`
+from an `after()` callback. Nothing in this module touches Tk, so the reader
+threads never call into the UI directly.
+
+Events put on the queue are tuples:
+    ("out", line)   a line read from stdout (without the trailing newline)
+    ("err", line)   a line read from stderr
+    ("exit", code)  the process finished; always the last event
+"""
+import os
+import queue
+import subprocess
+import threading
+import time
+
+import profiling
+
+# Keep PowerShell from flashing a console window when the GUI is built --windowed
+_CREATE_NO_WINDOW = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+
+
+class BackgroundRunner:
+    """Start a process and stream its stdout/stderr lines into a queue."""
+    def __init__(self, cmd, cwd=None):
+        self.cmd = list(cmd)
+        self.cwd = cwd
+        self.events = queue.Queue()
+        self.returncode = None
+        self.cancelled = False
+        self._proc = None
+        self._readers = []
+        self._started = None
+
+    @property
+    def running(self) -> bool:
+        return self._proc is not None and self.returncode is None
+
+    def start(self):
+        self._started = time.perf_counter()
+        try:
+            self._proc = subprocess.Popen(
+                self.cmd,
+                cwd=self.cwd,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                errors="replace",
+                bufsize=1,
+                creationflags=_CREATE_NO_WINDOW,
+            )
+        except OSError as e:
+            self.returncode = -1
+            self.events.put(("err", f"Failed to start {self.cmd[0]}: {e}"))
+            self.events.put(("exit", self.returncode))
+            return self
+
+        for stream, kind in ((self._proc.stdout, "out"), (self._proc.stderr, "err")):
+            t = threading.Thread(target=self._pump, args=(stream, kind), daemon=True)
+            t.start()
+            self._readers.append(t)
+        threading.Thread(target=self._wait, daemon=True).start()
+        return self
+
+    def _pump(self, stream, kind):
+        try:
+            for line in iter(stream.readline, ""):
+                self.events.put((kind, line.rstrip("\r\n")))
+        except (OSError, ValueError):
+            # pipe closed underneath us (process killed)
+            pass
+        finally:
+            try:
+                stream.close()
+            except Exception:
+                pass
+
+    def _wait(self):
+        code = self._proc.wait()
+        # make sure every line has been queued before announcing the exit
+        for t in self._readers:
+            t.join()
+        self.returncode = code
+        profiling.complete("process", self._started, cat="powershell", cmd=self.cmd[0], code=code)
+        self.events.put(("exit", code))
+
+    def cancel(self):
+        """Terminate the process and its children. Safe to call more than once."""
+        if not self.running:
+            return
+        self.cancelled = True
+        kill_tree(self._proc)
+
+    def drain(self, max_events=500):
+        """Return up to `max_events` queued events without blocking."""
+        return drain_events(self.events, max_events)
+
+
+def drain_events(q, max_events=500):
+    out = []
+    for _ in range(max_events):
+        try:
+            out.append(q.get_nowait())
+        except queue.Empty:
+            break
+    return out
+
+
+def kill_tree(proc):
+    """Terminate `proc` and, on Windows, every child it started."""
+    try:
+        if os.name == "nt":
+            # powershell spawns powercfg/w32tm/etc.; take the whole tree down
+            subprocess.run(["taskkill", "/T", "/F", "/PID", str(proc.pid)],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                           creationflags=_CREATE_NO_WINDOW)
+        else:
+            proc.terminate()
+    except Exception:
+        try:
+            proc.kill()
+        except Exception:
+            pass
@@ -0,0 +1,87 @@
+<#
+ps_worker.ps1
+Long-lived helper started once per GUI session by computer_namer_gui.py (see ps_worker.py).
+It inherits the GUI's elevated token, so rename/configure/background requests do not each
+pay a PowerShell cold start or a UAC prompt.
+
+Reads one JSON request per line on stdin and answers with JSON lines on stdout:
+  request:  {"id": 1, "op": "configure", "args": {"script": "...", "params": {...}}}
+  output:   {"id": 1, "event": "out"|"err", "line": "..."}
+  finished: {"id": 1, "event": "done", "code": 0, "error": null}
+ps_worker_stub.py speaks the same protocol for testing without Windows.
+#>
+
+$ErrorActionPreference = 'Continue'
+[Console]::InputEncoding = New-Object System.Text.UTF8Encoding $false
+[Console]::OutputEncoding = New-Object System.Text.UTF8Encoding $false
+
+function Send-Message($obj) {
+    [Console]::Out.WriteLine(($obj | ConvertTo-Json -Compress -Depth 4))
+    [Console]::Out.Flush()
+}
+
+function Send-Record($id, $record) {
+    $kind = 'out'
+    if ($record -is [System.Management.Automation.ErrorRecord]) {
+        $kind = 'err'; $text = "ERROR: $record"
+    } elseif ($record -is [System.Management.Automation.WarningRecord]) {
+        $kind = 'err'; $text = "WARNING: $($record.Message)"
+    } else {
+        $text = "$record"
+    }
+    Send-Message @{ id = $id; event = $kind; line = $text }
+}
+
+function ConvertTo-Hashtable($obj) {
+    $h = @{}
+    if ($obj) {
+        foreach ($p in $obj.PSObject.Properties) { $h[$p.Name] = $p.Value }
+    }
+    return $h
+}
+
+function Invoke-Request($req) {
+    $a = ConvertTo-Hashtable $req.args
+    switch ($req.op) {
+        'ping' { 'pong' }
+        'rename' { Rename-Computer -NewName $a['name'] -Force -ErrorAction Stop }
+        'restart' { Restart-Computer -Force }
+        'configure' {
+            # switches arrive as $true, strings as strings; splatting handles both
+            $params = ConvertTo-Hashtable $a['params']
+            $global:LASTEXITCODE = 0
+            & $a['script'] @params
+            # the script ends with its exit code in $LASTEXITCODE; $? is false if it failed without one
+            $ok = $?
+            if ($LASTEXITCODE) { $script:RequestCode = $LASTEXITCODE } elseif (-not $ok) { $script:RequestCode = 1 }
+        }
+        default { throw "Unknown op: $($req.op)" }
+    }
+}
+
+Send-Message @{ event = 'ready'; pid = $PID }
+while ($true) {
+    $raw = [Console]::In.ReadLine()
+    if ($null -eq $raw) { break }   # GUI closed the pipe
+    if (-not $raw.Trim()) { continue }
+    try {
+        $req = $raw | ConvertFrom-Json
+    } catch {
+        Send-Message @{ id = $null; event = 'done'; code = 2; error = "Bad request: $_" }
+        continue
+    }
+    if ($req.op -eq 'shutdown') {
+        Send-Message @{ id = $req.id; event = 'done'; code = 0; error = $null }
+        break
+    }
+    $script:RequestCode = 0
+    $err = $null
+    try {
+        Invoke-Request $req *>&1 | ForEach-Object { Send-Record $req.id $_ }
+        $code = $script:RequestCode
+    } catch {
+        $code = 1
+        $err = "$_"
+    }
+    Send-Message @{ id = $req.id; event = 'done'; code = $code; error = $err }
+}
@@ -0,0 +1,239 @@
+"""Client for the long-lived PowerShell worker (ps_worker.ps1).
+
+The GUI starts one worker per session. Because the GUI itself runs elevated
+(--uac-admin), the worker inherits the elevated token, so there is a single
+UAC prompt and a single PowerShell cold start no matter how many buttons are
+pressed.
+
+Protocol: one JSON object per line in each direction.
+    request   {"id": 1, "op": "configure", "args": {...}}
+    output    {"id": 1, "event": "out" | "err", "line": "..."}
+    finished  {"id": 1, "event": "done", "code": 0, "error": null}
+    startup   {"event": "ready", "pid": 1234}
+
+Ops: ping, rename {name}, restart, configure {script, params}, shutdown.
+ps_worker_stub.py speaks the same protocol so this can be exercised on Linux.
+"""
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import profiling
+from ps_runner import drain_events, kill_tree, _CREATE_NO_WINDOW
+
+_STUB = Path(__file__).parent / "ps_worker_stub.py"
+
+
+def worker_command(script_path: str) -> list:
+    """Return the argv that starts a worker: PowerShell on Windows, the Python stub elsewhere.
+
+    Set CCI_WORKER_STUB=1 to force the stub (useful when debugging the GUI on Windows).
+    """
+    if os.name == "nt" and not os.environ.get("CCI_WORKER_STUB"):
+        return ["powershell", "-NoProfile", "-NonInteractive", "-ExecutionPolicy", "Bypass", "-File", script_path]
+    return [sys.executable, str(_STUB)]
+
+
+def encode_request(job_id, op, args=None) -> str:
+    """One request line as sent to the worker's stdin."""
+    return json.dumps({"id": job_id, "op": op, "args": args or {}}) + "\n"
+
+
+class WorkerJob:
+    """One request sent to the worker. Exposes the same surface as ps_runner.BackgroundRunner."""
+    def __init__(self, client, job_id, op):
+        self.id = job_id
+        self.op = op
+        self.events = queue.Queue()
+        self.returncode = None
+        self.error = None
+        self.cancelled = False
+        self._client = client
+        self._proc = None
+        self._started = time.perf_counter()
+
+    @property
+    def running(self) -> bool:
+        return self.returncode is None
+
+    def cancel(self):
+        if self.running:
+            self._client.cancel(self)
+
+    def drain(self, max_events=500):
+        return drain_events(self.events, max_events)
+
+    def _finish(self, code, error=None):
+        if self.returncode is not None:
+            return
+        if error:
+            self.error = error
+            self.events.put(("err", error))
+        self.returncode = code
+        profiling.complete(f"worker.{self.op}", self._started, cat="powershell", code=code)
+        self.events.put(("exit", code))
+
+
+class WorkerClient:
+    """Start the worker on first use and route its replies to the matching WorkerJob."""
+    def __init__(self, cmd):
+        self.cmd = list(cmd)
+        self.pid = None
+        self._proc = None
+        self._jobs = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    @property
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def start(self):
+        with self._lock:
+            self._ensure_started()
+        return self
+
+    def _ensure_started(self):
+        if self.alive:
+            return
+        proc = subprocess.Popen(
+            self.cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            bufsize=1,
+            creationflags=_CREATE_NO_WINDOW,
+        )
+        self._proc = proc
+        self.pid = proc.pid
+        threading.Thread(target=self._read_stdout, args=(proc,), daemon=True).start()
+        threading.Thread(target=self._read_stderr, args=(proc,), daemon=True).start()
+
+    def submit(self, op, args=None) -> WorkerJob:
+        """Queue a request; its output arrives on the returned job's event queue."""
+        with self._lock:
+            job = WorkerJob(self, self._next_id, op)
+            self._next_id += 1
+            try:
+                self._ensure_started()
+                job._proc = self._proc
+                self._jobs[job.id] = job
+                self._proc.stdin.write(encode_request(job.id, op, args))
+                self._proc.stdin.flush()
+            except OSError as e:
+                self._jobs.pop(job.id, None)
+                job._finish(-1, f"Worker unavailable: {e}")
+        return job
+
+    def cancel(self, job):
+        """Cancel `job` by stopping the worker; the next submit() starts a fresh one."""
+        with self._lock:
+            if not job.running:
+                return
+            job.cancelled = True
+            proc = job._proc
+        if proc is not None:
+            kill_tree(proc)
+
+    def close(self, timeout=2.0):
+        proc = self._proc
+        if proc is None or proc.poll() is not None:
+            return
+        try:
+            proc.stdin.write(encode_request(0, "shutdown"))
+            proc.stdin.flush()
+            proc.stdin.close()
+            proc.wait(timeout=timeout)
+        except (OSError, subprocess.TimeoutExpired):
+            kill_tree(proc)
+
+    def _current_job(self, proc):
+        # the worker handles requests in order, so stray output belongs to the oldest open job
+        for job in self._jobs.values():
+            if job._proc is proc and job.running:
+                return job
+        return None
+
+    def _read_stdout(self, proc):
+        for raw in iter(proc.stdout.readline, ""):
+            raw = raw.rstrip("\r\n")
+            try:
+                msg = json.loads(raw)
+            except ValueError:
+                msg = None
+            if not isinstance(msg, dict):
+                # something in the script wrote straight to the console
+                job = self._current_job(proc)
+                if job is not None and raw:
+                    job.events.put(("out", raw))
+                continue
+            event = msg.get("event")
+            if event == "ready":
+                self.pid = msg.get("pid", self.pid)
+                continue
+            job = self._jobs.get(msg.get("id"))
+            if job is None:
+                continue
+            if event in ("out", "err"):
+                job.events.put((event, str(msg.get("line", ""))))
+            elif event == "done":
+                self._jobs.pop(job.id, None)
+                job._finish(int(msg.get("code") or 0), msg.get("error"))
+        proc.wait()
+        # worker gone (exited, crashed or cancelled): fail whatever it still owed us
+        with self._lock:
+            orphans = [j for j in self._jobs.values() if j._proc is proc]
+            for job in orphans:
+                self._jobs.pop(job.id, None)
+        for job in orphans:
+            job._finish(-1, None if job.cancelled else f"Worker exited with code {proc.returncode}")
+
+    def _read_stderr(self, proc):
+        for raw in iter(proc.stderr.readline, ""):
+            job = self._current_job(proc)
+            if job is not None:
+                job.events.put(("err", raw.rstrip("\r\n")))
+
+
+class WorkerPool:
+    """Up to `size` WorkerClients, started on demand and kept for the whole session.
+
+    Used to run independent configurator sections side by side; `first` lets the
+    GUI's already-warm worker be the first one handed out.
+    """
+    def __init__(self, cmd, size, first=None):
+        self.cmd = list(cmd)
+        self.size = max(1, size)
+        self._free = queue.Queue()
+        self._clients = []
+        self._lock = threading.Lock()
+        if first is not None:
+            self._clients.append(first)
+            self._free.put(first)
+
+    def acquire(self) -> WorkerClient:
+        try:
+            return self._free.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._clients) < self.size:
+                client = WorkerClient(self.cmd)
+                self._clients.append(client)
+                return client
+        return self._free.get()
+
+    def release(self, client):
+        self._free.put(client)
+
+    def close(self):
+        for client in self._clients:
+            client.close()
@@ -0,0 +1,99 @@
+"""Stand-in for ps_worker.ps1 that speaks the same JSON-lines protocol.
+
+Nothing is changed on the machine: every op just reports what the real
+worker would have done. Used automatically off Windows (see
+ps_worker.worker_command) so the GUI plumbing can be exercised on Linux.
+
+Extra ops for exercising the client: `sleep` {seconds} and `fail` {message}.
+"""
+import json
+import os
+import sys
+import time
+
+
+def _send(obj):
+    sys.stdout.write(json.dumps(obj) + "\n")
+    sys.stdout.flush()
+
+
+def _step_events(params, out):
+    """Emit the -StepEvents records the real script would, with made-up timings."""
+    import datetime
+    import configurator_plan as _plan
+    skip = params.get("SkipSteps") or []
+    if isinstance(skip, str):
+        skip = skip.split(",")
+    plan = _plan.build_plan(params, scheme=_plan.SCHEME_PLACEHOLDER)
+    by_section = {}
+    for step in plan:
+        by_section.setdefault(step.section, []).append(step)
+
+    def record(kind, sid, desc, ms, status):
+        now = datetime.datetime.now(datetime.timezone.utc)
+        out("@@event " + json.dumps({
+            "type": kind, "id": sid, "section": sid.split(".")[0], "description": desc,
+            "start": (now - datetime.timedelta(milliseconds=ms)).isoformat(), "end": now.isoformat(),
+            "duration_ms": ms, "status": status, "exit_code": 0, "error": None}))
+
+    for section, steps in by_section.items():
+        total = 0.0
+        for step in steps:
+            status = "skipped" if step.id in skip else "dryrun" if params.get("DryRun") else "ok"
+            ms = 0.0 if status != "ok" else float(5 + len(step.id) * 3)
+            total += ms
+            record("step", step.id, step.description, ms, status)
+        record("section", section, section, total, "ok")
+
+
+def _handle(op, args, out):
+    if op == "ping":
+        out("pong")
+    elif op == "rename":
+        out(f"Rename-Computer -NewName '{args['name']}' -Force (stub)")
+    elif op == "restart":
+        out("Restart-Computer -Force (stub)")
+    elif op == "configure":
+        params = args.get("params") or {}
+        if params.get("DryRun"):
+            out("Dry run mode: no changes will be made.")
+        rendered = " ".join(f"-{k}" if v is True else f"-{k} {','.join(map(str, v)) if isinstance(v, list) else v}"
+                            for k, v in params.items() if v not in (None, False, "", []))
+        out(f"{os.path.basename(args.get('script', 'configure-windows.ps1'))} {rendered} (stub)")
+        if params.get("StepEvents"):
+            _step_events(params, out)
+        out("Done.")
+    elif op == "sleep":
+        time.sleep(float(args.get("seconds", 1)))
+        out("slept")
+    elif op == "fail":
+        raise RuntimeError(args.get("message", "failure requested"))
+    else:
+        raise ValueError(f"Unknown op: {op}")
+
+
+def main():
+    _send({"event": "ready", "pid": os.getpid()})
+    for raw in sys.stdin:
+        raw = raw.strip()
+        if not raw:
+            continue
+        try:
+            req = json.loads(raw)
+        except ValueError as e:
+            _send({"id": None, "event": "done", "code": 2, "error": f"Bad request: {e}"})
+            continue
+        rid = req.get("id")
+        if req.get("op") == "shutdown":
+            _send({"id": rid, "event": "done", "code": 0, "error": None})
+            break
+        try:
+            _handle(req.get("op"), req.get("args") or {},
+                    lambda line: _send({"id": rid, "event": "out", "line": line}))
+            _send({"id": rid, "event": "done", "code": 0, "error": None})
+        except Exception as e:
+            _send({"id": rid, "event": "done", "code": 1, "error": str(e)})
+
+
+if __name__ == "__main__":
+    main()
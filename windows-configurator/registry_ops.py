@@ -0,0 +1,180 @@
+"""Batched registry writes done in-process instead of one PowerShell cmdlet per value.
+
+A batch is a list of RegistryWrite items applied in order. Consecutive writes
+to the same key share one open handle; a write with name=None only ensures
+the key exists (like `New-Item -Force`, but without wiping an existing key).
+Every write gets a RegistryResult, and a failure never stops the rest of
+the batch.
+
+Backends share the batch logic (and delete_value) in RegistryBackend and only
+implement the primitives:
+    WinregBackend          the real registry through winreg (Windows only)
+    MemoryRegistryBackend  an in-memory registry for tests and non-Windows runs
+"""
+from typing import NamedTuple
+
+HIVES = ("HKCU", "HKLM", "HKCR", "HKU")
+VALUE_TYPES = ("DWord", "QWord", "String", "ExpandString")
+
+
+class RegistryWrite(NamedTuple):
+    key: str
+    name: object = None
+    value: object = None
+    type: str = "DWord"
+    step_id: object = None
+
+
+class RegistryResult(NamedTuple):
+    write: RegistryWrite
+    ok: bool
+    error: object = None
+
+
+def split_key(key: str):
+    """Split 'HKCU\\Software\\...' into ('HKCU', 'Software\\...')."""
+    hive, _, sub = key.replace("/", "\\").partition("\\")
+    hive = hive.upper().rstrip(":")
+    if hive not in HIVES:
+        raise ValueError(f"Unsupported registry hive in {key!r}")
+    return hive, sub
+
+
+def writes_for_plan(plan, skip=()):
+    """Registry operations from configurator_plan steps, minus any step id in `skip`."""
+    writes = []
+    for step in plan:
+        if step.id in skip:
+            continue
+        if step.kind == "registry-key":
+            writes.append(RegistryWrite(step.op["key"], step_id=step.id))
+        elif step.kind == "registry":
+            op = step.op
+            writes.append(RegistryWrite(op["key"], op["name"], op["value"], op["type"], step.id))
+    return writes
+
+
+class RegistryBackend:
+    """Batch semantics shared by every backend."""
+
+    def apply(self, writes):
+        results = []
+        handle, handle_key, open_error = None, None, None
+        try:
+            for w in writes:
+                if w.key.lower() != handle_key:
+                    if handle is not None:
+                        self._close(handle)
+                    handle, handle_key, open_error = None, w.key.lower(), None
+                    try:
+                        handle = self._open(w.key)
+                    except Exception as e:
+                        open_error = f"{type(e).__name__}: {e}"
+                if open_error is not None:
+                    results.append(RegistryResult(w, False, open_error))
+                    continue
+                if w.name is None:
+                    results.append(RegistryResult(w, True))
+                    continue
+                try:
+                    if w.type not in VALUE_TYPES:
+                        raise ValueError(f"Unsupported value type {w.type!r}")
+                    self._set(handle, w.name, w.value, w.type)
+                    results.append(RegistryResult(w, True))
+                except Exception as e:
+                    results.append(RegistryResult(w, False, f"{type(e).__name__}: {e}"))
+        finally:
+            if handle is not None:
+                self._close(handle)
+        return results
+
+    def delete_value(self, key, name):
+        """Remove one value; a value that is already gone counts as success."""
+        w = RegistryWrite(key, name)
+        try:
+            handle = self._open(key)
+        except Exception as e:
+            return RegistryResult(w, False, f"{type(e).__name__}: {e}")
+        try:
+            self._delete(handle, name)
+            return RegistryResult(w, True)
+        except FileNotFoundError:
+            return RegistryResult(w, True)
+        except Exception as e:
+            return RegistryResult(w, False, f"{type(e).__name__}: {e}")
+        finally:
+            self._close(handle)
+
+    def _open(self, key):
+        """Open `key` for writing, creating it when missing; return a handle."""
+        raise NotImplementedError
+
+    def _set(self, handle, name, value, value_type):
+        raise NotImplementedError
+
+    def _delete(self, handle, name):
+        raise NotImplementedError
+
+    def _close(self, handle):
+        pass
+
+
+class WinregBackend(RegistryBackend):
+    def __init__(self):
+        import winreg
+        self._winreg = winreg
+        self._hives = {
+            "HKCU": winreg.HKEY_CURRENT_USER,
+            "HKLM": winreg.HKEY_LOCAL_MACHINE,
+            "HKCR": winreg.HKEY_CLASSES_ROOT,
+            "HKU": winreg.HKEY_USERS,
+        }
+        self._types = {
+            "DWord": winreg.REG_DWORD,
+            "QWord": winreg.REG_QWORD,
+            "String": winreg.REG_SZ,
+            "ExpandString": winreg.REG_EXPAND_SZ,
+        }
+
+    def _open(self, key):
+        hive, sub = split_key(key)
+        return self._winreg.CreateKeyEx(self._hives[hive], sub, 0, self._winreg.KEY_SET_VALUE)
+
+    def _set(self, handle, name, value, value_type):
+        self._winreg.SetValueEx(handle, name, 0, self._types[value_type], value)
+
+    def _delete(self, handle, name):
+        self._winreg.DeleteValue(handle, name)
+
+    def _close(self, handle):
+        handle.Close()
+
+
+class MemoryRegistryBackend(RegistryBackend):
+    """Registry kept in a dict: {key (lower case): {value name: (value, type)}}.
+
+    Keys listed in `deny` raise PermissionError on open, to exercise error reporting.
+    """
+    def __init__(self, deny=()):
+        self.keys = {}
+        self.deny = {k.lower() for k in deny}
+        self.opens = 0
+
+    def _open(self, key):
+        split_key(key)
+        if key.lower() in self.deny:
+            raise PermissionError(f"Access is denied: {key}")
+        self.opens += 1
+        return self.keys.setdefault(key.lower(), {})
+
+    def _set(self, handle, name, value, value_type):
+        if value_type in ("DWord", "QWord") and not isinstance(value, int):
+            raise TypeError(f"{value_type} value must be an int, got {type(value).__name__}")
+        handle[name] = (value, value_type)
+
+    def _delete(self, handle, name):
+        handle.pop(name, None)
+
+    def read(self, key, name):
+        entry = self.keys.get(key.lower(), {}).get(name)
+        return entry[0] if entry else None
@@ -0,0 +1,476 @@
+"""Archive of every preview and apply run's output, compressed and searchable.
+
+Each run is two files under %LOCALAPPDATA%\\CCI_New_PC_Setup\\archive:
+
+    <run id>.json     metadata: kind, title, machine, app version, selections,
+                      start and finish times, status
+    <run id>.log.gz   the output, gzip'd once the run finishes (<run id>.log
+                      while it is still being written)
+
+index.bin (marshal) holds the metadata of every run plus an inverted index:
+each lower-cased word of two or more characters (plain numbers aside) maps to
+the packed sequence numbers of the runs containing it. search() narrows the runs down through the
+index (a search word may be any part of an indexed word) and only then
+decompresses the candidates to find the matching lines, so weeks of runs are
+searched in well under a second. A missing or unreadable index is rebuilt
+from the run files.
+
+Runs older than `max_age_days` are dropped, then the oldest runs until the
+compressed logs fit in `max_bytes`. recover() finishes a .log left by a
+crashed process as "interrupted".
+
+    python run_archive.py list [--kind apply]
+    python run_archive.py search "Access is denied" [--kind apply]
+    python run_archive.py show <run id>
+"""
+import argparse
+import datetime
+import gzip
+import json
+import marshal
+import os
+import re
+import shutil
+import socket
+import sys
+import threading
+import time
+import uuid
+from array import array
+from bisect import bisect_right
+from typing import NamedTuple
+
+import app_version as _av
+from app_paths import app_data_dir
+
+INDEX_NAME = "index.bin"
+INDEX_VERSION = 1
+_FEW = 8
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+DEFAULT_MAX_AGE_DAYS = 90
+
+_WORD = re.compile(r"\w{2,}")
+# plain numbers (times, durations, counters) and hex ids (GUIDs, hashes) would swamp the index
+# and are rarely what anyone searches for; search() still finds them by reading the candidates
+_UNINDEXED = re.compile(r"^(?:\d+|(?=[0-9a-f]*\d)[0-9a-f]{8,})$")
+# any all-hex query word may be part of such an unindexed token, so it cannot narrow the runs
+_HEX = re.compile(r"^[0-9a-f]+$")
+
+
+def default_archive_dir() -> str:
+    return app_data_dir("archive")
+
+
+def machine_name() -> str:
+    return os.environ.get("COMPUTERNAME") or socket.gethostname().split(".")[0]
+
+
+def _now():
+    return datetime.datetime.now().isoformat(timespec="seconds")
+
+
+def _pid_alive(pid) -> bool:
+    if not pid:
+        return False
+    if os.name == "nt":
+        import ctypes
+        kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        handle = kernel32.OpenProcess(0x1000, False, int(pid))  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        code = ctypes.c_ulong()
+        try:
+            return bool(kernel32.GetExitCodeProcess(handle, ctypes.byref(code))) and code.value == 259  # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+def _terms(fh):
+    terms = set()
+    for line in fh:
+        terms.update(_WORD.findall(line.lower()))
+    return {t for t in terms if not _UNINDEXED.match(t)}
+
+
+class RunInfo(NamedTuple):
+    id: str
+    kind: str
+    title: str
+    machine: str
+    version: str
+    selections: dict
+    started: str
+    finished: object
+    status: str
+    exit_code: object
+    stored_bytes: int
+    started_ts: float
+
+    @classmethod
+    def from_meta(cls, meta):
+        return cls(**{f: meta.get(f) for f in cls._fields})
+
+
+class Hit(NamedTuple):
+    run: RunInfo
+    line_no: int
+    line: str
+
+
+class RunRecorder:
+    """Output of one run in progress; append() from any thread, then finish() once."""
+    def __init__(self, archive, meta):
+        self.archive = archive
+        self.meta = meta
+        self.id = meta["id"]
+        self._lock = threading.Lock()
+        self._fh = open(archive._path(self.id, ".log"), "w", encoding="utf-8", errors="replace", newline="\n")
+
+    def append(self, text):
+        with self._lock:
+            if self._fh is not None and text:
+                self._fh.write(text)
+
+    def finish(self, status="ok", exit_code=None):
+        """Compress, index and rotate; returns the RunInfo."""
+        with self._lock:
+            if self._fh is None:
+                return RunInfo.from_meta(self.meta)
+            self._fh.close()
+            self._fh = None
+        return self.archive._finish(self.meta, status, exit_code)
+
+
+class RunArchive:
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES, max_age_days=DEFAULT_MAX_AGE_DAYS):
+        self.directory = directory or default_archive_dir()
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self._lock = threading.RLock()
+        self._index = None
+        self._index_stamp = None
+        self._blob = None
+
+    def _path(self, run_id, suffix):
+        return os.path.join(self.directory, run_id + suffix)
+
+    # --- index -------------------------------------------------------------
+
+    def _load(self):
+        """The index, re-read when another process rewrote it; rebuilt when missing or unreadable."""
+        path = os.path.join(self.directory, INDEX_NAME)
+        try:
+            st = os.stat(path)
+            stamp = (st.st_size, st.st_mtime_ns)
+        except OSError:
+            stamp = None
+        if self._index is not None and stamp == self._index_stamp:
+            return self._index
+        index = None
+        if stamp is not None:
+            try:
+                with open(path, "rb") as fh:
+                    index = marshal.loads(fh.read())
+                if not isinstance(index, dict) or index.get("version") != INDEX_VERSION:
+                    index = None
+            except (OSError, EOFError, ValueError, TypeError):
+                index = None
+        if index is None:
+            index = self._rebuild()
+        else:
+            self._index, self._index_stamp, self._blob = index, stamp, None
+        return index
+
+    def _rebuild(self):
+        index = {"version": INDEX_VERSION, "next": 0, "runs": {}, "terms": {}}
+        postings = {}
+        metas = []
+        for name in os.listdir(self.directory) if os.path.isdir(self.directory) else ():
+            if name.endswith(".json") and os.path.exists(self._path(name[:-5], ".log.gz")):
+                try:
+                    with open(os.path.join(self.directory, name), encoding="utf-8") as fh:
+                        metas.append(json.load(fh))
+                except (OSError, ValueError):
+                    continue
+        # sequence numbers follow the start times, like runs finished in order
+        for meta in sorted(metas, key=lambda m: (m.get("started_ts") or 0, m.get("id", ""))):
+            try:
+                with gzip.open(self._path(meta["id"], ".log.gz"), "rt", encoding="utf-8", errors="replace") as fh:
+                    terms = _terms(fh)
+            except (OSError, EOFError, KeyError):
+                continue
+            seq = index["next"]
+            index["next"] += 1
+            index["runs"][seq] = meta
+            for t in terms:
+                postings.setdefault(t, array("I")).append(seq)
+        index["terms"] = {t: p.tobytes() for t, p in postings.items()}
+        self._save(index)
+        return index
+
+    def _save(self, index):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, INDEX_NAME)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as fh:
+            fh.write(marshal.dumps(index))
+        os.replace(tmp, path)
+        st = os.stat(path)
+        self._index, self._index_stamp, self._blob = index, (st.st_size, st.st_mtime_ns), None
+
+    def _term_blob(self):
+        """Every indexed word in one newline-joined string, for finding the words that contain a search word."""
+        if self._blob is None:
+            terms = sorted(self._index["terms"])
+            starts, pos = array("q"), 0
+            for t in terms:
+                starts.append(pos)
+                pos += len(t) + 1
+            self._blob = ("\n".join(terms) + "\n", starts, terms)
+        return self._blob
+
+    # --- writing -----------------------------------------------------------
+
+    def begin(self, kind, title, selections=None):
+        """Start recording a run; returns its RunRecorder."""
+        os.makedirs(self.directory, exist_ok=True)
+        started = time.time()
+        run_id = (datetime.datetime.fromtimestamp(started).strftime("%Y%m%d-%H%M%S-")
+                  + re.sub(r"\W", "", kind)[:16] + "-" + uuid.uuid4().hex[:6])
+        meta = {"id": run_id, "kind": kind, "title": title, "machine": machine_name(), "version": _av.read_version(),
+                "selections": dict(selections or {}), "started": _now(), "finished": None, "status": "running",
+                "exit_code": None, "stored_bytes": 0, "started_ts": started, "pid": os.getpid()}
+        self._write_meta(meta)
+        return RunRecorder(self, meta)
+
+    def record(self, kind, title, text, selections=None, status="ok"):
+        """Archive a run whose whole output is already known (a preview)."""
+        rec = self.begin(kind, title, selections)
+        rec.append(text)
+        return rec.finish(status)
+
+    def _write_meta(self, meta):
+        path = self._path(meta["id"], ".json")
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(meta, fh)
+        os.replace(tmp, path)
+
+    def _finish(self, meta, status, exit_code):
+        plain, packed = self._path(meta["id"], ".log"), self._path(meta["id"], ".log.gz")
+        with open(plain, "rb") as src, gzip.open(packed + ".tmp", "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(packed + ".tmp", packed)
+        with open(plain, encoding="utf-8", errors="replace") as fh:
+            terms = _terms(fh)
+        meta = dict(meta, finished=_now(), status=status, exit_code=exit_code, stored_bytes=os.path.getsize(packed))
+        self._write_meta(meta)
+        os.remove(plain)
+        with self._lock:
+            index = self._load()
+            if not any(m["id"] == meta["id"] for m in index["runs"].values()):
+                seq = index["next"]
+                index["next"] += 1
+                index["runs"][seq] = meta
+                postings = index["terms"]
+                packed_seq = array("I", [seq]).tobytes()
+                for t in terms:
+                    postings[t] = postings.get(t, b"") + packed_seq
+            self._rotate(index)
+            self._save(index)
+        return RunInfo.from_meta(meta)
+
+    def _rotate(self, index):
+        runs = index["runs"]
+        cutoff = time.time() - self.max_age_days * 86400.0
+        doomed = {seq for seq, m in runs.items() if (m.get("started_ts") or 0) < cutoff}
+        total = sum(m.get("stored_bytes") or 0 for seq, m in runs.items() if seq not in doomed)
+        for seq in sorted(runs):
+            if total <= self.max_bytes:
+                break
+            if seq not in doomed:
+                doomed.add(seq)
+                total -= runs[seq].get("stored_bytes") or 0
+        if not doomed:
+            return []
+        removed = []
+        for seq in doomed:
+            meta = runs.pop(seq)
+            removed.append(meta["id"])
+            for suffix in (".log.gz", ".json"):
+                try:
+                    os.remove(self._path(meta["id"], suffix))
+                except OSError:
+                    pass
+        terms = index["terms"]
+        for t in list(terms):
+            p = array("I")
+            p.frombytes(terms[t])
+            kept = array("I", [s for s in p if s not in doomed])
+            if kept:
+                terms[t] = kept.tobytes()
+            else:
+                del terms[t]
+        return removed
+
+    def recover(self):
+        """Finish the runs a crash left unfinished as "interrupted"; returns their ids."""
+        if not os.path.isdir(self.directory):
+            return []
+        done = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".log"):
+                continue
+            run_id = name[:-4]
+            try:
+                with open(self._path(run_id, ".json"), encoding="utf-8") as fh:
+                    meta = json.load(fh)
+                if meta.get("pid") == os.getpid() or _pid_alive(meta.get("pid")):
+                    continue  # still being written by a running process
+                self._finish(meta, "interrupted", None)
+                done.append(run_id)
+            except (OSError, ValueError):
+                continue
+        return done
+
+    # --- reading -----------------------------------------------------------
+
+    def runs(self, kind=None):
+        """Archived runs, newest first."""
+        with self._lock:
+            index = self._load()
+            metas = [index["runs"][seq] for seq in sorted(index["runs"], reverse=True)]
+        return [RunInfo.from_meta(m) for m in metas if kind is None or m.get("kind") == kind]
+
+    def latest(self, kind=None):
+        runs = self.runs(kind)
+        return runs[0] if runs else None
+
+    def read(self, run_id):
+        with gzip.open(self._path(run_id, ".log.gz"), "rt", encoding="utf-8", errors="replace") as fh:
+            return fh.read()
+
+    def export(self, run_id, path):
+        """Write the run's metadata as a header, then its output, to `path`."""
+        run = next((r for r in self.runs() if r.id == run_id), None)
+        with open(path, "w", encoding="utf-8", newline="\n") as out:
+            if run is not None:
+                out.write(format_header(run) + "\n\n")
+            with gzip.open(self._path(run_id, ".log.gz"), "rt", encoding="utf-8", errors="replace") as fh:
+                shutil.copyfileobj(fh, out)
+
+    def candidates(self, needle):
+        """Sequence numbers of the runs that may contain `needle` (a superset); None means every run."""
+        # short words are in nearly every run and narrow nothing down
+        words = [w for w in re.findall(r"\w+", needle.lower()) if len(w) >= 3 and not _HEX.match(w)]
+        if not words:
+            return None
+        blob, starts, terms = self._term_blob()
+        postings = self._index["terms"]
+        result = None
+        for w in sorted(set(words), key=len, reverse=True):
+            seqs = set()
+            exact = postings.get(w)
+            if exact is not None:
+                seqs.update(array("I", exact))
+            pos = blob.find(w)
+            while pos >= 0:
+                i = bisect_right(starts, pos) - 1
+                if terms[i] != w:
+                    seqs.update(array("I", postings[terms[i]]))
+                # skip to the next word; one match per word is enough
+                nxt = starts[i + 1] if i + 1 < len(starts) else len(blob)
+                pos = blob.find(w, nxt)
+            result = seqs if result is None else result & seqs
+            if len(result) <= _FEW:
+                break  # reading a handful of runs is cheaper than narrowing further
+        return result
+
+    def search(self, needle, kind=None, limit=200):
+        """Lines containing `needle` (case-insensitive), newest run first."""
+        needle_l = needle.lower()
+        hits = []
+        with self._lock:
+            index = self._load()
+            seqs = self.candidates(needle)
+            if seqs is None:
+                seqs = set(index["runs"])
+            metas = [index["runs"][s] for s in sorted(seqs, reverse=True) if s in index["runs"]]
+        for meta in metas:
+            if kind is not None and meta.get("kind") != kind:
+                continue
+            run = RunInfo.from_meta(meta)
+            try:
+                with gzip.open(self._path(run.id, ".log.gz"), "rt", encoding="utf-8", errors="replace") as fh:
+                    text = fh.read()
+            except (OSError, EOFError):
+                continue
+            if needle_l not in text.lower():
+                continue
+            for no, line in enumerate(text.splitlines(), 1):
+                if needle_l in line.lower():
+                    hits.append(Hit(run, no, line))
+                    if len(hits) >= limit:
+                        return hits
+        return hits
+
+
+def format_header(run):
+    lines = [f"Run:        {run.id}",
+             f"Kind:       {run.kind} - {run.title}",
+             f"Machine:    {run.machine} (app {run.version})",
+             f"Started:    {run.started}",
+             f"Finished:   {run.finished or '-'} ({run.status}"
+             + (f", exit code {run.exit_code})" if run.exit_code is not None else ")")]
+    chosen = sorted(k for k, v in (run.selections or {}).items() if v is True)
+    if chosen:
+        lines.append(f"Selections: {', '.join(chosen)}")
+    values = {k: v for k, v in (run.selections or {}).items() if not isinstance(v, bool) and v not in (None, "", [])}
+    for k, v in sorted(values.items()):
+        lines.append(f"  {k} = {v}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="List, search and show archived run output.")
+    ap.add_argument("--dir", default=None, help="archive folder (default: under %%LOCALAPPDATA%%)")
+    sub = ap.add_subparsers(dest="command", required=True)
+    ls = sub.add_parser("list")
+    ls.add_argument("--kind")
+    sp = sub.add_parser("search")
+    sp.add_argument("text")
+    sp.add_argument("--kind")
+    sp.add_argument("--limit", type=int, default=200)
+    sh = sub.add_parser("show")
+    sh.add_argument("run_id")
+    args = ap.parse_args(argv)
+    archive = RunArchive(args.dir)
+    if args.command == "list":
+        for r in archive.runs(args.kind):
+            print(f"{r.id:<40} {r.status:<12} {r.title}")
+        return 0
+    if args.command == "search":
+        started = time.perf_counter()
+        hits = archive.search(args.text, kind=args.kind, limit=args.limit)
+        for h in hits:
+            print(f"{h.run.id}:{h.line_no}: {h.line}")
+        print(f"{len(hits)} line(s) in {(time.perf_counter() - started) * 1000.0:.0f} ms", file=sys.stderr)
+        return 0 if hits else 1
+    run = next((r for r in archive.runs() if r.id == args.run_id), None)
+    if run is None:
+        print(f"No archived run {args.run_id}", file=sys.stderr)
+        return 1
+    print(format_header(run) + "\n")
+    sys.stdout.write(archive.read(run.id))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
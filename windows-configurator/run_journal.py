@@ -0,0 +1,327 @@
+"""Checkpoint journal of a configurator run, so an interrupted run can resume.
+
+Each run gets an id and one JSON file under
+%LOCALAPPDATA%\\CCI_New_PC_Setup\\runs. The file is rewritten atomically
+(temp file, fsync, os.replace) every time a step finishes, from the
+-StepEvents records, so a crash or a reboot at any point leaves the previous
+or the new version on disk, never a torn one.
+
+A step counts as completed when the script reports it ok or skipped (it
+already had the right value, or was written natively before the run).
+resume_params() returns the run's parameters with every completed step in
+SkipSteps and the Do* switch of every finished section dropped, so the
+script continues at the first unfinished step instead of starting over.
+
+Run status: "running" while a run is in progress (a run still "running" when
+the app starts was interrupted), "incomplete" when it ended with steps left
+to do, "done", or "dismissed" when the user declined to resume it.
+register_resume() adds a RunOnce entry that starts the app with
+--resume <run id> at the next logon.
+
+FakeExecutor plays a plan into a journal the way the script reports it and
+can crash at any step (SimulatedCrash), for exercising resume without a VM.
+"""
+import datetime
+import json
+import os
+import subprocess
+import sys
+import uuid
+
+import configurator_plan as _plan
+from app_paths import app_data_dir
+from step_events import StepEvent
+
+RUNNING = "running"
+INCOMPLETE = "incomplete"
+DONE = "done"
+DISMISSED = "dismissed"
+
+RUNONCE_KEY = r"HKCU\Software\Microsoft\Windows\CurrentVersion\RunOnce"
+RUNONCE_VALUE = "CCI_New_PC_Setup_Resume"
+
+# statuses that mean a step needs no further work
+_COMPLETED = ("ok", "skipped", "native")
+
+
+def default_journal_dir() -> str:
+    return app_data_dir("runs")
+
+
+def new_run_id() -> str:
+    return datetime.datetime.now().strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+
+
+def _now() -> str:
+    return datetime.datetime.now().isoformat(timespec="seconds")
+
+
+def atomic_write_json(path, data):
+    """Replace `path` with `data` so readers see either the old or the new file."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(data, fh, indent=1)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+
+
+class RunJournal:
+    def __init__(self, path, data):
+        self.path = path
+        self.data = data
+
+    @classmethod
+    def create(cls, params, directory=None, run_id=None):
+        directory = directory or default_journal_dir()
+        os.makedirs(directory, exist_ok=True)
+        run_id = run_id or new_run_id()
+        params = {k: v for k, v in params.items() if k not in ("SkipSteps", "StepEvents", "DryRun")}
+        journal = cls(os.path.join(directory, f"{run_id}.json"), {
+            "run_id": run_id,
+            "created": _now(),
+            "updated": _now(),
+            "status": RUNNING,
+            "resumes": 0,
+            "params": params,
+            "steps": {},
+            "sections": {},
+        })
+        journal.save()
+        return journal
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as fh:
+            return cls(path, json.load(fh))
+
+    @property
+    def run_id(self) -> str:
+        return self.data["run_id"]
+
+    @property
+    def params(self) -> dict:
+        return dict(self.data["params"])
+
+    @property
+    def status(self) -> str:
+        return self.data["status"]
+
+    def completed(self):
+        """Ids of the steps that need no further work."""
+        return [sid for sid, s in self.data["steps"].items() if s["status"] in _COMPLETED]
+
+    def failed(self):
+        return {sid: s.get("error") for sid, s in self.data["steps"].items() if s["status"] == "failed"}
+
+    def save(self):
+        self.data["updated"] = _now()
+        atomic_write_json(self.path, self.data)
+
+    def record(self, event: StepEvent):
+        """Checkpoint one -StepEvents record; dry-run records are ignored."""
+        if event.status == "dryrun":
+            return
+        entry = {"status": event.status, "end": event.end, "duration_ms": event.duration_ms}
+        if event.error:
+            entry["error"] = event.error
+        if event.type == "section":
+            self.data["sections"][event.id] = entry
+        else:
+            previous = self.data["steps"].get(event.id)
+            # a step done earlier and skipped on resume keeps its original record
+            if event.status == "skipped" and previous and previous["status"] in _COMPLETED:
+                return
+            self.data["steps"][event.id] = entry
+        self.save()
+
+    def mark_completed(self, step_ids, status="native"):
+        """Record steps finished outside the script (the native registry batch), in one write."""
+        for sid in step_ids:
+            self.data["steps"][sid] = {"status": status, "end": _now(), "duration_ms": 0.0}
+        self.save()
+
+    def mark_section(self, section, status="ok", error=None):
+        """Record a section run outside the script, such as the Windows Update job."""
+        self.data["sections"][section] = {"status": status, "end": _now(), "duration_ms": 0.0, "error": error}
+        self.save()
+
+    def remaining_sections(self, **plan_kwargs):
+        """Selected sections that still have unfinished steps, in script order."""
+        params = self.params
+        done = set(self.completed())
+        plan = _plan.build_plan(params, **plan_kwargs)
+        remaining = []
+        for section in _plan.selected_sections(params):
+            if section == "windowsupdate":
+                # run by its own job, which reports the section as a whole
+                if self.data["sections"].get(section, {}).get("status") != "ok":
+                    remaining.append(section)
+            elif any(s.id not in done for s in plan if s.section == section):
+                remaining.append(section)
+        return remaining
+
+    def first_unfinished(self, **plan_kwargs):
+        """The PlanStep a resumed run starts at, or None when nothing is left."""
+        done = set(self.completed())
+        remaining = set(self.remaining_sections(**plan_kwargs))
+        for step in _plan.build_plan(self.params, **plan_kwargs):
+            if step.section in remaining and step.id not in done:
+                return step
+        return None
+
+    def resume_params(self, **plan_kwargs):
+        """Parameters that continue this run, or None when every selected section is finished."""
+        remaining = self.remaining_sections(**plan_kwargs)
+        if not remaining:
+            return None
+        switches = {key: switch for switch, key, _ in _plan.SECTIONS}
+        params = {k: v for k, v in self.params.items() if not k.startswith("Do")}
+        for section in remaining:
+            params[switches[section]] = True
+        skip = self.completed()
+        if skip:
+            params["SkipSteps"] = skip
+        return params
+
+    def start_resume(self):
+        self.data["resumes"] += 1
+        self.data["status"] = RUNNING
+        self.save()
+
+    def dismiss(self):
+        """Stop offering this run for resume."""
+        self.data["status"] = DISMISSED
+        self.save()
+
+    def finish(self, **plan_kwargs):
+        """Close the run: DONE when nothing is left, else INCOMPLETE. Returns the status."""
+        self.data["status"] = INCOMPLETE if self.remaining_sections(**plan_kwargs) else DONE
+        self.save()
+        return self.data["status"]
+
+    def summary(self, **plan_kwargs) -> str:
+        total = len(_plan.build_plan(self.params, **plan_kwargs))
+        done = len(set(self.completed()))
+        first = self.first_unfinished(**plan_kwargs)
+        text = f"Run {self.run_id} (started {self.data['created']}): {done} of {total} steps done"
+        if first is not None:
+            text += f", next: {first.description}"
+        return text
+
+
+def list_runs(directory=None):
+    """Journals in `directory`, newest first; unreadable files are skipped."""
+    directory = directory or default_journal_dir()
+    try:
+        names = sorted((n for n in os.listdir(directory) if n.endswith(".json")), reverse=True)
+    except OSError:
+        return []
+    runs = []
+    for name in names:
+        try:
+            runs.append(RunJournal.load(os.path.join(directory, name)))
+        except (OSError, ValueError, KeyError):
+            continue
+    return runs
+
+
+def find_run(run_id, directory=None):
+    path = os.path.join(directory or default_journal_dir(), f"{run_id}.json")
+    try:
+        return RunJournal.load(path)
+    except (OSError, ValueError):
+        return None
+
+
+def latest_unfinished(directory=None):
+    for journal in list_runs(directory):
+        if journal.status in (RUNNING, INCOMPLETE):
+            return journal
+    return None
+
+
+def dismiss_unfinished(directory=None, keep=None):
+    """Dismiss every unfinished run except `keep` (a run id), e.g. when a new run starts."""
+    for journal in list_runs(directory):
+        if journal.status in (RUNNING, INCOMPLETE) and journal.run_id != keep:
+            journal.dismiss()
+
+
+def prune(directory=None, keep=20):
+    """Delete finished and dismissed journals beyond the newest `keep`."""
+    finished = [j for j in list_runs(directory) if j.status in (DONE, DISMISSED)]
+    for journal in finished[keep:]:
+        try:
+            os.remove(journal.path)
+        except OSError:
+            pass
+
+
+def resume_command(run_id) -> str:
+    """Command line that starts this app and resumes `run_id`."""
+    if getattr(sys, "frozen", False):
+        argv = [sys.executable, "--resume", run_id]
+    else:
+        gui = os.path.join(os.path.dirname(os.path.abspath(__file__)), "computer_namer_gui.py")
+        argv = [sys.executable, gui, "--resume", run_id]
+    return subprocess.list2cmdline(argv)
+
+
+def register_resume(run_id, registry):
+    """Start the app with --resume at the next logon (RunOnce removes the entry when it fires)."""
+    from registry_ops import RegistryWrite
+    return registry.apply([RegistryWrite(RUNONCE_KEY, RUNONCE_VALUE, resume_command(run_id), "String")])[0]
+
+
+def unregister_resume(registry):
+    return registry.delete_value(RUNONCE_KEY, RUNONCE_VALUE)
+
+
+class SimulatedCrash(Exception):
+    pass
+
+
+class FakeExecutor:
+    """Plays the plan for a journal's params into the journal, like the script with -StepEvents.
+
+    `crash_at` is a step id, or the number of steps to execute before crashing; the
+    crash happens before that step is recorded, like a power cut or reboot mid-step.
+    Steps in `fail` are reported failed. `executed` lists every step actually run.
+    """
+    def __init__(self, crash_at=None, fail=(), scheme=None):
+        self.crash_at = crash_at
+        self.fail = set(fail)
+        self.scheme = scheme or _plan.SCHEME_PLACEHOLDER
+        self.executed = []
+
+    def _event(self, kind, sid, description, status, error=None):
+        now = _now()
+        return StepEvent(kind, sid, sid.split(".")[0], description, now, now, 1.0, status,
+                         1 if status == "failed" else 0, error)
+
+    def run(self, journal, params=None):
+        """Run `params` (by default the journal's resume params); returns the journal's final status."""
+        params = journal.resume_params(scheme=self.scheme) if params is None else params
+        if params is None:
+            return journal.finish(scheme=self.scheme)
+        skip = set(params.get("SkipSteps") or ())
+        sections = {}
+        for step in _plan.build_plan(params, scheme=self.scheme):
+            sections.setdefault(step.section, []).append(step)
+        for section, steps in sections.items():
+            status = "ok"
+            for step in steps:
+                if step.id in skip:
+                    journal.record(self._event("step", step.id, step.description, "skipped"))
+                    continue
+                if step.id == self.crash_at or self.crash_at == len(self.executed):
+                    raise SimulatedCrash(step.id)
+                self.executed.append(step.id)
+                if step.id in self.fail:
+                    status = "failed"
+                    journal.record(self._event("step", step.id, step.description, "failed", "simulated failure"))
+                else:
+                    journal.record(self._event("step", step.id, step.description, "ok"))
+            journal.record(self._event("section", section, section, status))
+        return journal.finish(scheme=self.scheme)
@@ -0,0 +1,166 @@
+"""Run configurator sections concurrently where they do not depend on each other.
+
+Sections are the Apply-* functions of configure-windows.ps1, keyed as in
+configurator_plan.SECTIONS. SECTION_DEPS lists, for each section, the
+sections that must finish first (the "after" lists in settings_catalog.json):
+    powerbuttons after power      both change and re-activate the active power scheme
+    windowsupdate after the rest  -AutoReboot may restart the machine when it finishes
+Everything else (taskbar, date/time, notifications, personalization) touches
+unrelated state and can run side by side.
+
+run_sections() is the scheduler; SectionRun wraps it with the same
+events/drain/cancel surface as ps_runner.BackgroundRunner so the GUI can
+stream a concurrent run into the preview pane like a single job.
+worker_executor() builds the usual `execute`: one configure request per
+section, each on a worker taken from a ps_worker.WorkerPool.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import NamedTuple
+
+import configurator_plan as _plan
+import settings_catalog as _catalog
+from ps_runner import drain_events
+
+SECTION_DEPS = _catalog.catalog().section_deps()
+
+
+class SectionResult(NamedTuple):
+    section: str
+    code: int
+    started: float
+    finished: float
+    error: object = None
+
+    @property
+    def duration(self) -> float:
+        return self.finished - self.started
+
+
+def run_sections(sections, execute, max_workers=3, deps=SECTION_DEPS, stop=None):
+    """Run `execute(section)` for every section, honouring `deps` among the selected sections.
+
+    `execute` returns an exit code (or raises). At most `max_workers` sections run at once.
+    When the `stop` event is set, sections not yet started are reported with code -1.
+    Returns SectionResult rows in the order of `sections`.
+    """
+    selected = list(sections)
+    chosen = set(selected)
+    waiting = {s: {d for d in deps.get(s, ()) if d in chosen} for s in selected}
+    results = {}
+
+    def _run(section):
+        started = time.monotonic()
+        try:
+            code = int(execute(section))
+            error = None
+        except Exception as e:
+            code, error = 1, str(e)
+        return SectionResult(section, code, started, time.monotonic(), error)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        running = {}
+        while waiting or running:
+            if stop is not None and stop.is_set():
+                now = time.monotonic()
+                for section in list(waiting):
+                    results[section] = SectionResult(section, -1, now, now, "cancelled")
+                waiting.clear()
+            for section in [s for s in selected if s in waiting and not waiting[s]]:
+                del waiting[section]
+                running[pool.submit(_run, section)] = section
+            if not running:
+                if waiting:
+                    # a dependency cycle among the selected sections; refuse rather than hang
+                    raise ValueError(f"Unsatisfiable section dependencies: {sorted(waiting)}")
+                break
+            done, _ = wait(running, timeout=0.2, return_when=FIRST_COMPLETED)
+            for fut in done:
+                section = running.pop(fut)
+                results[section] = fut.result()
+                for pending in waiting.values():
+                    pending.discard(section)
+    return [results[s] for s in selected]
+
+
+class SectionRun:
+    """Run sections on a background thread and stream their output as one job.
+
+    `execute(section, emit, stop)` runs one section, calls `emit(kind, line)` for its
+    output and returns the exit code; it should return promptly once `stop` is set.
+    Output lines are prefixed with the section name.
+    """
+    def __init__(self, sections, execute, max_workers=3, deps=SECTION_DEPS):
+        self.sections = list(sections)
+        self.events = queue.Queue()
+        self.results = []
+        self.returncode = None
+        self.cancelled = False
+        self._execute = execute
+        self._max_workers = max_workers
+        self._deps = deps
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self.returncode is None
+
+    def start(self):
+        threading.Thread(target=self._main, daemon=True).start()
+        return self
+
+    def _main(self):
+        def _one(section):
+            self.events.put(("out", f"[{section}] started"))
+            emit = lambda kind, line: self.events.put((kind, f"[{section}] {line}"))
+            return self._execute(section, emit, self._stop)
+
+        try:
+            self.results = run_sections(self.sections, _one, self._max_workers, self._deps, self._stop)
+        except Exception as e:
+            self.events.put(("err", f"Section run failed: {e}"))
+            self.returncode = 1
+            self.events.put(("exit", 1))
+            return
+        self.events.put(("out", "Section summary:"))
+        for r in self.results:
+            state = "cancelled" if r.error == "cancelled" else f"exit {r.code}"
+            self.events.put(("out", f"  {r.section:<16} {state:<10} {r.duration:6.1f}s" + (f"  {r.error}" if r.error and r.error != "cancelled" else "")))
+        failed = [r.code for r in self.results if r.code != 0]
+        self.returncode = failed[0] if failed else 0
+        self.events.put(("exit", self.returncode))
+
+    def cancel(self):
+        if self.running:
+            self.cancelled = True
+            self._stop.set()
+
+    def drain(self, max_events=500):
+        return drain_events(self.events, max_events)
+
+
+def worker_executor(pool, script, params):
+    """`execute` for SectionRun: run one section of `params` as a configure request on a pooled worker."""
+    switches = {key: switch for switch, key, _ in _plan.SECTIONS}
+    base = {k: v for k, v in params.items() if not k.startswith("Do")}
+
+    def _execute(section, emit, stop):
+        client = pool.acquire()
+        try:
+            job = client.submit("configure", {"script": script, "params": dict(base, **{switches[section]: True})})
+            while True:
+                if stop.is_set():
+                    job.cancel()
+                try:
+                    kind, payload = job.events.get(timeout=0.2)
+                except queue.Empty:
+                    continue
+                if kind == "exit":
+                    return payload
+                emit(kind, payload)
+        finally:
+            pool.release(client)
+
+    return _execute
@@ -0,0 +1,113 @@
+"""The settings selection as plain data: checklist rows and script parameters.
+
+The GUI snapshots its Tk variables into a dict keyed by the names in
+SELECTION_KEYS and hands it to the functions here, so the rules for which
+checklist rows apply and which configure-windows.ps1 switches are sent can
+be used (and benchmarked) without Tk. The keys, rows and switches come from
+the settings catalog (settings_catalog.json).
+
+Each ChecklistRow lists the selection keys its check reads, so after a
+change only the rows that depend on the changed keys are re-evaluated.
+"""
+from typing import Callable, NamedTuple
+
+import settings_catalog as _catalog
+
+_CATALOG = _catalog.catalog()
+
+# key -> default, in the order the settings tree shows them
+SELECTION_KEYS = _CATALOG.defaults()
+
+# selection key -> Do* switch, in the order the script runs the sections
+SECTION_SWITCHES = [(s.when[0], s.switch) for s in _CATALOG.sections if len(s.when) == 1 and not s.when_any]
+
+# selection key -> script switch of the settings that refine a section
+BUTTON_SWITCHES = [(s.key, s.switch) for s in _CATALOG.settings if s.switch]
+
+
+class ChecklistRow(NamedTuple):
+    desc: str
+    check: Callable
+    deps: tuple
+    tooltip: str = ""
+
+
+def _all_on(keys):
+    truthy = _catalog.truthy
+    return lambda sel: all(truthy(sel.get(key)) for key in keys)
+
+
+def _section_on(section, sel) -> bool:
+    truthy = _catalog.truthy
+    if not all(truthy(sel.get(key)) for key in section.when):
+        return False
+    return not section.when_any or any(truthy(sel.get(key)) for key in section.when_any)
+
+
+CHECKLIST = [ChecklistRow(item.desc, _all_on(item.when), item.when, item.tooltip) for item in _CATALOG.checklist]
+
+
+def default_selection():
+    return dict(SELECTION_KEYS)
+
+
+def dependency_index(rows):
+    """selection key -> descriptions of the rows that read it."""
+    index = {}
+    for row in rows:
+        for dep in row.deps:
+            index.setdefault(dep, []).append(row.desc)
+    return index
+
+
+def row_applies(row, sel) -> bool:
+    try:
+        return bool(row.check(sel))
+    except Exception:
+        return False
+
+
+class Checklist:
+    """Checklist rows plus the state last reported for each, so refresh() only returns changes."""
+    def __init__(self, rows=CHECKLIST):
+        self.rows = {row.desc: row for row in rows}
+        self.index = dependency_index(rows)
+        self.state = {}
+
+    def affected(self, keys):
+        """Rows that read any of `keys`, in checklist order."""
+        hit = set()
+        for key in keys:
+            hit.update(self.index.get(key, ()))
+        return [desc for desc in self.rows if desc in hit]
+
+    def refresh(self, sel, keys=None):
+        """Re-evaluate the rows that depend on `keys` (all rows when None); returns [(desc, applies)] that changed."""
+        descs = self.rows if keys is None else self.affected(keys)
+        changed = []
+        for desc in descs:
+            applies = row_applies(self.rows[desc], sel)
+            if self.state.get(desc) != applies:
+                self.state[desc] = applies
+                changed.append((desc, applies))
+        return changed
+
+
+def selection_params(sel, background=None, dry_run=False):
+    """configure-windows.ps1 parameters for a selection, with no validation."""
+    params = {}
+    if dry_run:
+        params["DryRun"] = True
+    for setting in _CATALOG.settings:
+        if setting.param and _catalog.truthy(sel.get(setting.key)):
+            params[setting.param] = str(sel[setting.key]).strip()
+    if background:
+        params["BackgroundPath"] = background
+    # fine-grained switches (power button actions) refine their section
+    for setting in _CATALOG.settings:
+        if setting.switch and sel.get(setting.key):
+            params[setting.switch] = True
+    for section in _CATALOG.sections:
+        if _section_on(section, sel):
+            params[section.switch] = True
+    return params
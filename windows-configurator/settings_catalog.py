@@ -0,0 +1,555 @@
+"""The settings catalog: one declarative file for everything the tool can set.
+
+settings_catalog.json lists:
+    constants   names usable as {NAME} in any step string (registry paths, GUIDs)
+    groups      top-level nodes of the settings tree, in order
+    settings    selection keys: tree label, group, type (bool or text), default,
+                the script switch or parameter it sets, and its answer-file key
+    sections    configure-windows.ps1 sections in script order: Do* switch, title,
+                the settings that enable it (when / when_any) and the sections
+                that must finish first (after)
+    checklist   "Planned changes" rows: text, the settings they need, tooltip
+    operations  per section, the plan steps in order. A step has an id, the
+                description the script prints, a kind and its op fields;
+                "if"/"unless" name a parameter or plan value ({scheme},
+                {wallpaper}, {pswindowsupdate_installed}) that gates it, and
+                string fields may use those as {placeholders}.
+
+selection.py, configurator_plan.py, section_graph.py, unattended.py and the
+GUI all read the catalog, so adding a setting or a checklist row is a change
+to the JSON file only. Registry steps are written natively before the script
+runs; one that configure-windows.ps1 has no Invoke-IfNotDry -Id for is applied
+natively only, and a failed write is reported as an error instead of being
+retried. Give it an -Id in the script to get the fallback. A section the
+script does not know still needs an Apply-* function in configure-windows.ps1.
+
+The file is validated once and compiled to plain data, which is cached with
+marshal under %LOCALAPPDATA%\\CCI_New_PC_Setup\\cache keyed by the SHA-256 of
+the file, so later starts skip JSON parsing and validation. Set
+CCI_SETTINGS_CATALOG to use another catalog file.
+
+    python settings_catalog.py [catalog.json]    validate and report
+"""
+import hashlib
+import json
+import marshal
+import os
+import re
+import string
+import sys
+from typing import NamedTuple
+
+import profiling
+from app_paths import app_data_dir
+
+CATALOG_NAME = "settings_catalog.json"
+# bump when the compiled layout changes, so older caches are ignored
+CACHE_FORMAT = 1
+
+KINDS = {
+    "command": ("argv",),
+    "registry-key": ("key",),
+    "registry": ("key", "name", "value"),
+    "service": ("action", "name"),
+    "module": ("action", "name"),
+    "wallpaper": ("path",),
+    "open-ui": ("target",),
+}
+# plan values available to templates and conditions besides the script parameters
+PLAN_FIELDS = ("scheme", "wallpaper", "pswindowsupdate_installed", "BackgroundPath", "DryRun")
+
+_ID_RE = re.compile(r"^[a-z][a-z0-9_]*$")
+_SWITCH_RE = re.compile(r"^[A-Za-z][A-Za-z0-9]*$")
+
+
+class CatalogError(Exception):
+    """The catalog cannot be used; `errors` lists every problem found."""
+    def __init__(self, errors):
+        super().__init__("; ".join(errors))
+        self.errors = list(errors)
+
+
+class Group(NamedTuple):
+    id: str
+    title: str
+
+
+class Setting(NamedTuple):
+    key: str
+    group: object
+    label: str
+    type: str
+    default: object
+    switch: object
+    param: object
+    answer: object
+    tooltip: str
+
+
+class Section(NamedTuple):
+    id: str
+    switch: str
+    title: str
+    when: tuple
+    when_any: tuple
+    after: tuple
+
+
+class CheckItem(NamedTuple):
+    desc: str
+    when: tuple
+    tooltip: str
+
+
+class StepTemplate(NamedTuple):
+    id: str
+    section: str
+    description: str
+    kind: str
+    op: dict
+    if_: object
+    unless: object
+    # True when description or op still has {placeholders} to fill per plan
+    templated: bool
+
+
+def default_catalog_path() -> str:
+    override = os.environ.get("CCI_SETTINGS_CATALOG")
+    if override:
+        return override
+    base = getattr(sys, "_MEIPASS", None) or os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base, CATALOG_NAME)
+
+
+def default_cache_dir() -> str:
+    return app_data_dir("cache")
+
+
+def truthy(value) -> bool:
+    """How a selection or parameter value gates a row, section or step (blank text is off)."""
+    if isinstance(value, str):
+        return bool(value.strip())
+    return bool(value)
+
+
+# --- templates -----------------------------------------------------------------
+
+_FORMATTER = string.Formatter()
+
+
+def _fields(text):
+    return [field for _, field, _, _ in _FORMATTER.parse(text) if field is not None]
+
+
+def _substitute(text, constants):
+    """Replace {CONSTANT} fields now and keep the others (and escaped braces) for plan time."""
+    out = []
+    for literal, field, spec, conv in _FORMATTER.parse(text):
+        out.append(literal.replace("{", "{{").replace("}", "}}"))
+        if field is None:
+            continue
+        if field in constants:
+            out.append(str(constants[field]).replace("{", "{{").replace("}", "}}"))
+        else:
+            out.append("{" + field + ("!" + conv if conv else "") + (":" + spec if spec else "") + "}")
+    return "".join(out)
+
+
+def _strings(value):
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, list):
+        for item in value:
+            yield from _strings(item)
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _strings(item)
+
+
+def map_strings(value, fn):
+    if isinstance(value, str):
+        return fn(value)
+    if isinstance(value, list):
+        return [map_strings(item, fn) for item in value]
+    if isinstance(value, dict):
+        return {k: map_strings(v, fn) for k, v in value.items()}
+    return value
+
+
+def unescape(text):
+    """A compiled string with no plan fields left, with {{ }} turned back into braces."""
+    return text.replace("{{", "{").replace("}}", "}")
+
+
+# --- validation ----------------------------------------------------------------
+
+def _list_of(data, name, errors):
+    value = data.get(name)
+    if not isinstance(value, list) or not all(isinstance(item, dict) for item in value):
+        errors.append(f"{name} must be a list of objects")
+        return []
+    return value
+
+
+def _str_list(entry, name, where, errors):
+    value = entry.get(name, [])
+    if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+        errors.append(f"{where}: {name} must be a list of strings")
+        return []
+    return value
+
+
+def validate(data):
+    """Every problem with a parsed catalog, as readable strings (empty when it is usable)."""
+    if not isinstance(data, dict):
+        return ["the catalog must be a JSON object"]
+    errors = []
+    if data.get("version") != 1:
+        errors.append("version must be 1")
+    constants = data.get("constants", {})
+    if not isinstance(constants, dict) or not all(isinstance(v, (str, int)) for v in constants.values()):
+        errors.append("constants must map names to strings or numbers")
+        constants = {}
+
+    groups = set()
+    for i, group in enumerate(_list_of(data, "groups", errors)):
+        gid = group.get("id")
+        if not isinstance(gid, str) or not _ID_RE.match(gid):
+            errors.append(f"groups[{i}]: id must be lower_case")
+        elif gid in groups:
+            errors.append(f"groups[{i}]: duplicate id {gid!r}")
+        groups.add(gid)
+        if not isinstance(group.get("title"), str):
+            errors.append(f"groups[{i}]: title must be a string")
+
+    keys, params, answers = set(), set(), set()
+    for i, setting in enumerate(_list_of(data, "settings", errors)):
+        key = setting.get("key")
+        where = f"settings[{i}]"
+        if not isinstance(key, str) or not _ID_RE.match(key):
+            errors.append(f"{where}: key must be lower_case")
+        elif key in keys:
+            errors.append(f"{where}: duplicate key {key!r}")
+        else:
+            where = f"setting {key!r}"
+        keys.add(key)
+        kind = setting.get("type", "bool")
+        if kind not in ("bool", "text"):
+            errors.append(f"{where}: type must be bool or text")
+        default = setting.get("default", False if kind == "bool" else "")
+        if kind == "bool" and not isinstance(default, bool):
+            errors.append(f"{where}: default must be true or false")
+        if kind == "text" and not isinstance(default, str):
+            errors.append(f"{where}: default must be a string")
+        if not isinstance(setting.get("label"), str):
+            errors.append(f"{where}: label must be a string")
+        group = setting.get("group")
+        if group is not None and group not in groups:
+            errors.append(f"{where}: unknown group {group!r}")
+        if kind == "bool" and group is None:
+            errors.append(f"{where}: a bool setting needs a group")
+        switch, param = setting.get("switch"), setting.get("param")
+        if switch is not None:
+            if kind != "bool" or not isinstance(switch, str) or not _SWITCH_RE.match(switch) or switch.startswith("Do"):
+                errors.append(f"{where}: switch must be a script switch name not starting with 'Do', on a bool setting")
+            params.add(switch)
+        if param is not None:
+            if kind != "text" or not isinstance(param, str) or not _SWITCH_RE.match(param):
+                errors.append(f"{where}: param must be a script parameter name, on a text setting")
+            params.add(param)
+        answer = setting.get("answer")
+        if answer is not None:
+            if not isinstance(answer, str) or not _ID_RE.match(answer):
+                errors.append(f"{where}: answer must be lower_case")
+            elif answer in answers:
+                errors.append(f"{where}: duplicate answer key {answer!r}")
+            answers.add(answer)
+
+    sections = {}
+    for i, section in enumerate(_list_of(data, "sections", errors)):
+        sid = section.get("id")
+        where = f"sections[{i}]"
+        if not isinstance(sid, str) or not _ID_RE.match(sid):
+            errors.append(f"{where}: id must be lower_case")
+        elif sid in sections:
+            errors.append(f"{where}: duplicate id {sid!r}")
+        else:
+            where = f"section {sid!r}"
+        switch = section.get("switch")
+        if not isinstance(switch, str) or not _SWITCH_RE.match(switch) or not switch.startswith("Do"):
+            errors.append(f"{where}: switch must be a Do* script switch")
+        elif switch in params:
+            errors.append(f"{where}: switch {switch!r} is used twice")
+        params.add(switch)
+        if not isinstance(section.get("title"), str):
+            errors.append(f"{where}: title must be a string")
+        for name in ("when", "when_any"):
+            for key in _str_list(section, name, where, errors):
+                if key not in keys:
+                    errors.append(f"{where}: {name} names unknown setting {key!r}")
+        if not section.get("when") and not section.get("when_any"):
+            errors.append(f"{where}: needs when or when_any")
+        sections[sid] = _str_list(section, "after", where, errors)
+    for sid, after in sections.items():
+        for dep in after:
+            if dep not in sections:
+                errors.append(f"section {sid!r}: after names unknown section {dep!r}")
+    errors.extend(_cycles(sections))
+
+    descs = set()
+    for i, row in enumerate(_list_of(data, "checklist", errors)):
+        desc = row.get("desc")
+        where = f"checklist[{i}]"
+        if not isinstance(desc, str) or not desc:
+            errors.append(f"{where}: desc must be a string")
+        elif desc in descs:
+            errors.append(f"{where}: duplicate desc {desc!r}")
+        descs.add(desc)
+        when = _str_list(row, "when", where, errors)
+        if not when:
+            errors.append(f"{where}: when must name at least one setting")
+        for key in when:
+            if key not in keys:
+                errors.append(f"{where}: when names unknown setting {key!r}")
+        if not isinstance(row.get("tooltip", ""), str):
+            errors.append(f"{where}: tooltip must be a string")
+
+    operations = data.get("operations")
+    if not isinstance(operations, dict):
+        errors.append("operations must map section ids to step lists")
+        operations = {}
+    for sid in sections:
+        if sid not in operations:
+            errors.append(f"operations: no steps for section {sid!r}")
+    known = set(constants) | params | set(PLAN_FIELDS)
+    for sid, steps in operations.items():
+        if sid not in sections:
+            errors.append(f"operations: unknown section {sid!r}")
+        if not isinstance(steps, list):
+            errors.append(f"operations.{sid} must be a list")
+            continue
+        ids = set()
+        for i, step in enumerate(steps):
+            errors.extend(_step_errors(sid, i, step, ids, known, constants))
+    return errors
+
+
+def _step_errors(sid, i, step, ids, known, constants):
+    where = f"operations.{sid}[{i}]"
+    if not isinstance(step, dict):
+        return [f"{where} must be an object"]
+    errors = []
+    step_id = step.get("id")
+    if not isinstance(step_id, str) or not _ID_RE.match(step_id):
+        errors.append(f"{where}: id must be lower_case")
+    elif step_id in ids:
+        errors.append(f"{where}: duplicate step id {step_id!r}")
+    else:
+        where = f"step {sid}.{step_id}"
+    ids.add(step_id)
+    if not isinstance(step.get("description"), str):
+        errors.append(f"{where}: description must be a string")
+    kind, op = step.get("kind"), step.get("op")
+    if kind not in KINDS:
+        errors.append(f"{where}: kind must be one of {', '.join(KINDS)}")
+    if not isinstance(op, dict):
+        return errors + [f"{where}: op must be an object"]
+    for field in KINDS.get(kind, ()):
+        if field not in op:
+            errors.append(f"{where}: op needs {field!r}")
+    if kind == "command" and (not isinstance(op.get("argv"), list) or not op.get("argv")
+                              or not all(isinstance(a, str) for a in op["argv"])):
+        errors.append(f"{where}: argv must be a non-empty list of strings")
+    if kind == "registry":
+        from registry_ops import VALUE_TYPES
+        if op.get("type", "DWord") not in VALUE_TYPES:
+            errors.append(f"{where}: type must be one of {', '.join(VALUE_TYPES)}")
+        if op.get("type", "DWord") in ("DWord", "QWord") and not isinstance(op.get("value"), int):
+            errors.append(f"{where}: a {op.get('type', 'DWord')} value must be an integer")
+    if kind in ("registry", "registry-key") and isinstance(op.get("key"), str):
+        from registry_ops import split_key
+        key = op["key"]
+        if not set(_fields(key)) - set(constants):
+            try:
+                split_key(unescape(_substitute(key, constants)))
+            except ValueError as e:
+                errors.append(f"{where}: {e}")
+    for name in ("if", "unless"):
+        gate = step.get(name)
+        if gate is not None and gate not in known:
+            errors.append(f"{where}: {name} names unknown value {gate!r}")
+    for text in _strings([step.get("description", ""), op]):
+        try:
+            fields = _fields(text)
+        except ValueError as e:
+            errors.append(f"{where}: bad template {text!r}: {e}")
+            continue
+        for field in fields:
+            if field not in known:
+                errors.append(f"{where}: unknown placeholder {{{field}}}")
+    return errors
+
+
+def _cycles(after):
+    errors, state = [], {}
+
+    def visit(sid, path):
+        if state.get(sid) == 1:
+            errors.append(f"sections: circular after: {' -> '.join(path + [sid])}")
+            return
+        if state.get(sid) == 2:
+            return
+        state[sid] = 1
+        for dep in after.get(sid, ()):
+            if dep in after:
+                visit(dep, path + [sid])
+        state[sid] = 2
+
+    for sid in after:
+        visit(sid, [])
+    return errors
+
+
+# --- compiling and loading -----------------------------------------------------
+
+def compile_catalog(data):
+    """Validate `data` and flatten it into the plain tuples the cache stores; raises CatalogError."""
+    errors = validate(data)
+    if errors:
+        raise CatalogError(errors)
+    constants = data.get("constants", {})
+    settings = []
+    for s in data["settings"]:
+        kind = s.get("type", "bool")
+        settings.append((s["key"], s.get("group"), s["label"], kind, s.get("default", False if kind == "bool" else ""),
+                         s.get("switch"), s.get("param"), s.get("answer"), s.get("tooltip", "")))
+    sections = [(s["id"], s["switch"], s["title"], tuple(s.get("when", ())), tuple(s.get("when_any", ())),
+                 tuple(s.get("after", ()))) for s in data["sections"]]
+    steps = {}
+    for sid, entries in data["operations"].items():
+        compiled = []
+        for step in entries:
+            op = dict(step["op"])
+            if step["kind"] == "registry":
+                op.setdefault("type", "DWord")
+            if step.get("hex"):
+                op["hex"] = True
+            description = _substitute(step["description"], constants)
+            op = map_strings(op, lambda text: _substitute(text, constants))
+            templated = any(_fields(text) for text in _strings([description, op]))
+            if not templated:
+                description = unescape(description)
+                op = map_strings(op, unescape)
+            compiled.append((step["id"], sid, description, step["kind"], op, step.get("if"), step.get("unless"), templated))
+        steps[sid] = compiled
+    return {
+        "format": CACHE_FORMAT,
+        "groups": [(g["id"], g["title"]) for g in data["groups"]],
+        "settings": settings,
+        "sections": sections,
+        "checklist": [(r["desc"], tuple(r["when"]), r.get("tooltip", "")) for r in data["checklist"]],
+        "steps": steps,
+    }
+
+
+class Catalog:
+    """A compiled catalog; built from the cached plain data, so it holds no JSON."""
+    def __init__(self, compiled, path=None, digest=None, cached=False):
+        self.path = path
+        self.digest = digest
+        self.cached = cached
+        self.groups = [Group._make(g) for g in compiled["groups"]]
+        self.settings = [Setting._make(s) for s in compiled["settings"]]
+        self.sections = [Section._make(s) for s in compiled["sections"]]
+        self.checklist = [CheckItem._make(r) for r in compiled["checklist"]]
+        self.steps = {sid: [StepTemplate._make(s) for s in entries] for sid, entries in compiled["steps"].items()}
+        self.by_key = {s.key: s for s in self.settings}
+
+    def defaults(self):
+        return {s.key: s.default for s in self.settings}
+
+    def section_deps(self):
+        return {s.id: s.after for s in self.sections}
+
+
+def file_digest(raw: bytes) -> str:
+    h = hashlib.sha256(raw)
+    h.update(f"format={CACHE_FORMAT}".encode())
+    return h.hexdigest()
+
+
+def load_catalog(path=None, cache_dir=None, use_cache=True):
+    """Load the catalog at `path`, from the compiled cache when the file is unchanged; raises CatalogError."""
+    path = path or default_catalog_path()
+    try:
+        with open(path, "rb") as fh:
+            raw = fh.read()
+    except OSError as e:
+        raise CatalogError([f"cannot read {path}: {e.strerror or e}"])
+    digest = file_digest(raw)
+    cache_dir = cache_dir or default_cache_dir()
+    cache_path = os.path.join(cache_dir, f"catalog-{digest[:20]}.bin")
+    if use_cache:
+        try:
+            with open(cache_path, "rb") as fh:
+                compiled = marshal.loads(fh.read())
+            if isinstance(compiled, dict) and compiled.get("format") == CACHE_FORMAT:
+                return Catalog(compiled, path, digest, cached=True)
+        except (OSError, EOFError, ValueError, TypeError):
+            pass
+    with profiling.span("catalog.compile", cat="startup"):
+        try:
+            data = json.loads(raw.decode("utf-8-sig"))
+        except ValueError as e:
+            raise CatalogError([f"{path} is not valid JSON: {e}"])
+        compiled = compile_catalog(data)
+    if use_cache:
+        _write_cache(cache_dir, cache_path, compiled)
+    return Catalog(compiled, path, digest)
+
+
+def _write_cache(cache_dir, cache_path, compiled):
+    """Best effort: a read-only profile just means compiling on every start."""
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as fh:
+            fh.write(marshal.dumps(compiled))
+        os.replace(tmp, cache_path)
+        for name in os.listdir(cache_dir):
+            if name.startswith("catalog-") and name.endswith(".bin") and os.path.join(cache_dir, name) != cache_path:
+                os.remove(os.path.join(cache_dir, name))
+    except OSError:
+        pass
+
+
+_CATALOG = None
+
+
+def catalog():
+    """The process-wide catalog, loaded on first use."""
+    global _CATALOG
+    if _CATALOG is None:
+        with profiling.span("catalog.load", cat="startup"):
+            _CATALOG = load_catalog()
+    return _CATALOG
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    path = argv[0] if argv else default_catalog_path()
+    try:
+        cat = load_catalog(path, use_cache=False)
+    except CatalogError as e:
+        print(f"{path}: {len(e.errors)} problem(s)", file=sys.stderr)
+        for error in e.errors:
+            print(f"  {error}", file=sys.stderr)
+        return 1
+    steps = sum(len(s) for s in cat.steps.values())
+    print(f"{path}: ok - {len(cat.groups)} groups, {len(cat.settings)} settings, {len(cat.sections)} sections, "
+          f"{len(cat.checklist)} checklist rows, {steps} steps")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
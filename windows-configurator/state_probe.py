@@ -0,0 +1,200 @@
+"""Read the machine's current state for a plan and diff it against the desired state.
+
+Every probeable plan step (registry values and keys, powercfg indexes,
+service state, time zone, wallpaper) maps to a probe key. A backend reads
+all keys in one batch; diff_plan() then marks each step as "change", "ok"
+or "always" (steps that cannot be probed, e.g. opening a Settings page or
+running Windows Update). The GUI passes the "ok" step ids to the script as
+-SkipSteps so re-runs only touch what differs.
+
+Backends:
+    PowerShellProbeBackend  one PowerShell process reads everything (Windows)
+    FakeProbeBackend        a dict / JSON fixture of machine state (tests, Linux)
+"""
+import base64
+import json
+import subprocess
+from typing import NamedTuple
+
+import profiling
+
+# powercfg -change aliases -> (subgroup, setting) for powercfg /query
+_POWERCFG_CHANGE = {
+    "-disk-timeout": ("SUB_DISK", "DISKIDLE"),
+    "-monitor-timeout": ("SUB_VIDEO", "VIDEOIDLE"),
+    "-standby-timeout": ("SUB_SLEEP", "STANDBYIDLE"),
+}
+
+
+class Probe(NamedTuple):
+    key: str
+    kind: str
+    args: tuple
+    desired: object
+
+
+class SettingDiff(NamedTuple):
+    step: object
+    probe_key: str
+    desired: object
+    actual: object
+    status: str
+
+
+def probe_for(step):
+    """Return the Probe that tells whether `step` is already applied, or None if it cannot be probed."""
+    op, kind = step.op, step.kind
+    if kind == "registry":
+        return Probe(f"reg:{op['key']}:{op['name']}", "registry", (op["key"], op["name"]), op["value"])
+    if kind == "registry-key":
+        return Probe(f"regkey:{op['key']}", "registry-key", (op["key"],), True)
+    if kind == "service" and op["action"] == "stop":
+        return Probe(f"service:{op['name']}:status", "service-status", (op["name"],), "Stopped")
+    if kind == "service" and op["action"] == "disable":
+        return Probe(f"service:{op['name']}:start", "service-start", (op["name"],), "Disabled")
+    if kind == "wallpaper":
+        return Probe("wallpaper", "wallpaper", (), op["path"])
+    if kind == "command":
+        argv = op["argv"]
+        if argv[:2] == ["tzutil", "/s"]:
+            return Probe("timezone", "timezone", (), argv[2])
+        if argv[0] == "powercfg" and argv[1] == "-change":
+            alias, source = argv[2].rsplit("-", 1)
+            sub, setting = _POWERCFG_CHANGE[alias]
+            return Probe(f"power:{sub}:{setting}:{source}", "powercfg", (sub, setting, source), int(argv[3]))
+        if argv[0] == "powercfg" and argv[1] in ("-setacvalueindex", "-setdcvalueindex"):
+            source = "ac" if argv[1] == "-setacvalueindex" else "dc"
+            sub, setting = argv[3], argv[4]
+            return Probe(f"power:{sub}:{setting}:{source}", "powercfg", (sub, setting, source), int(argv[5]))
+    return None
+
+
+def diff_plan(plan, actual: dict):
+    """Compare each plan step with `actual` (probe key -> value) and return SettingDiff rows in plan order."""
+    rows = []
+    for step in plan:
+        probe = probe_for(step)
+        if probe is None:
+            rows.append(SettingDiff(step, None, None, None, "always"))
+            continue
+        value = actual.get(probe.key)
+        same = value == probe.desired
+        if probe.kind == "wallpaper" and isinstance(value, str):
+            same = value.lower() == str(probe.desired).lower()
+        rows.append(SettingDiff(step, probe.key, probe.desired, value, "ok" if same else "change"))
+    return rows
+
+
+def skip_ids(diffs):
+    """Step ids that are already in the desired state."""
+    return [d.step.id for d in diffs if d.status == "ok"]
+
+
+def probe_plan(plan, backend):
+    """Read every probe the plan needs in one backend call and return the diff."""
+    probes = {}
+    for step in plan:
+        probe = probe_for(step)
+        if probe is not None:
+            probes[probe.key] = probe
+    actual = backend.read(list(probes.values())) if probes else {}
+    return diff_plan(plan, actual)
+
+
+def format_diff(diffs) -> str:
+    lines = []
+    for d in diffs:
+        if d.status == "change":
+            lines.append(f"  change  {d.step.render()}   (currently: {d.actual!r})")
+        elif d.status == "ok":
+            lines.append(f"  ok      {d.step.render()}")
+        else:
+            lines.append(f"  run     {d.step.render()}")
+    changed = sum(1 for d in diffs if d.status == "change")
+    ok = sum(1 for d in diffs if d.status == "ok")
+    lines.append(f"{changed} to change, {ok} already set, {len(diffs) - changed - ok} always run")
+    return "\n".join(lines)
+
+
+class FakeProbeBackend:
+    """Machine state from a dict (probe key -> value); missing keys read as None."""
+    def __init__(self, state=None):
+        self.state = dict(state or {})
+        self.calls = 0
+
+    @classmethod
+    def from_json(cls, path):
+        with open(path, "r", encoding="utf-8") as fh:
+            return cls(json.load(fh))
+
+    def read(self, probes):
+        self.calls += 1
+        return {p.key: self.state.get(p.key) for p in probes}
+
+
+_PS_PRELUDE = r"""
+$ErrorActionPreference = 'SilentlyContinue'
+$r = @{}
+$pq = @{}
+function RegPath($p) { return ($p -replace '^HKCU\\', 'HKCU:\' -replace '^HKLM\\', 'HKLM:\') }
+function Read-Reg($k, $path, $name) {
+    $v = Get-ItemProperty -Path (RegPath $path) -Name $name -ErrorAction SilentlyContinue
+    if ($v) { $r[$k] = $v.$name } else { $r[$k] = $null }
+}
+function Read-Power($k, $sub, $setting, $src) {
+    $q = "$sub/$setting"
+    if (-not $pq.ContainsKey($q)) {
+        # the last two hex indexes in the query output are the current AC and DC values (locale independent)
+        $pq[$q] = @(powercfg /query SCHEME_CURRENT $sub $setting | Select-String -Pattern ':\s*(0x[0-9a-fA-F]+)\s*$' | ForEach-Object { [Convert]::ToInt32($_.Matches[0].Groups[1].Value, 16) })
+    }
+    $vals = $pq[$q]
+    if ($vals.Count -ge 2) {
+        $r[$k] = if ($src -eq 'ac') { $vals[$vals.Count - 2] } else { $vals[$vals.Count - 1] }
+    } else { $r[$k] = $null }
+}
+"""
+
+
+def _ps_quote(value) -> str:
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+class PowerShellProbeBackend:
+    """Read all probes with a single PowerShell invocation that prints one JSON object."""
+    def __init__(self, powershell="powershell", timeout=60):
+        self.powershell = powershell
+        self.timeout = timeout
+
+    def script(self, probes) -> str:
+        lines = [_PS_PRELUDE]
+        for p in probes:
+            k = _ps_quote(p.key)
+            if p.kind == "registry":
+                lines.append(f"Read-Reg {k} {_ps_quote(p.args[0])} {_ps_quote(p.args[1])}")
+            elif p.kind == "registry-key":
+                lines.append(f"$r[{k}] = [bool](Test-Path (RegPath {_ps_quote(p.args[0])}))")
+            elif p.kind == "powercfg":
+                lines.append(f"Read-Power {k} {' '.join(_ps_quote(a) for a in p.args)}")
+            elif p.kind == "service-status":
+                lines.append(f"$r[{k}] = \"$((Get-Service -Name {_ps_quote(p.args[0])}).Status)\"")
+            elif p.kind == "service-start":
+                lines.append(f"$r[{k}] = \"$((Get-Service -Name {_ps_quote(p.args[0])}).StartType)\"")
+            elif p.kind == "timezone":
+                lines.append(f"$r[{k}] = (Get-TimeZone).Id")
+            elif p.kind == "wallpaper":
+                lines.append(f"$r[{k}] = (Get-ItemProperty -Path 'HKCU:\\Control Panel\\Desktop').WallPaper")
+        lines.append("$r | ConvertTo-Json -Compress")
+        return "\n".join(lines)
+
+    def read(self, probes):
+        encoded = base64.b64encode(self.script(probes).encode("utf-16-le")).decode("ascii")
+        with profiling.span("probe.read", cat="powershell", probes=len(probes)):
+            proc = subprocess.run(
+                [self.powershell, "-NoProfile", "-NonInteractive", "-EncodedCommand", encoded],
+                capture_output=True, text=True, timeout=self.timeout,
+                creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+            )
+        out = proc.stdout.strip()
+        if proc.returncode != 0 or not out:
+            raise RuntimeError(f"State probe failed (exit {proc.returncode}): {proc.stderr.strip()}")
+        return json.loads(out)
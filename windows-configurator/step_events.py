@@ -0,0 +1,108 @@
+"""Per-step timing events from configure-windows.ps1 -StepEvents.
+
+With -StepEvents the script prints one line per Invoke-IfNotDry step and per
+Apply-* section:
+
+    @@event {"type":"step","id":"power.disk_ac","section":"power","start":"...","end":"...",
+             "duration_ms":12.5,"status":"ok","exit_code":0,"error":null}
+
+Lines may carry a "[section] " prefix when they come through a concurrent
+SectionRun. StepTimings collects the events of one run and renders the
+timing table and the slowest-steps summary shown by the GUI.
+"""
+import json
+from typing import NamedTuple
+
+EVENT_PREFIX = "@@event "
+STATUSES = ("ok", "failed", "skipped", "dryrun")
+
+
+class StepEvent(NamedTuple):
+    type: str
+    id: str
+    section: str
+    description: str
+    start: str
+    end: str
+    duration_ms: float
+    status: str
+    exit_code: object = None
+    error: object = None
+
+
+def parse_event_line(line: str):
+    """Return the StepEvent carried by `line`, or None for ordinary output."""
+    idx = line.find(EVENT_PREFIX)
+    if idx < 0:
+        return None
+    try:
+        data = json.loads(line[idx + len(EVENT_PREFIX):])
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or data.get("type") not in ("step", "section"):
+        return None
+    sid = str(data.get("id") or "")
+    return StepEvent(
+        type=data["type"],
+        id=sid,
+        section=str(data.get("section") or sid.split(".")[0]),
+        description=str(data.get("description") or ""),
+        start=str(data.get("start") or ""),
+        end=str(data.get("end") or ""),
+        duration_ms=float(data.get("duration_ms") or 0.0),
+        status=str(data.get("status") or "ok"),
+        exit_code=data.get("exit_code"),
+        error=data.get("error"),
+    )
+
+
+class StepTimings:
+    """Step and section events of one run, in arrival order."""
+    def __init__(self):
+        self.steps = []
+        self.sections = []
+
+    def add(self, event: StepEvent):
+        (self.sections if event.type == "section" else self.steps).append(event)
+
+    def feed(self, line: str):
+        """Record `line` if it is an event; returns the event or None."""
+        event = parse_event_line(line)
+        if event is not None:
+            self.add(event)
+        return event
+
+    def __bool__(self):
+        return bool(self.steps or self.sections)
+
+    def executed(self):
+        """Steps that actually ran (not skipped or dry-run)."""
+        return [e for e in self.steps if e.status in ("ok", "failed")]
+
+    def slowest(self, n=5):
+        return sorted(self.executed(), key=lambda e: e.duration_ms, reverse=True)[:n]
+
+    def failed(self):
+        return [e for e in self.steps + self.sections if e.status == "failed"]
+
+    def total_ms(self):
+        return sum(e.duration_ms for e in self.sections) or sum(e.duration_ms for e in self.steps)
+
+    def render_table(self):
+        rows = [f"{'Step':<34} {'Status':<8} {'ms':>9}  Error"]
+        for e in self.steps:
+            rows.append(f"{e.id:<34} {e.status:<8} {e.duration_ms:>9.1f}  {e.error or ''}".rstrip())
+        for e in self.sections:
+            rows.append(f"{'[' + e.id + ']':<34} {e.status:<8} {e.duration_ms:>9.1f}  {e.error or ''}".rstrip())
+        return "\n".join(rows)
+
+    def render_summary(self, n=5):
+        lines = [f"{len(self.executed())} step(s) ran, {sum(1 for e in self.steps if e.status == 'skipped')} skipped, "
+                 f"{len(self.failed())} failed; {self.total_ms() / 1000.0:.1f}s in sections"]
+        slow = self.slowest(n)
+        if slow:
+            lines.append("Slowest steps:")
+            lines.extend(f"  {e.duration_ms / 1000.0:7.2f}s  {e.id}  {e.description}" for e in slow)
+        for e in self.failed():
+            lines.append(f"  FAILED {e.id}: {e.error or f'exit code {e.exit_code}'}")
+        return "\n".join(lines)
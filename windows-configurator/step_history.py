@@ -0,0 +1,268 @@
+"""Step durations of past runs, and the remaining-time estimate built from them.
+
+Every apply run records how long each executed step took (from the
+-StepEvents records, see step_events.py) in a small SQLite database under
+%LOCALAPPDATA%\\CCI_New_PC_Setup, keyed by step id and hardware model. The
+Windows Update job is recorded as the step "windowsupdate.job".
+
+Before a run, stats_for() turns the history of the steps about to run into
+StepStats (median and 90th percentile). The model's own history is used once
+it has MIN_SAMPLES runs, otherwise every model's. Forecast then tracks the
+run as step events arrive: the fraction done for a progress bar and the
+remaining time (median and 90th percentile) with the sections spread over
+the concurrent workers. A step is flagged as slow when it took more than
+SLOW_FACTOR times its 90th percentile and at least SLOW_MIN_MS longer.
+
+    python step_history.py [--model "Dell Inc. Latitude 5440"] [--db PATH]
+
+prints the per-step quantiles, for planning bench throughput.
+"""
+import argparse
+import os
+import platform
+import sqlite3
+import sys
+import time
+from typing import NamedTuple
+
+from app_paths import app_data_dir
+
+MIN_SAMPLES = 3
+KEEP_PER_STEP = 50
+SLOW_FACTOR = 2.0
+SLOW_MIN_MS = 2000.0
+DEFAULT_STEP_MS = 500.0
+WINDOWS_UPDATE_STEP = "windowsupdate.job"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS durations (
+    step_id TEXT NOT NULL,
+    model TEXT NOT NULL,
+    duration_ms REAL NOT NULL,
+    run_id TEXT,
+    recorded REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS durations_step ON durations (step_id, model);
+"""
+
+
+def default_db_path() -> str:
+    return app_data_dir("step_history.sqlite3")
+
+
+def hardware_model() -> str:
+    """'Manufacturer Product' from the BIOS registry key; CCI_HARDWARE_MODEL overrides it."""
+    override = os.environ.get("CCI_HARDWARE_MODEL")
+    if override:
+        return override
+    parts = []
+    if os.name == "nt":
+        try:
+            import winreg
+            with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, r"HARDWARE\DESCRIPTION\System\BIOS") as key:
+                for name in ("SystemManufacturer", "SystemProductName"):
+                    try:
+                        parts.append(str(winreg.QueryValueEx(key, name)[0]).strip())
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+    else:
+        for name in ("sys_vendor", "product_name"):
+            try:
+                with open(f"/sys/class/dmi/id/{name}", encoding="utf-8", errors="replace") as fh:
+                    parts.append(fh.read().strip())
+            except OSError:
+                pass
+    return " ".join(p for p in parts if p) or platform.machine() or "unknown"
+
+
+def quantile(values, q):
+    """Linear-interpolated quantile of a sorted, non-empty sequence."""
+    pos = (len(values) - 1) * q
+    lo = int(pos)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (pos - lo)
+
+
+class StepStats(NamedTuple):
+    count: int
+    p50_ms: float
+    p90_ms: float
+
+
+class StepHistory:
+    """The duration database; each call opens its own connection, so any thread may use it."""
+    def __init__(self, path=None, model=None):
+        self.path = path or default_db_path()
+        self.model = model or hardware_model()
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5)
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def record(self, durations, run_id=None):
+        """Store (step id, duration ms) pairs and keep the newest KEEP_PER_STEP per step and model."""
+        rows = [(sid, self.model, float(ms), run_id, time.time()) for sid, ms in durations]
+        if not rows:
+            return 0
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany("INSERT INTO durations VALUES (?, ?, ?, ?, ?)", rows)
+                for sid in {r[0] for r in rows}:
+                    conn.execute("DELETE FROM durations WHERE rowid IN (SELECT rowid FROM durations"
+                                 " WHERE step_id = ? AND model = ? ORDER BY rowid DESC LIMIT -1 OFFSET ?)",
+                                 (sid, self.model, KEEP_PER_STEP))
+        finally:
+            conn.close()
+        return len(rows)
+
+    def stats_for(self, step_ids=None):
+        """{step id: StepStats} for `step_ids` (every recorded step when None)."""
+        query = "SELECT step_id, model, duration_ms FROM durations"
+        args = ()
+        if step_ids is not None:
+            step_ids = list(dict.fromkeys(step_ids))
+            if not step_ids:
+                return {}
+            query += f" WHERE step_id IN ({','.join('?' * len(step_ids))})"
+            args = tuple(step_ids)
+        if not os.path.exists(self.path):
+            return {}
+        conn = self._connect()
+        try:
+            rows = conn.execute(query, args).fetchall()
+        finally:
+            conn.close()
+        own, every = {}, {}
+        for sid, model, ms in rows:
+            every.setdefault(sid, []).append(ms)
+            if model == self.model:
+                own.setdefault(sid, []).append(ms)
+        stats = {}
+        for sid, values in every.items():
+            if len(own.get(sid, ())) >= MIN_SAMPLES:
+                values = own[sid]
+            values.sort()
+            stats[sid] = StepStats(len(values), quantile(values, 0.5), quantile(values, 0.9))
+        return stats
+
+
+def slow(duration_ms, stats):
+    """True when a step took much longer than its history says it should."""
+    if stats is None or stats.count < MIN_SAMPLES:
+        return False
+    return duration_ms > stats.p90_ms * SLOW_FACTOR and duration_ms - stats.p90_ms >= SLOW_MIN_MS
+
+
+def format_duration(seconds: float) -> str:
+    seconds = max(0, int(round(seconds)))
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60} min {seconds % 60:02d}s" if seconds < 600 else f"{round(seconds / 60)} min"
+    return f"{seconds // 3600} h {seconds % 3600 // 60:02d} min"
+
+
+class Forecast:
+    """Progress and remaining time of one run of `step_ids`, from their StepStats.
+
+    Steps without history count as the median of the known ones (DEFAULT_STEP_MS
+    when nothing is known). Sections run concurrently on `workers` workers, so
+    the remaining wall time is the longest section's remainder or the total
+    spread over the workers, whichever is larger.
+    """
+    def __init__(self, step_ids, stats, workers=1, clock=time.monotonic):
+        self.stats = stats
+        self.workers = max(1, workers)
+        self._clock = clock
+        known = sorted(s.p50_ms for sid, s in stats.items() if sid in step_ids)
+        fallback = quantile(known, 0.5) if known else DEFAULT_STEP_MS
+        self._expected = {}
+        for sid in dict.fromkeys(step_ids):
+            s = stats.get(sid)
+            self._expected[sid] = (s.p50_ms, s.p90_ms) if s else (fallback, fallback)
+        self._pending = set(self._expected)
+        self.known = sum(1 for sid in self._expected if sid in stats)
+        self._total = self._wall(self._pending)[0] or 1.0
+        self._since = clock()
+        self._left = self._wall(self._pending)
+
+    def _wall(self, ids):
+        per_section, p50_sum, p90_sum = {}, 0.0, 0.0
+        for sid in ids:
+            p50, p90 = self._expected[sid]
+            sec = per_section.setdefault(sid.split(".", 1)[0], [0.0, 0.0])
+            sec[0] += p50
+            sec[1] += p90
+            p50_sum += p50
+            p90_sum += p90
+        if not per_section:
+            return 0.0, 0.0
+        return (max(max(s[0] for s in per_section.values()), p50_sum / self.workers),
+                max(max(s[1] for s in per_section.values()), p90_sum / self.workers))
+
+    def feed(self, event):
+        """Mark the event's step done; returns True when it ran much slower than its history."""
+        if event.type != "step" or event.id not in self._pending:
+            return False
+        self._pending.discard(event.id)
+        self._since = self._clock()
+        self._left = self._wall(self._pending)
+        return event.status == "ok" and slow(event.duration_ms, self.stats.get(event.id))
+
+    def remaining(self):
+        """(median, 90th percentile) seconds left, counting down while a step runs."""
+        elapsed = (self._clock() - self._since) * 1000.0
+        p50, p90 = self._left
+        if not self._pending:
+            return 0.0, 0.0
+        return max(0.0, p50 - elapsed) / 1000.0, max(0.0, p90 - elapsed) / 1000.0
+
+    def fraction(self):
+        return min(1.0, max(0.0, 1.0 - self.remaining()[0] * 1000.0 / self._total))
+
+    def text(self):
+        if not self._pending:
+            return "Finishing..."
+        p50, p90 = self.remaining()
+        if not self.known:
+            return f"{len(self._pending)} step(s) left"
+        if p50 <= 0:
+            return f"Taking longer than usual; up to {format_duration(p90)} more"
+        if p50 < 1:
+            return "Almost done" if p90 < 1 else f"Almost done (up to {format_duration(p90)})"
+        return f"About {format_duration(p50)} left (up to {format_duration(p90)})"
+
+
+def slow_message(event, stats):
+    return (f"SLOW {event.id}: {event.duration_ms / 1000.0:.1f}s, usually {stats.p50_ms / 1000.0:.1f}s "
+            f"(90% under {stats.p90_ms / 1000.0:.1f}s over {stats.count} runs)")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Show the recorded step durations.")
+    ap.add_argument("--db", default=None, help="history database (default: under %%LOCALAPPDATA%%)")
+    ap.add_argument("--model", default=None, help="hardware model (default: this machine's)")
+    args = ap.parse_args(argv)
+    history = StepHistory(args.db, args.model)
+    try:
+        stats = history.stats_for()
+    except sqlite3.Error as e:
+        print(f"Cannot read {history.path}: {e}", file=sys.stderr)
+        return 1
+    if not stats:
+        print(f"No step durations recorded in {history.path}")
+        return 0
+    print(f"Model: {history.model}")
+    print(f"{'Step':<34} {'runs':>5} {'p50 s':>8} {'p90 s':>8}")
+    for sid, s in sorted(stats.items(), key=lambda kv: kv[1].p50_ms, reverse=True):
+        print(f"{sid:<34} {s.count:>5} {s.p50_ms / 1000.0:>8.2f} {s.p90_ms / 1000.0:>8.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,43 @@
+r"""configurator_plan against a -DryRun transcript.
+
+tests/fixtures/dryrun_all_sections.txt is synthetic: no PowerShell was
+available where it was written, so it was assembled from the script's
+Write-Host and DRYRUN lines. Replace it with a real capture, run on Windows
+from the folder holding the script:
+
+    .\configure-windows.ps1 -DryRun -TimeZoneId 'Pacific Standard Time' `
+        -BackgroundPath 'C:\Users\Public\Pictures\cci-background.jpg' `
+        -PowerButtonDoNothing -SleepButtonDoNothing -LidCloseDoNothing > dryrun_all_sections.txt
+
+(with PSWindowsUpdate installed and the background file present).
+"""
+import os
+
+import configurator_plan
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+SCHEME = "381b4222-f694-41f0-9685-ff5bb260df2e"
+BACKGROUND = r"C:\Users\Public\Pictures\cci-background.jpg"
+# the parameters the fixture stands for
+PARAMS = {"TimeZoneId": "Pacific Standard Time", "BackgroundPath": BACKGROUND,
+          "PowerButtonDoNothing": True, "SleepButtonDoNothing": True, "LidCloseDoNothing": True}
+
+
+def _transcript():
+    with open(os.path.join(FIXTURES, "dryrun_all_sections.txt"), encoding="utf-8") as fh:
+        return fh.read()
+
+
+def _plan(params=PARAMS):
+    return configurator_plan.build_plan(params, scheme=SCHEME, exists=lambda p: p == BACKGROUND,
+                                        pswindowsupdate_installed=True)
+
+
+def test_plan_matches_dryrun_transcript():
+    assert configurator_plan.compare_with_dryrun(_plan(), _transcript()) == []
+
+
+def test_drift_is_reported():
+    diff = configurator_plan.compare_with_dryrun(_plan(dict(PARAMS, TimeZoneId="UTC")), _transcript())
+    assert "-DRYRUN: tzutil /s Pacific Standard Time" in diff
+    assert "+DRYRUN: tzutil /s UTC" in diff
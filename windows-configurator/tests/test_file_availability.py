@@ -0,0 +1,119 @@
+import threading
+import time
+
+from file_availability import AVAILABLE, CHECKING, MISSING, TIMEOUT, FileAvailability
+
+
+class Probe:
+    """Stands in for os.path.exists: answers from `present`, optionally held on a gate."""
+    def __init__(self, present=(), gate=None):
+        self.present = set(present)
+        self.gate = gate
+        self.calls = []
+
+    def __call__(self, path):
+        self.calls.append(path)
+        if self.gate is not None:
+            self.gate.wait(10)
+        if path == "boom":
+            raise OSError("device not ready")
+        return path in self.present
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _settle(files, path):
+    # the check runs on its own thread; wait until it has answered
+    deadline = time.monotonic() + 10
+    while files.status(path) is None or files.status(path).state == CHECKING:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    return files.status(path)
+
+
+def _calls(probe, count):
+    deadline = time.monotonic() + 10
+    while len(probe.calls) < count:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    return sorted(probe.calls)
+
+
+def _changes(files):
+    out = []
+    while not files.changes.empty():
+        out.append(files.changes.get_nowait().state)
+    return out
+
+
+def test_first_query_starts_a_check_and_reports_changes():
+    files = FileAvailability(probe=Probe({"H:\\bg.png"}))
+    assert files.exists("H:\\bg.png") is None
+    assert _settle(files, "H:\\bg.png").state == AVAILABLE
+    assert files.exists("H:\\bg.png") is True
+    assert _changes(files) == [CHECKING, AVAILABLE]
+
+
+def test_wait_returns_the_answer():
+    files = FileAvailability(probe=Probe({"present"}))
+    assert files.wait("present") is True
+    assert files.wait("absent") is False
+    assert files.wait("boom") is False
+    assert files.status("boom").state == MISSING
+
+
+def test_hung_probe_times_out_and_a_late_answer_still_counts():
+    gate = threading.Event()
+    probe = Probe({"H:\\bg.png"}, gate)
+    files = FileAvailability(timeout=0.05, probe=probe)
+    assert files.wait("H:\\bg.png", timeout=5) is False
+    assert files.status("H:\\bg.png").state == TIMEOUT
+    # the hung check stays registered, so no second probe piles up on the same path
+    files.invalidate("H:\\bg.png")
+    files.check("H:\\bg.png")
+    assert probe.calls == ["H:\\bg.png"]
+    gate.set()
+    deadline = time.monotonic() + 10
+    while files.exists("H:\\bg.png") is not True:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_positive_and_negative_answers_expire_after_their_ttl():
+    clock = Clock()
+    probe = Probe({"present"})
+    files = FileAvailability(ttl=30.0, negative_ttl=10.0, probe=probe, clock=clock)
+    _settle(files, "present")
+    _settle(files, "absent")
+    assert sorted(probe.calls) == ["absent", "present"]
+
+    clock.now += 5
+    files.status("present")
+    files.status("absent")
+    assert len(probe.calls) == 2
+
+    clock.now += 10
+    files.status("present")
+    files.status("absent")
+    assert _calls(probe, 3) == ["absent", "absent", "present"]
+
+    clock.now += 20
+    files.status("present")
+    assert _calls(probe, 4).count("present") == 2
+
+
+def test_invalidate_forces_a_new_check():
+    probe = Probe()
+    files = FileAvailability(probe=probe)
+    assert files.wait("H:\\bg.png") is False
+    probe.present.add("H:\\bg.png")
+    assert files.exists("H:\\bg.png") is False
+    files.invalidate()
+    assert files.exists("H:\\bg.png") is None
+    assert _settle(files, "H:\\bg.png").state == AVAILABLE
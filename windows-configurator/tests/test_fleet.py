@@ -0,0 +1,19 @@
+import fleet
+
+
+def _snapshot(folder, machine, state):
+    fleet.write_snapshot({"v": fleet.SNAPSHOT_FORMAT, "machine": machine, "taken": "2026-10-01T10:00:00Z",
+                          "app": "test", "state": state}, str(folder))
+
+
+def test_unknown_checks_are_not_compliant(tmp_path):
+    desired = {c.probe_key: c.desired for c in fleet.fleet_checks() if c.probe_key}
+    _snapshot(tmp_path, "ACME-D-000001", desired)
+    _snapshot(tmp_path, "ACME-D-000002", {})
+    _snapshot(tmp_path, "ACME-D-000003", dict(desired, **{next(iter(desired)): "drifted"}))
+    columns, _ = fleet.load_fleet(str(tmp_path), use_index=False)
+    report = fleet.analyze(columns, use_numpy=False)
+    assert (report["machines"], report["compliant"], report["incomplete"]) == (3, 1, 1)
+    assert report["customers"][0]["compliant"] == 1
+    assert report["customers"][0]["incomplete"] == 1
+    assert "1 incomplete" in fleet.format_report(report)
@@ -0,0 +1,53 @@
+import log_store
+from log_store import LogStore
+
+
+def _line(i):
+    return "line %05d payload\n" % i
+
+
+def _fill(store, count):
+    for i in range(count):
+        store.append(_line(i))
+
+
+def test_append_past_max_bytes_drops_oldest_half(tmp_path):
+    store = LogStore(max_bytes=2000, directory=str(tmp_path))
+    try:
+        _fill(store, 500)
+        assert store.dropped_lines > 0
+        assert store.size <= 2000
+        assert store.dropped_lines + store.line_count == 500
+        first = store.dropped_lines
+        assert store.get_lines(0, 2) == [_line(first).rstrip("\n"), _line(first + 1).rstrip("\n")]
+        assert store.get_lines(store.line_count - 1, 5) == [_line(499).rstrip("\n")]
+        assert store.text() == "".join(_line(i) for i in range(first, 500))
+    finally:
+        store.close()
+
+
+def test_search_after_drop_uses_kept_line_indexes(tmp_path):
+    store = LogStore(max_bytes=2000, directory=str(tmp_path))
+    try:
+        _fill(store, 500)
+        first = store.dropped_lines
+        assert store.search("line %05d" % (first + 3)) == 3
+        assert store.search("line %05d" % 499, backwards=True) == store.line_count - 1
+        assert store.search("line %05d" % (first - 1)) is None
+        assert store.search("LINE %05d" % 0) is None
+    finally:
+        store.close()
+
+
+def test_drop_copies_kept_half_in_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(log_store, "_COPY_CHUNK", 7)
+    store = LogStore(max_bytes=400, directory=str(tmp_path))
+    try:
+        _fill(store, 60)
+        first = store.dropped_lines
+        assert first > 0
+        assert store.text() == "".join(_line(i) for i in range(first, 60))
+        with open(store.path, "rb") as fh:
+            assert len(fh.read()) == store.size
+    finally:
+        store.close()
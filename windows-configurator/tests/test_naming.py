@@ -0,0 +1,89 @@
+import csv
+
+import pytest
+
+import naming
+from naming import NETBIOS_MAX, InventoryIndex, fit_name, generate_batch, generate_name, parse_name
+
+
+def test_generated_name_within_the_limit_is_unchanged():
+    assert generate_name("Acme", "Laptop", "12345") == "Acme-L-12345"
+    assert generate_name("Acme", "unknown", "12345") == "Acme-D-12345"
+
+
+def test_customer_is_shortened_first():
+    name = generate_name("Contoso Ltd", "Desktop", "SN12345")
+    assert name == "Conto-D-SN12345"
+    assert len(name) == NETBIOS_MAX
+
+
+def test_serial_keeps_its_last_digits_once_the_customer_is_gone():
+    assert generate_name("Acme", "Laptop", "ABCDEFGHIJKLMNOPQRS") == "L-GHIJKLMNOPQRS"
+    assert generate_name("", "Laptop", "ABCDEFGHIJKLMNOPQRS") == "L-GHIJKLMNOPQRS"
+
+
+def test_suffix_makes_room_by_shortening_the_customer():
+    assert fit_name("Contoso", "L", "123456", suffix="-2") == "Cont-L-123456-2"
+    for n in range(2, 12):
+        assert len(fit_name("Contoso", "L", "123456789012", suffix=f"-{n}")) <= NETBIOS_MAX
+
+
+def test_custom_name_is_sanitized_and_cut():
+    assert generate_name("Acme", "L", "1", custom="My Custom PC!! name long") == "My-Custom-PC-na"
+
+
+def test_parse_name_round_trips_the_convention():
+    assert parse_name("ACME-L-12345") == ("ACME", "L", "12345")
+    assert parse_name("L-12345-2") == ("", "L", "12345-2")
+    assert parse_name("12345") is None
+    assert parse_name("Workstation") is None
+    assert parse_name("A" * 16 + "-L-1") is None
+
+
+def test_batch_suffixes_collisions_against_the_inventory_and_itself():
+    inventory = InventoryIndex(["ACME-L-12345-2"])
+    results = generate_batch([("Acme", "Laptop", "12345"), ("acme", "L", "12345"), ("Acme", "Laptop", "12345")],
+                             inventory)
+    assert [(r.name, r.status) for r in results] == [
+        ("Acme-L-12345", "ok"),
+        # -2 is in the inventory already, names ignore case
+        ("acme-L-12345-3", "suffixed"),
+        ("Acme-L-12345-4", "suffixed"),
+    ]
+    assert all(r.name in inventory for r in results)
+
+
+def test_batch_is_deterministic_and_flags_bad_rows():
+    rows = [("Contoso Ltd", "Desktop", "SN12345"), ("", "", ""), ("Contoso", "D", "SN12345")]
+    first = generate_batch(rows)
+    assert first == generate_batch(rows)
+    assert [r.status for r in first] == ["shortened", "invalid", "suffixed"]
+    assert first[0].note == "from Contoso-Ltd-D-SN12345"
+    assert first[2].name != first[0].name
+
+
+def test_inventory_from_csv_and_plain_list(tmp_path):
+    exported = tmp_path / "inventory.csv"
+    exported.write_text("Id,ComputerName,Owner\n1,ACME-L-1,x\n2,acme-l-2,y\n", encoding="utf-8")
+    index = InventoryIndex.from_file(str(exported))
+    assert len(index) == 2 and "Acme-L-2" in index
+    plain = tmp_path / "names.txt"
+    plain.write_text("ACME-L-1\n\nACME-L-3\n", encoding="utf-8")
+    assert len(InventoryIndex.from_file(str(plain))) == 2
+    no_name = tmp_path / "bad.csv"
+    no_name.write_text("Id,Owner\n1,x\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        InventoryIndex.from_file(str(no_name))
+
+
+def test_bulk_generate_writes_manifest_and_report(tmp_path):
+    src = tmp_path / "machines.csv"
+    src.write_text("customer,type,serial\nAcme,Laptop,12345\nAcme,Laptop,12345\n,,\n", encoding="utf-8")
+    inventory = tmp_path / "inventory.txt"
+    inventory.write_text("OTHER-D-1\n", encoding="utf-8")
+    results, manifest, report, _ = naming.bulk_generate(str(src), str(inventory), str(tmp_path))
+    assert naming.summarize(results) == "1 ok, 0 shortened, 1 suffixed, 1 invalid"
+    with open(manifest, newline="", encoding="utf-8") as fh:
+        assert [row[4] for row in csv.reader(fh)][1:] == ["Acme-L-12345", "Acme-L-12345-2", ""]
+    with open(report, newline="", encoding="utf-8") as fh:
+        assert [row[5] for row in csv.reader(fh)][1:] == ["suffixed", "invalid"]
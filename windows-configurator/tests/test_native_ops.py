@@ -0,0 +1,73 @@
+import pytest
+
+import configurator_plan
+import native_ops
+from native_ops import FakeNativeBackend, NativeError
+
+
+def _rename_error(name, backend):
+    with pytest.raises(NativeError) as info:
+        native_ops.try_rename(name, backend)
+    return info.value
+
+
+def test_rename_succeeds_natively():
+    backend = FakeNativeBackend()
+    assert native_ops.try_rename("ACME-D-0001", backend) is None
+    assert backend.computer_name == "ACME-D-0001"
+
+
+@pytest.mark.parametrize("name", ["", "12345", "BAD NAME", "TOO-LONG-FOR-NETBIOS"])
+def test_invalid_names_are_final_without_touching_the_machine(name):
+    backend = FakeNativeBackend()
+    err = _rename_error(name, backend)
+    assert err.code == native_ops.ERROR_INVALID_COMPUTERNAME
+    assert not err.fallback
+    assert backend.calls == []
+
+
+def test_domain_joined_falls_back():
+    backend = FakeNativeBackend(domain_joined=True)
+    err = _rename_error("ACME-D-0001", backend)
+    assert err.fallback
+    assert ("set_computer_name", "ACME-D-0001") not in backend.calls
+
+
+def test_unknown_domain_membership_falls_back():
+    backend = FakeNativeBackend(fail={"is_domain_joined": 1355})
+    err = _rename_error("ACME-D-0001", backend)
+    assert err.fallback and err.code == 1355
+    assert backend.computer_name is None
+
+
+def test_access_denied_falls_back():
+    err = _rename_error("ACME-D-0001", FakeNativeBackend(fail={"set_computer_name": native_ops.ERROR_ACCESS_DENIED}))
+    assert err.fallback
+    assert err.message == "Access is denied; run the tool elevated"
+
+
+def test_invalid_computername_from_windows_is_final():
+    err = _rename_error("ACME-D-0001", FakeNativeBackend(fail={"set_computer_name": native_ops.ERROR_INVALID_COMPUTERNAME}))
+    assert not err.fallback
+
+
+def _wallpaper_plan(path):
+    return configurator_plan.build_plan({"DoPersonalization": True, "BackgroundPath": path}, exists=lambda p: True)
+
+
+def test_wallpaper_steps_run_through_the_backend():
+    backend = FakeNativeBackend()
+    results = native_ops.apply_native_steps(_wallpaper_plan(r"C:\bg.jpg"), backend, exists=lambda p: True)
+    assert results == [native_ops.NativeResult("personalization.wallpaper", r"C:\bg.jpg", True)]
+    assert backend.wallpaper == r"C:\bg.jpg"
+    skipped = native_ops.apply_native_steps(_wallpaper_plan(r"C:\bg.jpg"), backend,
+                                            skip={"personalization.wallpaper"}, exists=lambda p: True)
+    assert skipped == []
+
+
+def test_missing_wallpaper_file_fails_without_calling_the_backend():
+    backend = FakeNativeBackend()
+    results = native_ops.apply_native_steps(_wallpaper_plan(r"C:\gone.jpg"), backend, exists=lambda p: False)
+    assert [(r.step_id, r.ok) for r in results] == [("personalization.wallpaper", False)]
+    assert results[0].error == "The file was not found"
+    assert backend.calls == []
@@ -0,0 +1,91 @@
+import os
+import threading
+import time
+
+from preview_cache import PreviewLoader, ThumbnailCache, cache_key
+
+
+class Decode:
+    """Stands in for decode_thumbnail: returns a marker and records each path decoded."""
+    def __init__(self, gate=None):
+        self.calls = []
+        self.gate = gate
+
+    def __call__(self, path, size):
+        self.calls.append(path)
+        if self.gate is not None:
+            self.gate.wait(10)
+        if path.endswith(".bad"):
+            raise ValueError("cannot identify image file")
+        return ("thumb", os.path.basename(path), size)
+
+
+def _image(tmp_path, name):
+    path = tmp_path / name
+    path.write_bytes(b"not really an image")
+    return str(path)
+
+
+def test_cache_key_changes_with_the_file(tmp_path):
+    path = _image(tmp_path, "a.png")
+    key = cache_key(path)
+    assert key[0] == os.path.abspath(path)
+    with open(path, "ab") as fh:
+        fh.write(b" grown")
+    assert cache_key(path) != key
+    assert cache_key(str(tmp_path / "missing.png")) is None
+
+
+def test_thumbnail_cache_evicts_least_recently_used():
+    cache = ThumbnailCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c"), len(cache)) == (1, 3, 2)
+
+
+def test_second_request_is_served_from_the_cache(tmp_path):
+    decode = Decode()
+    loader = PreviewLoader(decode=decode, size=(10, 10))
+    path = _image(tmp_path, "a.png")
+    loader.request(path)
+    assert loader.results.get(timeout=10) == (path, ("thumb", "a.png", (10, 10)), None)
+    loader.request(path)
+    assert loader.results.get(timeout=10) == (path, ("thumb", "a.png", (10, 10)), None)
+    assert decode.calls == [path]
+
+
+def test_missing_file_and_decode_error(tmp_path):
+    decode = Decode()
+    loader = PreviewLoader(decode=decode)
+    missing = str(tmp_path / "missing.png")
+    loader.request(missing)
+    assert loader.results.get(timeout=10) == (missing, None, None)
+    bad = _image(tmp_path, "broken.bad")
+    loader.request(bad)
+    assert loader.results.get(timeout=10) == (bad, None, "cannot identify image file")
+    assert decode.calls == [bad]
+    assert len(loader.cache) == 0
+
+
+def test_stale_requests_are_skipped(tmp_path):
+    gate = threading.Event()
+    decode = Decode(gate)
+    loader = PreviewLoader(decode=decode)
+    paths = [_image(tmp_path, f"{i}.png") for i in range(4)]
+    loader.request(paths[0])
+    deadline = time.monotonic() + 10
+    while not decode.calls:
+        # wait until the worker is busy with the first one
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    for path in paths[1:]:
+        loader.request(path)
+    assert not loader.is_current(paths[0])
+    assert loader.is_current(paths[3])
+    gate.set()
+    results = [loader.results.get(timeout=10)[0] for _ in range(2)]
+    assert results == [paths[0], paths[3]]
+    assert decode.calls == [paths[0], paths[3]]
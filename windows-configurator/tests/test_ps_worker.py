@@ -0,0 +1,93 @@
+"""JSON-lines protocol of the worker client, against ps_worker_stub.py."""
+import sys
+import time
+
+import pytest
+
+import ps_worker
+from ps_worker import WorkerClient, WorkerPool
+
+STUB = [sys.executable, str(ps_worker._STUB)]
+
+
+def _wait(job, timeout=10.0):
+    """All of `job`'s events up to and including its ("exit", code)."""
+    events, deadline = [], time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        events.extend(job.drain())
+        if events and events[-1][0] == "exit":
+            return events
+        time.sleep(0.01)
+    raise AssertionError(f"job {job.id} ({job.op}) did not finish: {events}")
+
+
+@pytest.fixture
+def client():
+    client = WorkerClient(STUB)
+    yield client
+    client.close()
+
+
+def test_ping_round_trip(client):
+    job = client.submit("ping")
+    assert _wait(job) == [("out", "pong"), ("exit", 0)]
+    assert job.returncode == 0 and job.error is None
+    assert client.alive and client.pid is not None
+
+
+def test_failing_op_reports_its_exit_code(client):
+    job = client.submit("fail", {"message": "boom"})
+    assert _wait(job) == [("err", "boom"), ("exit", 1)]
+    assert (job.returncode, job.error) == (1, "boom")
+    # the worker survives a failed request
+    assert _wait(client.submit("ping"))[-1] == ("exit", 0)
+
+
+def test_queued_jobs_run_in_order(client):
+    jobs = [client.submit("sleep", {"seconds": 0.2}), client.submit("ping"), client.submit("rename", {"name": "PC-1"})]
+    last = _wait(jobs[2])
+    # one worker answers in request order, so the earlier jobs are done by then
+    assert [job.returncode for job in jobs] == [0, 0, 0]
+    assert jobs[0].drain() == [("out", "slept"), ("exit", 0)]
+    assert jobs[1].drain() == [("out", "pong"), ("exit", 0)]
+    assert last == [("out", "Rename-Computer -NewName 'PC-1' -Force (stub)"), ("exit", 0)]
+
+
+def test_cancel_kills_the_worker_and_submit_respawns_it(client):
+    long = client.submit("sleep", {"seconds": 30})
+    queued = client.submit("ping")
+    first_pid = client.pid
+    time.sleep(0.2)
+    long.cancel()
+    assert _wait(long)[-1] == ("exit", -1)
+    assert long.cancelled and long.error is None
+    # the request queued behind it died with the worker
+    assert _wait(queued)[-1] == ("exit", -1)
+    assert "Worker exited" in queued.error
+    deadline = time.monotonic() + 5
+    while client.alive and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not client.alive
+    job = client.submit("ping")
+    assert _wait(job) == [("out", "pong"), ("exit", 0)]
+    assert client.pid != first_pid
+
+
+def test_pool_spreads_jobs_over_its_workers():
+    pool = WorkerPool(STUB, 2)
+    try:
+        a, b = pool.acquire(), pool.acquire()
+        assert a is not b
+        for worker in (a, b):
+            _wait(worker.submit("ping"))
+        jobs = [a.submit("sleep", {"seconds": 0.3}), b.submit("sleep", {"seconds": 0.3})]
+        started = time.monotonic()
+        for job in jobs:
+            assert _wait(job)[-1] == ("exit", 0)
+        # side by side, not one after the other
+        assert time.monotonic() - started < 0.55
+        assert a.pid != b.pid
+        pool.release(a)
+        assert pool.acquire() is a
+    finally:
+        pool.close()
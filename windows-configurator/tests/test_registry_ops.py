@@ -0,0 +1,75 @@
+import configurator_plan
+import registry_ops
+from registry_ops import MemoryRegistryBackend, RegistryWrite
+
+ADV = r"HKCU\Software\Microsoft\Windows\CurrentVersion\Explorer\Advanced"
+THEMES = r"HKCU\Software\Microsoft\Windows\CurrentVersion\Themes\Personalize"
+
+
+class RecordingBackend(MemoryRegistryBackend):
+    """Memory backend that logs every primitive call, with the handle it was given."""
+    def __init__(self, deny=()):
+        super().__init__(deny)
+        self.log = []
+
+    def _open(self, key):
+        handle = super()._open(key)
+        self.log.append(("open", key, id(handle)))
+        return handle
+
+    def _set(self, handle, name, value, value_type):
+        self.log.append(("set", name, id(handle)))
+        super()._set(handle, name, value, value_type)
+
+    def _close(self, handle):
+        self.log.append(("close", None, id(handle)))
+
+
+def test_writes_are_applied_in_order_with_one_handle_per_key():
+    backend = RecordingBackend()
+    writes = [RegistryWrite(ADV), RegistryWrite(ADV, "TaskbarAl", 1), RegistryWrite(ADV, "TaskbarSi", 1),
+              RegistryWrite(THEMES, "AppsUseLightTheme", 0), RegistryWrite(THEMES, "SystemUsesLightTheme", 0)]
+    results = backend.apply(writes)
+    assert [r.write for r in results] == writes
+    assert all(r.ok for r in results)
+    assert [entry[:2] for entry in backend.log] == [
+        ("open", ADV), ("set", "TaskbarAl"), ("set", "TaskbarSi"), ("close", None),
+        ("open", THEMES), ("set", "AppsUseLightTheme"), ("set", "SystemUsesLightTheme"), ("close", None)]
+    assert backend.opens == 2
+    # the writes of one key go through the handle opened for it
+    assert len({entry[2] for entry in backend.log[:4]}) == 1
+    assert backend.read(ADV, "TaskbarSi") == 1
+
+
+def test_a_failed_value_does_not_stop_the_batch():
+    backend = MemoryRegistryBackend()
+    results = backend.apply([RegistryWrite(ADV, "TaskbarAl", "one"), RegistryWrite(ADV, "TaskbarSi", 1),
+                             RegistryWrite(ADV, "Odd", 1, "Binary")])
+    assert [r.ok for r in results] == [False, True, False]
+    assert results[0].error.startswith("TypeError")
+    assert "Unsupported value type" in results[2].error
+    assert backend.read(ADV, "TaskbarSi") == 1
+    assert backend.read(ADV, "TaskbarAl") is None
+
+
+def test_a_denied_or_missing_key_fails_only_its_own_writes():
+    backend = MemoryRegistryBackend(deny=[ADV])
+    results = backend.apply([RegistryWrite(ADV, "TaskbarAl", 1), RegistryWrite(ADV, "TaskbarSi", 1),
+                             RegistryWrite(r"HKXX\Nowhere", "Value", 1), RegistryWrite(THEMES, "AppsUseLightTheme", 0)])
+    assert [r.ok for r in results] == [False, False, False, True]
+    assert results[0].error.startswith("PermissionError")
+    assert results[2].error.startswith("ValueError")
+    assert backend.read(THEMES, "AppsUseLightTheme") == 0
+
+
+def test_writes_for_plan_leaves_out_skipped_steps():
+    plan = configurator_plan.build_plan({"DoTaskbar": True, "DoPersonalization": True}, exists=lambda p: False)
+    writes = registry_ops.writes_for_plan(plan)
+    registry_steps = [s.id for s in plan if s.kind in ("registry", "registry-key")]
+    assert [w.step_id for w in writes] == registry_steps
+    assert "taskbar.open_ui" not in registry_steps
+    skipped = registry_ops.writes_for_plan(plan, skip={"taskbar.alignment", "personalization.apps_dark"})
+    assert [w.step_id for w in skipped] == [s for s in registry_steps
+                                            if s not in ("taskbar.alignment", "personalization.apps_dark")]
+    key_only = next(w for w in writes if w.step_id == "taskbar.advanced_key")
+    assert key_only.name is None
@@ -0,0 +1,24 @@
+import run_archive
+
+
+def _archive(tmp_path):
+    archive = run_archive.RunArchive(str(tmp_path))
+    archive.record("configure", "Apply", "Installing driver a1b2c3d4e5f6 for the dock\nDone in 1234 ms\n")
+    archive.record("configure", "Apply", "Nothing to do\n")
+    return archive
+
+
+def test_search_finds_indexed_words(tmp_path):
+    hits = _archive(tmp_path).search("dock")
+    assert [h.line for h in hits] == ["Installing driver a1b2c3d4e5f6 for the dock"]
+
+
+def test_search_finds_part_of_an_unindexed_hex_id(tmp_path):
+    archive = _archive(tmp_path)
+    assert len(archive.search("a1b2c3")) == 1
+    assert len(archive.search("driver a1b2c3")) == 1
+    assert len(archive.search("c3d4e5f6")) == 1
+
+
+def test_search_finds_part_of_an_unindexed_number(tmp_path):
+    assert len(_archive(tmp_path).search("234")) == 1
@@ -0,0 +1,81 @@
+import json
+import os
+
+import pytest
+
+import configurator_plan
+import run_journal
+from run_journal import FakeExecutor, RunJournal, SimulatedCrash
+
+PARAMS = {"DoPowerSettings": True, "DoTaskbar": True}
+SCHEME = configurator_plan.SCHEME_PLACEHOLDER
+
+
+def _plan_ids(params=PARAMS):
+    return [s.id for s in configurator_plan.build_plan(params, scheme=SCHEME)]
+
+
+def test_crash_at_a_step_then_resume(tmp_path):
+    ids = _plan_ids()
+    crash_at = "taskbar.alignment"
+    journal = RunJournal.create(PARAMS, directory=str(tmp_path), run_id="run1")
+    first = FakeExecutor(crash_at=crash_at)
+    with pytest.raises(SimulatedCrash):
+        first.run(journal, dict(PARAMS))
+    done = ids[:ids.index(crash_at)]
+    assert first.executed == done
+
+    reloaded = RunJournal.load(journal.path)
+    assert reloaded.status == run_journal.RUNNING
+    assert sorted(reloaded.completed()) == sorted(done)
+    resume = reloaded.resume_params(scheme=SCHEME)
+    assert sorted(resume["SkipSteps"]) == sorted(done)
+    # the power section finished, so only the taskbar section is run again
+    assert "DoPowerSettings" not in resume and resume["DoTaskbar"] is True
+    assert reloaded.first_unfinished(scheme=SCHEME).id == crash_at
+
+    second = FakeExecutor()
+    assert second.run(reloaded) == run_journal.DONE
+    assert second.executed == ids[ids.index(crash_at):]
+    final = RunJournal.load(journal.path)
+    assert final.status == run_journal.DONE
+    assert sorted(final.completed()) == sorted(ids)
+    assert final.resume_params(scheme=SCHEME) is None
+
+
+def test_crash_after_a_number_of_steps(tmp_path):
+    journal = RunJournal.create(PARAMS, directory=str(tmp_path))
+    with pytest.raises(SimulatedCrash):
+        FakeExecutor(crash_at=3).run(journal, dict(PARAMS))
+    assert len(RunJournal.load(journal.path).completed()) == 3
+
+
+def test_failed_steps_leave_the_run_incomplete(tmp_path):
+    journal = RunJournal.create(PARAMS, directory=str(tmp_path))
+    assert FakeExecutor(fail={"power.disk_dc"}).run(journal, dict(PARAMS)) == run_journal.INCOMPLETE
+    reloaded = RunJournal.load(journal.path)
+    assert reloaded.failed() == {"power.disk_dc": "simulated failure"}
+    assert reloaded.resume_params(scheme=SCHEME)["DoPowerSettings"] is True
+
+
+def test_crash_during_the_atomic_rewrite_keeps_the_previous_journal(tmp_path, monkeypatch):
+    journal = RunJournal.create(PARAMS, directory=str(tmp_path), run_id="run2")
+    executor = FakeExecutor()
+    journal.record(executor._event("step", "power.disk_ac", "Set disk timeout AC to 0", "ok"))
+
+    def _power_cut(src, dst):
+        raise OSError("power cut")
+
+    monkeypatch.setattr(run_journal.os, "replace", _power_cut)
+    with pytest.raises(OSError):
+        journal.record(executor._event("step", "power.disk_dc", "Set disk timeout DC to 0", "ok"))
+    monkeypatch.undo()
+
+    # the file on disk is the last complete version; the half-done rewrite is only a temp file
+    with open(journal.path, encoding="utf-8") as fh:
+        json.load(fh)
+    reloaded = RunJournal.load(journal.path)
+    assert reloaded.completed() == ["power.disk_ac"]
+    assert sorted(reloaded.resume_params(scheme=SCHEME)["SkipSteps"]) == ["power.disk_ac"]
+    assert [n for n in os.listdir(tmp_path) if n.endswith(".tmp")]
+    assert [j.run_id for j in run_journal.list_runs(str(tmp_path))] == ["run2"]
@@ -0,0 +1,29 @@
+import os
+
+import configurator_plan
+import settings_catalog
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "configure-windows.ps1")
+
+
+def test_every_native_step_has_a_script_fallback():
+    # a catalog-only registry or wallpaper step is never retried when its native write fails
+    script_ids = configurator_plan.script_step_ids(SCRIPT)
+    missing = [f"{section}.{t.id}" for section, steps in settings_catalog.catalog().steps.items()
+               for t in steps if t.kind in configurator_plan.NATIVE_KINDS and f"{section}.{t.id}" not in script_ids]
+    assert missing == []
+
+
+def test_catalog_only_unapplied_lists_native_steps_without_script_code():
+    plan = configurator_plan.build_plan({"DoTaskbar": True, "DoNotifications": True})
+    script_ids = {s.id for s in plan} - {"taskbar.size", "notifications.open_ui"}
+    # open-ui steps are never written natively; finished steps are not reported
+    assert configurator_plan.catalog_only_unapplied(plan, set(), script_ids) == ["taskbar.size"]
+    assert configurator_plan.catalog_only_unapplied(plan, {"taskbar.size"}, script_ids) == []
+
+
+def test_compiled_catalog_is_cached(tmp_path):
+    first = settings_catalog.load_catalog(cache_dir=str(tmp_path))
+    second = settings_catalog.load_catalog(cache_dir=str(tmp_path))
+    assert not first.cached and second.cached
+    assert second.steps == first.steps
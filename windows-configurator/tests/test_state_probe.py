@@ -0,0 +1,82 @@
+import os
+
+import configurator_plan
+import state_probe
+from state_probe import FakeProbeBackend
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "machine_state.json")
+SCHEME = "381b4222-f694-41f0-9685-ff5bb260df2e"
+PARAMS = {"DoPowerSettings": True, "DoPowerButtonActions": True, "PowerButtonDoNothing": True, "DoTaskbar": True,
+          "DoDateTime": True, "TimeZoneId": "UTC", "DoPersonalization": True,
+          "BackgroundPath": r"C:\Users\Public\Pictures\BG.jpg"}
+
+
+def _diffs():
+    plan = configurator_plan.build_plan(PARAMS, scheme=SCHEME, exists=lambda p: True)
+    backend = FakeProbeBackend.from_json(FIXTURE)
+    diffs = state_probe.probe_plan(plan, backend)
+    assert backend.calls == 1  # one batch for the whole plan
+    return {d.step.id: d for d in diffs}
+
+
+def test_skip_ids_from_the_fixture():
+    diffs = _diffs()
+    assert state_probe.skip_ids(diffs.values()) == [
+        "power.disk_ac", "power.monitor_ac", "power.standby_ac",
+        "taskbar.advanced_key", "taskbar.alignment",
+        "personalization.personalize_key", "personalization.apps_dark",
+        "personalization.themes_key", "personalization.color_prevalence", "personalization.wallpaper",
+        "powerbuttons.power_ac",
+    ]
+
+
+def test_registry_values():
+    diffs = _diffs()
+    assert diffs["taskbar.alignment"].status == "ok"
+    mismatch = diffs["taskbar.size"]
+    assert (mismatch.status, mismatch.desired, mismatch.actual) == ("change", 1, 2)
+
+
+def test_missing_key_and_values_are_changed():
+    diffs = _diffs()
+    assert diffs["personalization.accent_key"].actual is False
+    assert diffs["personalization.accent_key"].status == "change"
+    # values under a key that does not exist are not in the state at all
+    assert diffs["personalization.accent_color"].actual is None
+    assert diffs["personalization.accent_color"].status == "change"
+
+
+def test_powercfg_probes():
+    plan = {s.id: s for s in configurator_plan.build_plan(PARAMS, scheme=SCHEME, exists=lambda p: True)}
+    change = state_probe.probe_for(plan["power.standby_dc"])
+    assert (change.key, change.args, change.desired) == ("power:SUB_SLEEP:STANDBYIDLE:dc", ("SUB_SLEEP", "STANDBYIDLE", "dc"), 0)
+    index = state_probe.probe_for(plan["powerbuttons.power_dc"])
+    assert index.args == ("4f971e89-eebd-4455-a8de-9e59040e7347", "7648efa3-dd9c-4e3e-b566-50f929386280", "dc")
+    assert index.desired == 0
+    assert state_probe.probe_for(plan["powerbuttons.setactive"]) is None
+    diffs = _diffs()
+    assert [diffs[i].status for i in ("power.disk_ac", "power.disk_dc", "powerbuttons.power_ac", "powerbuttons.power_dc")] \
+        == ["ok", "change", "ok", "change"]
+    assert diffs["powerbuttons.setactive"].status == "always"
+
+
+def test_wallpaper_path_compares_case_insensitively():
+    diffs = _diffs()
+    assert diffs["personalization.wallpaper"].status == "ok"
+    other = configurator_plan.build_plan(dict(PARAMS, BackgroundPath=r"C:\Other.jpg"), scheme=SCHEME,
+                                         exists=lambda p: True)
+    rows = state_probe.probe_plan(other, FakeProbeBackend.from_json(FIXTURE))
+    assert "personalization.wallpaper" not in state_probe.skip_ids(rows)
+
+
+def test_timezone_and_unprobeable_steps():
+    diffs = _diffs()
+    assert (diffs["datetime.timezone"].status, diffs["datetime.timezone"].actual) == ("change", "Pacific Standard Time")
+    assert diffs["datetime.resync"].status == "always"
+    assert diffs["taskbar.open_ui"].status == "always"
+
+
+def test_active_scheme_guid_is_parsed_from_powercfg_output():
+    out = "Power Scheme GUID: 381B4222-F694-41F0-9685-FF5BB260DF2E  (Balanced)\r\n"
+    assert configurator_plan.parse_active_scheme(out) == SCHEME
+    assert configurator_plan.parse_active_scheme("Access denied") is None
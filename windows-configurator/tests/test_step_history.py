@@ -0,0 +1,115 @@
+import pytest
+
+import step_history
+from step_events import StepEvent
+from step_history import Forecast, StepHistory, StepStats, quantile, slow
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def _history(tmp_path, model="Dell Inc. Latitude 5440"):
+    return StepHistory(str(tmp_path / "history.sqlite3"), model=model)
+
+
+def _step(sid, ms, status="ok"):
+    return StepEvent("step", sid, sid.split(".", 1)[0], sid, "", "", ms, status)
+
+
+def test_quantile_interpolates():
+    assert quantile([10.0], 0.9) == 10.0
+    assert quantile([10.0, 20.0, 30.0, 40.0, 50.0], 0.5) == 30.0
+    assert quantile([10.0, 20.0], 0.9) == pytest.approx(19.0)
+
+
+def test_stats_for_missing_database_is_empty(tmp_path):
+    history = _history(tmp_path)
+    assert history.stats_for(["power.disk_ac"]) == {}
+    assert not (tmp_path / "history.sqlite3").exists()
+
+
+def test_other_models_are_used_until_this_one_has_enough_runs(tmp_path):
+    other = _history(tmp_path, model="Lenovo ThinkPad T14")
+    other.record([("power.disk_ac", ms) for ms in (1000, 2000, 3000)])
+    mine = _history(tmp_path)
+    mine.record([("power.disk_ac", 100.0)] * (step_history.MIN_SAMPLES - 1))
+    stats = mine.stats_for(["power.disk_ac", "power.disk_dc"])
+    assert list(stats) == ["power.disk_ac"]
+    assert stats["power.disk_ac"].count == 3 + step_history.MIN_SAMPLES - 1
+
+    mine.record([("power.disk_ac", 100.0)])
+    assert mine.stats_for(["power.disk_ac"])["power.disk_ac"] == StepStats(step_history.MIN_SAMPLES, 100.0, 100.0)
+
+
+def test_record_keeps_the_newest_runs_per_step(tmp_path, monkeypatch):
+    monkeypatch.setattr(step_history, "KEEP_PER_STEP", 3)
+    history = _history(tmp_path)
+    for ms in (1, 2, 3, 4, 5):
+        history.record([("power.disk_ac", ms), ("power.disk_dc", 10 * ms)], run_id=f"run{ms}")
+    stats = history.stats_for()
+    assert stats["power.disk_ac"] == StepStats(3, 4.0, pytest.approx(4.8))
+    assert stats["power.disk_dc"].count == 3
+    assert history.record([]) == 0
+
+
+def test_slow_needs_history_and_a_clear_margin():
+    stats = StepStats(5, 1000.0, 2000.0)
+    assert slow(20000.0, stats)
+    # over twice the 90th percentile but less than SLOW_MIN_MS over it
+    assert not slow(2500.0, StepStats(5, 500.0, 1000.0))
+    # well over the 90th percentile in time but not twice it
+    assert not slow(9000.0, StepStats(5, 4000.0, 5000.0))
+    assert not slow(20000.0, StepStats(step_history.MIN_SAMPLES - 1, 1000.0, 2000.0))
+    assert not slow(20000.0, None)
+
+
+def test_forecast_spreads_sections_over_workers_and_counts_down():
+    stats = {"power.a": StepStats(5, 1000.0, 2000.0), "power.b": StepStats(5, 1000.0, 2000.0),
+             "taskbar.c": StepStats(5, 3000.0, 4000.0)}
+    clock = Clock()
+    # taskbar.d has no history and counts as the median of the known steps
+    forecast = Forecast(["power.a", "power.b", "taskbar.c", "taskbar.d"], stats, workers=2, clock=clock)
+    assert forecast.known == 3
+    assert forecast.remaining() == (4.0, 5.0)
+    assert forecast.fraction() == 0.0
+
+    clock.now += 1.0
+    assert forecast.remaining() == (3.0, 4.0)
+    assert forecast.fraction() == pytest.approx(0.25)
+
+    assert forecast.feed(_step("taskbar.c", 3000.0)) is False
+    assert forecast.remaining() == (2.0, 4.0)
+    assert forecast.text() == "About 2s left (up to 4s)"
+    assert forecast.feed(_step("taskbar.c", 3000.0)) is False
+
+    assert forecast.feed(_step("power.a", 20000.0)) is True
+    assert forecast.feed(_step("power.b", 20000.0, status="failed")) is False
+    forecast.feed(_step("taskbar.d", 10.0))
+    assert forecast.remaining() == (0.0, 0.0)
+    assert forecast.fraction() == 1.0
+    assert forecast.text() == "Finishing..."
+
+
+def test_forecast_without_history_counts_steps():
+    forecast = Forecast(["power.a", "power.b"], {}, clock=Clock())
+    assert forecast.text() == "2 step(s) left"
+    assert forecast.remaining() == (1.0, 1.0)
+
+
+def test_forecast_past_its_estimate():
+    clock = Clock()
+    forecast = Forecast(["power.a"], {"power.a": StepStats(5, 1000.0, 3000.0)}, clock=clock)
+    clock.now += 2.0
+    assert forecast.text() == "Taking longer than usual; up to 1s more"
+
+
+def test_format_duration():
+    assert step_history.format_duration(42) == "42s"
+    assert step_history.format_duration(125) == "2 min 05s"
+    assert step_history.format_duration(1500) == "25 min"
+    assert step_history.format_duration(3725) == "1 h 02 min"
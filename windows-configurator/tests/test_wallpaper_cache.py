@@ -0,0 +1,129 @@
+import os
+import shutil
+import threading
+import time
+
+import pytest
+
+import wallpaper_cache
+from wallpaper_cache import ImportCancelled, WallpaperCache, WallpaperImport
+
+SIZE = (1920, 1080)
+
+
+class Render:
+    """Stands in for render_fill: copies the source and records the sizes asked for."""
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, src, dest, size):
+        self.calls.append(size)
+        shutil.copyfile(src, dest)
+
+
+def _source(tmp_path, name, data=b"wallpaper bytes"):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def _cache(tmp_path, **kwargs):
+    render = Render()
+    return WallpaperCache(str(tmp_path / "cache"), render=render, **kwargs), render
+
+
+def test_default_dir_is_under_localappdata(tmp_path, monkeypatch):
+    monkeypatch.setenv("LOCALAPPDATA", str(tmp_path))
+    assert wallpaper_cache.default_cache_dir() == os.path.join(str(tmp_path), "CCI_New_PC_Setup", "wallpapers")
+
+
+def test_import_renders_once_and_lookup_hits(tmp_path):
+    cache, render = _cache(tmp_path)
+    src = _source(tmp_path, "bg.png")
+    assert cache.lookup(src, SIZE) is None
+    path = cache.import_file(src, SIZE)
+    assert os.path.basename(path).endswith("-1920x1080.jpg")
+    assert cache.lookup(src, SIZE) == path
+    assert cache.import_file(src, SIZE) == path
+    assert render.calls == [SIZE]
+
+
+def test_same_content_from_two_paths_is_one_file(tmp_path):
+    cache, render = _cache(tmp_path)
+    first = cache.import_file(_source(tmp_path, "a.png"), SIZE)
+    second = cache.import_file(_source(tmp_path, "b.png"), SIZE)
+    assert first == second
+    assert len(render.calls) == 1
+    assert [row[0] for row in cache.entries()] == [first]
+
+
+def test_changed_source_is_imported_again(tmp_path):
+    cache, _ = _cache(tmp_path)
+    src = _source(tmp_path, "bg.png")
+    old = cache.import_file(src, SIZE)
+    _source(tmp_path, "bg.png", b"a different picture")
+    assert cache.lookup(src, SIZE) is None
+    assert cache.import_file(src, SIZE) != old
+
+
+def test_index_survives_a_new_cache_object(tmp_path):
+    cache, _ = _cache(tmp_path)
+    src = _source(tmp_path, "bg.png")
+    path = cache.import_file(src, SIZE)
+    again, render = _cache(tmp_path)
+    assert again.lookup(src, SIZE) == path
+    assert render.calls == []
+
+
+def test_evict_removes_least_recently_used_but_not_the_pinned(tmp_path):
+    cache, _ = _cache(tmp_path)
+    paths = [cache.import_file(_source(tmp_path, f"{i}.png", bytes([i]) * 100), SIZE) for i in range(3)]
+    now = time.time()
+    for age, path in zip((300, 200, 100), paths):
+        os.utime(path, (now - age, now - age))
+    cache.pin(paths[0])
+    cache.max_bytes = 150
+    assert cache.evict() == [paths[1], paths[2]]
+    assert [row[0] for row in cache.entries()] == [paths[0]]
+
+
+def test_cancel_stops_the_copy_and_leaves_no_partial_file(tmp_path):
+    cache, render = _cache(tmp_path)
+    cancel = threading.Event()
+    cancel.set()
+    with pytest.raises(ImportCancelled):
+        cache.import_file(_source(tmp_path, "bg.png"), SIZE, cancel=cancel)
+    assert render.calls == []
+    assert cache.entries() == []
+    assert [n for n in os.listdir(cache.root) if n.startswith("incoming-")] == []
+
+
+def test_copy_reports_progress_per_chunk(tmp_path, monkeypatch):
+    monkeypatch.setattr(wallpaper_cache, "CHUNK_SIZE", 4)
+    cache, _ = _cache(tmp_path)
+    seen = []
+    cache.import_file(_source(tmp_path, "bg.png", b"0123456789"), SIZE,
+                      progress=lambda done, total: seen.append((done, total)))
+    assert seen == [(4, 10), (8, 10), (10, 10)]
+
+
+def test_background_import_ends_with_done(tmp_path):
+    cache, _ = _cache(tmp_path)
+    job = WallpaperImport(cache, _source(tmp_path, "bg.png"), SIZE).start()
+    events = []
+    deadline = time.monotonic() + 10
+    while not events or events[-1][0] != "done":
+        assert time.monotonic() < deadline
+        events += job.drain()
+        time.sleep(0.01)
+    assert events[-1] == ("done", job.path, None)
+    assert os.path.exists(job.path)
+    assert not job.running
+
+
+def test_background_import_reports_a_missing_source(tmp_path):
+    cache, _ = _cache(tmp_path)
+    job = WallpaperImport(cache, str(tmp_path / "missing.png"), SIZE).start()
+    kind, path, error = job.events.get(timeout=10)
+    assert (kind, path) == ("done", None)
+    assert error
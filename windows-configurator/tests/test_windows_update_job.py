@@ -0,0 +1,78 @@
+import windows_update_job as wu
+from windows_update_job import FakeUpdateProvider, UpdateInfo, WindowsUpdateJob
+
+UPDATES = [UpdateInfo("KB1", "First"), UpdateInfo("KB2", "Second"), UpdateInfo("KB3", "Third")]
+
+
+def _run(provider):
+    job = WindowsUpdateJob(provider).start()
+    job._thread.join(10)
+    assert not job._thread.is_alive()
+    events = job.drain(10000)
+    assert events[-1][0] == "done"
+    assert [e for e in events if e[0] == "done"] == [events[-1]]
+    return job, events
+
+
+def _states(events):
+    return [e[1] for e in events if e[0] == "state"]
+
+
+def test_success_with_reboot():
+    provider = FakeUpdateProvider(UPDATES, reboot={"KB2"})
+    job, events = _run(provider)
+    assert events[-1] == ("done", wu.DONE, True, None)
+    assert [u.kb for u in job.installed] == ["KB1", "KB2", "KB3"]
+    assert _states(events) == [wu.PREPARING, wu.SCANNING] + [wu.DOWNLOADING, wu.INSTALLING] * 3 \
+        + [wu.STOPPING_SERVICE, wu.DONE]
+    assert provider.calls[-1] == ("stop_service",)
+    assert ("update", 2, 3, "KB2", "install", 100) in events
+
+
+def test_a_failed_update_is_skipped():
+    provider = FakeUpdateProvider(UPDATES, fail={"download:KB2": "no space"})
+    job, events = _run(provider)
+    assert events[-1][:3] == ("done", wu.FAILED, False)
+    assert "KB2" in events[-1][3]
+    assert [u.kb for u in job.installed] == ["KB1", "KB3"]
+    assert [u.kb for u in job.failed] == ["KB2"]
+    assert ("install", "KB2") not in provider.calls
+    assert provider.calls[-1] == ("stop_service",)
+
+
+def test_prepare_or_scan_failure_still_stops_the_service():
+    for phase in ("prepare", "scan"):
+        provider = FakeUpdateProvider(UPDATES, fail={phase: f"{phase} broke"})
+        job, events = _run(provider)
+        assert events[-1] == ("done", wu.FAILED, False, f"{phase} broke")
+        assert job.installed == []
+        assert provider.calls[-1] == ("stop_service",)
+
+
+def test_stop_service_failure_fails_the_job():
+    job, events = _run(FakeUpdateProvider(UPDATES, fail={"stop_service": "access denied"}))
+    assert events[-1] == ("done", wu.FAILED, False, "Could not stop wuauserv: access denied")
+    assert len(job.installed) == 3
+
+
+class CancellingProvider(FakeUpdateProvider):
+    """Cancels the job once the second update starts installing."""
+    job = None
+
+    def install(self, update, progress, cancel):
+        if update.kb == "KB2":
+            self.job.cancel()
+        return super().install(update, progress, cancel)
+
+
+def test_cancel_mid_install():
+    provider = CancellingProvider(UPDATES)
+    job = WindowsUpdateJob(provider)
+    provider.job = job
+    job.start()._thread.join(10)
+    events = job.drain(10000)
+    assert events[-1] == ("done", wu.CANCELLED, False, None)
+    assert [u.kb for u in job.installed] == ["KB1"]
+    # a cancelled job leaves the service alone and starts nothing more
+    assert ("stop_service",) not in provider.calls
+    assert ("download", "KB3") not in provider.calls
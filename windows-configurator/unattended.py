@@ -0,0 +1,471 @@
+"""Unattended mode: run the rename-plus-configure sequence from an answer file.
+
+    CCI_New_PC_Setup.exe --answer-file answers.json [--result result.json]
+    python computer_namer_gui.py --answer-file answers.json
+
+computer_namer_gui.py hands over to main() before tkinter is imported, and
+nothing here imports Tk or PIL, so the first action starts within a few
+hundred milliseconds. The answer file is a JSON object; every key is
+optional except the ones the name needs (customer and serial, or
+custom_name):
+
+    {
+      "customer": "Acme", "type": "Laptop", "serial": "5CG1234XYZ",
+      "custom_name": "",
+      "time_zone": "Eastern Standard Time",
+      "background": "H:\\\\Shared drives\\\\...\\\\wallpaper.png",
+      "apply_power": true, "apply_taskbar": true, "apply_datetime": true,
+      "apply_notifications": true, "apply_windowsupdate": false,
+      "apply_personalization": true,
+      "power_button_do_nothing": false, "sleep_button_do_nothing": false,
+      "lid_close_do_nothing": false,
+      "rename": true, "restart": false, "dry_run": false
+    }
+
+Toggles default to the GUI's defaults; the toggle and setting keys are the
+"answer" names in settings_catalog.json. The name follows the naming.py rules.
+The run goes in the GUI's order: probe the current state, write the registry
+and the wallpaper natively, run the sections concurrently (Windows Update
+alongside them), then rename, then restart when "restart" is true and
+everything succeeded.
+
+The result is a JSON object, printed on stdout and written to --result if
+given; progress goes to stderr. Step durations go to the step history
+(step_history.py), and steps much slower than their history are listed in
+"slow_steps". Exit codes:
+    0     success
+    1     a step, section, the update job or the rename failed
+    2     the answer file is missing or invalid
+    3     not running elevated (not needed with "dry_run")
+    3010  success, but a restart is needed (rename or updates) and "restart" is false
+"""
+import json
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+import configurator_plan as _plan
+import naming as _naming
+import native_ops as _native
+import profiling
+import registry_ops as _reg
+import run_archive as _archive
+import run_journal as _journal
+import selection as _sel
+import step_history as _hist
+import settings_catalog as _catalog
+import state_probe as _probe
+from file_availability import FileAvailability
+from ps_worker import WorkerClient, WorkerPool, worker_command
+from section_graph import SectionRun, worker_executor
+from step_events import StepTimings
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_INVALID = 2
+EXIT_NOT_ADMIN = 3
+EXIT_REBOOT_REQUIRED = 3010
+
+SECTION_WORKERS = 3
+BACKGROUND_TIMEOUT = 5.0
+
+# answer file key -> selection.py key, from the "answer" of each catalog setting
+TOGGLES = {s.answer: s.key for s in _catalog.catalog().settings if s.answer and s.type == "bool"}
+TEXT_SETTINGS = {s.answer: s.key for s in _catalog.catalog().settings if s.answer and s.type == "text"}
+TEXT_KEYS = ("customer", "type", "serial", "custom_name", "background") + tuple(TEXT_SETTINGS)
+FLAGS = {"rename": True, "restart": False, "dry_run": False}
+
+
+class AnswerError(Exception):
+    """The answer file cannot be used; `errors` lists every problem found."""
+    def __init__(self, errors):
+        super().__init__("; ".join(errors))
+        self.errors = list(errors)
+
+
+def _resource_path(rel_path):
+    base = getattr(sys, "_MEIPASS", None)
+    return os.path.join(base or os.path.dirname(os.path.abspath(__file__)), rel_path)
+
+
+def is_admin():
+    try:
+        import ctypes
+        return ctypes.windll.shell32.IsUserAnAdmin() != 0
+    except Exception:
+        return False
+
+
+def load_answers(path):
+    """Read and validate an answer file; returns the normalized answers dict or raises AnswerError."""
+    try:
+        with open(path, encoding="utf-8-sig") as fh:
+            raw = json.load(fh)
+    except OSError as e:
+        raise AnswerError([f"cannot read {path}: {e.strerror or e}"])
+    except ValueError as e:
+        raise AnswerError([f"{path} is not valid JSON: {e}"])
+    return validate_answers(raw)
+
+
+def validate_answers(raw):
+    if not isinstance(raw, dict):
+        raise AnswerError(["the answer file must contain a JSON object"])
+    errors = []
+    known = set(TEXT_KEYS) | set(TOGGLES) | set(FLAGS)
+    for key in sorted(set(raw) - known):
+        errors.append(f"unknown key {key!r}")
+    answers = {}
+    for key in TEXT_KEYS:
+        value = raw.get(key, "")
+        if value is None:
+            value = ""
+        if not isinstance(value, str):
+            errors.append(f"{key} must be a string")
+            value = ""
+        answers[key] = value.strip()
+    defaults = _sel.default_selection()
+    for key, sel_key in TOGGLES.items():
+        value = raw.get(key, defaults[sel_key])
+        if not isinstance(value, bool):
+            errors.append(f"{key} must be true or false")
+            value = defaults[sel_key]
+        answers[key] = value
+    for key, default in FLAGS.items():
+        value = raw.get(key, default)
+        if not isinstance(value, bool):
+            errors.append(f"{key} must be true or false")
+            value = default
+        answers[key] = value
+
+    type_name = answers["type"]
+    if type_name and _naming.type_char(type_name) == "D" and type_name.lower() not in ("desktop", "d"):
+        errors.append(f"type {type_name!r} is not one of {', '.join(_naming.TYPE_MAP)}")
+    if answers["rename"]:
+        name = computer_name(answers)
+        if not name:
+            errors.append("no computer name: give customer and serial, or custom_name")
+        elif name.isdigit():
+            errors.append(f"computer name {name!r} cannot be all digits")
+    if errors:
+        raise AnswerError(errors)
+    return answers
+
+
+def computer_name(answers):
+    return _naming.generate_name(answers["customer"], answers["type"] or "Console",
+                                 answers["serial"], answers["custom_name"])
+
+
+def selection_for(answers):
+    sel = {sel_key: answers[key] for key, sel_key in TOGGLES.items()}
+    sel.update({sel_key: answers[key] for key, sel_key in TEXT_SETTINGS.items()})
+    return sel
+
+
+class UnattendedRun:
+    """One unattended run; execute() returns the result dict (with "exit_code")."""
+    def __init__(self, answers, log=None, report=None, started=None):
+        self.answers = answers
+        self.started = started if started is not None else time.perf_counter()
+        self.result = {"status": "running", "errors": [], "warnings": [], "slow_steps": []}
+        # step events of the section run and the update job's duration, for step_history.py
+        self._durations = []
+        self._wu_ms = 0.0
+        # the run's log in the run archive (run_archive.py), shared with the GUI's runs
+        self._archive_run = None
+        self._log = log or (lambda text: print(text, file=sys.stderr, flush=True))
+        # called with the final result; before the restart when there is one
+        self._report = report or (lambda result: None)
+
+    def log(self, text):
+        self._log(text)
+        if self._archive_run is not None:
+            self._archive_run.append(text + "\n")
+
+    def error(self, text):
+        self.result["errors"].append(text)
+        self.log(f"ERROR: {text}")
+
+    def warn(self, text):
+        self.result["warnings"].append(text)
+        self.log(f"WARNING: {text}")
+
+    def background(self):
+        """The wallpaper to use: the answer file's if it is reachable in time, else the bundled default."""
+        src = self.answers["background"]
+        if src:
+            if FileAvailability(timeout=BACKGROUND_TIMEOUT).wait(src):
+                return src
+            self.warn(f"background {src} is not reachable; using the default background")
+        default = Path(_resource_path("assets")) / "default_background.png"
+        return str(default) if default.exists() else None
+
+    def execute(self):
+        answers, result = self.answers, self.result
+        dry_run = answers["dry_run"]
+        name = computer_name(answers) if answers["rename"] else None
+        result.update(name=name, dry_run=dry_run, rename=answers["rename"], restart=False,
+                      reboot_required=False, run_id=None, sections=[], failed_steps=[])
+        if not dry_run and not is_admin():
+            self.error("not running elevated; run as Administrator")
+            return self._finish(EXIT_NOT_ADMIN)
+        result["startup_ms"] = round((time.perf_counter() - self.started) * 1000.0, 1)
+        profiling.instant("unattended.first_action", cat="unattended")
+
+        sel = selection_for(answers)
+        bg = self.background() if sel.get("personalization") else None
+        params = _sel.selection_params(sel, bg, dry_run)
+        result["params"] = params
+        try:
+            self._archive_run = _archive.RunArchive().begin("unattended", f"Unattended run ({name or 'no rename'})", params)
+        except OSError as e:
+            self.log(f"Run archive unavailable: {e}")
+        worker = WorkerClient(worker_command(_resource_path("ps_worker.ps1")))
+        pool = WorkerPool(worker.cmd, SECTION_WORKERS, first=worker)
+        try:
+            failed = False
+            if any(k.startswith("Do") for k in params):
+                failed |= not self._configure(params, pool, dry_run)
+            if name:
+                failed |= not self._rename(worker, name, dry_run)
+            if failed:
+                return self._finish(EXIT_FAILED)
+            if answers["restart"] and not dry_run:
+                result["restart"] = True
+                # report before the machine goes down; the restart itself is the last action
+                self._finish(EXIT_OK)
+                self.log("Restarting...")
+                self._wait(worker.submit("restart"))
+                return self.result
+            return self._finish(EXIT_REBOOT_REQUIRED if result["reboot_required"] and not dry_run else EXIT_OK)
+        finally:
+            pool.close()
+
+    def _configure(self, params, pool, dry_run):
+        script = _resource_path("configure-windows.ps1")
+        if not os.path.exists(script):
+            self.error(f"configure-windows.ps1 not found at {script}")
+            return False
+        journal = None
+        if not dry_run:
+            try:
+                journal = _journal.RunJournal.create(params)
+                self.result["run_id"] = journal.run_id
+            except OSError as e:
+                self.log(f"Run journal unavailable: {e}")
+
+        plan = _plan.build_plan(params)
+        errors = len(self.result["errors"])
+        skip = self._probe_and_write(plan, journal, script) if not dry_run else []
+        if skip:
+            params = dict(params, SkipSteps=skip)
+
+        history = _hist.StepHistory()
+        try:
+            stats = history.stats_for([s.id for s in plan] + [_hist.WINDOWS_UPDATE_STEP])
+        except (sqlite3.Error, OSError) as e:
+            self.log(f"Step history unavailable: {e}")
+            stats = {}
+        forecast = _hist.Forecast([s.id for s in plan if s.id not in skip and s.section != "windowsupdate"],
+                                  stats, SECTION_WORKERS)
+
+        # a catalog-only step that could not be written natively fails the run
+        ok = len(self.result["errors"]) == errors
+        wu = None
+        if params.pop("DoWindowsUpdate", False):
+            wu = self._start_windows_update(dry_run)
+        if any(k.startswith("Do") for k in params):
+            if not dry_run:
+                self.log(f"Estimate: {forecast.text()}")
+            ok &= self._run_sections(params, pool, script, journal, forecast)
+        if wu is not None:
+            ok &= self._finish_windows_update(wu, journal)
+        if not dry_run:
+            durations = [(e.id, e.duration_ms) for e in self._durations if e.status == "ok"]
+            if wu is not None and wu.state == "done":
+                durations.append((_hist.WINDOWS_UPDATE_STEP, self._wu_ms))
+            try:
+                history.record(durations, self.result.get("run_id"))
+            except (sqlite3.Error, OSError) as e:
+                self.log(f"Step history not updated: {e}")
+        if journal is not None:
+            journal.finish()
+        return ok
+
+    def _probe_and_write(self, plan, journal, script):
+        """Read the current state, write registry values and the wallpaper natively; returns the step ids now done.
+
+        A failed write is retried by `script` when it has the step; catalog-only steps are reported as errors.
+        """
+        fixture = os.environ.get("CCI_PROBE_FIXTURE")
+        if fixture:
+            backend = _probe.FakeProbeBackend.from_json(fixture)
+        elif os.name == "nt":
+            backend = _probe.PowerShellProbeBackend()
+        else:
+            backend = _probe.FakeProbeBackend()
+        try:
+            skip = _probe.skip_ids(_probe.probe_plan(plan, backend))
+        except Exception as e:
+            self.log(f"State probe failed, applying everything: {e}")
+            skip = []
+        self.log(f"{len(skip)} step(s) already in the wanted state")
+        if os.name == "nt":
+            written = _reg.WinregBackend().apply(_reg.writes_for_plan(plan, skip))
+            native = [r.write.step_id for r in written if r.ok and r.write.step_id]
+            for r in written:
+                if not r.ok:
+                    self.log(f"Registry write failed: {r.write.key}\\{r.write.name} ({r.error})")
+            backend = _native.default_backend()
+            for r in _native.apply_native_steps(plan, backend, skip) if backend is not None else ():
+                if r.ok:
+                    native.append(r.step_id)
+                else:
+                    self.log(f"Wallpaper failed: {r.target} ({r.error})")
+            if journal is not None and native:
+                journal.mark_completed(native)
+            skip += native
+            for sid in _plan.catalog_only_unapplied(plan, set(skip), _plan.script_step_ids(script)):
+                self.error(f"Step {sid} was not applied and configure-windows.ps1 has no fallback for it")
+        return list(dict.fromkeys(skip))
+
+    def _run_sections(self, params, pool, script, journal, forecast=None):
+        sections = _plan.selected_sections(params)
+        self.log(f"Configuring: {', '.join(sections)}")
+        timings = StepTimings()
+        self._durations = timings.steps
+        execute = worker_executor(pool, script, dict(params, StepEvents=True))
+        job = SectionRun(sections, execute, SECTION_WORKERS).start()
+        while True:
+            kind, payload = job.events.get()
+            if kind == "exit":
+                break
+            event = timings.feed(payload) if kind == "out" else None
+            if event is None:
+                self.log(payload if kind == "out" else f"[stderr] {payload}")
+                continue
+            if journal is not None:
+                journal.record(event)
+            if forecast is not None and forecast.feed(event):
+                self.log(_hist.slow_message(event, forecast.stats[event.id]))
+                self.result["slow_steps"].append({"id": event.id, "ms": event.duration_ms,
+                                                  "usual_ms": round(forecast.stats[event.id].p50_ms, 1)})
+        self.result["sections"] = [
+            {"section": r.section, "exit_code": r.code, "seconds": round(r.duration, 2), "error": r.error}
+            for r in job.results]
+        self.result["failed_steps"] = [{"id": e.id, "error": e.error or f"exit code {e.exit_code}"}
+                                       for e in timings.failed() if e.type == "step"]
+        self.result["slowest_steps"] = [{"id": e.id, "ms": e.duration_ms} for e in timings.slowest()]
+        if job.returncode != 0:
+            self.error(f"configuration failed (exit code {job.returncode})")
+        return job.returncode == 0 and not self.result["failed_steps"]
+
+    def _start_windows_update(self, dry_run):
+        import windows_update_job as _wu
+        if dry_run:
+            self.log("Windows Update: skipped (dry run)")
+            return None
+        if os.name == "nt" and not os.environ.get("CCI_WORKER_STUB"):
+            provider = _wu.PowerShellUpdateProvider()
+        else:
+            provider = _wu.FakeUpdateProvider([_wu.UpdateInfo("KB0000001", "Sample update (stub)")], delay=0.3)
+        self.log("Windows Update: started alongside the other settings")
+        self._wu_started = time.perf_counter()
+        return _wu.WindowsUpdateJob(provider).start()
+
+    def _finish_windows_update(self, job, journal):
+        import windows_update_job as _wu
+        while True:
+            event = job.events.get()
+            if event[0] == "log":
+                self.log(f"[windowsupdate] {event[1]}")
+            elif event[0] == "done":
+                _, state, reboot, error = event
+                self._wu_ms = (time.perf_counter() - self._wu_started) * 1000.0
+                break
+        self.result["windows_update"] = {"state": state, "installed": [u._asdict() for u in job.installed],
+                                         "failed": [u._asdict() for u in job.failed], "reboot_required": bool(reboot),
+                                         "error": error}
+        self.result["reboot_required"] |= bool(reboot)
+        if journal is not None:
+            journal.mark_section("windowsupdate", "ok" if state == _wu.DONE else state, error)
+        if state != _wu.DONE:
+            self.error(f"Windows Update {state}: {error}")
+            return False
+        return True
+
+    def _rename(self, worker, name, dry_run):
+        if dry_run:
+            self.log(f"Rename to {name}: skipped (dry run)")
+            return True
+        self.log(f"Renaming computer to {name}")
+        backend = _native.default_backend()
+        if backend is not None:
+            try:
+                _native.try_rename(name, backend)
+            except _native.NativeError as e:
+                if not e.fallback:
+                    self.error(str(e))
+                    return False
+                self.log(f"Native rename unavailable ({e.message}); using Rename-Computer")
+            else:
+                self.result["reboot_required"] = True
+                return True
+        job = worker.submit("rename", {"name": name})
+        code = self._wait(job)
+        if code != 0:
+            self.error(f"rename to {name} failed (exit code {code})")
+            return False
+        self.result["reboot_required"] = True
+        return True
+
+    def _wait(self, job):
+        while True:
+            kind, payload = job.events.get()
+            if kind == "exit":
+                return payload
+            self.log(payload if kind == "out" else f"[stderr] {payload}")
+
+    def _finish(self, code):
+        self.result["exit_code"] = code
+        self.result["status"] = {EXIT_OK: "ok", EXIT_REBOOT_REQUIRED: "ok"}.get(code, "failed")
+        self.result["total_ms"] = round((time.perf_counter() - self.started) * 1000.0, 1)
+        rec, self._archive_run = self._archive_run, None
+        if rec is not None:
+            try:
+                self.result["archive_id"] = rec.finish("dry run" if self.result.get("dry_run") else self.result["status"], code).id
+            except OSError as e:
+                self.log(f"Run archive not updated: {e}")
+        self._report(self.result)
+        return self.result
+
+
+def write_result(result, path):
+    if path:
+        _journal.atomic_write_json(path, result)
+    sys.stdout.write(json.dumps(result, indent=2) + "\n")
+    sys.stdout.flush()
+
+
+def _arg(argv, flag):
+    return argv[argv.index(flag) + 1] if flag in argv[:-1] else None
+
+
+def main(argv, started=None):
+    """Entry point for --answer-file; returns the process exit code."""
+    started = started if started is not None else time.perf_counter()
+    answer_file = _arg(argv, "--answer-file")
+    result_path = _arg(argv, "--result")
+    if not answer_file:
+        write_result({"status": "invalid", "exit_code": EXIT_INVALID, "errors": ["--answer-file needs a path"]}, result_path)
+        return EXIT_INVALID
+    try:
+        answers = load_answers(answer_file)
+    except AnswerError as e:
+        write_result({"status": "invalid", "exit_code": EXIT_INVALID, "errors": e.errors}, result_path)
+        return EXIT_INVALID
+    run = UnattendedRun(answers, report=lambda result: write_result(result, result_path), started=started)
+    return run.execute()["exit_code"]
@@ -0,0 +1,169 @@
+"""Virtualized Tk rows and a single shared tooltip window.
+
+VirtualList shows a list of any length with a fixed pool of row widgets: just
+enough for the rows that fit, created once and re-pointed at other items as
+the list scrolls. The caller supplies make_row(parent) -> (frame, widgets)
+and render(widgets, item); render(widgets, None) blanks a row past the end.
+Refreshing the list only re-renders the visible rows, so hundreds of items
+cost the same as a screenful.
+
+SharedTooltip owns one Toplevel for the whole app. Widgets register a text
+(or a callable returning the text, so a pooled row can describe whatever
+item it currently shows) instead of each owning a tooltip.
+"""
+import tkinter as tk
+from tkinter import font as tkfont
+from tkinter import ttk
+
+
+class SharedTooltip:
+    def __init__(self, root, delay=500):
+        self.root = root
+        self.delay = delay
+        self._window = None
+        self._label = None
+        self._after = None
+
+    def attach(self, widget, text):
+        """Show `text` (a string, or a callable returning one) while the pointer rests on `widget`."""
+        widget.bind("<Enter>", lambda e: self._schedule(widget, text), add="+")
+        widget.bind("<Leave>", lambda e: self.hide(), add="+")
+        widget.bind("<ButtonPress>", lambda e: self.hide(), add="+")
+
+    def _schedule(self, widget, text):
+        self.hide()
+        self._after = self.root.after(self.delay, self.show, widget, text)
+
+    def show(self, widget, text):
+        self._after = None
+        text = text() if callable(text) else text
+        if not text or not widget.winfo_exists():
+            return
+        if self._window is None:
+            self._window = tk.Toplevel(self.root)
+            self._window.withdraw()
+            self._window.wm_overrideredirect(True)
+            self._label = ttk.Label(self._window, justify="left", background="#FFFFE0", relief="solid", borderwidth=1)
+            self._label.pack(ipadx=6, ipady=3)
+        self._label.config(text=text)
+        x = widget.winfo_rootx() + 20
+        y = widget.winfo_rooty() + widget.winfo_height() + 10
+        self._window.wm_geometry(f"+{x}+{y}")
+        self._window.deiconify()
+        self._window.lift()
+
+    def hide(self):
+        if self._after is not None:
+            self.root.after_cancel(self._after)
+            self._after = None
+        if self._window is not None:
+            self._window.withdraw()
+
+
+class _Row:
+    __slots__ = ("frame", "widgets", "item")
+
+    def __init__(self, frame, widgets):
+        self.frame = frame
+        self.widgets = widgets
+        self.item = None
+
+
+class VirtualList(ttk.Frame):
+    def __init__(self, master, make_row, render, key=None, rows=10, row_height=None,
+                 tooltip=None, tooltip_text=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.items = []
+        self.top = 0
+        self._make_row = make_row
+        self._render = render
+        self._key = key or (lambda item: item)
+        self._index = {}
+        self._pool = []
+        self._tooltip = tooltip
+        self._tooltip_text = tooltip_text
+        self.row_height = row_height or max(18, tkfont.nametofont("TkDefaultFont").metrics("linespace") + 6)
+
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(0, weight=1)
+        self.body = ttk.Frame(self, height=rows * self.row_height)
+        self.body.grid(column=0, row=0, sticky="nsew")
+        self.body.grid_propagate(False)
+        self.body.pack_propagate(False)
+        self.vsb = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.vsb.grid(column=1, row=0, sticky="ns")
+        self.body.bind("<Configure>", self._on_resize)
+        self._bind_wheel(self.body)
+
+    @property
+    def visible_rows(self) -> int:
+        height = self.body.winfo_height()
+        if height <= 1:
+            height = int(self.body.cget("height"))
+        return max(1, height // self.row_height)
+
+    def set_items(self, items):
+        self.items = list(items)
+        self._index = {self._key(item): i for i, item in enumerate(self.items)}
+        self.top = min(self.top, max(0, len(self.items) - self.visible_rows))
+        self.refresh()
+
+    def refresh(self):
+        """Re-render every visible row."""
+        self._ensure_pool()
+        for i, row in enumerate(self._pool):
+            idx = self.top + i
+            row.item = self.items[idx] if idx < len(self.items) else None
+            self._render(row.widgets, row.item)
+        total = len(self.items)
+        if total:
+            self.vsb.set(self.top / total, min(1.0, (self.top + len(self._pool)) / total))
+        else:
+            self.vsb.set(0.0, 1.0)
+
+    def refresh_item(self, key):
+        """Re-render the row showing the item with `key`, if it is on screen."""
+        idx = self._index.get(key)
+        if idx is None or not self.top <= idx < self.top + len(self._pool):
+            return
+        row = self._pool[idx - self.top]
+        self._render(row.widgets, row.item)
+
+    def scroll_to(self, index):
+        self.top = max(0, min(int(index), max(0, len(self.items) - self.visible_rows)))
+        self.refresh()
+
+    def _ensure_pool(self):
+        wanted = self.visible_rows
+        while len(self._pool) < wanted:
+            frame, widgets = self._make_row(self.body)
+            row = _Row(frame, widgets)
+            frame.place(x=0, y=len(self._pool) * self.row_height, relwidth=1.0, height=self.row_height)
+            for w in (frame,) + tuple(widgets):
+                self._bind_wheel(w)
+                if self._tooltip is not None and self._tooltip_text is not None:
+                    self._tooltip.attach(w, lambda row=row: self._tooltip_text(row.item))
+            self._pool.append(row)
+        while len(self._pool) > wanted:
+            self._pool.pop().frame.destroy()
+
+    def _on_resize(self, _event=None):
+        if len(self._pool) != self.visible_rows:
+            self.top = min(self.top, max(0, len(self.items) - self.visible_rows))
+            self.refresh()
+
+    def _on_scrollbar(self, action, *args):
+        if action == "moveto":
+            self.scroll_to(float(args[0]) * len(self.items))
+        elif action == "scroll":
+            amount, what = int(args[0]), args[1]
+            self.scroll_to(self.top + amount * (self.visible_rows if what == "pages" else 1))
+
+    def _bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", self._on_wheel)
+        widget.bind("<Button-4>", lambda e: (self.scroll_to(self.top - 3), "break")[1])
+        widget.bind("<Button-5>", lambda e: (self.scroll_to(self.top + 3), "break")[1])
+
+    def _on_wheel(self, event):
+        self.scroll_to(self.top + (-3 if event.delta > 0 else 3))
+        return "break"
@@ -0,0 +1,269 @@
+"""Import wallpapers once into a local content-addressed cache.
+
+The corporate wallpaper lives on a Google Drive share. Reading it for every
+preview and handing the raw PNG to SystemParametersInfo (which decodes and
+transcodes it again) is slow, so a wallpaper is imported once:
+
+    1. copied in chunks off the share into the cache, hashing as it goes
+       (progress is reported per chunk and the copy can be cancelled)
+    2. pre-rendered at the display resolution, Fill style (scaled to cover and
+       centre-cropped), as a high quality JPEG; Windows stores wallpapers as
+       JPEG anyway. Without Pillow the copied original is used as is.
+    3. stored as <sha256>-<w>x<h>.jpg, so the same image imported from two
+       paths, or again after a restart, is a single local file
+
+index.json maps source (path, mtime, size) to the content hash, so an unchanged
+source is not even re-read. The cache is kept under `max_bytes` by evicting
+the least recently used files; the pinned wallpaper (the one last applied)
+is never evicted.
+"""
+import hashlib
+import importlib.util
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+
+import profiling
+from app_paths import app_data_dir
+from ps_runner import drain_events
+
+CHUNK_SIZE = 1024 * 1024
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+JPEG_QUALITY = 95
+
+
+class ImportCancelled(Exception):
+    pass
+
+
+def default_cache_dir() -> str:
+    return app_data_dir("wallpapers")
+
+
+def source_key(path: str):
+    """(absolute path, mtime_ns, size) for `path`; raises OSError when it is missing."""
+    st = os.stat(path)
+    return [os.path.abspath(path), st.st_mtime_ns, st.st_size]
+
+
+def render_fill(src_path, dest_path, size):
+    """Scale `src_path` to cover `size`, centre-crop and save it as JPEG."""
+    from PIL import Image, ImageOps
+    with Image.open(src_path) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        img = ImageOps.fit(img, size, Image.LANCZOS)
+        img.save(dest_path, "JPEG", quality=JPEG_QUALITY, subsampling=0, optimize=True)
+
+
+class WallpaperCache:
+    def __init__(self, root=None, max_bytes=DEFAULT_MAX_BYTES, render=None):
+        self.root = root or default_cache_dir()
+        self.max_bytes = max_bytes
+        if render is None:
+            # without Pillow the copied original is cached as is
+            render = render_fill if importlib.util.find_spec("PIL") is not None else None
+        self._render = render
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+        self._index_path = os.path.join(self.root, "index.json")
+        self._index = self._load_index()
+
+    def _load_index(self):
+        try:
+            with open(self._index_path, encoding="utf-8") as fh:
+                data = json.load(fh)
+            if isinstance(data, dict):
+                data.setdefault("sources", {})
+                data.setdefault("pinned", None)
+                return data
+        except (OSError, ValueError):
+            pass
+        return {"sources": {}, "pinned": None}
+
+    def _save_index(self):
+        tmp = self._index_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(self._index, fh)
+        os.replace(tmp, self._index_path)
+
+    def _entry_name(self, digest, size, ext):
+        if self._render:
+            return f"{digest}-{size[0]}x{size[1]}.jpg"
+        return f"{digest}{ext.lower()}"
+
+    def lookup(self, src, size):
+        """Cached file for `src` at `size` if the source is unchanged and already imported, else None."""
+        try:
+            key = source_key(src)
+        except OSError:
+            return None
+        with self._lock:
+            entry = self._index["sources"].get(key[0])
+        if not entry or entry.get("key") != key:
+            return None
+        path = os.path.join(self.root, self._entry_name(entry["hash"], size, os.path.splitext(src)[1]))
+        if not os.path.exists(path):
+            return None
+        self._touch(path)
+        return path
+
+    def import_file(self, src, size, progress=None, cancel=None):
+        """Import `src` and return the local path of the wallpaper rendered at `size` (w, h)."""
+        size = (int(size[0]), int(size[1]))
+        cached = self.lookup(src, size)
+        if cached:
+            return cached
+        key = source_key(src)
+        ext = os.path.splitext(src)[1] or ".img"
+        incoming = os.path.join(self.root, f"incoming-{os.getpid()}-{threading.get_ident()}{ext}")
+        try:
+            with profiling.span("wallpaper.copy", cat="image", bytes=key[2]):
+                digest = self._copy_hashing(src, incoming, key[2], progress, cancel)
+            dest = os.path.join(self.root, self._entry_name(digest, size, ext))
+            if not os.path.exists(dest):
+                if self._render:
+                    with profiling.span("wallpaper.render", cat="image", size=f"{size[0]}x{size[1]}"):
+                        tmp = dest + ".tmp"
+                        self._render(incoming, tmp, size)
+                        os.replace(tmp, dest)
+                else:
+                    os.replace(incoming, dest)
+        finally:
+            if os.path.exists(incoming):
+                os.remove(incoming)
+        with self._lock:
+            self._index["sources"][key[0]] = {"key": key, "hash": digest}
+            self._save_index()
+        self._touch(dest)
+        self.evict(keep=(dest,))
+        return dest
+
+    def _copy_hashing(self, src, dest, total, progress, cancel):
+        h = hashlib.sha256()
+        done = 0
+        with open(src, "rb") as fin, open(dest, "wb") as fout:
+            while True:
+                if cancel is not None and cancel.is_set():
+                    raise ImportCancelled()
+                chunk = fin.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                h.update(chunk)
+                fout.write(chunk)
+                done += len(chunk)
+                if progress is not None:
+                    progress(done, total)
+        return h.hexdigest()
+
+    def _touch(self, path):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def pin(self, path):
+        """Protect `path` (the applied wallpaper) from eviction; replaces the previous pin."""
+        with self._lock:
+            self._index["pinned"] = os.path.basename(path)
+            self._save_index()
+
+    def entries(self):
+        """(path, size, last used) of cached wallpapers, least recently used first."""
+        rows = []
+        for name in os.listdir(self.root):
+            if name == "index.json" or name.startswith("incoming-") or name.endswith(".tmp"):
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            rows.append((path, st.st_size, st.st_mtime))
+        rows.sort(key=lambda r: r[2])
+        return rows
+
+    def evict(self, keep=()):
+        """Delete least recently used wallpapers until the cache fits in max_bytes. Returns removed paths.
+
+        The pinned wallpaper and any path in `keep` are never removed.
+        """
+        rows = self.entries()
+        total = sum(r[1] for r in rows)
+        pinned = self._index.get("pinned")
+        keep = {os.path.abspath(p) for p in keep}
+        removed = []
+        for path, nbytes, _ in rows:
+            if total <= self.max_bytes:
+                break
+            if os.path.basename(path) == pinned or os.path.abspath(path) in keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= nbytes
+            removed.append(path)
+        return removed
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+        os.makedirs(self.root, exist_ok=True)
+        self._index = {"sources": {}, "pinned": None}
+
+
+class WallpaperImport:
+    """Import one wallpaper on a background thread.
+
+    Events on `events`:
+        ("progress", bytes_done, bytes_total)
+        ("done", local_path or None, error or None)   always the last event
+    """
+    def __init__(self, cache, src, size):
+        self.cache = cache
+        self.src = src
+        self.size = size
+        self.events = queue.Queue()
+        self.path = None
+        self.error = None
+        self.cancelled = False
+        self._cancel = threading.Event()
+        self._finished = False
+
+    @property
+    def running(self) -> bool:
+        return not self._finished
+
+    def start(self):
+        threading.Thread(target=self._main, daemon=True).start()
+        return self
+
+    def _main(self):
+        last = [0.0]
+
+        def progress(done, total):
+            # one event per ~50 ms is plenty for a progress bar
+            now = time.monotonic()
+            if done >= total or now - last[0] >= 0.05:
+                last[0] = now
+                self.events.put(("progress", done, total))
+
+        try:
+            self.path = self.cache.import_file(self.src, self.size, progress, self._cancel)
+        except ImportCancelled:
+            self.cancelled = True
+            self.error = "cancelled"
+        except Exception as e:
+            self.error = str(e)
+        self._finished = True
+        self.events.put(("done", self.path, self.error))
+
+    def cancel(self):
+        self._cancel.set()
+
+    def drain(self, max_events=500):
+        return drain_events(self.events, max_events)
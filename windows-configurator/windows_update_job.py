@@ -0,0 +1,299 @@
+"""Windows Update as a cancellable background job.
+
+configure-windows.ps1 runs `Get-WindowsUpdate -AcceptAll -Install -AutoReboot
+| Out-Null`, which blocks the whole run for a long time with no output. The
+GUI instead runs updates as a WindowsUpdateJob on its own thread, next to the
+other settings: one update at a time, download then install, with progress
+events and a cancel that takes effect between (or, for the PowerShell
+provider, in the middle of) operations. The job never reboots; it reports
+whether a reboot is required.
+
+State machine:
+    idle -> preparing -> scanning -> downloading <-> installing -> stopping_service -> done
+    any active state -> failed | cancelled
+    any active state -> stopping_service -> failed
+
+An update that fails to download or install is logged and skipped; the job
+carries on with the next one and ends failed, listing the updates in
+`failed`. The service is stopped on the way out whether the job succeeded or
+failed, but not when it was cancelled.
+
+Providers:
+    PowerShellUpdateProvider  PSWindowsUpdate cmdlets, one short process per operation
+    FakeUpdateProvider        scripted updates/failures for tests and non-Windows runs
+"""
+import json
+import queue
+import threading
+import time
+from typing import NamedTuple
+
+from ps_runner import BackgroundRunner, drain_events
+
+IDLE = "idle"
+PREPARING = "preparing"
+SCANNING = "scanning"
+DOWNLOADING = "downloading"
+INSTALLING = "installing"
+STOPPING_SERVICE = "stopping_service"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+ACTIVE_STATES = (PREPARING, SCANNING, DOWNLOADING, INSTALLING, STOPPING_SERVICE)
+FINAL_STATES = (DONE, FAILED, CANCELLED)
+
+TRANSITIONS = {
+    IDLE: {PREPARING},
+    PREPARING: {SCANNING, STOPPING_SERVICE},
+    SCANNING: {DOWNLOADING, STOPPING_SERVICE},
+    DOWNLOADING: {INSTALLING, DOWNLOADING, STOPPING_SERVICE},
+    INSTALLING: {DOWNLOADING, STOPPING_SERVICE},
+    STOPPING_SERVICE: {DONE},
+}
+for _state in ACTIVE_STATES:
+    TRANSITIONS[_state] = TRANSITIONS[_state] | {FAILED, CANCELLED}
+
+
+class UpdateCancelled(Exception):
+    pass
+
+
+class UpdateInfo(NamedTuple):
+    kb: str                 # KB article, or the title for updates without one
+    title: str
+    size: int = 0
+    update_id: str = ""     # Windows Update identity; selects the update when set
+
+
+class WindowsUpdateJob:
+    """Run updates through `provider` on a background thread.
+
+    Events on `events`:
+        ("state", state)
+        ("update", index, total, kb, phase, percent)   phase is "download" or "install"
+        ("log", text)
+        ("done", state, reboot_required, error)        always the last event
+    """
+    def __init__(self, provider, stop_service=True):
+        self.provider = provider
+        self.stop_service = stop_service
+        self.state = IDLE
+        self.updates = []
+        self.installed = []
+        self.failed = []
+        self.reboot_required = False
+        self.error = None
+        self.events = queue.Queue()
+        self._cancel = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self.state not in FINAL_STATES and self._thread is not None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._main, daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    def drain(self, max_events=500):
+        return drain_events(self.events, max_events)
+
+    def _set_state(self, state):
+        if state not in TRANSITIONS.get(self.state, ()):
+            raise RuntimeError(f"Invalid Windows Update job transition {self.state} -> {state}")
+        self.state = state
+        self.events.put(("state", state))
+
+    def _check_cancel(self):
+        if self._cancel.is_set():
+            raise UpdateCancelled()
+
+    def _main(self):
+        try:
+            try:
+                self._set_state(PREPARING)
+                self.provider.prepare(self._cancel)
+                self._check_cancel()
+                self._set_state(SCANNING)
+                self.updates = list(self.provider.scan(self._cancel))
+                self.events.put(("log", f"{len(self.updates)} update(s) available"))
+                total = len(self.updates)
+                for index, update in enumerate(self.updates, start=1):
+                    self._check_cancel()
+                    try:
+                        self._apply_update(index, total, update)
+                    except UpdateCancelled:
+                        raise
+                    except Exception as e:
+                        self._check_cancel()
+                        self.failed.append(update)
+                        self.events.put(("log", f"Update {update.kb} failed, skipped: {e}"))
+                self._check_cancel()
+                if self.failed:
+                    self.error = f"{len(self.failed)} of {total} update(s) failed: " + ", ".join(u.kb for u in self.failed)
+            finally:
+                if not self._cancel.is_set():
+                    self._stop_service()
+        except UpdateCancelled:
+            self._set_state(CANCELLED)
+        except Exception as e:
+            self.error = str(e)
+            self.events.put(("log", f"Windows Update failed: {e}"))
+            self._set_state(FAILED if not self._cancel.is_set() else CANCELLED)
+        else:
+            self._set_state(FAILED if self.error else DONE)
+        self.events.put(("done", self.state, self.reboot_required, self.error))
+
+    def _apply_update(self, index, total, update):
+        self._set_state(DOWNLOADING)
+        self.provider.download(update, self._progress(index, total, update, "download"), self._cancel)
+        self._check_cancel()
+        self._set_state(INSTALLING)
+        if self.provider.install(update, self._progress(index, total, update, "install"), self._cancel):
+            self.reboot_required = True
+        self.installed.append(update)
+        self.events.put(("log", f"Installed {update.kb}: {update.title}"))
+
+    def _stop_service(self):
+        """Leave wuauserv stopped; a failure here fails the job unless something failed first."""
+        self._set_state(STOPPING_SERVICE)
+        if not self.stop_service:
+            return
+        try:
+            self.provider.stop_service()
+        except Exception as e:
+            self.events.put(("log", f"Could not stop wuauserv: {e}"))
+            if self.error is None:
+                self.error = f"Could not stop wuauserv: {e}"
+
+    def _progress(self, index, total, update, phase):
+        def report(percent):
+            self.events.put(("update", index, total, update.kb, phase, int(percent)))
+        return report
+
+
+class FakeUpdateProvider:
+    """Scripted provider: `updates` are UpdateInfo rows; `fail` maps a kb or phase name to an error message."""
+    def __init__(self, updates=(), fail=None, reboot=(), delay=0.0):
+        self.updates = list(updates)
+        self.fail = dict(fail or {})
+        self.reboot = set(reboot)
+        self.delay = delay
+        self.calls = []
+
+    def _maybe_fail(self, key):
+        if key in self.fail:
+            raise RuntimeError(self.fail[key])
+
+    def _work(self, progress, cancel):
+        for pct in (0, 50, 100):
+            if cancel.is_set():
+                raise UpdateCancelled()
+            if self.delay:
+                time.sleep(self.delay)
+            progress(pct)
+
+    def prepare(self, cancel):
+        self.calls.append(("prepare",))
+        self._maybe_fail("prepare")
+
+    def scan(self, cancel):
+        self.calls.append(("scan",))
+        self._maybe_fail("scan")
+        return list(self.updates)
+
+    def download(self, update, progress, cancel):
+        self.calls.append(("download", update.kb))
+        self._work(progress, cancel)
+        self._maybe_fail(f"download:{update.kb}")
+
+    def install(self, update, progress, cancel):
+        self.calls.append(("install", update.kb))
+        self._work(progress, cancel)
+        self._maybe_fail(f"install:{update.kb}")
+        return update.kb in self.reboot
+
+    def stop_service(self):
+        self.calls.append(("stop_service",))
+        self._maybe_fail("stop_service")
+
+
+class PowerShellUpdateProvider:
+    """PSWindowsUpdate cmdlets, each operation in its own short PowerShell process.
+
+    PSWindowsUpdate reports no usable progress while a single update downloads or
+    installs, so each update goes 0% -> 100% per phase; cancel kills the running process.
+    """
+    def __init__(self, powershell="powershell"):
+        self.powershell = powershell
+
+    @staticmethod
+    def _select(update):
+        """Cmdlet parameters picking exactly `update`: its UpdateID, else its KB, else its title."""
+        if update.update_id:
+            name, value = "UpdateID", update.update_id
+        elif update.kb and update.kb != update.title:
+            name, value = "KBArticleID", update.kb
+        else:
+            name, value = "Title", update.title
+        return f"-{name} '{value.replace(chr(39), chr(39) * 2)}'"
+
+    def _run(self, command, cancel):
+        runner = BackgroundRunner([self.powershell, "-NoProfile", "-NonInteractive", "-ExecutionPolicy", "Bypass",
+                                   "-Command", command]).start()
+        out, err = [], []
+        while True:
+            if cancel.is_set():
+                runner.cancel()
+            try:
+                kind, payload = runner.events.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            if kind == "exit":
+                break
+            (out if kind == "out" else err).append(payload)
+        if runner.cancelled:
+            raise UpdateCancelled()
+        if runner.returncode != 0:
+            raise RuntimeError("\n".join(err) or f"PowerShell exited with code {runner.returncode}")
+        return "\n".join(out)
+
+    def prepare(self, cancel):
+        self._run("if (-not (Get-Module -ListAvailable -Name PSWindowsUpdate)) { "
+                  "Install-Module -Name PSWindowsUpdate -Force -Confirm:$false -Scope AllUsers -AllowClobber -ErrorAction Stop }; "
+                  "Import-Module PSWindowsUpdate -ErrorAction Stop", cancel)
+
+    def scan(self, cancel):
+        out = self._run("Import-Module PSWindowsUpdate; "
+                        "@(Get-WindowsUpdate -ErrorAction Stop | ForEach-Object { "
+                        "[pscustomobject]@{ kb = \"$($_.KB)\"; title = \"$($_.Title)\"; size = [int64]$_.Size; "
+                        "id = \"$($_.Identity.UpdateID)\" } }) "
+                        "| ConvertTo-Json -Compress", cancel).strip()
+        if not out:
+            return []
+        rows = json.loads(out)
+        if isinstance(rows, dict):
+            rows = [rows]
+        return [UpdateInfo(r.get("kb") or r.get("title", ""), r.get("title", ""), int(r.get("size") or 0), r.get("id") or "")
+                for r in rows]
+
+    def download(self, update, progress, cancel):
+        progress(0)
+        self._run(f"Import-Module PSWindowsUpdate; Get-WindowsUpdate {self._select(update)} -Download -AcceptAll -ErrorAction Stop | Out-Null", cancel)
+        progress(100)
+
+    def install(self, update, progress, cancel):
+        progress(0)
+        out = self._run(f"Import-Module PSWindowsUpdate; Install-WindowsUpdate {self._select(update)} -AcceptAll -IgnoreReboot -ErrorAction Stop | Out-Null; "
+                        "Get-WURebootStatus -Silent", cancel)
+        progress(100)
+        return out.strip().lower().endswith("true")
+
+    def stop_service(self):
+        self._run("Stop-Service -Name wuauserv -Force -ErrorAction Stop; Set-Service -Name wuauserv -StartupType Disabled",
+                  threading.Event())